@@ -0,0 +1,153 @@
+"""
+Benchmark the broad phase of Solve Adjacencies from 10 to 2,000 zones.
+
+hb_AdjacencyIndex is taken from src/Honeybee_Honeybee.py and run outside of Rhino with
+CPython 2.7. The model is a block of box zones (4 zones on each side for 10 zones and
+about 20 zones on each side and 5 floors for 2,000 zones) with 6 surfaces for each zone.
+The script checks that:
+    - the index returns the same candidates as testing every pair of surfaces of different
+      zones with the same test (up to 200 zones),
+    - every pair of surfaces that zones share is found and nothing else,
+    - every shared pair is found when the model is rotated and moved away from the origin.
+      Bounding boxes of rotated surfaces also overlap for some surfaces that are not
+      adjacent. These are left for the exact test of Solve Adjacencies, so the candidates
+      are checked against testing every pair here.
+It then prints the time to build and query the index and to test every pair.
+
+Usage:
+    python2 benchmarks/benchmark_AdjacencyIndex.py [maxZones] [maxBruteForceZones]
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import itertools
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+zoneCounts = (10, 50, 100, 200, 500, 1000, 2000)
+
+
+def loadHoneybeeClasses():
+    """Execute hb_AdjacencyIndex from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_AdjacencyIndex(object):")
+    end = source.index("class hb_EPSurface(object):")
+    namespace = {"math": math, "itertools": itertools}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace["hb_AdjacencyIndex"]
+
+
+def createBoxZone(ix, iy, iz, size = 4.0, height = 3.0):
+    """Return the 6 surfaces of a box zone with the normals facing out."""
+    x0, y0, z0 = ix * size, iy * size, iz * height
+    x1, y1, z1 = x0 + size, y0 + size, z0 + height
+    return [[(x0, y0, z0), (x0, y1, z0), (x1, y1, z0), (x1, y0, z0)],
+            [(x0, y0, z1), (x1, y0, z1), (x1, y1, z1), (x0, y1, z1)],
+            [(x0, y0, z0), (x1, y0, z0), (x1, y0, z1), (x0, y0, z1)],
+            [(x1, y1, z0), (x0, y1, z0), (x0, y1, z1), (x1, y1, z1)],
+            [(x1, y0, z0), (x1, y1, z0), (x1, y1, z1), (x1, y0, z1)],
+            [(x0, y1, z0), (x0, y0, z0), (x0, y0, z1), (x0, y1, z1)]]
+
+
+def createModel(zoneCount):
+    """Return the surfaces of a block of zones and the pairs of surfaces that the zones share."""
+    floors = max(1, int(round(zoneCount ** (1.0 / 3) / 2.5)))
+    side = int(math.ceil(math.sqrt(zoneCount / float(floors))))
+    positions = [(count % side, (count // side) % side, count // (side * side)) for count in range(zoneCount)]
+    zones = [createBoxZone(*position) for position in positions]
+
+    # the neighbour in +x shares surface 4 with surface 5 of the neighbour and so on
+    zoneIds = dict((position, count) for count, position in enumerate(positions))
+    adjacentPairs = set()
+    for count, (ix, iy, iz) in enumerate(positions):
+        for offset, srfCount, neighbourSrfCount in (((1, 0, 0), 4, 5), ((0, 1, 0), 3, 2), ((0, 0, 1), 1, 0)):
+            neighbour = zoneIds.get((ix + offset[0], iy + offset[1], iz + offset[2]))
+            if neighbour is not None:
+                adjacentPairs.add(frozenset([(count, srfCount), (neighbour, neighbourSrfCount)]))
+    return zones, adjacentPairs
+
+
+def transformModel(zones, angle, move):
+    """Rotate the model around z and move it."""
+    cosA, sinA = math.cos(angle), math.sin(angle)
+    def transform(pt):
+        x, y, z = pt
+        return (move[0] + x * cosA - y * sinA, move[1] + x * sinA + y * cosA, move[2] + z)
+    return [[[transform(pt) for pt in surface] for surface in zone] for zone in zones]
+
+
+def buildIndex(hb_AdjacencyIndex, zones):
+    index = hb_AdjacencyIndex(0.01)
+    for zoneCount, zone in enumerate(zones):
+        for srfCount, surface in enumerate(zone):
+            index.addPolygon((zoneCount, srfCount), zoneCount, surface)
+    return index
+
+
+def indexPairs(hb_AdjacencyIndex, zones):
+    """Candidate pairs from the index."""
+    index = buildIndex(hb_AdjacencyIndex, zones)
+    return set(frozenset([key, candidate]) for key in index.surfaces for candidate in index.getCandidates(key))
+
+
+def bruteForcePairs(hb_AdjacencyIndex, zones):
+    """Candidate pairs from testing every pair of surfaces of different zones."""
+    index = buildIndex(hb_AdjacencyIndex, zones)
+    keys = sorted(index.surfaces)
+    return set(frozenset([key, testKey]) for key, testKey in itertools.combinations(keys, 2) \
+               if index.isCandidate(key, testKey))
+
+
+def timeIt(function, *args):
+    startTime = time.time()
+    result = function(*args)
+    return time.time() - startTime, result
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def main(maxZones, maxBruteForceZones):
+    hb_AdjacencyIndex = loadHoneybeeClasses()
+    failed = []
+    timings = []
+    for zoneCount in zoneCounts:
+        if zoneCount > maxZones: break
+        zones, adjacentPairs = createModel(zoneCount)
+        print "%d zones (%d surfaces)"%(zoneCount, 6 * zoneCount)
+        indexTime, pairs = timeIt(indexPairs, hb_AdjacencyIndex, zones)
+        check("every shared pair of surfaces is found and nothing else", pairs == adjacentPairs, failed)
+
+        bruteForceTime = None
+        if zoneCount <= maxBruteForceZones:
+            bruteForceTime, bruteForce = timeIt(bruteForcePairs, hb_AdjacencyIndex, zones)
+            check("same candidates as testing every pair", pairs == bruteForce, failed)
+
+        if zoneCount == 200:
+            random.seed(0)
+            moved = transformModel(zones, math.radians(33), (500.0, -300.0, random.random()))
+            movedPairs = indexPairs(hb_AdjacencyIndex, moved)
+            check("every shared pair is found for the rotated model", adjacentPairs <= movedPairs, failed)
+            check("same candidates as testing every pair for the rotated model", \
+                  movedPairs == bruteForcePairs(hb_AdjacencyIndex, moved), failed)
+        timings.append((zoneCount, indexTime, bruteForceTime))
+
+    print "time to find the candidates"
+    print "    zones    index   every pair"
+    for zoneCount, indexTime, bruteForceTime in timings:
+        bruteForce = "%9.3f s"%bruteForceTime if bruteForceTime is not None else "%11s"%"-"
+        print "    %5d %7.3f s %s"%(zoneCount, indexTime, bruteForce)
+
+    if failed:
+        raise SystemExit("%d checks failed."%len(failed))
+    print "The index finds every adjacent surface."
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000, int(sys.argv[2]) if len(sys.argv) > 2 else 200)
@@ -0,0 +1,136 @@
+"""
+Benchmark the binary .ill matrix of Honeybee_Honeybee against parsing the Daysim .ill files.
+
+hb_DSIllMatrix is taken from src/Honeybee_Honeybee.py and run outside of Rhino with
+CPython 2.7. Annual .ill files are generated for a grid that is split between a number of
+CPUs. The reference reader is the text parser that Read All the Hourly Results from Annual
+Daylight Study used before the .ill files were converted to matrices. The script checks
+that the matrix has the same values for every hour and point, that the matrices of
+different sets of .ill files never share a file and then prints the time to parse the text
+files, to convert them once and to read one hour, one point and a block of points.
+
+Usage:
+    python2 benchmarks/benchmark_DSIllMatrix.py [points] [cpus]
+"""
+
+import os
+import sys
+import json
+import time
+import array
+import random
+import shutil
+import hashlib
+import tempfile
+import itertools
+
+try: import mmap
+except ImportError: mmap = None
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+
+
+def loadHoneybeeClasses():
+    """Execute hb_DSIllMatrix from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_DSIllMatrix(object):")
+    end = source.index("class hb_DSAnnualMetrics(object):")
+    namespace = {"os": os, "sys": sys, "json": json, "array": array, "shutil": shutil, \
+                 "hashlib": hashlib, "itertools": itertools, "mmap": mmap}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace["hb_DSIllMatrix"]
+
+
+def writeIllFiles(folder, numOfPts, numOfCPUs):
+    """Write annual .ill files with the points split between the CPUs."""
+    random.seed(0)
+    ptsPerCPU = [numOfPts // numOfCPUs + (1 if count < numOfPts % numOfCPUs else 0) \
+                 for count in range(numOfCPUs)]
+    illFiles = [os.path.join(folder, "study_%d.ill"%count) for count in range(numOfCPUs)]
+    outfs = [open(illFile, "w") for illFile in illFiles]
+    try:
+        daysInMonth = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+        for month, days in enumerate(daysInMonth):
+            for day in range(days):
+                for hour in range(24):
+                    date = "%d %d %.3f"%(month + 1, day + 1, hour + 0.5)
+                    isDay = 7 <= hour <= 18
+                    for outf, count in zip(outfs, ptsPerCPU):
+                        values = [random.uniform(0, 3000) if isDay else 0.0 for pt in range(count)]
+                        outf.write(date + " " + " ".join("%.2f"%value for value in values) + "\n")
+    finally:
+        for outf in outfs: outf.close()
+    return illFiles
+
+
+def referenceReader(illFiles):
+    """Parse the .ill files to a list of values for each hour like the old reader."""
+    illuminanceValues = [[] for HOY in range(8760)]
+    for illFile in illFiles:
+        with open(illFile, "r") as result:
+            for HOY, line in enumerate(result):
+                line = line.replace('\n', '', 10)
+                lineSeg = line.split(' ')
+                for hourLuxValue in lineSeg[3:]:
+                    illuminanceValues[HOY].append(float(hourLuxValue))
+    return illuminanceValues
+
+
+def timeIt(function, *args):
+    startTime = time.time()
+    result = function(*args)
+    return time.time() - startTime, result
+
+
+def main(numOfPts, numOfCPUs):
+    hb_DSIllMatrix = loadHoneybeeClasses()
+    tempFolder = tempfile.mkdtemp()
+    failed = []
+    try:
+        illFiles = writeIllFiles(tempFolder, numOfPts, numOfCPUs)
+        print "%d points in %d .ill files (%d MB)"%(numOfPts, numOfCPUs, \
+            sum(os.path.getsize(illFile) for illFile in illFiles) / 1024 ** 2)
+
+        referenceTime, reference = timeIt(referenceReader, illFiles)
+        convertTime, illMatrix = timeIt(hb_DSIllMatrix.fromIllFiles, illFiles)
+        reopenTime, reopened = timeIt(hb_DSIllMatrix.fromIllFiles, illFiles)
+        reopened.close()
+
+        # float32 keeps the values that are written with 2 decimals within 1e-3 lux
+        matches = illMatrix.numOfHours == 8760 and illMatrix.numOfPts == numOfPts and \
+            all(max(abs(a - b) for a, b in zip(illMatrix.getHour(HOY), reference[HOY])) < 1e-3 \
+                for HOY in xrange(8760) if reference[HOY])
+        print "    same values as the .ill files: %s"%("ok" if matches else "FAILED")
+        if not matches: failed.append("values")
+
+        # Read Annual Result II converts the first file only
+        firstFile = hb_DSIllMatrix.fromIllFiles(illFiles[:1])
+        separate = firstFile.matrixFile != illMatrix.matrixFile and firstFile.numOfPts < numOfPts and \
+            hb_DSIllMatrix.isUpToDate(illMatrix.matrixFile, illFiles)
+        firstFile.close()
+        print "    different sets of files use different matrices: %s"%("ok" if separate else "FAILED")
+        if not separate: failed.append("matrix file")
+
+        hourTime, values = timeIt(lambda: [illMatrix.getHour(HOY) for HOY in range(4000, 4100)])
+        pointTime, values = timeIt(illMatrix.getPoint, numOfPts // 2)
+        blockTime, values = timeIt(lambda: list(illMatrix.iterHours(0, min(100, numOfPts))))
+        illMatrix.close()
+
+        print "    parse the .ill files:         %.3f s"%referenceTime
+        print "    convert to a matrix once:     %.3f s"%convertTime
+        print "    open the converted matrix:    %.4f s"%reopenTime
+        print "    read 100 hours:               %.4f s"%hourTime
+        print "    read one point for the year:  %.4f s"%pointTime
+        print "    read 100 points for the year: %.4f s"%blockTime
+    finally:
+        shutil.rmtree(tempFolder)
+
+    if failed:
+        raise SystemExit("The matrix doesn't match the .ill files.")
+    print "The matrix matches the .ill files."
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000, int(sys.argv[2]) if len(sys.argv) > 2 else 4)
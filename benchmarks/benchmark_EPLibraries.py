@@ -0,0 +1,204 @@
+"""
+Benchmark the EnergyPlus library loader of Honeybee_Honeybee against the bundled idf files.
+
+The loader and the idf index are taken from src/Honeybee_Honeybee.py and run outside of
+Rhino with CPython 2.7. The reference loader is the regex loader that Honeybee used before
+the libraries were loaded through hb_EPObjectIndex. Honeybee only indexes the files when
+they are imported and parses each object the first time it is read from a library. The
+script checks that:
+    - the libraries have the same names as the reference before any object is parsed,
+    - the libraries are identical to the reference once every object is read,
+    - the index is the same when the file is read in small chunks,
+    - objects that are read after the file has changed come from the new file.
+It then prints the time to import the files and to read every object.
+
+Usage:
+    python2 benchmarks/benchmark_EPLibraries.py [repeat]
+"""
+
+import os
+import re
+import sys
+import time
+import copy
+import shutil
+import hashlib
+import tempfile
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+libFiles = [os.path.join(rootFolder, "resources", fileName) for fileName in \
+            ("OpenStudioMasterTemplate.idf", "userCustomEPLibrary.idf")]
+
+
+def loadHoneybeeClasses():
+    """Execute hb_EPObjectIndex, hb_EPLibrary and HB_GetEPLibraries from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_EPObjectIndex(object):")
+    end = source.index("class hb_EPLibraryCache(object):")
+    namespace = {"os": os, "re": re, "copy": copy, "hashlib": hashlib}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace["hb_EPObjectIndex"], namespace["HB_GetEPLibraries"]
+
+
+def referenceLoader(epFilePath):
+    """The regex loader of Honeybee before the libraries were parsed by hb_EPObjectIndex."""
+    libraries = dict((key, {}) for key in ("Material", "WindowMaterial", "Construction", "Schedule", \
+                     "ScheduleTypeLimits", "ThermMaterial", "WindowProperty", "MaterialProperty"))
+
+    with open(epFilePath, "r") as epFile:
+        EPObjectsString = re.findall(r'(.[^;]*;)', "".join(epFile.readlines()) + "\n", re.MULTILINE)
+
+    for EPObjectStr in EPObjectsString:
+        rawLines = EPObjectStr.strip().split("\n")
+        lines = []
+        for line in rawLines:
+            if line.strip() == '' or line.startswith('!'): continue
+            lines.append(line)
+
+        if not lines: continue
+
+        if lines[0].startswith('MaterialProperty:GlazingSpectralData'):
+            key = 'MaterialProperty:GlazingSpectralData'
+            shortKey = 'MaterialProperty'
+            name = lines[1].split(",")[0].strip().upper()
+            libraries[shortKey][name] = dict()
+            libraries[shortKey][name][0] = key
+            for lineCount, line in enumerate(lines):
+                objValue = line.split("!")[0].strip()
+                try: objDescription = line.split("!")[1].strip()
+                except: objDescription = ""
+                if lineCount == 0:
+                    libraries[shortKey][name][lineCount] = objValue[:-1]
+                elif lineCount == 1:
+                    pass
+                elif objValue.endswith(","):
+                    libraries[shortKey][name][lineCount-1] = objValue[:-1], objDescription
+                elif objValue.endswith(";"):
+                    libraries[shortKey][name][lineCount-1] = objValue[:-1], objDescription
+        else:
+            if len(lines) < 2: continue
+
+            if lines[0].split(",")[0].strip().isupper():
+                key = lines[0].split(",")[0].strip().title()
+            else:
+                key = lines[0].split(",")[0].strip()
+            shortKey = key.split(":")[0]
+
+            name = lines[1].split(",")[0].strip().upper()
+            values = lines[2:]
+            if values == []:
+                name = lines[1].split(";")[0].strip().upper()
+
+            if shortKey in libraries:
+                libraries[shortKey][name] = dict()
+                libraries[shortKey][name][0] = key
+                count = 1
+                delimiter = ","
+                for value in values:
+                    if not len(value.strip()): continue
+                    if count==len(values): delimiter = ";"
+                    v = value.split(delimiter)[0].strip()
+                    if value.find("!")!= -1:
+                        c = value.split("!")[-1].rstrip()
+                    else:
+                        c = ""
+                    libraries[shortKey][name][count] = v, c
+                    count += 1
+
+    return libraries
+
+
+def bestOf(repeat, function, *args):
+    """Return the shortest run time and the result of the last run."""
+    bestTime = None
+    for count in range(repeat):
+        startTime = time.time()
+        result = function(*args)
+        runTime = time.time() - startTime
+        if bestTime is None or runTime < bestTime: bestTime = runTime
+    return bestTime, result
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def main(repeat):
+    hb_EPObjectIndex, HB_GetEPLibraries = loadHoneybeeClasses()
+    
+    def honeybeeLoader(epFilePath):
+        EPLibs = HB_GetEPLibraries()
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        try: EPLibs.importEPLibrariesFromFile(epFilePath, False, True, False)
+        finally: sys.stdout = stdout
+        return EPLibs.libraries
+    
+    def readEachObject(epFilePath):
+        libraries = honeybeeLoader(epFilePath)
+        for library in libraries.values():
+            for name in library.keys(): library[name]
+        return libraries
+    
+    def readAllObjects(epFilePath):
+        libraries = honeybeeLoader(epFilePath)
+        for library in libraries.values(): library.values()
+        return libraries
+    
+    failed = []
+    print "best of %d runs"%repeat
+    for epFilePath in libFiles:
+        referenceTime, referenceLibs = bestOf(repeat, referenceLoader, epFilePath)
+        loaderTime, libs = bestOf(repeat, honeybeeLoader, epFilePath)
+        readEachTime, result = bestOf(repeat, readEachObject, epFilePath)
+        readAllTime, result = bestOf(repeat, readAllObjects, epFilePath)
+        
+        print "%s (%d KB, %d objects)"%(os.path.basename(epFilePath), os.path.getsize(epFilePath) / 1024, \
+                                        len(hb_EPObjectIndex(epFilePath).entries))
+        check("same names before the objects are parsed", all(sorted(libs[key].keys()) == \
+              sorted(referenceLibs[key].keys()) for key in referenceLibs), failed)
+        check("no object is parsed on import", \
+              all(len(dict.keys(library)) == 0 for library in libs.values()), failed)
+        check("identical libraries after every object is read", libs == referenceLibs, failed)
+        
+        hb_EPObjectIndex.chunkSize = 4096
+        try: chunkedIndex = hb_EPObjectIndex(epFilePath)
+        finally: hb_EPObjectIndex.chunkSize = 1048576
+        check("same index when the file is read in small chunks", \
+              chunkedIndex.entries == hb_EPObjectIndex(epFilePath).entries, failed)
+        
+        print "    reference loader:       %.4f s"%referenceTime
+        print "    Honeybee import:        %.4f s (%.0f%% of the reference)"%(loaderTime, 100 * loaderTime / referenceTime)
+        print "    import and read all:    %.4f s (%.0f%% of the reference)"%(readAllTime, 100 * readAllTime / referenceTime)
+        print "    import and read each:   %.4f s (%.0f%% of the reference)"%(readEachTime, 100 * readEachTime / referenceTime)
+    
+    print "change the file after it is imported"
+    tempFolder = tempfile.mkdtemp()
+    try:
+        epFilePath = os.path.join(tempFolder, "library.idf")
+        with open(epFilePath, "w") as outf:
+            outf.write("Material:NoMass,\n  Layer A,  !- Name\n  Rough,\n  1.5;\n\n" + \
+                       "Material:NoMass,\n  Layer B,  !- Name\n  Smooth,\n  2.5;\n")
+        libs = honeybeeLoader(epFilePath)
+        with open(epFilePath, "w") as outf:
+            outf.write("! a new header moves every object in the file\n\n" + \
+                       "Material:NoMass,\n  Layer B,  !- Name\n  Smooth,  !- Roughness\n  3.5;\n")
+        os.utime(epFilePath, (0, 0))
+        check("the object is read from the new file", \
+              libs["Material"]["LAYER B"] == {0: "Material:NoMass", 1: ("Smooth", "- Roughness"), \
+                                              2: ("3.5", "")}, failed)
+        check("a removed object is removed from the library", libs["Material"].get("LAYER A") is None and \
+              "LAYER A" not in libs["Material"] and len(libs["Material"]) == 1, failed)
+    finally:
+        shutil.rmtree(tempFolder)
+    
+    if failed:
+        raise SystemExit("The libraries don't match the reference loader.")
+    print "The libraries match the reference loader."
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,180 @@
+"""
+Benchmark the cold and warm start of the EnergyPlus and THERM libraries of Honeybee_Honeybee.
+
+The loader, the idf index and hb_EPLibraryCache are taken from src/Honeybee_Honeybee.py
+and run outside of Rhino with CPython 2.7 against the library files in resources. A cold
+start imports the files the same way Honeybee does when it flies for the first time and
+writes the cache. A warm start reads the libraries from the cache. The script checks that:
+    - the libraries of a warm start are identical to the ones of a cold start,
+    - the cache is ignored once a library file changes and is valid again after it is
+      written for the new file,
+    - a cache that is written by another version of the cache is ignored.
+It then prints the time of a cold and a warm start.
+
+THERM colors are .NET colors in Rhino and are replaced with a small stand-in class.
+
+Usage:
+    python2 benchmarks/benchmark_EPLibraryCache.py [repeat]
+"""
+
+import os
+import re
+import sys
+import copy
+import time
+import types
+import shutil
+import hashlib
+import tempfile
+import cPickle as pickle
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+libFiles = [os.path.join(rootFolder, "resources", fileName) for fileName in \
+            ("OpenStudioMasterTemplate.idf", "userCustomEPLibrary.idf", "thermMaterial.csv")]
+
+
+class Color(object):
+    """Stand-in for System.Drawing.Color."""
+    def __init__(self, html):
+        self.html = html
+
+    def __eq__(self, other):
+        return isinstance(other, Color) and self.html == other.html
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class ColorTranslator(object):
+    """Stand-in for System.Drawing.ColorTranslator."""
+    @staticmethod
+    def FromHtml(html):
+        return Color(html)
+
+    @staticmethod
+    def ToHtml(color):
+        return color.html
+
+
+def loadHoneybeeClasses():
+    """Execute the library loader and hb_EPLibraryCache from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_EPObjectIndex(object):")
+    end = source.index("def checkUnits():")
+    System = types.ModuleType("System")
+    System.Drawing = types.ModuleType("System.Drawing")
+    System.Drawing.Color = Color
+    System.Drawing.ColorTranslator = ColorTranslator
+    namespace = {"os": os, "re": re, "copy": copy, "hashlib": hashlib, "pickle": pickle, "System": System}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace["HB_GetEPLibraries"], namespace["hb_EPLibraryCache"]
+
+
+def bestOf(repeat, function, *args):
+    """Return the shortest run time and the result of the last run."""
+    bestTime = None
+    for count in range(repeat):
+        startTime = time.time()
+        result = function(*args)
+        runTime = time.time() - startTime
+        if bestTime is None or runTime < bestTime: bestTime = runTime
+    return bestTime, result
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def readAllObjects(libraries):
+    """Parse every object of the libraries and return them as plain dictionaries."""
+    return dict((key, dict(library.items())) for key, library in libraries.items())
+
+
+def main(repeat):
+    HB_GetEPLibraries, hb_EPLibraryCache = loadHoneybeeClasses()
+    tempFolder = tempfile.mkdtemp()
+    failed = []
+
+    def coldStart(libFilePaths, cacheFile):
+        """Import the library files the same way Honeybee does without a cache and write the cache."""
+        EPLibs = HB_GetEPLibraries()
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        try:
+            for pathCount, path in enumerate(libFilePaths):
+                EPLibs.importEPLibrariesFromFile(path, path.endswith(".csv"), pathCount == 0, False)
+        finally:
+            sys.stdout = stdout
+        hb_EPLibraryCache(libFilePaths, cacheFile).save(EPLibs.libraries)
+        return EPLibs.libraries
+
+    def warmStart(libFilePaths, cacheFile):
+        return hb_EPLibraryCache(libFilePaths, cacheFile).load()
+
+    try:
+        # copies of the library files so the cache is written to a temp folder
+        libFilePaths = []
+        for libFile in libFiles:
+            shutil.copy2(libFile, tempFolder)
+            libFilePaths.append(os.path.join(tempFolder, os.path.basename(libFile)))
+        cacheFile = os.path.join(tempFolder, hb_EPLibraryCache.defaultFileName)
+
+        coldTime, coldLibs = bestOf(repeat, coldStart, libFilePaths, cacheFile)
+        warmTime, warmLibs = bestOf(repeat, warmStart, libFilePaths, cacheFile)
+
+        print "warm start from %s (%d KB)"%(os.path.basename(cacheFile), os.path.getsize(cacheFile) / 1024)
+        check("the cache is found", warmLibs is not None, failed)
+        if warmLibs is None: raise SystemExit("The cache isn't valid after it is written.")
+        check("the same names in every library", all(sorted(warmLibs[key].keys()) == \
+              sorted(coldLibs[key].keys()) for key in coldLibs), failed)
+        check("identical libraries after every object is read", \
+              readAllObjects(warmLibs) == readAllObjects(coldLibs), failed)
+        check("THERM colors are read back as colors", len(warmLibs["ThermMaterial"]) > 0 and \
+              all(isinstance(material["RGBColor"], Color) for material in warmLibs["ThermMaterial"].values() \
+                  if "RGBColor" in material), failed)
+
+        print "change a library file"
+        userLibrary = libFilePaths[1]
+        with open(userLibrary, "a") as outf:
+            outf.write("\nMaterial:NoMass,\n  Cache Test Layer,  !- Name\n  Rough,  !- Roughness\n  1.5;\n")
+        # whole seconds so the modified time can be set back exactly
+        modifiedTime = int(time.time())
+        os.utime(userLibrary, (modifiedTime, modifiedTime))
+        check("the cache is ignored", warmStart(libFilePaths, cacheFile) is None, failed)
+        coldStart(libFilePaths, cacheFile)
+        warmLibs = warmStart(libFilePaths, cacheFile)
+        check("the cache is valid after it is written again", warmLibs is not None and \
+              "CACHE TEST LAYER" in warmLibs["Material"], failed)
+
+        # the same size and modified time but different content
+        fileSize = os.path.getsize(userLibrary)
+        with open(userLibrary, "r+b") as outf:
+            outf.seek(-5, 2)
+            outf.write("2.5;")
+        os.utime(userLibrary, (modifiedTime, modifiedTime))
+        check("the file has the same size and modified time", os.path.getsize(userLibrary) == fileSize and \
+              os.path.getmtime(userLibrary) == modifiedTime, failed)
+        check("the content hash is checked", warmStart(libFilePaths, cacheFile) is None, failed)
+        coldStart(libFilePaths, cacheFile)
+
+        print "read a cache of another version"
+        hb_EPLibraryCache.cacheVersion += 1
+        try: check("the cache is ignored", warmStart(libFilePaths, cacheFile) is None, failed)
+        finally: hb_EPLibraryCache.cacheVersion -= 1
+
+        print "best of %d runs"%repeat
+        print "    cold start: %.4f s"%coldTime
+        print "    warm start: %.4f s (%.1fx faster)"%(warmTime, coldTime / warmTime)
+    finally:
+        shutil.rmtree(tempFolder)
+
+    if failed:
+        raise SystemExit("%d checks failed."%len(failed))
+    print "The cached libraries match the library files."
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
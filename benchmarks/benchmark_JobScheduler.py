@@ -0,0 +1,144 @@
+"""
+Benchmark the job scheduler of Honeybee_Honeybee against the polling loop it replaced.
+
+hb_BatchJob and hb_JobScheduler are taken from src/Honeybee_Honeybee.py and run outside
+of Rhino with CPython 2.7. The jobs are small python commands that sleep for a given time
+in place of rtrace, Daysim or EnergyPlus. The reference is the loop of
+hb_WriteRAD.executeBatchFiles before the scheduler, which slept for waitingTime after every
+start and while all the CPUs were busy. The script checks that:
+    - no more than maxWorkers jobs run at the same time and every job finishes,
+    - exit code and stderr of a failed job are collected,
+    - a job is killed when it reaches its time limit,
+    - cancel kills the running jobs and skips the pending ones.
+It then prints the time to run the jobs with both and the time that is lost to waiting.
+
+Usage:
+    python2 benchmarks/benchmark_JobScheduler.py [jobs] [workers] [jobTime]
+"""
+
+import os
+import sys
+import time
+import Queue
+import signal
+import threading
+import subprocess
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+
+
+def loadHoneybeeClasses():
+    """Execute hb_BatchJob and hb_JobScheduler from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_BatchJob(object):")
+    end = source.index("class hb_WriteRAD(object):")
+    namespace = {"os": os, "time": time, "Queue": Queue, "signal": signal, "threading": threading, \
+                 "subprocess": subprocess}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace["hb_BatchJob"], namespace["hb_JobScheduler"]
+
+
+def dummyJob(seconds, exitCode = 0, message = ""):
+    """Return a command that sleeps, writes a message to stderr and exits with exitCode."""
+    script = "import sys, time; time.sleep(%f); sys.stderr.write('%s'); sys.exit(%d)"%(seconds, message, exitCode)
+    return '"%s" -c "%s"'%(sys.executable, script)
+
+
+def referenceExecute(batchFileNames, maxPRuns, shell = True, waitingTime = 0.5):
+    """The polling loop of hb_WriteRAD.executeBatchFiles before the scheduler."""
+    maxPRuns = min(max(int(maxPRuns), 1), len(batchFileNames))
+    total = len(batchFileNames)
+    running = 0
+    done = False
+    jobs = []
+    pid = 0
+    while not done:
+        if running < maxPRuns and pid < total:
+            jobs.append(subprocess.Popen(batchFileNames[pid], shell = shell))
+            pid += 1
+            time.sleep(waitingTime)
+
+        running = 0
+        finished = 0
+        for job in jobs:
+            if job.poll() is None: running += 1
+            else: finished += 1
+
+        if running == maxPRuns:
+            time.sleep(waitingTime)
+
+        if finished == total:
+            done = True
+    return jobs
+
+
+def maxConcurrent(jobs):
+    """Max number of jobs that ran at the same time based on their start and end times."""
+    events = sorted([(job.startTime, 1) for job in jobs] + [(job.endTime, -1) for job in jobs])
+    count = maxCount = 0
+    for eventTime, change in events:
+        count += change
+        maxCount = max(maxCount, count)
+    return maxCount
+
+
+def timeIt(function, *args):
+    startTime = time.time()
+    result = function(*args)
+    return time.time() - startTime, result
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def main(numOfJobs, numOfWorkers, jobTime):
+    hb_BatchJob, hb_JobScheduler = loadHoneybeeClasses()
+    failed = []
+
+    print "%d jobs of %.2f s on %d workers"%(numOfJobs, jobTime, numOfWorkers)
+    commands = [dummyJob(jobTime) for count in range(numOfJobs)]
+    schedulerTime, jobs = timeIt(hb_JobScheduler(numOfWorkers, shell = True).run, commands)
+    referenceTime, result = timeIt(referenceExecute, commands, numOfWorkers)
+    check("every job is done", all(job.succeeded and job.returnCode == 0 for job in jobs), failed)
+    check("no more than %d jobs run at the same time"%numOfWorkers, \
+          maxConcurrent(jobs) <= numOfWorkers, failed)
+    check("wall time of each job is collected", all(job.wallTime >= jobTime for job in jobs), failed)
+
+    print "exit code and stderr"
+    jobs = hb_JobScheduler(2, shell = True).run([dummyJob(0, 0), dummyJob(0, 3, "boom")])
+    check("the failed job has the exit code and stderr", jobs[1].status == "failed" and \
+          jobs[1].returnCode == 3 and jobs[1].stderr == "boom", failed)
+    check("the other job is done", jobs[0].succeeded, failed)
+
+    print "time limit"
+    limitTime, jobs = timeIt(hb_JobScheduler(2, shell = True).run, \
+                             [hb_BatchJob(dummyJob(30), timeout = 0.5), dummyJob(0)])
+    check("the job is killed", jobs[0].status == "timeout" and jobs[1].succeeded and limitTime < 10, failed)
+
+    print "cancel"
+    scheduler = hb_JobScheduler(1, shell = True)
+    timer = threading.Timer(0.5, scheduler.cancel)
+    timer.start()
+    cancelTime, jobs = timeIt(scheduler.run, [dummyJob(30), dummyJob(30), dummyJob(30)])
+    timer.join()
+    check("the running job is killed and the pending jobs are skipped", cancelTime < 10 and \
+          [job.status for job in jobs] == ["cancelled"] * 3 and jobs[1].process is None, failed)
+
+    # every worker runs the same number of jobs back to back without waiting
+    idealTime = -(-numOfJobs // numOfWorkers) * jobTime
+    print "run time (%.2f s of work for each worker)"%idealTime
+    print "    polling loop (waitingTime 0.5 s): %.3f s (%.3f s waiting)"%(referenceTime, referenceTime - idealTime)
+    print "    scheduler:                        %.3f s (%.3f s waiting)"%(schedulerTime, schedulerTime - idealTime)
+
+    if failed:
+        raise SystemExit("%d checks failed."%len(failed))
+    print "The scheduler runs every job."
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 16, int(sys.argv[2]) if len(sys.argv) > 2 else 4, \
+         float(sys.argv[3]) if len(sys.argv) > 3 else 0.2)
@@ -0,0 +1,143 @@
+"""
+Check and benchmark the hour chunks of Honeybee_Microclimate Map Analysis for 1 to 16 workers.
+
+PointMRTKernel and runHourChunks are taken from src/Honeybee_Microclimate Map Analysis.py
+and run outside of Rhino with CPython 2.7. The view factors and surface temperatures of a
+few zones are generated and each hour of the analysis writes the MRT of every point to its
+own row of the matrix, the same as the main functions of the component. Parallel.ForEach is
+replaced with a pool of threads that runs the chunks in a shuffled order. The script checks
+that the matrix is identical to the one of a sequential run for every number of workers,
+with and without numpy, and then prints the time for each number of workers.
+
+CPython runs one thread of python code at a time so the times mostly show the overhead
+of the chunks. numpy releases the lock while it multiplies the matrices. IronPython has no
+such lock and runs the tasks of Parallel.ForEach on all the CPUs.
+
+Usage:
+    python2 benchmarks/benchmark_MicroclimateChunks.py [points] [hours] [repeat]
+"""
+
+import os
+import sys
+import math
+import time
+import types
+import random
+import operator
+import threading
+from multiprocessing.pool import ThreadPool
+
+try: import numpy
+except ImportError: numpy = None
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Microclimate Map Analysis.py")
+workerCounts = (1, 2, 4, 8, 16)
+
+
+class ParallelOptions(object):
+    """Stand-in for System.Threading.Tasks.ParallelOptions."""
+    MaxDegreeOfParallelism = -1
+
+
+class Parallel(object):
+    """Stand-in for System.Threading.Tasks.Parallel that runs the items in a random order."""
+    @staticmethod
+    def ForEach(items, options, function):
+        items = list(items)
+        random.shuffle(items)
+        pool = ThreadPool(options.MaxDegreeOfParallelism)
+        try: pool.map(function, items, 1)
+        finally: pool.close()
+
+
+def loadComponentFunctions():
+    """Execute PointMRTKernel and runHourChunks from the component source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class PointMRTKernel(object):")
+    end = source.index("def computeHourShadeDrawing(")
+    tasks = types.ModuleType("System.Threading.Tasks")
+    tasks.Parallel = Parallel
+    tasks.ParallelOptions = ParallelOptions
+    System = types.ModuleType("System")
+    System.Environment = types.ModuleType("System.Environment")
+    System.Environment.ProcessorCount = 1
+    namespace = {"math": math, "operator": operator, "threading": threading, "numpy": numpy, \
+                 "tasks": tasks, "System": System, "parallel_": False}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace
+
+
+def createInputs(numOfPts, numOfZones = 3, numOfSrfs = 20):
+    """View factors of each point to the surfaces of its zone and annual surface temperatures."""
+    generator = random.Random(0)
+    viewFactors = [[[generator.random() / numOfSrfs for srf in range(numOfSrfs)] \
+                    for pt in range(numOfPts // numOfZones)] for zone in range(numOfZones)]
+    srfTempDict = dict((str([zone, srf]), {"srfTemp": [15 + 15 * generator.random() for hour in range(8760)]}) \
+                       for zone in range(numOfZones) for srf in range(numOfSrfs))
+    return srfTempDict, viewFactors
+
+
+def runAnalysis(namespace, srfTempDict, viewFactors, HOYs, workerCount, useNumpy = True):
+    """Fill a matrix with the MRT of every point for each hour the same as the component."""
+    namespace["parallel_"] = workerCount > 1
+    namespace["System"].Environment.ProcessorCount = workerCount
+    namespace["numpy"] = numpy if useNumpy else None
+    kernel = namespace["PointMRTKernel"](srfTempDict, viewFactors, HOYs, HOYs, False, {}, [], [0] * 8760)
+    radTempMtx = ["Point MRT"] + [None] * len(HOYs)
+
+    def hourFunction(count):
+        radTempMtx[count + 1] = [value for zoneMRT in kernel.getPointMRT(count) for value in zoneMRT]
+
+    namespace["runHourChunks"](hourFunction, len(HOYs))
+    return radTempMtx, kernel
+
+
+def bestOf(repeat, function, *args):
+    """Return the shortest run time and the result of the last run."""
+    bestTime = None
+    for count in range(repeat):
+        startTime = time.time()
+        result = function(*args)
+        runTime = time.time() - startTime
+        if bestTime is None or runTime < bestTime: bestTime = runTime
+    return bestTime, result
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def main(numOfPts, numOfHours, repeat):
+    namespace = loadComponentFunctions()
+    srfTempDict, viewFactors = createInputs(numOfPts)
+    HOYs = range(1, numOfHours + 1)
+    failed = []
+
+    for useNumpy in ([True, False] if numpy is not None else [False]):
+        # the pure python kernel is slow so it is checked for fewer hours
+        hours = HOYs if useNumpy else HOYs[:min(numOfHours, 500)]
+        print "%d points and %d hours %s numpy"%(numOfPts, len(hours), "with" if useNumpy else "without")
+        random.seed(0)
+        reference, kernel = runAnalysis(namespace, srfTempDict, viewFactors, hours, 1, useNumpy)
+        for workerCount in workerCounts:
+            radTempMtx, kernel = runAnalysis(namespace, srfTempDict, viewFactors, hours, workerCount, useNumpy)
+            check("same matrix for %d workers"%workerCount, radTempMtx == reference and not kernel.blocks, failed)
+
+    print "best of %d runs for %d points and %d hours"%(repeat, numOfPts, numOfHours)
+    sequentialTime = None
+    for workerCount in workerCounts:
+        runTime, result = bestOf(repeat, runAnalysis, namespace, srfTempDict, viewFactors, HOYs, workerCount)
+        if sequentialTime is None: sequentialTime = runTime
+        print "    %2d workers: %.3f s (%.2fx)"%(workerCount, runTime, sequentialTime / runTime)
+
+    if failed:
+        raise SystemExit("%d checks failed."%len(failed))
+    print "The chunks give the same matrix for every number of workers."
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 900, int(sys.argv[2]) if len(sys.argv) > 2 else 2000, \
+         int(sys.argv[3]) if len(sys.argv) > 3 else 3)
@@ -0,0 +1,268 @@
+"""
+Benchmark and check the binary Honeybee objects format (*.HBB) against cPickle (*.HB).
+
+hb_ObjectsFile is taken from src/Honeybee_Honeybee.py and run outside of Rhino with
+CPython 2.7. A generated model of zones with meshed surfaces is written to both formats
+in the same structure that Dump Honeybee Objects writes. The script checks that:
+    - every object reads back from the binary file with the same values,
+    - loading a subset of zones by name or ID returns the zones with their surfaces,
+      HVAC systems and libraries and nothing else,
+    - a file that is written by a newer version of the format is rejected.
+It then prints the size and the write, load and subset load times of both formats.
+
+Rhino geometries are replaced with small stand-in classes for the points and meshes.
+
+Usage:
+    python2 benchmarks/benchmark_ObjectsFile.py [zones] [repeat]
+"""
+
+import os
+import sys
+import time
+import array
+import random
+import struct
+import shutil
+import tempfile
+import cPickle as pickle
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+
+
+class Point3d(object):
+    def __init__(self, x, y, z):
+        self.X, self.Y, self.Z = x, y, z
+
+    def __reduce__(self):
+        return (Point3d, (self.X, self.Y, self.Z))
+
+
+class Vector3d(object):
+    def __init__(self, x, y, z):
+        self.X, self.Y, self.Z = x, y, z
+
+    def __reduce__(self):
+        return (Vector3d, (self.X, self.Y, self.Z))
+
+
+class Plane(object):
+    def __init__(self, origin, xAxis, yAxis):
+        self.Origin, self.XAxis, self.YAxis = origin, xAxis, yAxis
+
+
+class MeshFace(object):
+    def __init__(self, a, b, c, d):
+        self.A, self.B, self.C, self.D = a, b, c, d
+
+
+class MeshVertices(list):
+    def Add(self, point):
+        self.append(point)
+
+    def ToPoint3dArray(self):
+        return list(self)
+
+
+class MeshFaces(list):
+    @property
+    def Count(self):
+        return len(self)
+
+    def AddFace(self, a, b, c, d):
+        self.append(MeshFace(a, b, c, d))
+
+
+class MeshNormals(object):
+    def ComputeNormals(self):
+        pass
+
+
+class Mesh(object):
+    def __init__(self):
+        self.Vertices = MeshVertices()
+        self.Faces = MeshFaces()
+        self.Normals = MeshNormals()
+
+    def Compact(self):
+        pass
+
+    def __reduce__(self):
+        return (createMesh, ([(pt.X, pt.Y, pt.Z) for pt in self.Vertices], \
+                             [(f.A, f.B, f.C, f.D) for f in self.Faces]))
+
+
+def createMesh(vertices, faces):
+    mesh = Mesh()
+    for vertex in vertices:
+        mesh.Vertices.Add(Point3d(*vertex))
+    for face in faces:
+        mesh.Faces.AddFace(*face)
+    return mesh
+
+
+class Brep(object):
+    """Polysurfaces are not in the generated model."""
+    pass
+
+
+def loadHoneybeeClasses():
+    """Execute hb_ObjectsFile from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_ObjectsFile(object):")
+    end = source.index("class hb_RADParameters(object):")
+    geometry = type("Geometry", (object,), {"Point3d": Point3d, "Vector3d": Vector3d, "Plane": Plane, \
+                                           "Mesh": Mesh, "Brep": Brep})
+    rc = type("Rhino", (object,), {"Geometry": geometry})
+    namespace = {"rc": rc, "struct": struct, "array": array, "pickle": pickle}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace["hb_ObjectsFile"]
+
+
+def createModel(zoneCount, surfaceCount = 8):
+    """Return the dictionary that Dump Honeybee Objects pickles for a generated model."""
+    random.seed(0)
+    constructions = ["EXTERIOR WALL", "INTERIOR FLOOR", "EXTERIOR ROOF", "INTERIOR WALL"]
+    objs = {}
+    ids = []
+    for zoneCount_ in range(zoneCount):
+        zoneID = "zone-%05d"%zoneCount_
+        ids.append(zoneID)
+        surfaceIDs = []
+        for srfCount in range(surfaceCount):
+            srfID = "srf-%05d-%d"%(zoneCount_, srfCount)
+            surfaceIDs.append(srfID)
+            mesh = Mesh()
+            for count in range(40):
+                mesh.Vertices.Add(Point3d(random.random(), random.random(), random.random()))
+            for count in range(30):
+                mesh.Faces.AddFace(count, count + 1, count + 2, count + 2)
+            adjacentID = "srf-%05d-%d"%((zoneCount_ + 1) % zoneCount, srfCount)
+            objs[srfID] = {"objectType": "HBSurface", "name": "ZONE_%d_SRF_%d"%(zoneCount_, srfCount), \
+                "ID": srfID, "parent": zoneID, "type": srfCount % 4, \
+                "EPConstruction": constructions[srfCount % 4], "RadMaterial": None, \
+                "BCObject": adjacentID if srfCount == 3 else "Outdoors", "childSrfs": [], \
+                "meshedFace": mesh, "cenPt": Point3d(1.0, 2.0, 3.0), \
+                "normalVector": Vector3d(0.0, 0.0, 1.0), \
+                "basePlane": Plane(Point3d(0.0, 0.0, 0.0), Vector3d(1.0, 0.0, 0.0), Vector3d(0.0, 1.0, 0.0)), \
+                "coordinates": [Point3d(random.random(), 0.0, 1.0) for count in range(4)], \
+                "num": srfCount, "isChild": False, "hasChild": False, "shdCntrl": u"caf\xe9"}
+        objs[zoneID] = {"objectType": "HBZone", "name": "ZONE_%d"%zoneCount_, "ID": zoneID, \
+            "surfaces": surfaceIDs, "HVACSystem": "hvac-1", "isConditioned": True, "num": zoneCount_, \
+            "occupancySchedule": "OFFICE OCCUPANCY", "lightingSchedule": "OFFICE LIGHTING", \
+            "equipmentLoadPerArea": 10.5, "bigNumber": 2 ** 70}
+    objs["hvac-1"] = {"objectType": "HBHvac", "ID": "hvac-1", "airDetails": None, \
+                      "heatingDetails": None, "coolingDetails": None, "GroupID": 0}
+    objs["EXTERIOR WALL"] = {"objectType": "HBConstr", "name": "EXTERIOR WALL", \
+                             "EPstr": "Construction,\n EXTERIOR WALL,\n Brick;"}
+    return {"ids": ids, "objs": objs}
+
+
+def normalize(value):
+    """Return a value that compares equal for equal geometries."""
+    if isinstance(value, Mesh):
+        return ("Mesh", [(pt.X, pt.Y, pt.Z) for pt in value.Vertices], \
+                [(f.A, f.B, f.C, f.D) for f in value.Faces])
+    elif isinstance(value, Plane):
+        return ("Plane", normalize(value.Origin), normalize(value.XAxis), normalize(value.YAxis))
+    elif isinstance(value, (Point3d, Vector3d)):
+        return (type(value).__name__, value.X, value.Y, value.Z)
+    elif isinstance(value, dict):
+        return dict((key, normalize(item)) for key, item in value.iteritems())
+    elif isinstance(value, (list, tuple)):
+        return type(value)(normalize(item) for item in value)
+    return value
+
+
+def bestOf(repeat, function, *args):
+    """Return the shortest run time and the result of the last run."""
+    bestTime = None
+    for count in range(repeat):
+        startTime = time.time()
+        result = function(*args)
+        runTime = time.time() - startTime
+        if bestTime is None or runTime < bestTime: bestTime = runTime
+    return bestTime, result
+
+
+def writePickle(filePath, HBData):
+    with open(filePath, "wb") as outf:
+        pickle.dump(HBData, outf, 2)
+
+
+def readPickle(filePath):
+    with open(filePath, "rb") as inf:
+        return pickle.load(inf)
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def main(zoneCount, repeat):
+    hb_ObjectsFile = loadHoneybeeClasses()
+    HBData = createModel(zoneCount)
+    tempFolder = tempfile.mkdtemp()
+    failed = []
+    try:
+        pickleFile = os.path.join(tempFolder, "model.HB")
+        binaryFile = os.path.join(tempFolder, "model.HBB")
+
+        pickleWrite, result = bestOf(repeat, writePickle, pickleFile, HBData)
+        binaryWrite, result = bestOf(repeat, hb_ObjectsFile(0.01).write, binaryFile, HBData)
+
+        print "round trip of %d zones"%zoneCount
+        loaded = hb_ObjectsFile(0.01).read(binaryFile)
+        check("all the objects are read with the same values", \
+              normalize(loaded["objs"]) == normalize(HBData["objs"]), failed)
+        check("the zone IDs are read in order", loaded["ids"] == HBData["ids"], failed)
+        check("the file is detected as a binary file", hb_ObjectsFile.isObjectsFile(binaryFile) and \
+              not hb_ObjectsFile.isObjectsFile(pickleFile), failed)
+
+        print "load a subset of the zones"
+        subset = hb_ObjectsFile(0.01).read(binaryFile, names = ["zone_7"])
+        expected = set(["zone-00007", "hvac-1", "EXTERIOR WALL"] + ["srf-00007-%d"%count for count in range(8)])
+        check("a zone is loaded by name with its surfaces, HVAC and libraries", \
+              set(subset["objs"]) == expected and subset["ids"] == ["zone-00007"], failed)
+        check("the loaded objects have the same values", all(normalize(subset["objs"][id]) == \
+              normalize(HBData["objs"][id]) for id in expected), failed)
+        check("the names of all the objects are returned", \
+              subset["names"]["srf-00008-3"] == "ZONE_8_SRF_3", failed)
+        subset = hb_ObjectsFile(0.01).read(binaryFile, ids = ["srf-00009-2"])
+        check("a surface is loaded by ID with its zone", "srf-00009-2" in subset["objs"] and \
+              "zone-00009" in subset["objs"] and subset["ids"] == ["srf-00009-2"], failed)
+
+        print "read a file from a newer version"
+        newerFile = os.path.join(tempFolder, "newer.HBB")
+        shutil.copyfile(binaryFile, newerFile)
+        with open(newerFile, "r+b") as outf:
+            outf.write(struct.pack("<4sH", hb_ObjectsFile.MAGIC, hb_ObjectsFile.VERSION + 1))
+        try:
+            hb_ObjectsFile(0.01).read(newerFile)
+            rejected = False
+        except ValueError:
+            rejected = True
+        check("the file is rejected", rejected, failed)
+
+        pickleRead, result = bestOf(repeat, readPickle, pickleFile)
+        binaryRead, result = bestOf(repeat, hb_ObjectsFile(0.01).read, binaryFile)
+        subsetRead, result = bestOf(repeat, hb_ObjectsFile(0.01).read, binaryFile, ["zone_7"])
+
+        print "best of %d runs"%repeat
+        print "    size:        cPickle %8d KB   binary %8d KB"%(os.path.getsize(pickleFile) / 1024, \
+                                                                  os.path.getsize(binaryFile) / 1024)
+        print "    write:       cPickle %8.4f s    binary %8.4f s"%(pickleWrite, binaryWrite)
+        print "    load:        cPickle %8.4f s    binary %8.4f s"%(pickleRead, binaryRead)
+        print "    load 1 zone: cPickle %8.4f s    binary %8.4f s"%(pickleRead, subsetRead)
+    finally:
+        shutil.rmtree(tempFolder)
+
+    if failed:
+        raise SystemExit("%d checks failed."%len(failed))
+    print "The binary file reads back the same objects."
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300, int(sys.argv[2]) if len(sys.argv) > 2 else 3)
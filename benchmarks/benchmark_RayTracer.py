@@ -0,0 +1,186 @@
+"""
+Check and benchmark the BVH ray tracer of Honeybee_Honeybee against brute force.
+
+hb_RayTracer is taken from src/Honeybee_Honeybee.py and run outside of Rhino with CPython
+2.7. The scene is a room with meshed walls, floor and ceiling, two windows on the walls and
+random triangles for furniture. The brute force reference intersects each ray with every
+triangle of every surface and takes the closest surface, the same as calling
+Intersection.MeshRay for each surface mesh in parallel_projection. The script checks that
+for random points and directions:
+    - the closest surface and the distance to it are the same as brute force,
+    - anyHits and allHits find the same surfaces as brute force,
+    - a hit farther than tMax is ignored.
+It then prints the time to cast the view vectors of a few points with both.
+
+Usage:
+    python2 benchmarks/benchmark_RayTracer.py [points]
+"""
+
+import os
+import sys
+import math
+import time
+import random
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+
+
+def loadHoneybeeClasses():
+    """Execute hb_RayTracer from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_RayTracer(object):")
+    end = source.index("class hb_HiveCopyState(object):")
+    namespace = {"math": math}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace["hb_RayTracer"]
+
+
+def intersectTriangle(origin, direction, triangle):
+    """Distance to a triangle along a ray or None (Moller-Trumbore)."""
+    (ax, ay, az), (bx, by, bz), (cx, cy, cz) = triangle
+    ox, oy, oz = origin
+    dx, dy, dz = direction
+    e1x, e1y, e1z = bx - ax, by - ay, bz - az
+    e2x, e2y, e2z = cx - ax, cy - ay, cz - az
+    px, py, pz = dy * e2z - dz * e2y, dz * e2x - dx * e2z, dx * e2y - dy * e2x
+    det = e1x * px + e1y * py + e1z * pz
+    if abs(det) < 1e-12: return None
+    inv = 1.0 / det
+    sx, sy, sz = ox - ax, oy - ay, oz - az
+    u = (sx * px + sy * py + sz * pz) * inv
+    if u < 0 or u > 1: return None
+    qx, qy, qz = sy * e1z - sz * e1y, sz * e1x - sx * e1z, sx * e1y - sy * e1x
+    v = (dx * qx + dy * qy + dz * qz) * inv
+    if v < 0 or u + v > 1: return None
+    t = (e2x * qx + e2y * qy + e2z * qz) * inv
+    return t if t >= 0 else None
+
+
+def bruteForce(origin, direction, surfaces):
+    """Distance to the closest triangle of each surface or None if the ray misses the surface."""
+    distances = []
+    for triangles in surfaces:
+        hits = [t for t in (intersectTriangle(origin, direction, triangle) for triangle in triangles) \
+                if t is not None]
+        distances.append(min(hits) if hits else None)
+    return distances
+
+
+def meshQuad(corner, u, v, divisions):
+    """Triangles of a rectangle that is divided to a grid."""
+    def point(i, j):
+        return tuple(corner[k] + u[k] * i / float(divisions) + v[k] * j / float(divisions) for k in range(3))
+    triangles = []
+    for i in range(divisions):
+        for j in range(divisions):
+            a, b, c, d = point(i, j), point(i + 1, j), point(i + 1, j + 1), point(i, j + 1)
+            triangles.extend([(a, b, c), (a, c, d)])
+    return triangles
+
+
+def createRoom(generator, divisions, furniture):
+    """Surfaces of a 10 x 8 x 3 room as lists of triangles."""
+    W, D, H = 10.0, 8.0, 3.0
+    surfaces = [meshQuad((0, 0, 0), (W, 0, 0), (0, D, 0), divisions), meshQuad((0, 0, H), (W, 0, 0), (0, D, 0), divisions),
+                meshQuad((0, 0, 0), (W, 0, 0), (0, 0, H), divisions), meshQuad((0, D, 0), (W, 0, 0), (0, 0, H), divisions),
+                meshQuad((0, 0, 0), (0, D, 0), (0, 0, H), divisions), meshQuad((W, 0, 0), (0, D, 0), (0, 0, H), divisions)]
+    # windows on the walls
+    surfaces.append(meshQuad((2, 0, 1), (2, 0, 0), (0, 0, 1), 2))
+    surfaces.append(meshQuad((6, D, 1), (2, 0, 0), (0, 0, 1), 2))
+    triangles = []
+    for count in range(furniture):
+        center = (generator.uniform(1, 9), generator.uniform(1, 7), generator.uniform(0.2, 1.5))
+        size = generator.uniform(0.1, 0.6)
+        triangles.append(tuple(tuple(center[i] + generator.uniform(-size, size) for i in range(3)) for vertex in range(3)))
+    if triangles: surfaces.append(triangles)
+    return surfaces
+
+
+def createDirections(generator, count):
+    directions = []
+    for i in range(count):
+        z = generator.uniform(-1, 1)
+        angle = generator.uniform(0, 2 * math.pi)
+        radius = math.sqrt(1 - z * z)
+        directions.append((radius * math.cos(angle), radius * math.sin(angle), z))
+    # rays along the axes have zero components
+    return directions + [(1, 0, 0), (0, 0, 1), (0, -1, 0)]
+
+
+def buildTracer(hb_RayTracer, surfaces):
+    tracer = hb_RayTracer()
+    for srfId, triangles in enumerate(surfaces):
+        for a, b, c in triangles: tracer.addTriangle(a, b, c, srfId)
+    tracer.build()
+    return tracer
+
+
+def timeIt(function, *args):
+    startTime = time.time()
+    result = function(*args)
+    return time.time() - startTime, result
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def main(numOfPts):
+    hb_RayTracer = loadHoneybeeClasses()
+    generator = random.Random(3)
+    failed = []
+
+    for divisions, furniture, pointCount in ((1, 0, 30), (3, 40, 20), (6, 300, 10)):
+        surfaces = createRoom(generator, divisions, furniture)
+        tracer = buildTracer(hb_RayTracer, surfaces)
+        directions = createDirections(generator, 120)
+        packet = tracer.preparePacket(directions)
+        print "%d triangles in %d surfaces, %d rays"%(len(tracer), len(surfaces), pointCount * len(directions))
+
+        closest = distance = anyHit = allHits = limited = True
+        for count in range(pointCount):
+            origin = (generator.uniform(0.3, 9.7), generator.uniform(0.3, 7.7), generator.uniform(0.1, 2.9))
+            srfIds = tracer.closestHits(origin, packet)
+            anyHits = tracer.anyHits(origin, packet)
+            hitIds = tracer.allHits(origin, packet)
+            limitedIds = tracer.closestHits(origin, packet, tMax = 2.0)
+            for rayCount, direction in enumerate(directions):
+                distances = bruteForce(origin, direction, surfaces)
+                hits = [(t, srfId) for srfId, t in enumerate(distances) if t is not None]
+                # ties go to the lowest surface ID
+                bestT, bestId = min(hits) if hits else (-1.0, -1)
+                closest = closest and srfIds[rayCount] == bestId
+                t, srfId = tracer.intersect(origin, direction)
+                distance = distance and abs(t - bestT) < 1e-9
+                anyHit = anyHit and anyHits[rayCount] == bool(hits)
+                allHits = allHits and hitIds[rayCount] == sorted(srfId for t, srfId in hits)
+                limited = limited and limitedIds[rayCount] == (bestId if 0 <= bestT <= 2.0 else -1)
+        check("same closest surface as brute force", closest, failed)
+        check("same distance to the closest surface", distance, failed)
+        check("same rays hit any surface", anyHit, failed)
+        check("same surfaces for all of the hits", allHits, failed)
+        check("hits farther than tMax are ignored", limited, failed)
+
+    print "cast %d view vectors from %d points"%(290, numOfPts)
+    for divisions, furniture in ((1, 0), (4, 200), (8, 2000)):
+        surfaces = createRoom(generator, divisions, furniture)
+        buildTime, tracer = timeIt(buildTracer, hb_RayTracer, surfaces)
+        directions = createDirections(generator, 287)
+        points = [(generator.uniform(0.3, 9.7), generator.uniform(0.3, 7.7), 0.6) for count in range(numOfPts)]
+        packet = tracer.preparePacket(directions)
+        tracerTime, result = timeIt(lambda: [tracer.closestHits(origin, packet) for origin in points])
+        bruteForceTime, result = timeIt(lambda: [bruteForce(origin, direction, surfaces) \
+                                                 for origin in points for direction in directions])
+        print "    %5d triangles: BVH %.3f s (build %.3f s)  brute force %.3f s (%.1fx faster)"%( \
+            len(tracer), tracerTime, buildTime, bruteForceTime, bruteForceTime / tracerTime)
+
+    if failed:
+        raise SystemExit("%d checks failed."%len(failed))
+    print "The ray tracer matches brute force."
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
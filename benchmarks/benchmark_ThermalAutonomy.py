@@ -0,0 +1,260 @@
+"""
+Benchmark the streaming Thermal Autonomy Analysis against the in-memory matrices it replaced.
+
+ThermalAutonomyCounter is taken from src/Honeybee_Thermal Autonomy Analysis.py and the
+comfort matrix files from src/Honeybee_Honeybee.py. They run outside of Rhino with
+CPython 2.7. Annual comfort and degrees-from-target matrices are generated for a number of
+points in 6 zones and written as .hbcm files. Each run is a separate process so its peak
+memory can be measured:
+    - reference: calcComf of the component before the counter. It reads both matrices
+      into memory and fills the four hour x point result matrices.
+    - streaming: the counter reads the .hbcm files one hour at a time and writes the
+      four results to .hbcm files (writeResultFile_ = 3).
+The script checks that the total of every point and the occupied hours of the four
+results are the same for both and then prints the time and the peak memory of each run.
+
+The reference needs about 0.8 GB for every 1,000 points of an annual matrix so it runs for
+fewer points than the streaming run by default. The peak memory of the streaming run
+includes the pages of the two input matrices that are mapped to memory. They are read
+from the file and the system can drop them, unlike the lists of the reference.
+
+Usage:
+    python2 benchmarks/benchmark_ThermalAutonomy.py [points] [referencePoints] [hours]
+"""
+
+import os
+import re
+import sys
+import mmap
+import time
+import array
+import random
+import shutil
+import struct
+import operator
+import tempfile
+import itertools
+import subprocess
+import cPickle as pickle
+
+try: import resource
+except ImportError: resource = None
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+componentFile = os.path.join(rootFolder, "src", "Honeybee_Thermal Autonomy Analysis.py")
+numOfZones = 6
+headers = ["Adaptive Comfort;(1, 1, 1);(12, 31, 24)", "Degrees From Target;(1, 1, 1);(12, 31, 24)"]
+resultHeaders = ["Adaptive %s;(1, 1, 1);(12, 31, 24)"%name for name in \
+                 ("Occupied Thermal Comfort Percent", "Thermal Autonomy", "Over-Heated Percent", "Under-Heated Percent")]
+
+
+def loadHoneybeeClasses():
+    """Execute the comfort matrix file classes and ThermalAutonomyCounter from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_ComfortMatrixFile(object):")
+    end = source.index("class EPObjectsAux(object):")
+    namespace = {"os": os, "re": re, "mmap": mmap, "array": array, "struct": struct, \
+                 "operator": operator, "itertools": itertools}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+
+    with open(componentFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class ThermalAutonomyCounter(object):")
+    end = source.index("def main(")
+    exec compile(source[start:end], componentFile, "exec") in namespace
+    return namespace["hb_ComfortMatrixFile"], namespace["hb_ComfortMatrixWriter"], \
+           namespace["ThermalAutonomyCounter"]
+
+
+def createSchedules(numOfPts, numOfHours):
+    """Zone of each point, occupancy and energy use of each zone."""
+    generator = random.Random(1)
+    occupancy = [[generator.choice([0, 0.3, 1]) for hour in range(numOfHours)] for zone in range(numOfZones)]
+    energy = [[generator.choice([0, 0, 5.0]) for hour in range(numOfHours)] for zone in range(numOfZones)]
+    pointZones = [generator.randint(0, numOfZones - 1) for pt in range(numOfPts)]
+    return pointZones, occupancy, energy
+
+
+def generateMatrices(folder, numOfPts, numOfHours):
+    hb_ComfortMatrixFile, hb_ComfortMatrixWriter, ThermalAutonomyCounter = loadHoneybeeClasses()
+    generator = random.Random(2)
+    filePaths = [os.path.join(folder, "comfort_%d.hbcm"%numOfPts), os.path.join(folder, "degrees_%d.hbcm"%numOfPts)]
+    comfWriter, degWriter = [hb_ComfortMatrixWriter(filePath, header, numOfPts) \
+                             for filePath, header in zip(filePaths, headers)]
+    for hour in xrange(numOfHours):
+        comfWriter.writeRow([generator.randint(0, 1) for pt in xrange(numOfPts)])
+        degWriter.writeRow([generator.uniform(-3, 3) for pt in xrange(numOfPts)])
+    comfWriter.close()
+    degWriter.close()
+    return filePaths
+
+
+def referenceCalculation(comfFile, degFile, numOfPts, numOfHours):
+    """calcComf of the component before ThermalAutonomyCounter."""
+    hb_ComfortMatrixFile, hb_ComfortMatrixWriter, ThermalAutonomyCounter = loadHoneybeeClasses()
+    pointZoneList, occupancySchList, totEnergyNumbersMatched = createSchedules(numOfPts, numOfHours)
+    occupancyThreshold = 0.5
+    _comfResultsMtx = list(hb_ComfortMatrixFile(comfFile))
+    _degOrPMVMtx = list(hb_ComfortMatrixFile(degFile))
+    occTCP_Mtx = [resultHeaders[0]] + [0] * numOfHours
+    TA_Mtx = [resultHeaders[1]] + [0] * numOfHours
+    OverHeatedMtx = [resultHeaders[2]] + [0] * numOfHours
+    UnderHeatedMtx = [resultHeaders[3]] + [0] * numOfHours
+    occHrsNum = [0] * len(pointZoneList)
+
+    def calcComf(count):
+        occTCP = []
+        TA = []
+        OverHeated = []
+        UnderHeated = []
+        for pointCount, pointZone in enumerate(pointZoneList):
+            try:
+                _comfResultsMtx[count + 1][pointCount]
+                if occupancySchList[pointZone][count] > occupancyThreshold:
+                    occHrsNum[pointCount] += 1
+                    if _comfResultsMtx[count + 1][pointCount] > 0:
+                        occTCP.append(1)
+                        OverHeated.append(0)
+                        UnderHeated.append(0)
+                        if totEnergyNumbersMatched[pointZone][count] > 0: TA.append(0)
+                        else: TA.append(1)
+                    else:
+                        occTCP.append(0)
+                        TA.append(0)
+                        if _degOrPMVMtx[count + 1][pointCount] > 0:
+                            OverHeated.append(1)
+                            UnderHeated.append(0)
+                        else:
+                            OverHeated.append(0)
+                            UnderHeated.append(1)
+                else:
+                    occTCP.append(0.0)
+                    TA.append(0.0)
+                    OverHeated.append(0.0)
+                    UnderHeated.append(0.0)
+            except:
+                pass
+
+        occTCP_Mtx[count+1] = occTCP
+        TA_Mtx[count+1] = TA
+        OverHeatedMtx[count+1] = OverHeated
+        UnderHeatedMtx[count+1] = UnderHeated
+
+    for hour in range(len(occupancySchList[0])):
+        calcComf(hour)
+
+    matrices = [occTCP_Mtx, TA_Mtx, OverHeatedMtx, UnderHeatedMtx]
+    totals = [[sum(column) for column in itertools.izip(*matrix[1:])] for matrix in matrices]
+    return totals, occHrsNum
+
+
+def streamingCalculation(comfFile, degFile, numOfPts, numOfHours, folder):
+    """The counter with the results written to .hbcm files."""
+    hb_ComfortMatrixFile, hb_ComfortMatrixWriter, ThermalAutonomyCounter = loadHoneybeeClasses()
+    pointZoneList, occupancySchList, totEnergyNumbersMatched = createSchedules(numOfPts, numOfHours)
+    comfResultsMtx, degOrPMVMtx = hb_ComfortMatrixFile(comfFile), hb_ComfortMatrixFile(degFile)
+    resultFiles = [os.path.join(folder, "result_%d_%d.hbcm"%(numOfPts, count)) for count in range(4)]
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        counter = ThermalAutonomyCounter(pointZoneList, occupancySchList, totEnergyNumbersMatched, 0.5, float("nan"))
+        writers = [hb_ComfortMatrixWriter(resultFile, header, numOfPts, occupied = True) \
+                   for resultFile, header in zip(resultFiles, resultHeaders)]
+        try: counter.run(comfResultsMtx, degOrPMVMtx, numOfHours, [writer.writeValues for writer in writers])
+        finally:
+            for writer in writers: writer.close(counter.occHrsNum)
+    finally:
+        sys.stdout = stdout
+    comfResultsMtx.close()
+    degOrPMVMtx.close()
+    return resultFiles
+
+
+def readResultFiles(resultFiles, numOfHours):
+    hb_ComfortMatrixFile, hb_ComfortMatrixWriter, ThermalAutonomyCounter = loadHoneybeeClasses()
+    totals = []
+    for resultFile in resultFiles:
+        resultMtx = hb_ComfortMatrixFile(resultFile)
+        totals.append([int(value) for value in resultMtx.getPeriodValues(range(1, numOfHours + 1), total = True)])
+        occHrsNum = [int(value) for value in resultMtx[-1]]
+        resultMtx.close()
+    return totals, occHrsNum
+
+
+def peakMemory():
+    """Peak memory of the process in MB or None if it can't be measured."""
+    if resource is None: return None
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def runInProcess(mode, folder, numOfPts, numOfHours):
+    """Run one calculation in this process and pickle its time, memory and totals."""
+    comfFile, degFile = [os.path.join(folder, "%s_%d.hbcm"%(name, numOfPts)) for name in ("comfort", "degrees")]
+    startTime = time.time()
+    if mode == "reference":
+        totals, occHrsNum = referenceCalculation(comfFile, degFile, numOfPts, numOfHours)
+        runTime = time.time() - startTime
+    else:
+        resultFiles = streamingCalculation(comfFile, degFile, numOfPts, numOfHours, folder)
+        runTime = time.time() - startTime
+        totals, occHrsNum = readResultFiles(resultFiles, numOfHours)
+    with open(os.path.join(folder, "%s_%d.pkl"%(mode, numOfPts)), "wb") as outf:
+        pickle.dump((runTime, peakMemory(), totals, occHrsNum), outf, 2)
+
+
+def runProcess(mode, folder, numOfPts, numOfHours):
+    """Run a calculation in a new process and return its time, memory and totals."""
+    returnCode = subprocess.call([sys.executable, os.path.abspath(__file__), "--run", mode, folder, \
+                                  str(numOfPts), str(numOfHours)])
+    if returnCode != 0: return None
+    with open(os.path.join(folder, "%s_%d.pkl"%(mode, numOfPts)), "rb") as inf:
+        return pickle.load(inf)
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def main(numOfPts, referencePts, numOfHours):
+    tempFolder = tempfile.mkdtemp()
+    failed = []
+    runs = []
+    try:
+        for pts in sorted(set([referencePts, numOfPts])):
+            generateMatrices(tempFolder, pts, numOfHours)
+            streaming = runProcess("streaming", tempFolder, pts, numOfHours)
+            reference = runProcess("reference", tempFolder, pts, numOfHours) if pts <= referencePts else None
+            print "%d points and %d hours"%(pts, numOfHours)
+            check("the streaming run finishes", streaming is not None, failed)
+            if pts <= referencePts:
+                check("the reference run finishes", reference is not None, failed)
+                if reference is not None and streaming is not None:
+                    check("same totals of the points", streaming[2] == reference[2], failed)
+                    check("same occupied hours of the points", streaming[3] == reference[3], failed)
+            runs.append((pts, reference, streaming))
+
+        print "time and peak memory"
+        for pts, reference, streaming in runs:
+            for name, result in (("reference", reference), ("streaming", streaming)):
+                if result is None: continue
+                memory = "%5d MB"%result[1] if result[1] is not None else "     -"
+                print "    %6d points %-9s %7.2f s %s"%(pts, name, result[0], memory)
+    finally:
+        shutil.rmtree(tempFolder)
+
+    if failed:
+        raise SystemExit("%d checks failed."%len(failed))
+    print "The streaming results match the reference."
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        runInProcess(sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000, int(sys.argv[2]) if len(sys.argv) > 2 else 2000, \
+             int(sys.argv[3]) if len(sys.argv) > 3 else 8760)
@@ -0,0 +1,289 @@
+"""
+Check the annual daylight metrics of Honeybee_Honeybee against Daysim and the old reader.
+
+hb_DSIllMatrix and hb_DSAnnualMetrics are taken from src/Honeybee_Honeybee.py and run
+outside of Rhino with CPython 2.7.
+
+Without arguments a grid of conceptual blinds (blinds up and down) is generated. The script
+checks that the conceptual blinds follow the active user of Daysim and that the metrics of
+small blocks of sensors are the same as one loop over every hourly value. It then prints the
+time to calculate the metrics in process and the time that Read Annual Result I takes to
+write the .ill file of each space for ds_el_lighting before it can run Daysim. Daysim itself
+is not part of the timing.
+
+With the folder of a space that Read Annual Result I has run Daysim for, the metrics are
+compared with the files that ds_el_lighting writes:
+    - DA, CDA and UDI with the blinds of the Daysim annual profile (_intgain.csv),
+    - the blinds that are calculated in process against the Daysim annual profile and the
+      DA with these blinds.
+
+Usage:
+    python2 benchmarks/check_DSAnnualMetrics.py [points] [repeat] [spaces]
+    python2 benchmarks/check_DSAnnualMetrics.py projectFolder subProjectName
+        e.g. c:/ladybug/office/annualSimulation office_space_0
+"""
+
+import os
+import sys
+import json
+import time
+import array
+import random
+import shutil
+import hashlib
+import tempfile
+import itertools
+
+try: import mmap
+except ImportError: mmap = None
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+
+
+def loadHoneybeeClasses():
+    """Execute hb_DSIllMatrix and hb_DSAnnualMetrics from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_DSIllMatrix(object):")
+    end = source.index("class hb_ReadAnnualResultsAux(object):")
+    namespace = {"os": os, "sys": sys, "json": json, "array": array, \
+                 "shutil": shutil, "hashlib": hashlib, "itertools": itertools, "mmap": mmap}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace["hb_DSIllMatrix"], namespace["hb_DSAnnualMetrics"]
+
+
+def referenceMetrics(metrics, start, end, threshold = 300, UDIRange = (100, 2000)):
+    """One loop over every hourly value of all the sensors."""
+    threshold = float(threshold)
+    UDILow, UDIHigh = map(float, UDIRange)
+    occupiedHours = metrics.occupiedHours
+    blockLength = end - start
+
+    DACount = [0] * blockLength
+    underThreshold = [0.0] * blockLength
+    UDILessCount = [0] * blockLength
+    UDIMoreCount = [0] * blockLength
+    for (group, state), hours in sorted(metrics.hoursByMatrix.items()):
+        illMatrix = metrics.illMatrices[group][state]
+        for hourValues in illMatrix.iterHours(start, end, hours):
+            for ptCount, value in enumerate(hourValues):
+                if value >= threshold: DACount[ptCount] += 1
+                else: underThreshold[ptCount] += value
+                if value < UDILow: UDILessCount[ptCount] += 1
+                elif value > UDIHigh: UDIMoreCount[ptCount] += 1
+
+    toPercent = 100.0 / occupiedHours
+    return {"DA": [count * toPercent for count in DACount],
+            "cDA": [(DACount[i] + underThreshold[i] / threshold) * toPercent for i in range(blockLength)],
+            "UDILess": [count * toPercent for count in UDILessCount],
+            "UDIMore": [count * toPercent for count in UDIMoreCount],
+            "UDIIn": [(occupiedHours - UDILessCount[i] - UDIMoreCount[i]) * toPercent for i in range(blockLength)]}
+
+
+def writeIllFile(illFilePath, rows):
+    """Write a Daysim .ill file for a list of hourly values."""
+    daysInMonth = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+    dates = [(month + 1, day + 1, hour + 0.5) for month, days in enumerate(daysInMonth) \
+             for day in range(days) for hour in range(24)]
+    with open(illFilePath, "w") as outf:
+        for (month, day, hour), values in zip(dates, rows):
+            outf.write("%d %d %.3f %s\n"%(month, day, hour, " ".join("%.2f"%value for value in values)))
+
+
+def generateBlinds(folder, numOfPts):
+    """Write the .ill files of conceptual blinds. Direct sunlight hits the first point at noon."""
+    random.seed(0)
+    upRows, downRows = [], []
+    for HOY in range(8760):
+        hour = HOY % 24
+        isDay = 7 <= hour <= 18
+        diffuse = [random.uniform(0, 1200) if isDay else 0.0 for pt in range(numOfPts)]
+        direct = [random.uniform(0, 30000) if isDay and random.random() < 0.2 else 0.0 for pt in range(numOfPts)]
+        upRows.append([d + s for d, s in zip(diffuse, direct)])
+        downRows.append([0.25 * d for d in diffuse])
+    upFile = os.path.join(folder, "study_0_up.ill")
+    downFile = os.path.join(folder, "study_0_down.ill")
+    writeIllFile(upFile, upRows)
+    writeIllFile(downFile, downRows)
+    return upFile, downFile
+
+
+def writeSpaceIllFiles(illMatrix, folder, numOfPtsInEachSpace):
+    """Write the .ill file of each space the same as Read Annual Result I does for ds_el_lighting."""
+    dates = illMatrix.getDates()
+    for spaceCount in range(len(numOfPtsInEachSpace)):
+        stPt = sum(numOfPtsInEachSpace[:spaceCount])
+        endPt = sum(numOfPtsInEachSpace[:spaceCount+1])
+        with open(os.path.join(folder, "study_space_%d.ill"%spaceCount), "w") as newIllFile:
+            for HOY, hourValues in enumerate(illMatrix.iterHours(stPt, endPt)):
+                month, day, hour = dates[HOY]
+                dateInfo = [str(month), str(day), "%.3f"%hour, ""]
+                line = " ".join(dateInfo + ["%.7g"%value for value in hourValues])
+                newIllFile.write(line + "\n")
+
+
+def calculateSpaces(metrics, numOfPtsInEachSpace):
+    """Calculate the metrics of each space the same as Read Annual Result I does in process."""
+    spaceMetrics = []
+    for spaceCount in range(len(numOfPtsInEachSpace)):
+        stPt = sum(numOfPtsInEachSpace[:spaceCount])
+        endPt = sum(numOfPtsInEachSpace[:spaceCount+1])
+        spaceMetrics.append(metrics.calculate(stPt, endPt, 300))
+    return spaceMetrics
+
+
+def bestOf(repeat, function, *args):
+    """Return the shortest run time and the result of the last run."""
+    bestTime = None
+    for count in range(repeat):
+        startTime = time.time()
+        result = function(*args)
+        runTime = time.time() - startTime
+        if bestTime is None or runTime < bestTime: bestTime = runTime
+    return bestTime, result
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def maxDifference(values, referenceValues):
+    if len(values) != len(referenceValues): return float("inf")
+    return max([abs(a - b) for a, b in zip(values, referenceValues)] or [0])
+
+
+def checkGeneratedBlinds(numOfPts, repeat, numOfSpaces):
+    hb_DSIllMatrix, hb_DSAnnualMetrics = loadHoneybeeClasses()
+    tempFolder = tempfile.mkdtemp()
+    failed = []
+    try:
+        upFile, downFile = generateBlinds(tempFolder, numOfPts)
+        upMatrix = hb_DSIllMatrix.fromIllFiles([upFile], 0, 0)
+        downMatrix = hb_DSIllMatrix.fromIllFiles([downFile], 1, 0)
+        illMatrices = {0: [upMatrix], 1: [downMatrix]}
+        occupancy = [1 if 8 <= HOY % 24 < 17 else 0 for HOY in range(8760)]
+
+        print "conceptual blinds for %d points"%numOfPts
+        profile = hb_DSAnnualMetrics.getConceptualBlindsProfile(upMatrix, downMatrix, [0, 1], occupancy)
+        expected = []
+        isDown = False
+        for HOY in range(8760):
+            if HOY % 24 == 8: isDown = False
+            if occupancy[HOY] and not isDown:
+                up, down = upMatrix.getHour(HOY, 0, 2), downMatrix.getHour(HOY, 0, 2)
+                isDown = any(up[i] - 4 * down[i] > 50 * 179 for i in range(2))
+            expected.append(1 if isDown else 0)
+        check("blinds are lowered by direct sunlight and opened at arrival", profile == expected, failed)
+        downHours = sum(down for down, occ in zip(profile, occupancy) if occ)
+        check("blinds are down for some of the occupied hours", 0 < downHours < sum(occupancy), failed)
+
+        metrics = hb_DSAnnualMetrics(illMatrices, occupancy, [profile])
+        check("the hours with the blinds down are read from the second matrix", \
+              len(metrics.hoursByMatrix[(1, 0)]) == downHours, failed)
+
+        # blocks that don't divide the grid evenly
+        results = hb_DSAnnualMetrics(illMatrices, occupancy, [profile], blockSize = 37).calculate(0, numOfPts, 300)
+        reference = referenceMetrics(metrics, 0, numOfPts, 300)
+        for key in ("DA", "UDILess", "UDIIn", "UDIMore"):
+            check("same %s for blocks of sensors as for all the sensors"%key, results[key] == reference[key], failed)
+        check("same cDA for blocks of sensors as for all the sensors", \
+              maxDifference(results["cDA"], reference["cDA"]) < 1e-9, failed)
+
+        numOfPtsInEachSpace = [numOfPts // numOfSpaces + (1 if count < numOfPts % numOfSpaces else 0) \
+                               for count in range(numOfSpaces)]
+        newTime, results = bestOf(repeat, calculateSpaces, metrics, numOfPtsInEachSpace)
+        writeTime, result = bestOf(repeat, writeSpaceIllFiles, upMatrix, tempFolder, numOfPtsInEachSpace)
+
+        print "best of %d runs for %d spaces and %d occupied hours"%(repeat, numOfSpaces, metrics.occupiedHours)
+        print "    write the .ill files for ds_el_lighting: %.3f s (Daysim not included)"%writeTime
+        print "    calculate the metrics in process:        %.3f s (%.1fx faster)"%(newTime, writeTime / newTime)
+        upMatrix.close()
+        downMatrix.close()
+    finally:
+        shutil.rmtree(tempFolder)
+    return failed
+
+
+def readHeading(heaFile):
+    """Return the keywords of a Daysim heading file as lists of tokens."""
+    keywords = {}
+    with open(heaFile, "r") as inf:
+        for line in inf:
+            tokens = line.split()
+            if tokens: keywords.setdefault(tokens[0], []).append(tokens[1:])
+    return keywords
+
+
+def readDSStandardResults(filePath):
+    """Read the values of a Daysim DA, CDA or UDI file."""
+    results = []
+    with open(filePath, "r") as inf:
+        for line in inf:
+            if not line.startswith("#") and line.strip():
+                results.append(float(line.split("\t")[-1]))
+    return results
+
+
+def compareWithDaysim(projectFolder, subProjectName):
+    hb_DSIllMatrix, hb_DSAnnualMetrics = loadHoneybeeClasses()
+    failed = []
+    heading = readHeading(os.path.join(projectFolder, subProjectName + ".hea"))
+    occupancy = hb_DSAnnualMetrics.readOccupancyFile(os.path.join(projectFolder, heading["occupancy-file"][0][0]))
+    threshold = float(heading["minimum_illuminance_level"][0][0])
+
+    # .ill files in the shading section of the heading file. The first one is the base case.
+    illFiles = []
+    for shadingLine in heading.get("shading", []):
+        illFiles.extend(token for token in shadingLine if token.endswith(".ill"))
+    with open(os.path.join(projectFolder, subProjectName + ".hea"), "r") as inf:
+        for line in inf:
+            if line.strip().endswith(".ill") and not line.startswith("shading"):
+                illFiles.extend(token for token in line.split() if token.endswith(".ill"))
+    illMatrices = {}
+    for count, illFile in enumerate(illFiles):
+        illMatrices[count] = [hb_DSIllMatrix.fromIllFiles([os.path.join(projectFolder, illFile)], count, 0)]
+
+    shadingProfiles = None
+    intgainFile = os.path.join(projectFolder, subProjectName + "_intgain.csv")
+    if len(illMatrices) > 1 and os.path.isfile(intgainFile):
+        shadingProfiles = hb_DSAnnualMetrics.readShadingProfiles(intgainFile)
+
+    print "%s with %d .ill files and %d occupied hours"%(subProjectName, len(illFiles), sum(occupancy))
+    metrics = hb_DSAnnualMetrics(illMatrices, occupancy, shadingProfiles)
+    results = metrics.calculate(threshold = threshold)
+    # Daysim writes the metrics as whole percentages
+    for key, extension in (("DA", "_autonomy.DA"), ("cDA", ".CDA"), ("UDILess", "_less_than_100.UDI"), \
+                           ("UDIIn", "_100_2000.UDI"), ("UDIMore", "_more_than_2000.UDI")):
+        DSResults = readDSStandardResults(os.path.join(projectFolder, subProjectName + extension))
+        difference = maxDifference(results[key], DSResults)
+        check("%s within 1%% of %s (max difference %.2f)"%(key, subProjectName + extension, difference), \
+              difference <= 1.0, failed)
+
+    if shadingProfiles:
+        sensors = [count for count, info in enumerate(heading["sensor_file_info"][0]) if "BG1" in info]
+        profile = hb_DSAnnualMetrics.getConceptualBlindsProfile(illMatrices[0][0], illMatrices[1][0], sensors, occupancy)
+        DSProfile = [1 if value > 0 else 0 for value in shadingProfiles[0]]
+        occupiedHours = [HOY for HOY, occ in enumerate(occupancy) if occ]
+        agreement = 100.0 * sum(1 for HOY in occupiedHours if profile[HOY] == DSProfile[HOY]) / len(occupiedHours)
+        inProcess = hb_DSAnnualMetrics(illMatrices, occupancy, [profile]).calculate(threshold = threshold)
+        print "    blinds calculated in process"
+        print "        same blind position as Daysim: %.1f%% of the occupied hours"%agreement
+        print "        max DA difference with the Daysim blinds: %.2f"%maxDifference(inProcess["DA"], results["DA"])
+
+    for illMatrixList in illMatrices.values():
+        for illMatrix in illMatrixList: illMatrix.close()
+    return failed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and os.path.isdir(sys.argv[1]):
+        failed = compareWithDaysim(sys.argv[1], sys.argv[2])
+    else:
+        failed = checkGeneratedBlinds(int(sys.argv[1]) if len(sys.argv) > 1 else 500, \
+                                      int(sys.argv[2]) if len(sys.argv) > 2 else 3, \
+                                      int(sys.argv[3]) if len(sys.argv) > 3 else 4)
+    if failed:
+        raise SystemExit("%d checks failed."%len(failed))
+    print "The metrics match."
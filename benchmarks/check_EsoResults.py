@@ -0,0 +1,99 @@
+"""
+Check the eso reader of Honeybee_Honeybee against the csv file that ReadVarsESO writes.
+
+hb_EPEsoResults is taken from src/Honeybee_Honeybee.py and run outside of Rhino with
+CPython 2.7. Every column of the csv file must have the same values in the same rows as
+the column with the same header in the eso file. Both the line parser and the chunk
+search of the reader are checked.
+
+Usage:
+    python2 benchmarks/check_EsoResults.py eplusout.eso eplusout.csv
+"""
+
+import os
+import re
+import sys
+import array
+import bisect
+import hashlib
+import itertools
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+
+
+def loadHoneybeeClasses():
+    """Execute hb_EPResultCache and hb_EPEsoResults from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_EPResultCache(object):")
+    end = source.index("class hb_ComfortMatrixFile(object):")
+    namespace = {"os": os, "re": re, "array": array, "bisect": bisect, "hashlib": hashlib, \
+                 "itertools": itertools, "sqlite3": None}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace["hb_EPEsoResults"]
+
+
+def readCsv(csvFilePath):
+    """Return the headers and the columns of a ReadVarsESO csv file. Empty cells are None."""
+    with open(csvFilePath, "r") as inf:
+        headers = [header.strip() for header in inf.readline().split(",")]
+        columns = [[] for header in headers]
+        for line in inf:
+            cells = line.rstrip("\r\n").split(",")
+            for count, column in enumerate(columns):
+                try: cell = cells[count].strip()
+                except IndexError: cell = ""
+                if count == 0: column.append(cell)
+                else: column.append(float(cell) if cell else None)
+    return headers, columns
+
+
+def isClose(value, csvValue):
+    if value is None or csvValue is None: return value is None and csvValue is None
+    return abs(value - csvValue) <= 1e-6 * max(1.0, abs(csvValue))
+
+
+def main(esoFilePath, csvFilePath):
+    hb_EPEsoResults = loadHoneybeeClasses()
+    headers, csvColumns = readCsv(csvFilePath)
+
+    failed = False
+    for scanLimit in (0, sys.maxint):
+        esoResults = hb_EPEsoResults(esoFilePath)
+        esoResults.SCANLIMIT = scanLimit
+        method = "line parser" if scanLimit == 0 else "chunk search"
+        indexes = dict((header, index) for index, header in enumerate(esoResults.headers))
+
+        toCheck = [(indexes[header], count) for count, header in enumerate(headers) \
+                   if count != 0 and header in indexes]
+        missing = [header for count, header in enumerate(headers) if count != 0 and header not in indexes]
+        values = esoResults.getValues([index for index, count in toCheck])
+
+        print "%s: %d rows in the eso file, %d rows in the csv file"%(method, esoResults.rowCount, \
+                                                                      len(csvColumns[0]))
+        if esoResults.rowCount != len(csvColumns[0]): failed = True
+
+        for index, count in toCheck:
+            for row, (value, csvValue) in enumerate(itertools.izip_longest(values[index], csvColumns[count])):
+                if not isClose(value, csvValue):
+                    print "    %s doesn't match in row %d (%s): %s != %s"%(headers[count], row + 1, \
+                          csvColumns[0][row] if row < len(csvColumns[0]) else "", value, csvValue)
+                    failed = True
+                    break
+
+        for header in missing:
+            print "    %s is not in the eso file."%header
+            failed = True
+
+        print "    %d columns checked"%len(toCheck)
+
+    if failed:
+        raise SystemExit("The eso reader doesn't match the csv file.")
+    print "The eso reader matches the csv file."
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise SystemExit(__doc__)
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,139 @@
+"""
+Check the copy-on-write proxies of the Honeybee hive.
+
+hb_Hive and its proxies are taken from src/Honeybee_Honeybee.py and run outside of
+Rhino with CPython 2.7 against small stand-in zones. Changes to a proxy must only
+change the copy of the zone and never the zone that is stored in the hive, also when
+the change is made through a list or a dictionary that is read before the copy.
+
+Usage:
+    python2 benchmarks/check_HiveCopyOnWrite.py
+"""
+
+import os
+import sys
+import copy
+import time
+import types
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+
+
+class Mesh(object):
+    """Stand-in for Rhino.Geometry.Mesh which is all that hb_Hive.copyHBObject needs."""
+    def Append(self, other):
+        pass
+
+
+class Surface(object):
+    def __init__(self, name, BC):
+        self.name = name
+        self.BC = BC
+        self.BCObject = None
+        self.meshedFace = Mesh()
+        self.childSrfs = []
+        self.objectType = "HBSurface"
+
+
+class Zone(object):
+    def __init__(self, name):
+        self.name = name
+        self.objectType = "HBZone"
+        self.surfaces = [Surface(name + "_wall", "OUTDOORS"), Surface(name + "_floor", "GROUND"), \
+                         Surface(name + "_roof", "OUTDOORS")]
+        self.loads = {"lighting": 10.0, "floor": self.surfaces[1]}
+
+    def getBCs(self):
+        return [surface.BC for surface in self.surfaces]
+
+
+def loadHoneybeeClasses():
+    """Execute hb_HiveCopyState, the proxies and hb_Hive from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_HiveCopyState(object):")
+    end = source.index("    def visualizeFromHoneybeeHive", start)
+    rc = types.ModuleType("Rhino")
+    rc.Geometry = types.ModuleType("Rhino.Geometry")
+    rc.Geometry.Mesh = Mesh
+    sc = types.ModuleType("scriptcontext")
+    sc.sticky = {}
+    namespace = {"copy": copy, "time": time, "rc": rc, "sc": sc}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace["hb_Hive"], sc
+
+
+def callZones(hb_Hive, sc, names):
+    """Store zones in the hive and return the stored zones and their proxies."""
+    stored = dict((name, Zone(name)) for name in names)
+    sc.sticky["HBHive"] = {"component": stored}
+    hive = hb_Hive(copyOnWrite = True)
+    proxies = hive.callFromHoneybeeHive(["zone component#" + name for name in names])
+    return hive, [stored[name] for name in names], proxies
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def main():
+    hb_Hive, sc = loadHoneybeeClasses()
+    failed = []
+
+    print "iterate the surfaces and change each surface"
+    hive, (stored,), (zone,) = callZones(hb_Hive, sc, ["a"])
+    for surface in zone.surfaces:
+        surface.BC = "SURFACE"
+    check("the stored zone is not changed", stored.getBCs() == ["OUTDOORS", "GROUND", "OUTDOORS"], failed)
+    check("the copy has all the changes", zone.getBCs() == ["SURFACE"] * 3, failed)
+    check("one copy is made", hive.getCopyStats()["copies"] == 1, failed)
+
+    print "change a surface of a list that is read before the copy"
+    hive, (stored,), (zone,) = callZones(hb_Hive, sc, ["a"])
+    surfaces = zone.surfaces
+    zone.name = "b"
+    surfaces[1].BC = "ADIABATIC"
+    check("the stored zone is not changed", stored.getBCs() == ["OUTDOORS", "GROUND", "OUTDOORS"] \
+          and stored.name == "a", failed)
+    check("the copy has the change", zone.getBCs() == ["OUTDOORS", "ADIABATIC", "OUTDOORS"], failed)
+    check("the list holds the surfaces of the copy", \
+          all(a is b for a, b in zip(list.__iter__(surfaces), zone.surfaces)), failed)
+
+    print "change the list after an item is changed"
+    hive, (stored,), (zone,) = callZones(hb_Hive, sc, ["a"])
+    surfaces = zone.surfaces
+    surfaces[0].BC = "SURFACE"
+    surfaces.pop()
+    check("the stored zone is not changed", len(stored.surfaces) == 3, failed)
+    check("the copy has both changes", zone.getBCs() == ["SURFACE", "GROUND"], failed)
+    check("the list follows the copy", len(surfaces) == 2 and \
+          [surface.BC for surface in surfaces] == ["SURFACE", "GROUND"], failed)
+
+    print "change a dictionary value that is read before the copy"
+    hive, (stored,), (zone,) = callZones(hb_Hive, sc, ["a"])
+    loads = zone.loads
+    zone.surfaces[0].BC = "SURFACE"
+    for key, value in loads.items():
+        if key == "floor": value.BC = "ADIABATIC"
+    loads["lighting"] = 5.0
+    check("the stored zone is not changed", stored.loads["lighting"] == 10.0 and \
+          stored.surfaces[1].BC == "GROUND", failed)
+    check("the copy has the changes", zone.loads["lighting"] == 5.0 and \
+          zone.surfaces[1].BC == "ADIABATIC", failed)
+
+    print "read without changes"
+    hive, stored, zones = callZones(hb_Hive, sc, ["a", "b", "c"])
+    BCs = [[surface.BC for surface in zone.surfaces] for zone in zones]
+    check("the values are read from the stored zones", BCs == [zone.getBCs() for zone in stored], failed)
+    check("no copies are made", hive.getCopyStats()["copiesAvoided"] == 3 and \
+          hive.getCopyStats()["copies"] == 0, failed)
+
+    if failed:
+        raise SystemExit("%d checks failed."%len(failed))
+    print "The copy-on-write proxies never change the stored zones."
+
+
+if __name__ == "__main__":
+    main()
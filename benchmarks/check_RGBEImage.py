@@ -0,0 +1,178 @@
+"""
+Check the RGBE reader and writer of Honeybee_Honeybee against reference HDR files.
+
+hb_RGBEImage is taken from src/Honeybee_Honeybee.py and run outside of Rhino with CPython
+2.7. The pictures in benchmarks/hdr are written byte by byte the way Radiance writes them:
+    - flat.hdr has flat pixels, an old run-length encoded run and a header with two
+      EXPOSURE and two VIEW lines,
+    - oldrle.hdr has a run of 300 pixels with the old run-length encoding,
+    - rle.hdr is a 160 x 4 picture with the new run-length encoding of fwritecolrs in
+      Radiance src/common/color.c, including short runs and runs longer than 127.
+The script checks that:
+    - the header, the exposure, the view and the size are read,
+    - the RGBE bytes and the colors of every pixel are the expected ones,
+    - the pictures read back the same after they are written and the written files are the
+      same after a second round trip,
+    - the RGBE bytes don't change when they are read in small blocks,
+    - any scanline that is encoded decodes back to the same bytes,
+    - truncated and unsupported pictures raise an error.
+It then prints the time to write and read a 1000 x 1000 picture.
+
+Usage:
+    python2 benchmarks/check_RGBEImage.py
+"""
+
+import os
+import math
+import time
+import random
+import shutil
+import struct
+import tempfile
+import itertools
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+hdrFolder = os.path.join(rootFolder, "benchmarks", "hdr")
+
+
+def loadHoneybeeClasses():
+    """Execute hb_RGBEImage from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_RGBEImage(object):")
+    end = source.index("class hb_WriteDS(object):")
+    namespace = {"os": os, "math": math, "struct": struct, "itertools": itertools}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace["hb_RGBEImage"]
+
+
+def rlePixel(x, y):
+    """RGBE bytes of a pixel of rle.hdr."""
+    if x < 130:
+        return (128 + (x // (y + 2)) % 100, 255, (x * 37 + y * 11) % 256, 120 + y)
+    return (128 + (x * 13 + y * 7) % 128, (x * 5) % 256, (x * y) % 256, 120 + y)
+
+
+def toColor(colr):
+    """Color of RGBE bytes the same as colr_color in Radiance."""
+    if colr[3] == 0: return [0.0, 0.0, 0.0]
+    return [(value + 0.5) * math.ldexp(1.0, colr[3] - 136) for value in colr[:3]]
+
+
+def referencePixels():
+    """Expected RGBE bytes of each scanline of the reference pictures."""
+    flat = [[(128, 64, 0, 129), (0, 0, 0, 0), (255, 255, 255, 128)], \
+            [(10, 20, 30, 140), (10, 20, 30, 140), (5, 5, 5, 100)]]
+    oldRle = [[(200, 150, 100, 130)] * 301]
+    rle = [[rlePixel(x, y) for x in range(160)] for y in range(4)]
+    return {"flat.hdr": flat, "oldrle.hdr": oldRle, "rle.hdr": rle}
+
+
+def raisesValueError(function, *args):
+    try:
+        function(*args)
+    except ValueError:
+        return True
+    return False
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def main():
+    hb_RGBEImage = loadHoneybeeClasses()
+    tempFolder = tempfile.mkdtemp()
+    failed = []
+    try:
+        print "headers"
+        image = hb_RGBEImage(os.path.join(hdrFolder, "flat.hdr"))
+        check("the EXPOSURE lines are multiplied", image.exposure == 0.5, failed)
+        check("the VIEW lines are joined", image.view == "-vtv -vp 0 0 0 -vh 60", failed)
+        check("the size is read", (image.width, image.height) == (3, 2), failed)
+        image = hb_RGBEImage(os.path.join(hdrFolder, "rle.hdr"))
+        check("the header is kept without FORMAT", image.header == ["oconv room.rad > room.oct", \
+              "rpict -vtv -ab 2 room.oct", "VIEW= -vtv -vp 5 4 1.2 -vd 0 1 0 -vh 60 -vv 45", "EXPOSURE=2.0"] \
+              and image.exposure == 2.0 and image.format == "32-bit_rle_rgbe", failed)
+
+        for fileName, pixels in sorted(referencePixels().items()):
+            print fileName
+            filePath = os.path.join(hdrFolder, fileName)
+            image = hb_RGBEImage(filePath)
+            expectedColrs = [bytearray(value for pixel in scanline for value in pixel) for scanline in pixels]
+            colrs = list(image.iterColrs())
+            check("same RGBE bytes", colrs == expectedColrs, failed)
+            expectedColors = [[value for pixel in scanline for value in toColor(pixel)] for scanline in pixels]
+            check("same colors", list(image.iterScanlines()) == expectedColors, failed)
+
+            hb_RGBEImage.chunkSize = 7
+            check("same RGBE bytes in small blocks", list(image.iterColrs()) == colrs, failed)
+            hb_RGBEImage.chunkSize = 1 << 16
+
+            # the pixels with a mantissa below 128 are not normalized and change when written
+            if fileName != "flat.hdr":
+                outputFile = os.path.join(tempFolder, fileName)
+                hb_RGBEImage.writeHDR(outputFile, image.width, image.height, image.iterScanlines(), image.header)
+                writtenImage = hb_RGBEImage(outputFile)
+                check("same RGBE bytes after a round trip", list(writtenImage.iterColrs()) == colrs and \
+                      writtenImage.header == image.header, failed)
+                secondFile = os.path.join(tempFolder, "second_" + fileName)
+                hb_RGBEImage.writeHDR(secondFile, image.width, image.height, writtenImage.iterScanlines(), \
+                                      writtenImage.header)
+                with open(outputFile, "rb") as inf: written = inf.read()
+                with open(secondFile, "rb") as inf: second = inf.read()
+                check("same file after a second round trip", written == second, failed)
+
+        print "random scanlines"
+        generator = random.Random(0)
+        sameColrs = True
+        for count in range(300):
+            width = generator.choice([1, 7, 8, 9, 127, 128, 129, 300, 1000])
+            colrs = bytearray(generator.choice([generator.randint(0, 255), generator.randint(0, 3)]) \
+                              for value in range(4 * width))
+            encoded = hb_RGBEImage.encodeScanline(colrs, width)
+            decoded, pos = hb_RGBEImage.decodeScanline(bytearray(encoded), 0, width)
+            sameColrs = sameColrs and decoded == colrs and pos == len(encoded)
+        check("encoded scanlines decode to the same bytes", sameColrs, failed)
+        colors = [generator.uniform(0, 1000) for value in range(3 * 200)]
+        roundTrip = hb_RGBEImage.colrsToColors(hb_RGBEImage.colorsToColrs(colors))
+        # the exponent is shared by the three components
+        check("colors are kept to 1/128 of the brightest component", all(max(abs(a - b) for a, b in \
+              zip(colors[i:i + 3], roundTrip[i:i + 3])) <= max(colors[i:i + 3]) / 128.0 \
+              for i in range(0, len(colors), 3)), failed)
+
+        print "broken pictures"
+        with open(os.path.join(hdrFolder, "rle.hdr"), "rb") as inf: data = inf.read()
+        truncatedFile = os.path.join(tempFolder, "truncated.hdr")
+        with open(truncatedFile, "wb") as outf: outf.write(data[:-10])
+        check("a truncated picture raises an error", \
+              raisesValueError(lambda: list(hb_RGBEImage(truncatedFile).iterColrs())), failed)
+        for name, header in (("not a picture", "P6\n3 2\n255\n"), \
+                             ("a flipped picture", "#?RADIANCE\nFORMAT=32-bit_rle_rgbe\n\n+Y 2 +X 3\n"), \
+                             ("an XYZE picture", "#?RADIANCE\nFORMAT=32-bit_rle_xyze\n\n-Y 2 +X 3\n")):
+            brokenFile = os.path.join(tempFolder, "broken.hdr")
+            with open(brokenFile, "wb") as outf: outf.write(header + "\0" * 24)
+            check("%s raises an error"%name, raisesValueError(hb_RGBEImage, brokenFile), failed)
+
+        print "write and read a 1000 x 1000 picture"
+        scanline = [generator.random() for value in range(3 * 1000)]
+        bigFile = os.path.join(tempFolder, "big.hdr")
+        startTime = time.time()
+        hb_RGBEImage.writeHDR(bigFile, 1000, 1000, itertools.repeat(scanline, 1000))
+        writeTime = time.time() - startTime
+        startTime = time.time()
+        for colors in hb_RGBEImage(bigFile).iterScanlines(): pass
+        readTime = time.time() - startTime
+        print "    write: %.2f s  read: %.2f s"%(writeTime, readTime)
+    finally:
+        shutil.rmtree(tempFolder)
+
+    if failed:
+        raise SystemExit("%d checks failed."%len(failed))
+    print "The pictures match the reference files."
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Check the rtrace pool of Honeybee_Honeybee with a stand-in for rtrace.
+
+hb_RtracePool is taken from src/Honeybee_Honeybee.py and run outside of Rhino with
+CPython 2.7. The processes run benchmarks/rtrace_stub.py which follows the binary float
+I/O of rtrace -h -ff. The script checks that:
+    - every ray is traced once and the values come back in the order of the rays,
+    - the rays are split between the processes and each process has its own ambient file,
+    - a scene keeps its pool and its octree between studies and only maxPools scenes keep
+      their processes,
+    - a pool with a stopped process is started again and a process that stops while it
+      traces reports the error of rtrace,
+    - the binary result files are read back with both byte orders and text files are left
+      to the text reader.
+It then prints the time to trace a few batches with one pool and with a new pool for
+every batch. The stand-in starts much faster than rtrace loading an octree.
+
+Usage:
+    python2 benchmarks/check_RtracePool.py [rays] [processes]
+"""
+
+import os
+import sys
+import time
+import array
+import random
+import shutil
+import struct
+import tempfile
+import threading
+import subprocess
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+stubFile = os.path.join(rootFolder, "benchmarks", "rtrace_stub.py")
+
+
+class StickyContext(object):
+    """Stand-in for scriptcontext."""
+    sticky = {}
+
+
+def loadHoneybeeClasses():
+    """Execute hb_RtracePool from the Honeybee source and run the stand-in in place of rtrace."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_RtracePool(object):")
+    end = source.index("class hb_RGBEImage(object):")
+    namespace = {"os": os, "time": time, "array": array, "struct": struct, "threading": threading, \
+                 "subprocess": subprocess, "sc": StickyContext}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    hb_RtracePool = namespace["hb_RtracePool"]
+
+    class StubPool(hb_RtracePool):
+        def getProcessCommand(self, count):
+            return [sys.executable, stubFile] + hb_RtracePool.getProcessCommand(self, count)[1:]
+
+    return StubPool
+
+
+def createScene(folder, name):
+    """Write an octree file for a scene and return the function that creates it."""
+    created = []
+    def createOctree():
+        octFile = os.path.join(folder, name + ".oct")
+        with open(octFile, "w") as outf: outf.write("octree of %s"%name)
+        created.append(octFile)
+        return octFile
+    return createOctree, created
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def main(numOfRays, numOfProcesses):
+    hb_RtracePool = loadHoneybeeClasses()
+    tempFolder = tempfile.mkdtemp()
+    failed = []
+    try:
+        createOctree, created = createScene(tempFolder, "scene")
+        options = ["-ab", "2", "-af", "scene.amb"]
+        random.seed(0)
+        rays = array.array('f', [random.uniform(-10, 10) for count in xrange(6 * numOfRays)])
+
+        print "trace %d rays with %d processes"%(numOfRays, numOfProcesses)
+        pool = hb_RtracePool.getPool("scene", createOctree, options, numOfProcesses)
+        values = pool.trace(rays)
+        check("a value for every ray", len(values) == 3 * numOfRays, failed)
+        check("the values are in the order of the rays", all(values[3 * count] == \
+              array.array('f', [rays[6 * count] + rays[6 * count + 1] + rays[6 * count + 2]])[0] and \
+              values[3 * count + 1] == rays[6 * count + 5] for count in xrange(numOfRays)), failed)
+        # the stand-in counts the rays of each process
+        starts = [count for count in xrange(numOfRays) if values[3 * count + 2] == 1]
+        check("the rays are split evenly between the processes", \
+              starts == [numOfRays * count // numOfProcesses for count in range(numOfProcesses)], failed)
+
+        print "run another study of the scene"
+        samePool = hb_RtracePool.getPool("scene", createOctree, options, numOfProcesses)
+        values = samePool.trace(rays[:600])
+        check("the same pool is used and the octree is created once", samePool is pool and len(created) == 1, failed)
+        check("the processes continue from the last study", values[2] == values[5] - 1 and \
+              values[2] > 1, failed)
+        check("a small batch is traced", len(pool.trace(rays[:6])) == 3, failed)
+        otherPool = hb_RtracePool.getPool("scene", createOctree, ["-ab", "3"], numOfProcesses)
+        check("other options start a new pool", otherPool is not pool and otherPool.isAlive(), failed)
+
+        print "close the pools of the least recently used scenes"
+        createOctree2, created2 = createScene(tempFolder, "scene2")
+        hb_RtracePool.getPool("scene2", createOctree2, options, 1)
+        pools = StickyContext.sticky["honeybee_RtracePools"]
+        check("only %d pools are kept"%hb_RtracePool.maxPools, len(pools) == hb_RtracePool.maxPools and \
+              pool not in pools.values(), failed)
+        check("the processes of the closed pool are stopped", pool.processes == [], failed)
+        ambientFiles = [os.path.join(tempFolder, "scene_%d.amb"%count) for count in range(numOfProcesses)]
+        check("each process writes its own ambient file", all(os.path.isfile(ambientFile) \
+              for ambientFile in ambientFiles), failed)
+
+        print "stop a process"
+        pool = hb_RtracePool.getPool("scene2", createOctree2, options, 1)
+        pool.processes[0].kill()
+        pool.processes[0].wait()
+        newPool = hb_RtracePool.getPool("scene2", createOctree2, options, 1)
+        check("a new pool is started", newPool is not pool and newPool.isAlive() and len(created2) == 2, failed)
+        newPool.processes[0].kill()
+        newPool.processes[0].wait()
+        try:
+            newPool.trace(rays[:60])
+            error = None
+        except Exception, e:
+            error = str(e)
+        check("tracing with a stopped process raises an error", error is not None and \
+              error.startswith("rtrace stopped"), failed)
+        pool = hb_RtracePool.getPool("scene2", createOctree2, options, 1)
+        check("the pool that stopped is started again", pool is not newPool and len(pool.trace(rays[:60])) == 30, failed)
+
+        print "result files"
+        resultFile = os.path.join(tempFolder, "study.res")
+        hb_RtracePool.writeResultFile(resultFile, values)
+        check("binary result files are read back", hb_RtracePool.readResultFile(resultFile) == values, failed)
+        swapped = array.array('f', values)
+        swapped.byteswap()
+        with open(resultFile, "wb") as outf:
+            outf.write(hb_RtracePool.header%int(not hb_RtracePool.isBigEndian))
+            outf.write(swapped.tostring())
+        check("the other byte order is read", hb_RtracePool.readResultFile(resultFile) == values, failed)
+        with open(resultFile, "w") as outf:
+            outf.write("#?RADIANCE\nrtrace -h\nFORMAT=ascii\n\n1\t2\t3\t\n")
+        check("text results are left to the text reader", hb_RtracePool.readResultFile(resultFile) is None, failed)
+
+        print "the octree is missing"
+        brokenPool = hb_RtracePool.getPool("scene3", lambda: os.path.join(tempFolder, "missing.oct"), options, 1)
+        try:
+            brokenPool.trace(rays[:60])
+            error = ""
+        except Exception, e:
+            error = str(e)
+        check("the error of rtrace is reported", "can't open octree" in error, failed)
+
+        print "trace 10 batches of %d rays"%(numOfRays // 10)
+        batches = [rays[count * len(rays) // 10: (count + 1) * len(rays) // 10] for count in range(10)]
+        startTime = time.time()
+        for batch in batches:
+            newPool = hb_RtracePool(createOctree(), options, numOfProcesses)
+            newPool.trace(batch)
+            newPool.close()
+        newPoolsTime = time.time() - startTime
+        pool = hb_RtracePool.getPool("scene", createOctree, options, numOfProcesses)
+        startTime = time.time()
+        for batch in batches:
+            hb_RtracePool.getPool("scene", createOctree, options, numOfProcesses).trace(batch)
+        samePoolTime = time.time() - startTime
+        print "    a new pool for every batch: %.3f s"%newPoolsTime
+        print "    the same pool:              %.3f s"%samePoolTime
+    finally:
+        for pool in StickyContext.sticky.get("honeybee_RtracePools", {}).values(): pool.close()
+        StickyContext.sticky.clear()
+        shutil.rmtree(tempFolder)
+
+    if failed:
+        raise SystemExit("%d checks failed."%len(failed))
+    print "The pool traces every ray."
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000, int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -0,0 +1,209 @@
+"""
+Check the sql reader of Honeybee_Honeybee against the csv file that ReadVarsESO writes.
+
+hb_EPSqlResults and hb_EPResultCache are taken from src/Honeybee_Honeybee.py and run
+outside of Rhino with CPython 2.7. Every column of the csv file must have the same header
+and the same values in the same rows as the column of the sql file, the same as
+check_EsoResults.py does for the eso reader.
+
+Without arguments a tiny eplusout.sql and the eplusout.csv of the same results are
+generated in a temporary folder. The sql file is written the way EnergyPlus writes it:
+a time step for each reporting frequency, warmup days in ReportData, a meter without a
+key, timestep, hourly, daily, monthly and run period outputs and an end uses table.
+The script also checks that the sql file is not changed by the reader.
+
+Usage:
+    python2 benchmarks/check_SqlResults.py [eplusout.sql eplusout.csv]
+"""
+
+import os
+import sys
+import json
+import math
+import array
+import shutil
+import struct
+import sqlite3
+import urllib2
+import hashlib
+import tempfile
+import itertools
+
+rootFolder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sourceFile = os.path.join(rootFolder, "src", "Honeybee_Honeybee.py")
+
+# key, name, reporting frequency, units and meter flag of the generated outputs
+outputs = [("ZONE_1", "Zone Mean Air Temperature", "Zone Timestep", "C", 0), \
+           ("ZONE_1", "Zone Mean Air Temperature", "Hourly", "C", 0), \
+           ("Environment", "Site Outdoor Air Drybulb Temperature", "Hourly", "C", 0), \
+           ("", "Electricity:Facility", "Hourly", "J", 1), \
+           ("ZONE_2", "Zone Lights Electric Energy", "Daily", "J", 0), \
+           ("", "Electricity:Facility", "Monthly", "J", 1), \
+           ("", "Electricity:Facility", "Run Period", "J", 1)]
+csvTimesteps = {"Zone Timestep": "TimeStep", "Run Period": "RunPeriod"}
+
+
+def loadHoneybeeClasses():
+    """Execute hb_EPResultCache and hb_EPSqlResults from the Honeybee source."""
+    with open(sourceFile, "r") as inf:
+        source = inf.read()
+    start = source.index("class hb_EPResultCache(object):")
+    end = source.index("class hb_EPEsoResults(hb_EPResultCache):")
+    namespace = {"os": os, "json": json, "math": math, "array": array, "struct": struct, \
+                 "sqlite3": sqlite3, "urllib": urllib2}
+    exec compile(source[start:end], sourceFile, "exec") in namespace
+    return namespace["hb_EPResultCache"], namespace["hb_EPSqlResults"]
+
+
+def createTimeSteps(timestepsPerHour = 2):
+    """Time rows of a warmup day and a run period from January 31 to February 1.
+
+    Each item is (warmup, month, day, hour, minute, frequency, csv row) in the order that
+    EnergyPlus writes them. The csv row is None for the warmup days.
+    """
+    timeSteps = []
+    csvRows = []
+    for warmup, month, day in ((1, 1, 31), (0, 1, 31), (0, 2, 1)):
+        for hour in range(1, 25):
+            for step in range(1, timestepsPerHour + 1):
+                minute = 60 * step // timestepsPerHour
+                csvRow = None
+                if not warmup:
+                    csvRow = len(csvRows)
+                    csvRows.append(" %02d/%02d  %02d:%02d:00"%(month, day, hour - (minute != 60), minute % 60))
+                # the end of an hour is written as the hour and 0 minutes
+                if minute == 60: timeSteps.append((warmup, month, day, hour, 0, "Zone Timestep", csvRow))
+                else: timeSteps.append((warmup, month, day, hour - 1, minute, "Zone Timestep", csvRow))
+            timeSteps.append((warmup, month, day, hour, 0, "Hourly", csvRow))
+        timeSteps.append((warmup, month, day, 24, 0, "Daily", csvRow))
+        if not warmup and day == 31:
+            timeSteps.append((warmup, month, day, 24, 0, "Monthly", csvRow))
+    # the end of the run period is the end of a month and the end of the run period
+    timeSteps.append((0, 2, 1, 24, 0, "Monthly", csvRow))
+    timeSteps.append((0, None, None, None, None, "Run Period", csvRow))
+    return timeSteps, csvRows
+
+
+def getValue(output, timeIndex):
+    """A value of an output that is not the same for any two outputs or time steps."""
+    return round(100.0 * math.sin(output + 1.7 * timeIndex) + output, 4)
+
+
+def generateResults(folder):
+    """Write a tiny eplusout.sql and the eplusout.csv of the same results."""
+    sqlFilePath = os.path.join(folder, "eplusout.sql")
+    csvFilePath = os.path.join(folder, "eplusout.csv")
+    timeSteps, csvRows = createTimeSteps()
+    csvValues = [[""] * len(outputs) for row in csvRows]
+
+    connection = sqlite3.connect(sqlFilePath)
+    connection.executescript("""
+        CREATE TABLE Time (TimeIndex INTEGER PRIMARY KEY, Year INTEGER, Month INTEGER, Day INTEGER,
+            Hour INTEGER, Minute INTEGER, Dst INTEGER, Interval INTEGER, IntervalType INTEGER,
+            SimulationDays INTEGER, DayType TEXT, EnvironmentPeriodIndex INTEGER, WarmupFlag INTEGER);
+        CREATE TABLE ReportDataDictionary (ReportDataDictionaryIndex INTEGER PRIMARY KEY, IsMeter INTEGER,
+            Type TEXT, IndexGroup TEXT, TimestepType TEXT, KeyValue TEXT, Name TEXT,
+            ReportingFrequency TEXT, ScheduleName TEXT, Units TEXT);
+        CREATE TABLE ReportData (ReportDataIndex INTEGER PRIMARY KEY, TimeIndex INTEGER,
+            ReportDataDictionaryIndex INTEGER, Value REAL);
+        CREATE TABLE TabularDataWithStrings (TabularDataIndex INTEGER PRIMARY KEY, Value TEXT,
+            ReportName TEXT, ReportForString TEXT, TableName TEXT, RowName TEXT, ColumnName TEXT,
+            Units TEXT);
+        """)
+    for count, (key, name, frequency, units, isMeter) in enumerate(outputs):
+        connection.execute("INSERT INTO ReportDataDictionary VALUES (?, ?, 'Sum', 'Facility', 'Zone', " + \
+                           "?, ?, ?, NULL, ?)", (count + 1, isMeter, key, name, frequency, units))
+    for timeIndex, (warmup, month, day, hour, minute, frequency, csvRow) in enumerate(timeSteps):
+        connection.execute("INSERT INTO Time VALUES (?, 2017, ?, ?, ?, ?, 0, 60, 1, 1, 'Tuesday', 1, ?)", \
+                           (timeIndex + 1, month, day, hour, minute, warmup))
+        for count, output in enumerate(outputs):
+            if output[2] != frequency: continue
+            value = getValue(count, timeIndex)
+            connection.execute("INSERT INTO ReportData (TimeIndex, ReportDataDictionaryIndex, Value) " + \
+                               "VALUES (?, ?, ?)", (timeIndex + 1, count + 1, value))
+            if csvRow is not None: csvValues[csvRow][count] = "%.10g"%value
+    for count, (rowName, value) in enumerate((("Heating", "12.5"), ("Interior Lighting", "40.25"), \
+                                              ("Fans", ""))):
+        connection.execute("INSERT INTO TabularDataWithStrings VALUES (?, ?, " + \
+                           "'AnnualBuildingUtilityPerformanceSummary', 'Entire Facility', 'End Uses', " + \
+                           "?, 'Electricity', 'GJ')", (count + 1, value, rowName))
+    connection.commit()
+    connection.close()
+
+    with open(csvFilePath, "w") as outf:
+        headers = ["%s%s [%s](%s)"%(key + ":" if key else "", name, units, csvTimesteps.get(frequency, frequency)) \
+                   for key, name, frequency, units, isMeter in outputs]
+        outf.write("Date/Time," + ",".join(headers) + "\n")
+        for dateTime, values in zip(csvRows, csvValues):
+            outf.write(dateTime + "," + ",".join(values) + "\n")
+    return sqlFilePath, csvFilePath
+
+
+def fileHash(filePath):
+    with open(filePath, "rb") as inf:
+        return hashlib.md5(inf.read()).hexdigest()
+
+
+def isClose(value, csvValue):
+    if value is None or csvValue is None: return value is None and csvValue is None
+    return abs(value - csvValue) <= 1e-6 * max(1.0, abs(csvValue))
+
+
+def check(name, condition, failed):
+    print "    %s: %s"%(name, "ok" if condition else "FAILED")
+    if not condition: failed.append(name)
+
+
+def main(sqlFilePath, csvFilePath):
+    hb_EPResultCache, hb_EPSqlResults = loadHoneybeeClasses()
+    failed = []
+    sqlHash = fileHash(sqlFilePath)
+    sqlResults = hb_EPResultCache.open(sqlFilePath)
+    csvResults = hb_EPResultCache(csvFilePath)
+    csvHeaders = [header.strip() for header in csvResults.headers]
+
+    print "%d columns and %d rows in the sql file, %d columns and %d rows in the csv file"%( \
+        sqlResults.columnCount, sqlResults.rowCount, csvResults.columnCount, csvResults.rowCount)
+    check("the sql reader is used for .sql files", isinstance(sqlResults, hb_EPSqlResults), failed)
+    check("same headers", sqlResults.headers == csvHeaders, failed)
+    check("same catalog", sqlResults.catalog == csvResults.catalog, failed)
+    check("same number of rows", sqlResults.rowCount == csvResults.rowCount, failed)
+    check("same columns are found", all(sqlResults.findColumns(*query) == csvResults.findColumns(*query) \
+          for query in ((None, "ZONE_1", None), ("Zone Mean Air Temperature", None, "Hourly"), \
+                        (None, None, "RunPeriod"))), failed)
+
+    indexes = dict((header, index) for index, header in enumerate(sqlResults.headers))
+    toCheck = [(indexes[header], count) for count, header in enumerate(csvHeaders) if header in indexes]
+    sqlValues = sqlResults.getValues([index for index, count in toCheck])
+    csvValues = csvResults.getValues([count for index, count in toCheck])
+    sameValues = True
+    for index, count in toCheck:
+        for row, (value, csvValue) in enumerate(itertools.izip_longest(sqlValues[index], csvValues[count])):
+            if not isClose(value, csvValue):
+                print "    %s doesn't match in row %d: %s != %s"%(csvHeaders[count], row + 1, value, csvValue)
+                sameValues = False
+                break
+    check("same values in %d columns"%len(toCheck), sameValues, failed)
+    check("the sql file is not changed", fileHash(sqlFilePath) == sqlHash, failed)
+    return sqlResults, failed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        sqlResults, failed = main(sys.argv[1], sys.argv[2])
+    elif len(sys.argv) == 1:
+        tempFolder = tempfile.mkdtemp()
+        try:
+            sqlResults, failed = main(*generateResults(tempFolder))
+            rowNames, columns, values = sqlResults.getEndUses()
+            check("the end uses table is read", rowNames == ["Heating", "Interior Lighting", "Fans"] and \
+                  columns == [("Electricity", "GJ")] and values["Interior Lighting"]["Electricity"] == 40.25 \
+                  and values["Fans"]["Electricity"] == "", failed)
+        finally:
+            shutil.rmtree(tempFolder)
+    else:
+        raise SystemExit(__doc__)
+
+    if failed:
+        raise SystemExit("The sql reader doesn't match the csv file.")
+    print "The sql reader matches the csv file."
@@ -0,0 +1,53 @@
+"""
+Stand-in for rtrace that follows the binary float I/O of rtrace -h -ff.
+
+Used by benchmarks/check_RtracePool.py. It reads 6 floats (origin and direction) for each
+ray from stdin and writes 3 floats for each ray to stdout in the byte order of the machine:
+    x + y + z of the origin, z of the direction and the number of rays that the process has
+    traced so far.
+A ray with a zero direction is answered with 0, 0, 0 and the output is flushed the same way
+rtrace does. The last argument is the octree which must exist. With -af the process writes
+the number of rays that it has traced to the ambient file when stdin is closed.
+
+Usage:
+    python rtrace_stub.py -h -ff [-af ambientFile] [options] octree < rays > values
+"""
+
+import os
+import sys
+import struct
+
+
+def main(args):
+    if "-ff" not in args or not args or not os.path.isfile(args[-1]):
+        sys.stderr.write("rtrace: fatal - can't open octree or unsupported format: %s\n"%" ".join(args))
+        return 1
+    ambientFile = args[args.index("-af") + 1] if "-af" in args else None
+
+    if sys.platform == "win32":
+        import msvcrt
+        msvcrt.setmode(sys.stdin.fileno(), os.O_BINARY)
+        msvcrt.setmode(sys.stdout.fileno(), os.O_BINARY)
+    inf = getattr(sys.stdin, "buffer", sys.stdin)
+    outf = getattr(sys.stdout, "buffer", sys.stdout)
+
+    rayCount = 0
+    while True:
+        ray = inf.read(24)
+        if len(ray) < 24: break
+        x, y, z, dx, dy, dz = struct.unpack("=6f", ray)
+        if dx == 0 and dy == 0 and dz == 0:
+            outf.write(struct.pack("=3f", 0, 0, 0))
+            outf.flush()
+            continue
+        rayCount += 1
+        outf.write(struct.pack("=3f", x + y + z, dz, rayCount))
+
+    if ambientFile:
+        with open(ambientFile, "a") as ambf:
+            ambf.write("%d\n"%rayCount)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -82,6 +82,8 @@ import shutil
 import collections
 import subprocess
 import copy
+import hashlib
+import struct
 
 rc.Runtime.HostUtils.DisplayOleAlerts(False)
 
@@ -1537,6 +1539,78 @@ class RunIDF(object):
         out, err = p.communicate()
 
 
+class IDFFragmentCache(object):
+    """
+    Keeps the IDF strings of the zones from the previous run of the component.
+    
+    Each zone is keyed by an md5 hash of everything that ends up in its Zone, BuildingSurface,
+    FenestrationSurface and InternalMass objects. Zones that did not change since the last run
+    reuse their strings and only the changed zones are rendered again. Only the fragments of
+    the current run are kept for the next one so the cache never grows past one model.
+    """
+    
+    def __init__(self, previousFragments = None):
+        self.previousFragments = previousFragments or {}
+        self.fragments = {}
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def updateCoordinates(md5, coordinates):
+        values = []
+        for pt in coordinates: values.extend((pt.X, pt.Y, pt.Z))
+        md5.update(struct.pack('<%dd'%len(values), *values))
+    
+    def zoneKey(self, zone):
+        """Return the hash of the zone or None if the zone can't be hashed."""
+        try:
+            md5 = hashlib.md5()
+            md5.update(repr((sc.doc.ModelAbsoluteTolerance, zone.name, zone.north, zone.origin.X, \
+                zone.origin.Y, zone.origin.Z, str(zone.zoneType), str(zone.multiplier), \
+                str(zone.ceilingHeight), str(zone.volume), str(zone.floorArea), \
+                str(zone.insideConvectionAlgorithm), str(zone.outsideConvectionAlgorithm), \
+                zone.isPlenum, zone.partOfArea)))
+            
+            for srf in zone.surfaces:
+                md5.update(repr((srf.name, int(srf.type), srf.construction, srf.BC, \
+                    srf.BCObject.name, srf.sunExposure, srf.windExposure, \
+                    srf.groundViewFactor, srf.hasChild)))
+                self.updateCoordinates(md5, srf.coordinates)
+                if srf.hasChild:
+                    for childSrf in srf.childSrfs:
+                        md5.update(repr((childSrf.name, childSrf.type, childSrf.construction, \
+                            childSrf.parent.name, childSrf.BCObject.name, childSrf.groundViewFactor, \
+                            childSrf.shadingControlName, childSrf.frameName, childSrf.Multiplier)))
+                        self.updateCoordinates(md5, childSrf.coordinates)
+            
+            md5.update(repr((zone.internalMassNames, zone.internalMassSrfAreas, \
+                zone.internalMassConstructions)))
+            return md5.hexdigest()
+        except:
+            return None
+    
+    def get(self, key):
+        """Return the (zone, surfaces, fenestrations, masses) strings of a zone or None."""
+        if key is None:
+            self.misses += 1
+            return None
+        
+        fragments = self.previousFragments.get(key) or self.fragments.get(key)
+        if fragments is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.fragments[key] = fragments
+        return fragments
+    
+    def set(self, key, fragments):
+        if key is not None:
+            self.fragments[key] = fragments
+    
+    def report(self):
+        return "%d of %d zones were reused from the previous run."%(self.hits, self.hits + self.misses)
+
+
 sc.sticky["honeybee_WriteIDF"] = WriteIDF
 sc.sticky["honeybee_RunIDF"] = RunIDF
 
@@ -1809,10 +1883,43 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
     ZoneCollectionBasedOnSchAndLoads = {} # This will be used to create zoneLists
     
     
+    # the strings of the zones that have not changed since the last run are reused
+    fragmentCaches = sc.sticky.setdefault("honeybee_IDFFragments", {})
+    componentId = str(ghenv.Component.InstanceGuid)
+    fragmentCache = IDFFragmentCache(fragmentCaches.get(componentId))
+    
     # write idf file
     for zone in thermalZonesPyClasses:
+        # set the energyPlus constructions before the zone is hashed
+        for srf in zone.surfaces:
+            if srf.EPConstruction != None:
+                srf.construction = srf.EPConstruction
+            if srf.hasChild:
+                for childSrf in srf.childSrfs:
+                    if childSrf.EPConstruction != None:
+                        childSrf.construction = childSrf.EPConstruction
+        
+        fragmentKey = fragmentCache.zoneKey(zone)
+        fragments = fragmentCache.get(fragmentKey)
+        if fragments is None:
+            fragments = (hb_writeIDF.EPZone(zone), \
+                [hb_writeIDF.EPZoneSurface(srf) for srf in zone.surfaces], \
+                [hb_writeIDF.EPFenSurface(srf) if srf.hasChild else "" for srf in zone.surfaces], \
+                [hb_writeIDF.EPInternalMass(zone, massName, zone.internalMassSrfAreas[massCount], \
+                    zone.internalMassConstructions[massCount]) \
+                    for massCount, massName in enumerate(zone.internalMassNames)])
+            fragmentCache.set(fragmentKey, fragments)
+        else:
+            # apply the changes that writing the strings makes to the zone
+            if zone.isPlenum:
+                zone.partOfArea = False
+            for srf in zone.surfaces:
+                if int(srf.type) == 4: srf.type = 0
+        
+        zoneStr, srfStrs, fenStrs, massStrs = fragments
+        
         # Zone
-        idfFile.write(hb_writeIDF.EPZone(zone))
+        zoneStrs = [zoneStr]
         
         # get the schedule and loads for the zone
         schedules = zone.getCurrentSchedules(True)
@@ -1831,31 +1938,21 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
             if schedule != "" and schedule.upper() not in EPScheduleCollection:
                 EPScheduleCollection.append(schedule.upper())
         
-        for srf in zone.surfaces:
-            # check if there is an energyPlus material
-            
+        for srfCount, srf in enumerate(zone.surfaces):
             # Add surface to a list so that zone surfaces can be checked against honeybee generator PV surfaces
             WriteIDF.zonesurfaces.append(srf.name)
             
-            if srf.EPConstruction != None:
-                srf.construction = srf.EPConstruction
-            # else try to find the material based on bldg type and climate zone
             # the surface will use the default construction
             if not srf.construction.upper() in EPConstructionsCollection:
                 EPConstructionsCollection.append(srf.construction.upper())
             
             # Surfaces
-            idfFile.write(hb_writeIDF.EPZoneSurface(srf))
+            zoneStrs.append(srfStrs[srfCount])
             
             if srf.hasChild:
                 # check the construction
                 # this should be moved inside the function later
                 for childSrf in srf.childSrfs:
-                    # check if there is an energyPlus material
-                    if childSrf.EPConstruction != None:
-                        childSrf.construction = childSrf.EPConstruction
-                    # else try to find the material based on bldg type and climate zone
-                    # I will apply this later
                     # the surface will use the default construction
                     if not childSrf.construction.upper() in EPConstructionsCollection:
                             EPConstructionsCollection.append(childSrf.construction.upper())
@@ -1867,12 +1964,12 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
                                 if windowShading not in shdCntrlCollection:
                                     values = hb_EPObjectsAux.getEPObjectDataByName(windowShading)
                                     if not values[4][0].endswith('.CSV'):
-                                        idfFile.write(hb_EPObjectsAux.getEPObjectsStr(windowShading))
+                                        zoneStrs.append(hb_EPObjectsAux.getEPObjectsStr(windowShading))
                                     else:
                                         newSchedName = os.path.basename(values[4][0]).replace('.CSV', '')
                                         initStr = hb_EPObjectsAux.getEPObjectsStr(windowShading)
                                         finStr = initStr.replace(values[4][0], newSchedName)
-                                        idfFile.write(finStr)
+                                        zoneStrs.append(finStr)
                                     
                                     if values[2][0] != '':
                                         # Iniitalize for construction (for switchable glazing).
@@ -1892,7 +1989,7 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
                             except: pass
                 
                 # write the glazing strings
-                idfFile.write(hb_writeIDF.EPFenSurface(srf))
+                zoneStrs.append(fenStrs[srfCount])
         
         #If there are internal masses assigned to the zone, write them into the IDF.
         if len(zone.internalMassNames) > 0:
@@ -1902,7 +1999,12 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
                     EPConstructionsCollection.append(zone.internalMassConstructions[massCount].upper())
                 
                 #Write the internal mass into the IDF
-                idfFile.write(hb_writeIDF.EPInternalMass(zone, massName, zone.internalMassSrfAreas[massCount], zone.internalMassConstructions[massCount]))
+                zoneStrs.append(massStrs[massCount])
+        
+        idfFile.write("".join(zoneStrs))
+    
+    fragmentCaches[componentId] = fragmentCache.fragments
+    print fragmentCache.report()
     
     ########### Generators - Electric load center ###########
     
@@ -176,7 +176,7 @@ def getNationalHols(country, weekStartWith):
     
     return countries[country]
 
-def addHolidays(startVals, holidayValues, weekStartWith, epwFile, customHolidays, lb_preparation):
+def getHolidays(weekStartWith, epwFile, customHolidays, lb_preparation):
     holidayDOYs = []
     if epwFile:
         #get the base code from EPW
@@ -232,12 +232,6 @@ def addHolidays(startVals, holidayValues, weekStartWith, epwFile, customHolidays
             if item-1 not in holidayDOYs:
                 holidayDOYs.append(item-1)
     
-    # Edit the list of schedule values.
-    for day in holidayDOYs:
-        for interval in holidayValues:
-            if day >= interval[0]-1 and day <= interval[1]-1:
-                startVals[day] = interval[2]
-    
     # Build up a list of holidays
     def fromDayToDate(day, months):
         dateDay = date.fromordinal(date(2015, 1, 1).toordinal() + day) # 2015 is not leap year
@@ -249,7 +243,7 @@ def addHolidays(startVals, holidayValues, weekStartWith, epwFile, customHolidays
     for day in holidayDOYs:
         holidayDates.append(fromDayToDate(day, monthsDict))
     
-    return startVals, holidayDates
+    return holidayDOYs, holidayDates
 
 
 
@@ -314,16 +308,27 @@ def main(schName, startDayOfTheWeek, epwFile, customHol):
             ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
             return -1
         else:
+            scheduleType = readSchedules.hb_EPScheduleAUX.getScheduleDataByName(schName.upper(), \
+                                                                               ghenv.Component)[0][0].lower()
+            if scheduleType in ("schedule:day:interval", "schedule:week:daily"):
+                # day and week schedules return the values of a single day or week
+                values = readSchedules.getScheduleValues()
+            else:
+                # Check for any holidays.
+                holidayDOYs = []
+                if epwFile or customHol != []:
+                    holidayDOYs, holidays = getHolidays(startDayOfTheWeek, epwFile, customHol, lb_preparation)
+                
+                try:
+                    values = list(readSchedules.getAnnualScheduleValues(schName, holidayDOYs))
+                except ValueError, e:
+                    msg = str(e)
+                    print msg
+                    ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+                    return -1
             dataGotten = True
-            values = readSchedules.getScheduleValues()
     
     if dataGotten == True:
-        # Check for any holidays.
-        if epwFile or customHol != []:
-            if len(values) == 365 and not schName.lower().endswith(".csv"):
-                holidayValues = readSchedules.getHolidaySchedValues(schName)
-                values, holidays = addHolidays(values, holidayValues, startDayOfTheWeek, epwFile, customHol, lb_preparation)
-        
         strToBeFound = 'key:location/dataType/units/frequency/startsAt/endsAt'
         d, m, t = lb_preparation.hour2Date(readSchedules.startHOY, True)
         startDate = m+1, d, t
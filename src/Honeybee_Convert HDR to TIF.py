@@ -76,6 +76,7 @@ def main(HDRFilePath):
         hb_folders = sc.sticky["honeybee_folders"]
         hb_RADPath = hb_folders["RADPath"]
         hb_RADLibPath = hb_folders["RADLibPath"]
+        hb_RGBEImage = sc.sticky["honeybee_RGBEImage"]
         
     else:
         print "You should first let Honeybee to fly..."
@@ -83,13 +84,6 @@ def main(HDRFilePath):
         ghenv.Component.AddRuntimeMessage(w, "You should first let Honeybee to fly...")
         return
         
-    # check for ra_tiff.exe
-    if not os.path.isfile(hb_RADPath + "\\ra_tiff.exe"):
-        msg = "Cannot find ra_tiff.exe at " + hb_RADPath + \
-              "Make sure that Radiance is fully installed on your system."
-        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
-        return
-    
     validExt = ["HDR", "PIC"]
     if HDRFilePath.split('.')[-1].upper() not in validExt:
         msg = "Input file is not a valid HDR file."
@@ -114,32 +108,35 @@ def main(HDRFilePath):
     
     hInputFilePath = outputFile.replace(".TIF", "_h.HDR")
     
-    batchStr =  "SET RAYPATH=.;" + hb_RADLibPath + "\n" + \
-                "PATH=" + hb_RADPath + ";$PATH\n\n"
     if adjustExposure_:
-        batchStr += "pcond -h+ " + inputFilePath + " > " + hInputFilePath + "\n" + \
-                    "ra_tiff " + hInputFilePath + " " + outputFile + \
-                    "\nexit\n"
-    else:
-        batchStr += "ra_tiff " + inputFilePath + " " + outputFile + \
-                    "\nexit\n"
-                    
-    batchFileName = fileAddress + 'HDR2TIFF.BAT'
-    batchFile = open(batchFileName, 'w')
-    batchFile.write(batchStr)
-    batchFile.close()
-
-    # os.system("start /min /B /wait " + batchFileName)
-    runCmdAndGetTheResults("/c " + batchFileName)
+        # pcond models the human visual response and is still run from Radiance
+        if not os.path.isfile(hb_RADPath + "\\pcond.exe"):
+            msg = "Cannot find pcond.exe at " + hb_RADPath + \
+                  "Make sure that Radiance is fully installed on your system."
+            ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+            return
+        
+        batchStr =  "SET RAYPATH=.;" + hb_RADLibPath + "\n" + \
+                    "PATH=" + hb_RADPath + ";$PATH\n\n" + \
+                    "pcond -h+ " + inputFilePath + " > " + hInputFilePath + "\n" + \
+                    "exit\n"
+        
+        batchFileName = fileAddress + 'HDR2TIFF.BAT'
+        batchFile = open(batchFileName, 'w')
+        batchFile.write(batchStr)
+        batchFile.close()
+        
+        runCmdAndGetTheResults("/c " + batchFileName)
+        inputFilePath = hInputFilePath
     
-    if os.path.isfile(outputFile):
-        return outputFile
-    else:
-        msg = "Failed to genearate the .gif file. Open the bat file with a text editor " + \
-              "and change the last line from exit to pause. Then run it again and see what is the error.\n" + \
-              "here is the file address: " + batchFileName
+    try:
+        hb_RGBEImage(inputFilePath).writeTIFF(outputFile)
+    except Exception, e:
+        msg = "Failed to generate the .tiff file:\n" + str(e)
         ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
         return
+    
+    return outputFile
 
 if _HDRFilePath!=None:
     TIFFFilePath = main(_HDRFilePath)
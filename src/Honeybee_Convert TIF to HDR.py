@@ -76,6 +76,7 @@ def main(TIFFFilePath):
         hb_folders = sc.sticky["honeybee_folders"]
         hb_RADPath = hb_folders["RADPath"]
         hb_RADLibPath = hb_folders["RADLibPath"]
+        hb_RGBEImage = sc.sticky["honeybee_RGBEImage"]
         
     else:
         print "You should first let Honeybee to fly..."
@@ -83,13 +84,6 @@ def main(TIFFFilePath):
         ghenv.Component.AddRuntimeMessage(w, "You should first let Honeybee to fly...")
         return
         
-    # check for ra_tiff.exe
-    if not os.path.isfile(hb_RADPath + "\\ra_tiff.exe"):
-        msg = "Cannot find ra_tiff.exe at " + hb_RADPath + \
-              "Make sure that Radiance is fully installed on your system."
-        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
-        return
-    
     validExt = ["TIFF", "TIF"]
     if TIFFFilePath.split('.')[-1].upper() not in validExt:
         msg = "Input file is not a valid TIFF file."
@@ -112,7 +106,19 @@ def main(TIFFFilePath):
             #msg = "Can't remove the old GIF file..."
             #ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
     
-    hInputFilePath = outputFile.replace(".TIF", "_h.HDR")
+    # 8-bit TIFF files are converted in Python
+    try:
+        hb_RGBEImage.convertTIFFToHDR(inputFilePath, outputFile)
+        return outputFile
+    except Exception, e:
+        # compressed and high dynamic range TIFF files are still converted by ra_tiff
+        print str(e) + " Running ra_tiff instead."
+    
+    if not os.path.isfile(hb_RADPath + "\\ra_tiff.exe"):
+        msg = "Cannot find ra_tiff.exe at " + hb_RADPath + \
+              "Make sure that Radiance is fully installed on your system."
+        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+        return
     
     batchStr =  "SET RAYPATH=.;" + hb_RADLibPath + "\n" + \
                 "PATH=" + hb_RADPath + ";$PATH\n\n"
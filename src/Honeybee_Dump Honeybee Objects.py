@@ -34,6 +34,8 @@ Provided by Honeybee 0.0.63
     Args:
         _HBObjects: A list of Honeybee objects
         _fileName: A name for the file to which HBObjects will be written (e.g. 20ZonesExample.HB).
+            Use .HBB extension (e.g. 20ZonesExample.HBB) to write a compact binary file which is
+            smaller and can be partially loaded by zone name. Loading the whole file is faster for .HB files.
         _workingDir_: An optional working directory into which the HBZones will be written.  The default is set to C:\ladybug.
         _dump: Set to True to save the objects to file
     Returns:
@@ -68,7 +70,8 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
     hb_EPObjectsAux = sc.sticky["honeybee_EPObjectsAUX"]()
     if workingDir == None:
         workingDir = sc.sticky["Honeybee_DefaultFolder"] 
-    if not fileName.upper().endswith('.HB.'):
+    binary = fileName.upper().endswith('.HBB')
+    if not binary and not fileName.upper().endswith('.HB.'):
         fileName = fileName + '.HB'
     defaultEPConstrSet = ['INTERIOR CEILING', 'INTERIOR DOOR', 'INTERIOR FLOOR', 'INTERIOR PARTITION', \
         'INTERIOR WALL', 'INTERIOR WINDOW', 'EXTERIOR DOOR', 'EXTERIOR FLOOR', 'EXTERIOR ROOF', \
@@ -372,9 +375,15 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
             " InputError: Adjacent object %s is not in the list of HBObjects."%name
     
     HBData = {'ids':ids, 'objs': objs}
-    with open(filePath, "wb") as outf:
-        pickle.dump(HBData, outf)
+    if binary:
+        # geometries are already scaled to meters
+        tol = sc.doc.ModelAbsoluteTolerance * sc.sticky["honeybee_ConversionFactor"]
+        sc.sticky["honeybee_ObjectsFile"](tol).write(filePath, HBData)
         print "Saved file to %s"%filePath
+    else:
+        with open(filePath, "wb") as outf:
+            pickle.dump(HBData, outf)
+            print "Saved file to %s"%filePath
     return filePath
 
 
@@ -537,41 +537,50 @@ def checkSkyResolution(skyResolution, allDataDict, analysisPeriod, latitude, lon
     return allDataDict, finalSunVecs
 
 
-def nonparallel_projection(analysisMesh, sunLines, windowTestPts):
-    #Intersect the sun lines with the test mesh
+def pointSunHits(shadeTracer, contextTracer, sunPacket, pt, lineLength):
+    #Find the face of the test mesh that each sun ray hits first, discounting the rays that are blocked by the context.
+    faceHits = shadeTracer.closestHits(pt, sunPacket, lineLength)
+    if contextTracer != None:
+        blockedRays = contextTracer.anyHits(pt, sunPacket)
+        faceHits = [-1 if blocked else face for face, blocked in zip(faceHits, blockedRays)]
+    return faceHits
+
+
+def nonparallel_projection(shadeTracer, contextTracer, sunPacket, windowTestPts, lineLength, faceCount):
+    #Intersect the sun rays with the test mesh
     faceInt = []
-    for face in range(analysisMesh.Faces.Count): faceInt.append([])
+    for face in range(faceCount): faceInt.append([])
     
     for ptCount, pt in enumerate(windowTestPts):
         try:
-            for hour, sunLine in enumerate(sunLines[ptCount]):
-                if sunLine != 0:
-                    intPt, i = rc.Geometry.Intersect.Intersection.MeshLine(analysisMesh, sunLine)
-                    if len(intPt)!=0: faceInt[i[0]].append(hour)
-                else: pass
+            for hour, face in enumerate(pointSunHits(shadeTracer, contextTracer, sunPacket, pt, lineLength)):
+                if face >= 0: faceInt[face].append(hour)
         except Exception, e:
             print `e`
     
     return faceInt
 
 
-def parallel_projection(analysisMesh, sunLines, windowTestPts):
-    #Intersect the sun lines with the test mesh using parallel processing
+def parallel_projection(shadeTracer, contextTracer, sunPacket, windowTestPts, lineLength, faceCount):
+    #Intersect the sun rays with the test mesh using parallel processing
     faceInt = []
-    for face in range(analysisMesh.Faces.Count): faceInt.append([]) #place holder for result
+    for face in range(faceCount): faceInt.append([]) #place holder for result
+    pointHits = []
+    for pt in windowTestPts: pointHits.append([])
     
     def intersect(i):
         try:
-            for hour, sunLine in enumerate(sunLines[i]):
-                if sunLine != 0:
-                    intPt, indx = rc.Geometry.Intersect.Intersection.MeshLine(analysisMesh, sunLine)
-                    if len(intPt)!=0: faceInt[indx[0]].append(hour)
-                else: pass
+            pointHits[i] = pointSunHits(shadeTracer, contextTracer, sunPacket, windowTestPts[i], lineLength)
         except Exception, e:
             print `e`
     
     tasks.Parallel.ForEach(range(len(windowTestPts)), intersect)
     
+    #Collect the hours of each face in the order of the test points.
+    for faceHits in pointHits:
+        for hour, face in enumerate(faceHits):
+            if face >= 0: faceInt[face].append(hour)
+    
     return faceInt
 
 
@@ -633,32 +642,25 @@ def evaluateShade(coolingLoad, heatingLoad, beamGain, analysisMesh, analysisArea
     #Multiply the largest dimension of the bounding box by 2 to ensure that the lines are definitely long enough to intersect the shade.
     lineLength = (max(boundBox.Max - boundBox.Min)) * 2
     
-    #Generate the sun lines for intersection and discount the vector if it intersects a context.
-    sunLines = []
+    #Put the test mesh and the context in ray tracers.  The sun rays are discounted if they intersect the context.
+    hb_RayTracer = sc.sticky["honeybee_RayTracer"]
+    shadeTracer = hb_RayTracer()
+    shadeTracer.addMesh(analysisMesh)
+    shadeTracer.build()
+    contextTracer = None
     if context_:
-        contextMeshes = []
+        contextTracer = hb_RayTracer()
         for brep in context_:
-            contextMeshes.extend(rc.Geometry.Mesh.CreateFromBrep(brep, rc.Geometry.MeshingParameters.Default))
-        contextMesh = joinMesh(contextMeshes)
-    else: pass
-    
-    for pt in windowTestPts: sunLines.append([]) 
-    
-    for ptCount, pt in enumerate(windowTestPts):
-        for vec in sunVectors:
-            if context_:
-                if rc.Geometry.Intersect.Intersection.MeshRay(contextMesh, rc.Geometry.Ray3d(pt, vec)) < 0:
-                    sunLines[ptCount].append(rc.Geometry.Line(pt, lineLength * vec))
-                else: sunLines[ptCount].append(0)
-            else:
-                sunLines[ptCount].append(rc.Geometry.Line(pt, lineLength * vec))
-            
+            for contextMesh in rc.Geometry.Mesh.CreateFromBrep(brep, rc.Geometry.MeshingParameters.Default):
+                contextTracer.addMesh(contextMesh, 0)
+        contextTracer.build()
+    sunPacket = shadeTracer.preparePacket(sunVectors)
     
     #If parallel is true, then run the intersection through the parallel function.  If not, run it through the normal function.
     if parallel_ == True:
-        faceInt = parallel_projection(analysisMesh, sunLines, windowTestPts)
+        faceInt = parallel_projection(shadeTracer, contextTracer, sunPacket, windowTestPts, lineLength, analysisMesh.Faces.Count)
     else:
-        faceInt = nonparallel_projection(analysisMesh, sunLines, windowTestPts)
+        faceInt = nonparallel_projection(shadeTracer, contextTracer, sunPacket, windowTestPts, lineLength, analysisMesh.Faces.Count)
     
     #Convert the Number Of Intersections for Each Mesh Face into a Percent of Sun Blocked by Each Mesh Face for Each Hour of the Year.
     percentBlocked = []
@@ -126,6 +126,7 @@ def main(HDRFilePath, legendUnit, legendMax, conversionF, contourLines, \
         hb_folders = sc.sticky["honeybee_folders"]
         hb_RADPath = hb_folders["RADPath"]
         hb_RADLibPath = hb_folders["RADLibPath"]
+        hb_RGBEImage = sc.sticky["honeybee_RGBEImage"]
         
     else:
         print "You should first let Honeybee to fly..."
@@ -133,13 +134,6 @@ def main(HDRFilePath, legendUnit, legendMax, conversionF, contourLines, \
         ghenv.Component.AddRuntimeMessage(w, "You should first let Honeybee to fly...")
         return
     
-    # check for pfilt.exe
-    if not os.path.isfile(hb_RADPath + "\\falsecolor2.exe"):
-        msg = "Cannot find falsecolor2.exe at " + hb_RADPath + \
-              "Make sure that falsecolor2 is installed on your system."
-        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
-        return
-        
     validExt = ["HDR", "PIC"]
     if HDRFilePath.split('.')[-1].upper() not in validExt:
         msg = "Input file is not a valid HDR file."
@@ -157,6 +151,28 @@ def main(HDRFilePath, legendUnit, legendMax, conversionF, contourLines, \
         try: os.remove(outputFile)
         except: print "---"
     
+    # check for falsecolor2.exe
+    if not os.path.isfile(hb_RADPath + "\\falsecolor2.exe"):
+        # map the colors in Python but without the legend
+        msg = "Cannot find falsecolor2.exe at " + hb_RADPath + \
+              ". The image is colored without a legend. Install falsecolor2 to add the legend."
+        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Remark, msg)
+        
+        try: legendMax = float(legendMax)
+        except ValueError: legendMax = None # auto
+        
+        try:
+            legendMax = hb_RGBEImage(inputFilePath).falseColor(outputFile, float(conversionF), legendMax, \
+                                                   numOfSegments, float(maskThreshold), contourBands, \
+                                                   contourLines, useAlterColors)
+        except Exception, e:
+            msg = "Failed to generate the false color image:\n" + str(e)
+            ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+            return
+        
+        print "Legend: 0 - %.2f %s"%(legendMax, legendUnit)
+        return outputFile
+    
     batchStr_head = "SET RAYPATH=.;" + hb_RADLibPath + "\n" + \
                     "PATH=" + hb_RADPath + ";$PATH\n\n"
     if not contourLines and not contourBands:
@@ -149,7 +149,7 @@ def getHBZoneFloorSurfaces(HBZone):
     
     try:
         # call the objects from the lib
-        hb_hive = sc.sticky["honeybee_Hive"]()
+        hb_hive = sc.sticky["honeybee_Hive"](copyOnWrite = True)
         HBZone = hb_hive.callFromHoneybeeHive([HBZone])[0]
 
         for HBS in HBZone.surfaces:
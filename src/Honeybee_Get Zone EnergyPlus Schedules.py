@@ -70,7 +70,7 @@ def main(HBZone):
         return -1
     
     # get Honeybee zone
-    hb_hive = sc.sticky["honeybee_Hive"]()
+    hb_hive = sc.sticky["honeybee_Hive"](copyOnWrite = True)
     HBZoneObject = hb_hive.callFromHoneybeeHive([HBZone])[0]
     
     try:
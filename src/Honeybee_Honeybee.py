@@ -78,10 +78,23 @@ import copy
 import urllib2 as urllib
 import cPickle as pickle
 import subprocess
+import signal
+import threading
+import Queue
 import uuid
 import re
+import operator
 import random
+import hashlib
+import bisect
+import array
+import struct
 import zipfile
+import zlib
+try: import mmap
+except ImportError: mmap = None
+try: import sqlite3
+except ImportError: sqlite3 = None
 
 try:
     System.Net.ServicePointManager.SecurityProtocol = System.Net.SecurityProtocolType.Tls12
@@ -384,16 +397,18 @@ class PrepareTemplateEPLibFiles(object):
     """
     Download Template files and check for available libraries for EnergyPlus
     """
+    EPLibNames = ("honeybee_constructionLib", "honeybee_materialLib", "honeybee_windowMaterialLib", \
+                  "honeybee_ScheduleLib", "honeybee_ScheduleTypeLimitsLib", "honeybee_WindowPropLib", \
+                  "honeybee_SpectralDataLib")
+    
     def __init__(self, downloadTemplate = False, workingDir = None):
         
         if not workingDir: workingDir = sc.sticky["Honeybee_DefaultFolder"]
-        if not sc.sticky.has_key("honeybee_constructionLib"): sc.sticky ["honeybee_constructionLib"] = {}
-        if not sc.sticky.has_key("honeybee_materialLib"): sc.sticky ["honeybee_materialLib"] = {}
-        if not sc.sticky.has_key("honeybee_windowMaterialLib"): sc.sticky ["honeybee_windowMaterialLib"] = {}
-        if not sc.sticky.has_key("honeybee_ScheduleLib"): sc.sticky["honeybee_ScheduleLib"] = {}
-        if not sc.sticky.has_key("honeybee_ScheduleTypeLimitsLib"): sc.sticky["honeybee_ScheduleTypeLimitsLib"] = {}
-        if not sc.sticky.has_key("honeybee_WindowPropLib"): sc.sticky["honeybee_WindowPropLib"] = {}
-        if not sc.sticky.has_key("honeybee_SpectralDataLib"): sc.sticky["honeybee_SpectralDataLib"] = {}
+        # EnergyPlus libraries parse their objects when they are read. Libraries of an older
+        # version of Honeybee in this document are converted.
+        for libName in self.EPLibNames:
+            if not isinstance(sc.sticky.get(libName), hb_EPLibrary):
+                sc.sticky[libName] = hb_EPLibrary(sc.sticky.get(libName) or {})
         if not sc.sticky.has_key("honeybee_thermMaterialLib"): sc.sticky["honeybee_thermMaterialLib"] = {}
         
         self.downloadTemplate = downloadTemplate
@@ -406,17 +421,16 @@ class PrepareTemplateEPLibFiles(object):
         client.DownloadFile(url, localFilePath)
     
     def cleanHBLib(self):
-        sc.sticky ["honeybee_constructionLib"] = {}
-        sc.sticky ["honeybee_materialLib"] = {}
-        sc.sticky ["honeybee_windowMaterialLib"] = {}
-        sc.sticky["honeybee_ScheduleLib"] = {}
-        sc.sticky["honeybee_ScheduleTypeLimitsLib"] = {}
-        sc.sticky["honeybee_WindowPropLib"] = {}
-        sc.sticky["honeybee_SpectralDataLib"] = {}
+        for libName in self.EPLibNames:
+            sc.sticky[libName] = hb_EPLibrary()
     
     def cleanThermLib(self):
         sc.sticky["honeybee_thermMaterialLib"] = {}
     
+    def removeLibraryCache(self):
+        # libraries will be parsed and cached again from the new files
+        hb_EPLibraryCache([os.path.join(self.workingDir, 'OpenStudioMasterTemplate.idf')]).remove()
+    
     def downloadTemplates(self):
         
         workingDir = self.workingDir
@@ -443,6 +457,7 @@ class PrepareTemplateEPLibFiles(object):
                 self.downloadFile(updatedLink, workingDir)
                 # clean current library
                 self.cleanHBLib()
+                self.removeLibraryCache()
             except:
                 print 'Download failed!!! You need OpenStudioMasterTemplate.idf to use honeybee.' + \
                 '\nPlease check your internet connection, and try again!'
@@ -513,6 +528,7 @@ class PrepareTemplateEPLibFiles(object):
                 self.downloadFile(updatedLink, workingDir)
                 # clean current library
                 self.cleanThermLib()
+                self.removeLibraryCache()
             except:
                 print 'Download failed!!! You need thermMaterial.csv to use the "export to THERM" capabilties of honeybee.' + \
                 '\nPlease check your internet connection, and try again!'
@@ -535,19 +551,501 @@ class PrepareTemplateEPLibFiles(object):
         return libFilePaths
 
 
+class hb_EPObjectIndex(object):
+    """
+    Single-pass index of the objects inside an EnergyPlus idf file.
+    
+    The file is read in chunks and scanned with a single regular expression so it is never
+    loaded into memory as a whole. Comments that start with "!" are ignored and for each
+    object only the class, the name and the byte range in the file are stored. Objects are
+    parsed into Honeybee library records only when they are asked for.
+    
+    Args:
+        epFilePath: Path to an EnergyPlus idf file.
+    
+    Usage:
+        EPIndex = hb_EPObjectIndex(r"C:\ladybug\userCustomEPLibrary.idf")
+        EPIndex.getObjectNames("Construction")
+        EPIndex.getObject("Construction", "ASHRAE 189.1-2009 EXTWALL MASS CLIMATEZONE 1")
+    """
+    
+    chunkSize = 1048576
+    
+    def __init__(self, epFilePath):
+        if not os.path.isfile(epFilePath):
+            raise ValueError("Can't find %s."%epFilePath)
+        
+        self.filePath = epFilePath
+        # list of (className, objectName, startByte, endByte) in the order of the file
+        self.entries = []
+        # (key, name) of the library record for each entry or None if it is not a valid
+        # object. They are the same as parseEPObjectString returns for the object.
+        self.recordKeys = []
+        # CLASSNAME > list of entry ids
+        self.classIndex = {}
+        # (CLASSNAME, OBJECTNAME) > entry id. The last object with the same name wins.
+        self.nameIndex = {}
+        # entry id > parsed record
+        self.records = {}
+        # size and modified time of the file when it was indexed
+        self.fileStat = None
+        
+        self.buildIndex()
+    
+    # an object starts at the first character that is not a space or inside a comment and
+    # ends at the first ; that is not inside a comment. The comments are matched as whole
+    # lines so the expression doesn't backtrack when an object is cut at the end of a chunk.
+    objectPattern = re.compile(r"\s*(?:![^\n]*\n\s*)*([^;!\s][^;!]*(?:![^\n]*\n[^;!]*)*);")
+    commentPattern = re.compile(r"![^\n]*")
+    # value and comment of each line of an object. Lines that start with ! are skipped.
+    fieldPattern = re.compile(r"^(?!!)[ \t]*(?=\S)([^,;\n]*)(?:[^\n]*!([^\n]*))?", re.M)
+    
+    def getFileStat(self):
+        fileStat = os.stat(self.filePath)
+        return fileStat.st_size, fileStat.st_mtime
+    
+    def buildIndex(self):
+        """Scan the file once and collect class, name and byte range of every object."""
+        self.entries = []
+        self.recordKeys = []
+        self.classIndex = {}
+        self.nameIndex = {}
+        self.records = {}
+        self.fileStat = self.getFileStat()
+        
+        objectPattern = self.objectPattern
+        addEntry = self.addEntry
+        with open(self.filePath, "rb") as epFile:
+            # offset of the text in the file. The text always ends at the end of a line so
+            # the comments are complete. An object that continues in the next chunk doesn't
+            # match right after the last object and is scanned again with the next chunk.
+            offset = 0
+            text = ""
+            while True:
+                chunk = epFile.read(self.chunkSize)
+                if chunk and not chunk.endswith("\n"): chunk += epFile.readline()
+                isLastChunk = not chunk
+                text += chunk
+                
+                end = 0
+                while True:
+                    match = objectPattern.match(text, end)
+                    if match is None:
+                        if not isLastChunk: break
+                        match = objectPattern.search(text, end)
+                        if match is None: break
+                    addEntry(match.group(1), offset + match.start(1))
+                    end = match.end()
+                
+                if isLastChunk: break
+                offset += end
+                text = text[end:]
+    
+    def addEntry(self, objectCode, start):
+        # class and name are the first two fields. The comments usually come after them.
+        nameEnd = objectCode.find(",", objectCode.find(",") + 1)
+        if nameEnd == -1: head = objectCode
+        else: head = objectCode[:nameEnd]
+        if "!" in head: head = ",".join(self.commentPattern.sub("", objectCode).split(",", 2)[:2])
+        
+        fields = head.split(",", 1)
+        className = fields[0].strip()
+        if len(fields) > 1: objectName = fields[1].strip()
+        else: objectName = ""
+        
+        entryId = len(self.entries)
+        self.entries.append((className, objectName, start, start + len(objectCode) + 1))
+        self.recordKeys.append(self.getRecordKey(objectCode))
+        
+        classKey = className.upper()
+        if classKey in self.classIndex: self.classIndex[classKey].append(entryId)
+        else: self.classIndex[classKey] = [entryId]
+        self.nameIndex[(classKey, objectName.upper())] = entryId
+    
+    @staticmethod
+    def getRecordKey(objectCode):
+        """
+        Return the (key, name) that parseEPObjectString finds for an object without parsing
+        the fields. The name is the first value in the second line of the object.
+        
+        Args:
+            objectCode: The object from the class name to the closing ; without the ;.
+        """
+        lineEnd = objectCode.find("\n")
+        if lineEnd == -1: return None
+        firstLine = objectCode[:lineEnd]
+        
+        while lineEnd != -1:
+            lineStart = lineEnd + 1
+            lineEnd = objectCode.find("\n", lineStart)
+            if lineEnd == -1:
+                # the last line is never empty as it ends with the ;
+                line = objectCode[lineStart:] + ";"
+            else:
+                line = objectCode[lineStart:lineEnd]
+                if not line.strip(): continue
+            if line.startswith("!"): continue
+            
+            if firstLine.startswith('MaterialProperty:GlazingSpectralData'):
+                return 'MaterialProperty:GlazingSpectralData', line.split(",")[0].strip().upper()
+            
+            key = hb_EPObjectIndex.getEPObjectKey(firstLine.split(",")[0].strip())
+            # it's a two line object such as Any Number scheduleTypeLimit
+            if lineEnd == -1: return key, line.split(";")[0].strip().upper()
+            return key, line.split(",")[0].strip().upper()
+        
+        return None
+    
+    def getClassNames(self):
+        """Return the name of all the classes in the file."""
+        return [self.entries[ids[0]][0] for ids in self.classIndex.values()]
+    
+    def getObjectNames(self, className):
+        """Return the name of all the objects of a class in the order of the file."""
+        ids = self.classIndex.get(className.upper(), [])
+        return [self.entries[entryId][1] for entryId in ids]
+    
+    def getEntryIds(self, classNames = None):
+        """Return the ids for the objects of input classes in the order of the file."""
+        if classNames is None: return range(len(self.entries))
+        
+        ids = []
+        for className in classNames:
+            ids.extend(self.classIndex.get(className.upper(), []))
+        ids.sort()
+        return ids
+    
+    def getObjectString(self, className, objectName):
+        """Return the idf string of an object. Return None if the object is not in the file."""
+        entryId = self.nameIndex.get((className.upper(), objectName.upper()))
+        if entryId is None: return None
+        return self.readObjectStrings([(entryId, self.entries[entryId])])[0]
+    
+    def readObjectStrings(self, entries):
+        """
+        Return the idf strings for a list of (entry id, entry). The file is opened once.
+        
+        If the file has changed since the entries were indexed the index is built again and
+        the objects are found by their class and name. The string is None for the objects
+        that are not in the file anymore.
+        """
+        if self.getFileStat() != self.fileStat: self.buildIndex()
+        
+        ranges = []
+        for count, (entryId, entry) in enumerate(entries):
+            if entryId >= len(self.entries) or self.entries[entryId] is not entry:
+                entryId = self.nameIndex.get((entry[0].upper(), entry[1].upper()))
+                if entryId is None: continue
+            ranges.append(self.entries[entryId][2:] + (count,))
+        ranges.sort()
+        
+        objectStrings = [None] * len(entries)
+        with open(self.filePath, "rb") as epFile:
+            for start, end, count in ranges:
+                epFile.seek(start)
+                objectStrings[count] = epFile.read(end - start)
+        return objectStrings
+    
+    def getObject(self, className, objectName):
+        """
+        Return the parsed record for an object as (key, name, record) where record
+        has the same structure as the objects in Honeybee EnergyPlus libraries.
+        
+        Objects are parsed the first time they are asked for and are cached after that.
+        """
+        if self.getFileStat() != self.fileStat: self.buildIndex()
+        entryId = self.nameIndex.get((className.upper(), objectName.upper()))
+        if entryId is None: return None
+        
+        if entryId not in self.records:
+            objectString = self.readObjectStrings([(entryId, self.entries[entryId])])[0]
+            if objectString is None: return None
+            self.records[entryId] = self.parseEPObjectString(objectString)
+        
+        return self.records[entryId]
+    
+    @staticmethod
+    def getEPObjectKey(className):
+        """Return the library key for an EnergyPlus class name (e.g. MATERIAL:NOMASS > Material:Nomass)."""
+        if className.isupper(): return className.title()
+        return className
+    
+    @staticmethod
+    def parseEPObjectString(EPObjectStr):
+        """
+        Parse a single EnergyPlus object string into a Honeybee library record.
+        
+        Returns:
+            (key, name, record) where record is a dictionary of (value, comment) for each
+            field and the full class name under 0. None if the string is not a valid object.
+        """
+        EPObjectStr = EPObjectStr.strip()
+        
+        # fast path for the usual layout with one field in each line. Objects with several
+        # fields in the last line or with only a name are parsed line by line below.
+        if not EPObjectStr.startswith('MaterialProperty:GlazingSpectralData') and \
+           EPObjectStr.find(",", EPObjectStr.rfind("\n")) == -1:
+            fields = hb_EPObjectIndex.fieldPattern.findall(EPObjectStr)
+            if len(fields) > 2:
+                key = hb_EPObjectIndex.getEPObjectKey(fields[0][0].rstrip())
+                name = fields[1][0].rstrip().upper()
+                record = dict(enumerate([(value.rstrip(), comment.rstrip()) for value, comment in fields[2:]], 1))
+                record[0] = key
+                return key, name, record
+        
+        lines = []
+        for line in EPObjectStr.split("\n"):
+            if line.strip() == '' or line.startswith('!'): continue
+            lines.append(line)
+        
+        if not lines:
+            return None
+        
+        record = dict()
+        if lines[0].startswith('MaterialProperty:GlazingSpectralData'):
+            key = 'MaterialProperty:GlazingSpectralData'
+            name = lines[1].split(",")[0].strip().upper()
+            record[0] = key
+            # store the data into the dictionary
+            for lineCount, line in enumerate(lines):
+                objValue = line.split("!")[0].strip()
+                try: objDescription = line.split("!")[1].strip()
+                except:  objDescription = ""
+                if lineCount == 0:
+                    record[lineCount] = objValue[:-1]
+                elif lineCount == 1:
+                    pass # name is already there as the key
+                elif objValue.endswith(","):
+                    record[lineCount-1] = objValue[:-1], objDescription
+                elif objValue.endswith(";"):
+                    record[lineCount-1] = objValue[:-1], objDescription
+        else:
+            if len(lines) < 2: return None
+            
+            key = hb_EPObjectIndex.getEPObjectKey(lines[0].split(",")[0].strip())
+            
+            name = lines[1].split(",")[0].strip().upper()
+            values = lines[2:]
+            # it's a two line object such as Any Number scheduleTypeLimit
+            if values == []:
+                name = lines[1].split(";")[0].strip().upper() # name is the last input
+            
+            record[0] = key
+            count = 1
+            delimiter = ","
+            for value in values:
+                if not len(value.strip()): continue #pass empty lines
+                if count==len(values): delimiter = ";"
+                v = value.split(delimiter)[0].strip() # find the  value
+                if value.find("!")!= -1:
+                    c = value.split("!")[-1].rstrip() # find the  value
+                else:
+                    c = ""
+                record[count] = v, c
+                count += 1
+        
+        return key, name, record
+
+
+class hb_EPLibrary(dict):
+    """
+    Honeybee library of EnergyPlus objects (e.g. constructions) by their upper case names.
+    
+    The library works as a normal dictionary of records. The objects that are added from
+    an idf file are only indexed when the file is imported and each object is parsed into
+    a record the first time that it is read from the library. Looping through the names or
+    checking if a name is in the library doesn't parse any objects.
+    
+    Usage:
+        constructionLib = hb_EPLibrary()
+        constructionLib.addFromIndex(hb_EPObjectIndex(EPFile), entryId, "EXTERIOR WALL")
+        constructionLib["EXTERIOR WALL"] # the object is parsed here
+    """
+    
+    def __init__(self, *args, **kwargs):
+        # NAME > (hb_EPObjectIndex, entry id, entry) or the idf string of the object
+        self.pending = {}
+        dict.__init__(self, *args, **kwargs)
+    
+    def addFromIndex(self, EPIndex, entryId, name):
+        """Add an object of an indexed idf file to the library without parsing it."""
+        dict.pop(self, name, None)
+        self.pending[name] = (EPIndex, entryId, EPIndex.entries[entryId])
+    
+    def addFromString(self, name, objectString):
+        """Add the idf string of an object to the library without parsing it."""
+        dict.pop(self, name, None)
+        self.pending[name] = objectString
+    
+    def parsePending(self, names):
+        """Parse the objects that are not parsed yet. The objects of each file are read together."""
+        objectStrings = {}
+        fromIndex = {}
+        for name in names:
+            source = self.pending.get(name)
+            if source is None: continue
+            elif isinstance(source, tuple): fromIndex.setdefault(source[0], []).append(name)
+            else: objectStrings[name] = source
+        
+        for EPIndex, indexNames in fromIndex.items():
+            entries = [self.pending[name][1:] for name in indexNames]
+            objectStrings.update(zip(indexNames, EPIndex.readObjectStrings(entries)))
+        
+        for name, objectString in objectStrings.items():
+            EPObject = None
+            if objectString is not None: EPObject = hb_EPObjectIndex.parseEPObjectString(objectString)
+            # the object may be replaced or parsed by another component in the meantime
+            if name not in self.pending: continue
+            if EPObject is not None: dict.__setitem__(self, name, EPObject[2])
+            self.pending.pop(name, None)
+    
+    def parseAll(self):
+        if self.pending: self.parsePending(self.pending.keys())
+    
+    def serialize(self):
+        """Return the library as plain dictionaries. The objects that are not parsed are kept as idf strings."""
+        objectStrings = {}
+        fromIndex = {}
+        for name, source in self.pending.items():
+            if isinstance(source, tuple): fromIndex.setdefault(source[0], []).append(name)
+            else: objectStrings[name] = source
+        
+        for EPIndex, indexNames in fromIndex.items():
+            entries = [self.pending[name][1:] for name in indexNames]
+            for name, objectString in zip(indexNames, EPIndex.readObjectStrings(entries)):
+                if objectString is not None: objectStrings[name] = objectString
+        
+        return {"records": dict(dict.items(self)), "pending": objectStrings}
+    
+    @classmethod
+    def deserialize(cls, serializedLib):
+        library = cls(serializedLib["records"])
+        library.pending.update(serializedLib["pending"])
+        return library
+    
+    def __getitem__(self, name):
+        if name in self.pending: self.parsePending([name])
+        return dict.__getitem__(self, name)
+    
+    def get(self, name, default = None):
+        try: return self[name]
+        except KeyError: return default
+    
+    def __setitem__(self, name, record):
+        self.pending.pop(name, None)
+        dict.__setitem__(self, name, record)
+    
+    def __delitem__(self, name):
+        if self.pending.pop(name, None) is None: dict.__delitem__(self, name)
+    
+    def __contains__(self, name):
+        return dict.__contains__(self, name) or name in self.pending
+    
+    def has_key(self, name):
+        return name in self
+    
+    def __len__(self):
+        return dict.__len__(self) + len(self.pending)
+    
+    def keys(self):
+        return dict.keys(self) + self.pending.keys()
+    
+    def __iter__(self):
+        return iter(self.keys())
+    
+    def iterkeys(self):
+        return iter(self.keys())
+    
+    def values(self):
+        self.parseAll()
+        return dict.values(self)
+    
+    def itervalues(self):
+        self.parseAll()
+        return dict.itervalues(self)
+    
+    def items(self):
+        self.parseAll()
+        return dict.items(self)
+    
+    def iteritems(self):
+        self.parseAll()
+        return dict.iteritems(self)
+    
+    def pop(self, name, *default):
+        if name in self.pending: self.parsePending([name])
+        return dict.pop(self, name, *default)
+    
+    def popitem(self):
+        self.parseAll()
+        return dict.popitem(self)
+    
+    def setdefault(self, name, default = None):
+        if name not in self: self[name] = default
+        return self[name]
+    
+    def update(self, *args, **kwargs):
+        for other in args + (kwargs,):
+            if isinstance(other, hb_EPLibrary):
+                for name, record in dict.iteritems(other): self[name] = record
+                for name, source in other.pending.items():
+                    dict.pop(self, name, None)
+                    self.pending[name] = source
+            elif hasattr(other, "keys"):
+                for name in other.keys(): self[name] = other[name]
+            else:
+                for name, record in other: self[name] = record
+    
+    def clear(self):
+        dict.clear(self)
+        self.pending.clear()
+    
+    def copy(self):
+        library = hb_EPLibrary()
+        library.update(self)
+        return library
+    
+    def __copy__(self):
+        return self.copy()
+    
+    def __deepcopy__(self, memo):
+        self.parseAll()
+        return hb_EPLibrary(copy.deepcopy(dict(dict.items(self)), memo))
+    
+    def __reduce_ex__(self, protocol):
+        # pickled as a normal dictionary
+        self.parseAll()
+        return (dict, (dict(dict.items(self)),))
+    
+    def __eq__(self, other):
+        self.parseAll()
+        if isinstance(other, hb_EPLibrary): other.parseAll()
+        return dict.__eq__(self, other)
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    def __repr__(self):
+        self.parseAll()
+        return dict.__repr__(self)
+    
+
 class HB_GetEPLibraries:
     
     def __init__(self):
         self.libraries = {
-            "Material": {},
-            "WindowMaterial": {},
-            "Construction": {},
-            "Schedule" : {},
-            "ScheduleTypeLimits": {},
+            "Material": hb_EPLibrary(),
+            "WindowMaterial": hb_EPLibrary(),
+            "Construction": hb_EPLibrary(),
+            "Schedule" : hb_EPLibrary(),
+            "ScheduleTypeLimits": hb_EPLibrary(),
             "ThermMaterial": {},
-            "WindowProperty": {},
-            "MaterialProperty": {}
+            "WindowProperty": hb_EPLibrary(),
+            "MaterialProperty": hb_EPLibrary()
             }
+        # imported idf files and their hb_EPObjectIndex
+        self.EPFiles = []
+        self.indices = {}
     
     def getEPMaterials(self):
         return self.libraries["Material"]
@@ -573,14 +1071,40 @@ class HB_GetEPLibraries:
     def getTHERMMaterials(self):
         return self.libraries["ThermMaterial"]
     
+    def getEPObject(self, className, objectName):
+        """
+        Return (key, name, record) for any object in the imported idf files including the
+        classes that are not loaded into the libraries. The last imported file wins.
+        """
+        for EPFile in reversed(self.EPFiles):
+            EPObject = self.getEPIndex(EPFile).getObject(className, objectName)
+            if EPObject is not None: return EPObject
+        return None
+    
+    def getEPIndex(self, EPFile):
+        """Return the hb_EPObjectIndex of an imported idf file. The index is built the first time."""
+        if EPFile not in self.indices:
+            self.indices[EPFile] = hb_EPObjectIndex(EPFile)
+        return self.indices[EPFile]
+    
+    def addEPFile(self, EPFile):
+        """Add an idf file to the files that getEPObject looks into."""
+        if EPFile in self.EPFiles: self.EPFiles.remove(EPFile)
+        self.EPFiles.append(EPFile)
+        # the file may have changed since the index was built
+        self.indices.pop(EPFile, None)
+    
     def importEPLibrariesFromFile(self, EPfile, isMatFile, cleanCurrentLib = True, report = True):
         if not os.path.isfile(EPfile):
             raise Exception("Can't find EP library! at %s"%EPfile)
         
         if isMatFile == False:
             print "Loading EP materials, constructions, schedules and material properties from %s"%EPfile
-            EPObjects = self.getEnergyPlusObjectsFromFile(EPfile)
-            self.loadEPConstructionsMaterialsAndSchedules(EPObjects, cleanCurrentLib)
+            if cleanCurrentLib: self.cleanHBLibs()
+            # the file is only indexed here. Each object is parsed when it is read from the
+            # libraries. See benchmarks/benchmark_EPLibraries.py
+            self.addEPFile(EPfile)
+            self.addEPIndexToLibraries(self.getEPIndex(EPfile))
         else:
             print "Loading THERM materials from %s"%EPfile
             self.getThermObjectsFromFile(EPfile)
@@ -590,82 +1114,40 @@ class HB_GetEPLibraries:
     
     def cleanHBLibs(self):
         self.libraries = {
-            "Material": {},
-            "WindowMaterial": {},
-            "Construction": {},
-            "Schedule" : {},
-            "ScheduleTypeLimits": {},
+            "Material": hb_EPLibrary(),
+            "WindowMaterial": hb_EPLibrary(),
+            "Construction": hb_EPLibrary(),
+            "Schedule" : hb_EPLibrary(),
+            "ScheduleTypeLimits": hb_EPLibrary(),
             "ThermMaterial": {},
-            "WindowProperty": {},
-            "MaterialProperty": {}
+            "WindowProperty": hb_EPLibrary(),
+            "MaterialProperty": hb_EPLibrary()
             }
-            
-    # TODO: Support parsing for files with no next line
+        self.EPFiles = []
+        self.indices = {}
+    
+    def addEPIndexToLibraries(self, EPIndex):
+        for entryId, recordKey in enumerate(EPIndex.recordKeys):
+            if recordKey is None: continue
+            key, name = recordKey
+            shortKey = key.split(":")[0]
+            if shortKey in self.libraries:
+                self.libraries[shortKey].addFromIndex(EPIndex, entryId, name)
+    
+    def addEPObjectToLibraries(self, EPObject):
+        if EPObject is None: return
+        key, name, record = EPObject
+        shortKey = key.split(":")[0]
+        if shortKey in self.libraries:
+            self.libraries[shortKey][name] = record
+    
     # TODO: Check if keys can be case insensitive
     # TODO: Create EPObjects and not dictionaries
     def loadEPConstructionsMaterialsAndSchedules(self, EPObjectsString, cleanCurrentLib = True):
         if cleanCurrentLib: self.cleanHBLibs()
         
         for EPObjectStr in EPObjectsString:
-            rawLines = EPObjectStr.strip().split("\n")
-            lines = []
-            for line in rawLines:
-                if line.strip() == '' or line.startswith('!'): continue
-                lines.append(line)
-            
-            if not lines:
-                continue
-            
-            if lines[0].startswith('MaterialProperty:GlazingSpectralData'):
-                key = 'MaterialProperty:GlazingSpectralData'
-                shortKey = 'MaterialProperty'
-                name = lines[1].split(",")[0].strip().upper()
-                self.libraries[shortKey][name] = dict() # create an empty dictonary
-                self.libraries[shortKey][name][0] = key
-                # store the data into the dictionary
-                for lineCount, line in enumerate(lines):
-                    objValue = line.split("!")[0].strip()
-                    try: objDescription = line.split("!")[1].strip()
-                    except:  objDescription = ""
-                    if lineCount == 0:
-                        self.libraries[shortKey][name][lineCount] = objValue[:-1]
-                    elif lineCount == 1:
-                        pass # name is already there as the key
-                    elif objValue.endswith(","):
-                        self.libraries[shortKey][name][lineCount-1] = objValue[:-1], objDescription
-                    elif objValue.endswith(";"):
-                        self.libraries[shortKey][name][lineCount-1] = objValue[:-1], objDescription
-            else:
-                if len(lines) < 2: continue
-                
-                if lines[0].split(",")[0].strip().isupper():
-                    key = lines[0].split(",")[0].strip().title()
-                else:
-                    key = lines[0].split(",")[0].strip()
-                shortKey = key.split(":")[0]
-                
-                name = lines[1].split(",")[0].strip().upper()
-                values = lines[2:]
-                # it's a two line object such as Any Number scheduleTypeLimit
-                if values == []:
-                    name = lines[1].split(";")[0].strip().upper() # name is the last input
-                    
-                if shortKey in self.libraries:
-                    self.libraries[shortKey][name] = dict() # create an empty dictonary
-                    self.libraries[shortKey][name][0] = key
-                    
-                    count = 1
-                    delimiter = ","
-                    for value in values:
-                        if not len(value.strip()): continue #pass empty lines
-                        if count==len(values): delimiter = ";"
-                        v = value.split(delimiter)[0].strip() # find the  value
-                        if value.find("!")!= -1:
-                            c = value.split("!")[-1].rstrip() # find the  value
-                        else:
-                            c = ""
-                        self.libraries[shortKey][name][count] = v, c
-                        count += 1
+            self.addEPObjectToLibraries(hb_EPObjectIndex.parseEPObjectString(EPObjectStr))
     
     def report(self): 
         # Report findings
@@ -719,7 +1201,7 @@ class HB_GetEPLibraries:
             raise ValueError("Can't find %s."%epFilePath)
         
         with open(epFilePath, "r") as epFile:
-            return self.getEnergyPlusObjectsFromString("".join(epFile.readlines()))
+            return self.getEnergyPlusObjectsFromString(epFile.read())
     
     def getThermObjectsFromFile(self, matFile):
         if not os.path.isfile(matFile):
@@ -750,6 +1232,129 @@ class HB_GetEPLibraries:
                         self.libraries["ThermMaterial"][matName]["RGBColor"] = System.Drawing.ColorTranslator.FromHtml("#" + matPropLine[-2])
                     except: pass
 
+class hb_EPLibraryCache(object):
+    """
+    Binary cache of the parsed EnergyPlus and THERM libraries.
+    
+    The cache is written next to the library files and is only valid as long as the size,
+    modified time and the content hash of every library file match the ones that are stored
+    in the cache header. If any of the files changes the cache is ignored and rebuilt.
+    
+    Args:
+        libFilePaths: List of library files in the order that they are loaded.
+        cacheFile: Optional path to the cache file. Default is honeybee_libraries.cache
+            in the folder of the first library file.
+    """
+    cacheVersion = 2
+    defaultFileName = "honeybee_libraries.cache"
+    
+    def __init__(self, libFilePaths, cacheFile = None):
+        self.libFilePaths = list(libFilePaths)
+        if not cacheFile:
+            cacheFile = os.path.join(os.path.dirname(self.libFilePaths[0]), self.defaultFileName)
+        self.cacheFile = cacheFile
+    
+    @staticmethod
+    def getFileHash(filePath, chunkSize = 1048576):
+        md5 = hashlib.md5()
+        with open(filePath, "rb") as inf:
+            while True:
+                chunk = inf.read(chunkSize)
+                if not chunk: break
+                md5.update(chunk)
+        return md5.hexdigest()
+    
+    def getFileStats(self):
+        """Return (path, size, mtime) for each library file."""
+        return [(os.path.normcase(os.path.abspath(path)), os.path.getsize(path), os.path.getmtime(path)) \
+                for path in self.libFilePaths]
+    
+    def getFileSignatures(self, fileStats = None):
+        """Return (path, size, mtime, md5) for each library file."""
+        if fileStats is None: fileStats = self.getFileStats()
+        return [stat + (self.getFileHash(self.libFilePaths[count]),) \
+                for count, stat in enumerate(fileStats)]
+    
+    def isValid(self, header):
+        """Check the header of a cache file against the current library files."""
+        try:
+            version, signatures = header
+        except:
+            return False
+        
+        if version != self.cacheVersion: return False
+        
+        fileStats = self.getFileStats()
+        # check size and modified time first and only hash the files if they match
+        if [tuple(sig[:3]) for sig in signatures] != fileStats: return False
+        return [tuple(sig) for sig in signatures] == self.getFileSignatures(fileStats)
+    
+    @staticmethod
+    def serializeLibraries(libraries):
+        # .NET colors of THERM materials are stored as html strings
+        thermMaterials = {}
+        for matName, material in libraries["ThermMaterial"].items():
+            material = dict(material)
+            if isinstance(material.get("RGBColor"), System.Drawing.Color):
+                material["RGBColor"] = System.Drawing.ColorTranslator.ToHtml(material["RGBColor"])
+            thermMaterials[matName] = material
+        
+        # EnergyPlus objects that are not parsed yet are stored as idf strings
+        serializedLibs = {}
+        for key, library in libraries.items():
+            if isinstance(library, hb_EPLibrary): serializedLibs[key] = library.serialize()
+            else: serializedLibs[key] = library
+        serializedLibs["ThermMaterial"] = thermMaterials
+        return serializedLibs
+    
+    @staticmethod
+    def deserializeLibraries(serializedLibs):
+        for material in serializedLibs["ThermMaterial"].values():
+            RGBColor = material.get("RGBColor")
+            if isinstance(RGBColor, str) and RGBColor.startswith("#"):
+                material["RGBColor"] = System.Drawing.ColorTranslator.FromHtml(material["RGBColor"])
+        
+        libraries = {}
+        for key, library in serializedLibs.items():
+            if key == "ThermMaterial": libraries[key] = library
+            else: libraries[key] = hb_EPLibrary.deserialize(library)
+        return libraries
+    
+    def load(self):
+        """Return the cached libraries or None if the cache is missing or out of date."""
+        if not os.path.isfile(self.cacheFile): return None
+        
+        try:
+            with open(self.cacheFile, "rb") as inf:
+                # the header is a separate pickle so the libraries are only read if it is valid
+                if not self.isValid(pickle.load(inf)): return None
+                return self.deserializeLibraries(pickle.load(inf))
+        except Exception, e:
+            print "Failed to read the library cache at %s:\n%s"%(self.cacheFile, e)
+            return None
+    
+    def save(self, libraries):
+        """Write the libraries to the cache file. Return True if it succeeds."""
+        try:
+            header = (self.cacheVersion, self.getFileSignatures())
+            tempFile = self.cacheFile + ".tmp"
+            with open(tempFile, "wb") as outf:
+                pickle.dump(header, outf, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(self.serializeLibraries(libraries), outf, pickle.HIGHEST_PROTOCOL)
+            
+            self.remove()
+            os.rename(tempFile, self.cacheFile)
+            return True
+        except Exception, e:
+            print "Failed to write the library cache to %s:\n%s"%(self.cacheFile, e)
+            return False
+    
+    def remove(self):
+        if os.path.isfile(self.cacheFile):
+            try: os.remove(self.cacheFile)
+            except: pass
+
+
 def checkUnits():
     units = sc.doc.ModelUnitSystem
     if `units` == 'Rhino.UnitSystem.Meters': conversionFactor = 1.00
@@ -1636,11 +2241,216 @@ class hb_MSHToRAD(object):
     
         return matFile, radFile
 
+class hb_BatchJob(object):
+    """
+    A command or a batch file that is executed by hb_JobScheduler.
+
+    Args:
+        command: Command or full path to the batch file.
+        name: Optional name for the job. Default is the command.
+        timeout: Optional time limit in seconds. The job will be killed after the limit.
+    """
+
+    def __init__(self, command, name = None, timeout = None):
+        self.command = command
+        self.name = name or command
+        self.timeout = timeout
+        self.process = None
+        # pending, running, done, failed, timeout or cancelled
+        self.status = "pending"
+        self.returnCode = None
+        self.stderr = ""
+        self.logFile = None
+        self.startTime = None
+        self.endTime = None
+
+    @property
+    def wallTime(self):
+        """Run time of the job in seconds."""
+        if self.startTime is None: return 0
+        if self.endTime is None: return time.time() - self.startTime
+        return self.endTime - self.startTime
+
+    @property
+    def succeeded(self):
+        return self.status == "done"
+
+    def writeLog(self, logFile = None):
+        """Write stderr of the job to a log file next to the batch file and return the path."""
+        if not logFile: logFile = os.path.splitext(self.command.strip('"'))[0] + ".err"
+        try:
+            with open(logFile, "w") as outf:
+                outf.write("%s\nstatus: %s\nexit code: %s\nwall time: %.2f s\n\n"%(self.command, \
+                           self.status, str(self.returnCode), self.wallTime))
+                outf.write(self.stderr)
+        except Exception, e:
+            print "Failed to write the log of %s: %s"%(self.name, str(e))
+            return None
+        self.logFile = logFile
+        return logFile
+
+    def __repr__(self):
+        return "Job: %s [%s, %.2f s]"%(self.name, self.status, self.wallTime)
+
+class hb_JobScheduler(object):
+    """
+    Run a number of jobs in parallel and wait to the end of the analysis.
+
+    The scheduler keeps maxWorkers jobs running at any time. Each job is watched by a
+    thread that waits for the process to exit, so a new job starts as soon as another
+    one finishes instead of checking the processes every few seconds. Exit code, stderr
+    and wall time are collected for each job.
+
+    Args:
+        maxWorkers: Max number of jobs to be ran in parallel. Default is 1.
+        shell: Set to True if you do NOT want to see the cmd window while the analysis is running.
+        timeout: Optional default time limit in seconds for each job.
+        progressCallback: Optional function that is called with each job when it finishes.
+
+    Usage:
+        scheduler = hb_JobScheduler(maxWorkers = 4)
+        jobs = scheduler.run(["c:/ladybug/study/study_0.bat", "c:/ladybug/study/study_1.bat"])
+        for job in jobs:
+            if not job.succeeded: print job.name, job.returnCode, job.stderr
+    """
+
+    def __init__(self, maxWorkers = 1, shell = False, timeout = None, progressCallback = None):
+        self.maxWorkers = max(int(maxWorkers or 1), 1)
+        self.shell = shell
+        self.timeout = timeout
+        self.progressCallback = progressCallback
+        self.cancelled = False
+        self.running = {}
+        self.events = Queue.Queue()
+        self.lock = threading.Lock()
+
+    def run(self, jobs):
+        """Run the jobs and return the list of hb_BatchJob after all of them are finished."""
+        jobs = [job if isinstance(job, hb_BatchJob) else hb_BatchJob(job, timeout = self.timeout) \
+                for job in jobs]
+        pending = list(reversed(jobs))
+        self.cancelled = False
+
+        try:
+            while pending or self.running:
+                while pending and len(self.running) < self.maxWorkers and not self.cancelled:
+                    self.startJob(pending.pop())
+
+                if not self.running: break
+
+                # block until a job finishes or the next job reaches its time limit
+                waitTime = self.getWaitTime()
+                try:
+                    if waitTime is None: job = self.events.get()
+                    else: job = self.events.get(True, waitTime)
+                except Queue.Empty:
+                    job = None
+
+                if job is None or job is self:
+                    # time limit or cancellation
+                    self.killExpiredJobs()
+                    continue
+
+                with self.lock:
+                    self.running.pop(id(job), None)
+
+                if self.progressCallback:
+                    try: self.progressCallback(job)
+                    except Exception, e: print "Progress callback failed: %s"%str(e)
+        finally:
+            for job in pending: job.status = "cancelled"
+
+        return jobs
+
+    def startJob(self, job):
+        job.status = "running"
+        job.startTime = time.time()
+        with self.lock:
+            self.running[id(job)] = job
+
+        try:
+            if os.name == "nt":
+                job.process = subprocess.Popen(job.command.replace("\\", "/"), shell = self.shell, \
+                                               stderr = subprocess.PIPE)
+            else:
+                # start a new process group so the shell and its children can be killed together
+                job.process = subprocess.Popen(job.command.replace("\\", "/"), shell = self.shell, \
+                                               stderr = subprocess.PIPE, preexec_fn = os.setsid)
+        except Exception, e:
+            job.status = "failed"
+            job.stderr = str(e)
+            job.endTime = time.time()
+            self.events.put(job)
+            return
+
+        waiter = threading.Thread(target = self.waitForJob, args = (job,))
+        waiter.daemon = True
+        waiter.start()
+
+    def waitForJob(self, job):
+        try:
+            stdout, stderr = job.process.communicate()
+            job.stderr = stderr or ""
+        except Exception, e:
+            job.stderr = str(e)
+        job.returnCode = job.process.returncode
+        job.endTime = time.time()
+        if job.status == "running":
+            if job.returnCode == 0: job.status = "done"
+            else: job.status = "failed"
+        self.events.put(job)
+
+    def getWaitTime(self):
+        """Seconds to the next time limit or None if there is no time limit."""
+        deadlines = [job.startTime + job.timeout - time.time() \
+                     for job in self.running.values() if job.timeout]
+        if not deadlines: return None
+        return max(min(deadlines), 0.01)
+
+    def killExpiredJobs(self):
+        with self.lock:
+            runningJobs = self.running.values()
+        for job in runningJobs:
+            if job.status != "running": continue
+            if self.cancelled:
+                job.status = "cancelled"
+            elif job.timeout and time.time() - job.startTime >= job.timeout:
+                job.status = "timeout"
+            else:
+                continue
+            self.killProcess(job.process)
+
+    @staticmethod
+    def killProcess(process):
+        try:
+            if os.name == "nt":
+                # kill the whole process tree since batch files start other processes
+                subprocess.call("taskkill /F /T /PID %d"%process.pid, shell = True)
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+        except Exception, e:
+            print "Failed to kill process %s: %s"%(str(process.pid), str(e))
+
+    def cancel(self):
+        """Kill the running jobs and skip the pending ones. It can be called from another thread."""
+        self.cancelled = True
+        self.events.put(self)
+
 class hb_WriteRAD(object):
     
-    def __init__(self, component = ghenv.Component):
+    # number of work units for each CPU in grid-based studies
+    # units are assigned to the CPUs as soon as they are free
+    unitsPerCPU = 4
+    
+    def __init__(self, component = ghenv.Component, binaryGridFiles = True):
         
         self.component = component
+        # grid-based studies write the test points as packed doubles and Radiance writes the
+        # results as binary floats. Set to False to write tab-separated text files.
+        self.binaryGridFiles = binaryGridFiles
+        self.pointUnits = None
+        self.daylightCoefficientsJob = None
+        self.imageTiles = []
         
         self.hb_writeRADAUX = sc.sticky["honeybee_WriteRADAUX"]()
         self.hb_RADMaterialAUX = sc.sticky["honeybee_RADMaterialAUX"]
@@ -1959,48 +2769,136 @@ class hb_WriteRAD(object):
             for v in flattenPtsNormals: v.Transform(transform)    
     
         numOfPoints = len(flattenTestPoints)
-    
-        if numOfCPUs > numOfPoints: numOfCPUs = numOfPoints
-
-        if numOfCPUs > 1:
-            ptsEachCpu = int(numOfPoints/(numOfCPUs))
-            remainder = numOfPoints%numOfCPUs
-        else:		
-            ptsEachCpu = numOfPoints		
-            remainder = 0
-    
-        lenOfPts = []
         
-        for cpuCount in range(numOfCPUs):		
-            if cpuCount < remainder:		
-                lenOfPts.append(ptsEachCpu+1)		
-            else:		
-                lenOfPts.append(ptsEachCpu)
+        # split the points into contiguous units with about the same cost so the results
+        # can be joined in the same order. Daysim has a large overhead for each heading file
+        # so annual studies only get one unit for each CPU.
+        if analysisRecipe.type == 2: numOfUnits = numOfCPUs
+        else: numOfUnits = numOfCPUs * self.unitsPerCPU
+        
+        pointCosts = self.loadPointCosts(subWorkingDir, numOfPoints)
+        units = self.partitionPoints(numOfPoints, numOfUnits, pointCosts)
+        self.pointUnits = {"subWorkingDir": subWorkingDir, "points": numOfPoints, "units": units,
+                           "costs": [sum(pointCosts[st:end]) if pointCosts else end - st for st, end in units]}
+        
+        lenOfPts = [end - st for st, end in units]
         
         testPtsEachCPU = []
         
-        for cpuCount in range(numOfCPUs):
+        # Daysim only reads text sensor files
+        binaryPoints = self.binaryGridFiles and analysisRecipe.type != 2
+        
+        for cpuCount, (stPt, endPt) in enumerate(units):
             # write pts file
             ptsForThisCPU = []
             ptsFileName = os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.pts')
             
-            ptsFile = open(ptsFileName, "w")
-
-            for ptCount in range(sum(lenOfPts[:cpuCount]), sum(lenOfPts[:cpuCount+1])):
-                ptsFile.write(self.hb_writeRADAUX.testPtsStr(flattenTestPoints[ptCount], flattenPtsNormals[ptCount]))
-                ptsForThisCPU.append(flattenTestPoints[ptCount])
-
-            ptsFile.close()
+            if binaryPoints:
+                # the input format of rtrace -fd
+                values = array.array('d')
+                for ptCount in range(stPt, endPt):
+                    pt, v = flattenTestPoints[ptCount], flattenPtsNormals[ptCount]
+                    values.extend((pt.X, pt.Y, pt.Z, v.X, v.Y, v.Z))
+                    ptsForThisCPU.append(pt)
+                with open(ptsFileName, "wb") as ptsFile:
+                    ptsFile.write(values.tostring())
+            else:
+                ptsFile = open(ptsFileName, "w")
+                
+                for ptCount in range(stPt, endPt):
+                    ptsFile.write(self.hb_writeRADAUX.testPtsStr(flattenTestPoints[ptCount], flattenPtsNormals[ptCount]))
+                    ptsForThisCPU.append(flattenTestPoints[ptCount])
+                
+                ptsFile.close()
             
             testPtsEachCPU.append(ptsForThisCPU)        
             
         return testPtsEachCPU, lenOfPts
     
+    @staticmethod
+    def readTestPtFile(ptsFileName):
+        """Return an array('d') of 6 values for each test point of a binary or a text .pts file.
+        
+        Binary files are packed doubles without a header. They are found by their size
+        and the bytes that are not in a text file.
+        """
+        with open(ptsFileName, "rb") as ptsFile:
+            data = ptsFile.read()
+        
+        values = array.array('d')
+        if len(data) % 48 == 0 and re.search(r"[^\t\n\r\x20-\x7e]", data[:4800]):
+            values.fromstring(data)
+        else:
+            values.extend(map(float, data.split()))
+            if len(values) % 6 != 0:
+                raise ValueError("%s doesn't have 6 values for each test point."%ptsFileName)
+        return values
+    
+    @staticmethod
+    def partitionPoints(numOfPoints, numOfUnits, pointCosts = None):
+        """Split the points into contiguous [start, end] units with about the same total cost."""
+        numOfUnits = max(min(numOfUnits, numOfPoints), 1)
+        if not pointCosts or sum(pointCosts) <= 0: pointCosts = [1] * numOfPoints
+        totalCost = float(sum(pointCosts))
+        
+        units = []
+        stPt = 0
+        cost = 0
+        for unitCount in range(numOfUnits - 1):
+            targetCost = totalCost * (unitCount + 1) / numOfUnits
+            # each unit has at least one point
+            endPt = stPt + 1
+            cost += pointCosts[stPt]
+            lastEndPt = numOfPoints - (numOfUnits - unitCount - 1)
+            # add points as long as it gets the total cost closer to the target
+            while endPt < lastEndPt and cost + pointCosts[endPt] - targetCost <= targetCost - cost:
+                cost += pointCosts[endPt]
+                endPt += 1
+            units.append([stPt, endPt])
+            stPt = endPt
+        
+        units.append([stPt, numOfPoints])
+        return units
+    
+    def getTimingFile(self, subWorkingDir):
+        # subWorkingDir is cleaned before each run so the timings are saved next to it
+        subWorkingDir = subWorkingDir.rstrip("\\/")
+        return os.path.join(os.path.dirname(subWorkingDir), os.path.basename(subWorkingDir) + "_timing.json")
+    
+    def loadPointCosts(self, subWorkingDir, numOfPoints):
+        """Estimate the cost of each point from the run time of the units in the last run."""
+        timingFile = self.getTimingFile(subWorkingDir)
+        if not os.path.isfile(timingFile): return None
+        try:
+            with open(timingFile, "r") as inf:
+                timings = json.load(inf)
+            if timings["points"] != numOfPoints: return None
+            pointCosts = [0] * numOfPoints
+            for stPt, endPt, wallTime in timings["units"]:
+                for ptCount in range(stPt, endPt):
+                    pointCosts[ptCount] = float(wallTime) / (endPt - stPt)
+            return pointCosts
+        except Exception, e:
+            print "Failed to read the timings of the last run: %s"%str(e)
+            return None
+    
+    def saveUnitTimings(self, jobs):
+        if not self.pointUnits or len(jobs) != len(self.pointUnits["units"]): return
+        if not all(job.succeeded for job in jobs): return
+        timings = {"points": self.pointUnits["points"],
+                   "units": [[stPt, endPt, job.wallTime] for (stPt, endPt), job \
+                             in zip(self.pointUnits["units"], jobs)]}
+        try:
+            with open(self.getTimingFile(self.pointUnits["subWorkingDir"]), "w") as outf:
+                json.dump(timings, outf)
+        except Exception, e:
+            print "Failed to save the timings of the run: %s"%str(e)
+    
     def writeBatchFiles(self, subWorkingDir, radFileName, radSkyFileName, \
                         radFileFullName, materialFileName, \
                         numOfCPUs, testPtsEachCPU, \
                         lenOfPts, analysisRecipe, additionalRadFiles, \
-                        readyOCTFile = None, runOverture = True):
+                        readyOCTFile = None, runOverture = True, daylightCoefficients = None):
         
         batchFiles = []
         fileNames = [] # list of only names of the files
@@ -2163,6 +3061,11 @@ class hb_WriteRAD(object):
             return initBatchFileName, batchFiles, fileNames, pcompFileName, DSResultFilesAddress
         
         ######################## NOT ANNUAL SIMULATION #######################
+        if daylightCoefficients != None and analysisRecipe.type != 0:
+            return self.writeDaylightCoefficientBatchFiles(subWorkingDir, radFileName, radSkyFileName, \
+                        radFileFullName, materialFileName, numOfCPUs, lenOfPts, analysisRecipe, \
+                        additionalRadFiles, daylightCoefficients)
+        
         # 3.  write the batch file
         HDRFileAddress = []
         if analysisRecipe.type == 0:
@@ -2230,6 +3133,7 @@ class hb_WriteRAD(object):
 
             fileNames = []
             HDRPieces = {}
+            self.imageTiles = []
             for cpuCount in range(numOfCPUs):
                 # create a batch file
                 batchFileName = os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '_IMG.bat')
@@ -2295,6 +3199,10 @@ class hb_WriteRAD(object):
                             .format(mergedName.replace('.HDR', '_temp.HDR'), originalView, mergedName)
                         # add original view
                         pcompFile.write(pfiltLine)
+                        
+                        # the same merge is done in Python when the batch files are executed
+                        self.imageTiles.append(([os.path.join(subWorkingDir, piece.replace('.HDR', '.unf')) for piece in pieces], \
+                                                nXDiv, os.path.join(subWorkingDir, mergedName), originalView))
 
             return initBatchFileName, batchFiles, fileNames, pcompFileName, HDRFileAddress
                         
@@ -2316,7 +3224,7 @@ class hb_WriteRAD(object):
                 batchFile.write("cd " + subWorkingDir + "\n")
                 
                 # 3.4. add rtrace lin
-                RTRACELine = self.hb_writeRADAUX.rtraceLine(radFileName, OCTFileName, analysisRecipe.radParameters, int(analysisRecipe.simulationType), cpuCount)
+                RTRACELine = self.hb_writeRADAUX.rtraceLine(radFileName, OCTFileName, analysisRecipe.radParameters, int(analysisRecipe.simulationType), cpuCount, self.binaryGridFiles)
                 batchFile.write(RTRACELine)
                 
                 # close the file
@@ -2325,6 +3233,155 @@ class hb_WriteRAD(object):
             
             return initBatchFileName, batchFiles, fileNames, pcompFileName, RADResultFilesAddress
         
+    def writeDaylightCoefficientBatchFiles(self, subWorkingDir, radFileName, radSkyFileName, \
+                                           radFileFullName, materialFileName, numOfCPUs, lenOfPts, \
+                                           analysisRecipe, additionalRadFiles, daylightCoefficients):
+        """
+        Write the batch files of a grid-based study in daylight coefficient mode.
+        
+        rcontrib only runs if the matrix of the scene is not in the cache. The results of the sky
+        are calculated in collectResults and written to the same .res files that rtrace writes.
+        """
+        dc = daylightCoefficients
+        simulationType = int(analysisRecipe.simulationType)
+        OCTFileName = radFileName + '_DC'
+        
+        sceneRadFiles = [materialFileName, dc.writeSkyPatchFile(subWorkingDir, radFileName), radFileFullName]
+        if additionalRadFiles:
+            sceneRadFiles.extend([f for f in additionalRadFiles if f != None])
+        
+        ptsFiles = [os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.pts') for cpuCount in range(numOfCPUs)]
+        parameters = sorted(analysisRecipe.radParameters.items())
+        key = dc.getKey(sceneRadFiles + ptsFiles, parameters, simulationType == 2)
+        isCached = dc.isCached(key, sum(lenOfPts))
+        
+        self.daylightCoefficientsJob = {"daylightCoefficients": dc, "key": key, "cached": isCached, \
+            "skyFile": radSkyFileName, "lenOfPts": lenOfPts, \
+            "dcFiles": [os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.dc') for cpuCount in range(numOfCPUs)]}
+        
+        if isCached: print "The daylight coefficients of the scene are read from the cache."
+        else: print "The daylight coefficients of the scene will be calculated for %d sky patches."%dc.binCount
+        
+        pathStr = "SET RAYPATH=.;" + self.hb_RADLibPath + "\nPATH=" + self.hb_RADPath + ";$PATH\n"
+        headerStr = pathStr + os.path.splitdrive(subWorkingDir)[0] + "\n" + "cd " + subWorkingDir + "\n"
+        
+        initBatchFileName = os.path.join(subWorkingDir, radFileName + '_DCInit.bat')
+        with open(initBatchFileName, "w") as batchFile:
+            batchFile.write(headerStr)
+            if not isCached: batchFile.write(self.hb_writeRADAUX.oconvLine(OCTFileName, sceneRadFiles))
+        
+        batchFiles = []
+        fileNames = []
+        RADResultFilesAddress = []
+        for cpuCount in range(numOfCPUs):
+            batchFileName = os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '_DC.bat')
+            batchFiles.append(batchFileName)
+            fileNames.append(batchFileName.split("\\")[-1])
+            RADResultFilesAddress.append(os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.res'))
+            
+            with open(batchFileName, "w") as batchFile:
+                batchFile.write(headerStr)
+                if not isCached:
+                    batchFile.write(self.hb_writeRADAUX.rcontribLine(radFileName, OCTFileName, \
+                        analysisRecipe.radParameters, simulationType, cpuCount, \
+                        dc.skyDivisions, dc.binCount, dc.modifier, self.binaryGridFiles))
+        
+        return initBatchFileName, batchFiles, fileNames, "", RADResultFilesAddress
+    
+    def writeDaylightCoefficientResults(self, subWorkingDir, expectedResultFiles):
+        """Multiply the daylight coefficients by the sky of the study and write the .res files."""
+        job = self.daylightCoefficientsJob
+        dc = job["daylightCoefficients"]
+        if not job["cached"]:
+            if not dc.save(job["key"], job["dcFiles"], sum(job["lenOfPts"])): return
+            for dcFile in job["dcFiles"]:
+                try: os.remove(dcFile)
+                except: pass
+        
+        startTime = time.time()
+        try:
+            skyVector = dc.getSkyVector(job["skyFile"], subWorkingDir, self.hb_RADPath, self.hb_RADLibPath)
+        except Exception, e:
+            print "Failed to calculate the sky vector:\n%s"%str(e)
+            return
+        dc.writeResults(job["key"], skyVector, expectedResultFiles, job["lenOfPts"], self.binaryGridFiles)
+        print "The sky is calculated from the daylight coefficients in %.2f seconds."%(time.time() - startTime)
+    
+    def runRtracePool(self, subWorkingDir, radFileName, radSkyFileName, radFileFullName, materialFileName, \
+                      additionalRadFiles, analysisRecipe, numOfUnits, lenOfPts, numOfCPUs):
+        """
+        Trace the test points of a grid-based study with the running rtrace processes of its scene.
+        
+        The octree and the ambient file are kept in rtracePool in the Honeybee folder since the
+        study folder is cleaned before each run. The results are written as binary .res files.
+        """
+        sceneRadFiles = [materialFileName, radSkyFileName, radFileFullName]
+        if additionalRadFiles:
+            sceneRadFiles.extend([f for f in additionalRadFiles if f != None])
+        
+        radParameters = analysisRecipe.radParameters
+        if int(analysisRecipe.simulationType) == 2: rtraceOptions = []
+        else: rtraceOptions = ["-I"]
+        for par in ("_dp_", "_ds_", "_dt_", "_dc_", "_dr_", "_st_", "_lr_", "_lw_", "_ab_", "_ad_", "_as_", "_ar_", "_aa_"):
+            rtraceOptions.extend(["-" + par.strip("_"), str(radParameters[par])])
+        if radParameters.has_key("additional"):
+            for par in radParameters["additional"]: rtraceOptions.extend(("-" + par).split())
+        rtraceOptions.extend(["-af", "scene.amb"])
+        
+        # the ambient files are only valid for the same scene, the files that it references
+        # and the parameters. References that can't be found are only added by their names.
+        md5 = hashlib.md5()
+        unresolved = hb_RADResultCache.updateHash(md5, sceneRadFiles, [subWorkingDir, self.hb_RADLibPath])
+        md5.update(repr(sorted(set(unresolved))))
+        md5.update(repr(rtraceOptions))
+        sceneKey = md5.hexdigest()
+        
+        poolsFolder = os.path.join(sc.sticky["Honeybee_DefaultFolder"], "rtracePool")
+        poolFolder = os.path.join(poolsFolder, sceneKey)
+        env = hb_RtracePool.getEnvironment(self.hb_RADPath, self.hb_RADLibPath)
+        
+        def createOctree():
+            # remove the folders of the scenes that don't have running processes
+            activeFolders = [os.path.dirname(pool.octFile) for pool in sc.sticky.get("honeybee_RtracePools", {}).values()]
+            if os.path.isdir(poolsFolder):
+                for folderName in os.listdir(poolsFolder):
+                    folder = os.path.join(poolsFolder, folderName)
+                    if folder != poolFolder and folder not in activeFolders:
+                        shutil.rmtree(folder, True)
+            
+            octFile = os.path.join(poolFolder, "scene.oct")
+            if not os.path.isfile(octFile):
+                if not os.path.isdir(poolFolder): os.makedirs(poolFolder)
+                p = subprocess.Popen(self.hb_writeRADAUX.oconvLine("scene", sceneRadFiles).strip(), shell = True, \
+                                     cwd = poolFolder, env = env, stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+                err = p.communicate()[1]
+                if p.returncode != 0:
+                    if os.path.isfile(octFile): os.remove(octFile)
+                    raise Exception("oconv failed:\n" + err)
+            return octFile
+        
+        rays = array.array('d')
+        for cpuCount in range(numOfUnits):
+            ptsFileName = os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.pts')
+            rays.extend(self.readTestPtFile(ptsFileName))
+        
+        startTime = time.time()
+        try:
+            pool = hb_RtracePool.getPool(sceneKey, createOctree, rtraceOptions, numOfCPUs, env)
+            values = pool.trace(rays)
+        except Exception, e:
+            print "Failed to run the rtrace processes:\n%s"%str(e)
+            return
+        
+        stPt = 0
+        for cpuCount, pointCount in enumerate(lenOfPts):
+            resultFile = os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.res')
+            hb_RtracePool.writeResultFile(resultFile, values[3 * stPt: 3 * (stPt + pointCount)])
+            stPt += pointCount
+        
+        print "%d test points were traced by %d running rtrace processes in %.2f seconds."% \
+              (stPt, len(pool.processes), time.time() - startTime)
+    
     def executeBatchFiles(self, batchFileNames, maxPRuns = None, shell = False, waitingTime = 0.5):
     
         """Run a number of batch files in parallel and
@@ -2334,57 +3391,73 @@ class hb_WriteRAD(object):
                 batchFileNames: List of batch files
                 maxPRuns: max number of files to be ran in parallel (default = 0)
                 shell: set to True if you do NOT want to see the cmd window while the analysis is runnig
+                waitingTime: Not used. Jobs start as soon as a running job finishes.
+            Returns:
+                A list of hb_BatchJob with the status, exit code, stderr and wall time of each file.
+                stderr of each job is also written to a .err file next to the batch file.
         """
-    
-        if not maxPRuns : maxPRuns = 1
-        maxPRuns = int(maxPRuns)
-        total = len(batchFileNames)
-        
-        if maxPRuns < 1: maxPRuns = 1
-        if maxPRuns > total: maxPRuns = total
         
-        running = 0
-        done = False
-        jobs = []
-        pid = 0
+        if not maxPRuns : maxPRuns = 1
+        maxPRuns = min(int(maxPRuns), len(batchFileNames))
         
         try:
-            while not done:
-                if running < maxPRuns and pid < total:
-                    # execute the files
-                    jobs.append(subprocess.Popen(batchFileNames[pid].replace("\\", "/") , shell = shell))
-                    pid+=1
-                    time.sleep(waitingTime)
-                
-                # count how many jobs are running and how many are done
-                running = 0
-                finished = 0
-                for job in jobs:
-                    if job.poll() is None:
-                        #one job is still running
-                        running += 1
-                    else:
-                        finished += 1
+            jobs = hb_JobScheduler(maxPRuns, shell).run(batchFileNames)
+        except Exception, e:
+            print "Something went wrong: %s"%str(e)
+            return []
         
-                if running == maxPRuns:
-                    # wait for half a second
-                    #print "waiting..."
-                    time.sleep(waitingTime)
+        failedJobs = []
+        for job in jobs:
+            if job.stderr.strip() or not job.succeeded: job.writeLog()
+            if not job.succeeded: failedJobs.append(job)
         
-                if finished ==  total:
-                    done = True
+        if failedJobs:
+            print "%d of %d batch files failed:"%(len(failedJobs), len(jobs))
+            for job in failedJobs:
+                print "%s [%s, exit code %s]. See %s\n%s"%(job.name, job.status, str(job.returnCode), \
+                                                          job.logFile, job.stderr.strip())
         
-        except Exception, e:
-            print "Something went wrong: %s"%str(e) 
+        return jobs
     
     def runBatchFiles(self, initBatchFileName, batchFileNames, fileNames, \
-                      pcompBatchFile, waitingTime, runInBackground = False):
+                      pcompBatchFile, waitingTime, runInBackground = False, numOfCPUs = None):
+        
+        """Run the batch files of the study and return the jobs that failed."""
+        if not numOfCPUs: numOfCPUs = len(batchFileNames)
         
-        self.executeBatchFiles([initBatchFileName], maxPRuns = 1, shell = runInBackground, waitingTime = waitingTime)
-        self.executeBatchFiles(batchFileNames, maxPRuns = len(batchFileNames), shell = runInBackground, waitingTime = waitingTime)
+        initJobs = self.executeBatchFiles([initBatchFileName], maxPRuns = 1, shell = runInBackground, waitingTime = waitingTime)
+        
+        # start the most expensive units first so the cheap ones fill the gaps at the end
+        runOrder = range(len(batchFileNames))
+        if self.pointUnits and len(self.pointUnits["costs"]) == len(batchFileNames):
+            runOrder.sort(key = lambda unitCount: -self.pointUnits["costs"][unitCount])
+        
+        jobs = self.executeBatchFiles([batchFileNames[unitCount] for unitCount in runOrder], \
+                                      maxPRuns = numOfCPUs, shell = runInBackground, waitingTime = waitingTime)
+        
+        if len(jobs) == len(batchFileNames):
+            jobsByUnit = [None] * len(jobs)
+            for unitCount, job in zip(runOrder, jobs): jobsByUnit[unitCount] = job
+            self.saveUnitTimings(jobsByUnit)
+        
+        failedJobs = [job for job in initJobs + jobs if not job.succeeded]
         
         if pcompBatchFile!="":
-            os.system(pcompBatchFile) # put all the files together
+            # put all the files together
+            try:
+                if not self.imageTiles: raise Exception("The pieces of the images are unknown.")
+                self.composeImageTiles()
+            except Exception, e:
+                print "Failed to merge the pieces of the images in Python. Running pcompos instead.\n%s"%str(e)
+                os.system(pcompBatchFile)
+        
+        return failedJobs
+    
+    def composeImageTiles(self):
+        """Merge the pieces of the rendered images without running pcompos and pfilt."""
+        hb_RGBEImage = sc.sticky["honeybee_RGBEImage"]
+        for tileFiles, columns, mergedFile, view in self.imageTiles:
+            hb_RGBEImage.composeTiles(tileFiles, columns, mergedFile, view)
         
     def collectResults(self, subWorkingDir, radFileName, numOfCPUs, analysisRecipe, expectedResultFiles):
         
@@ -2447,6 +3520,9 @@ class hb_WriteRAD(object):
         else:
             RADResultFilesAddress = expectedResultFiles
             # grid-based analysis
+            if self.daylightCoefficientsJob != None:
+                self.writeDaylightCoefficientResults(subWorkingDir, expectedResultFiles)
+            
             numRes = 0
             files = os.listdir(subWorkingDir)
             for file in files:
@@ -3174,7 +4250,7 @@ class hb_WriteRADAUX(object):
            "ra_gif " + projectName + "_" + viewName + "_FalseColored.pic " + projectName + "_" + viewName + "_FalseColored.gif\n"
         return line
 
-    def rtraceLine(self, projectName, octFileName, radParameters, simulationType = 0, cpuCount = 0):
+    def rtraceLine(self, projectName, octFileName, radParameters, simulationType = 0, cpuCount = 0, binaryFiles = False):
         ptsFile = projectName + "_" + str(cpuCount) + ".pts"
         outputFile = projectName + "_" + str(cpuCount) + ".res"
         if simulationType == 0:
@@ -3184,8 +4260,12 @@ class hb_WriteRADAUX(object):
         else:
             # print "Fix this for radiation analysis"
             line0 = "rtrace -I "
+        
+        # binary files keep the header of rtrace so the format of the results is known
+        if binaryFiles: line0 += "-fdf "
+        else: line0 += "-h "
             
-        line1_1 = " -h -dp " + str(radParameters["_dp_"]) + \
+        line1_1 = " -dp " + str(radParameters["_dp_"]) + \
                 " -ds " + str(radParameters["_ds_"]) + " -dt " + str(radParameters["_dt_"]) + \
                 " -dc " + str(radParameters["_dc_"]) + " -dr " + str(radParameters["_dr_"]) + \
                 " -st " + str(radParameters["_st_"]) + " -lr " + str(radParameters["_lr_"]) + \
@@ -3202,6 +4282,38 @@ class hb_WriteRADAUX(object):
                   " > " + outputFile + "\n"
         
         return line0 + line1_1 + line1_2 + line1_3
+    
+    def rcontribLine(self, projectName, octFileName, radParameters, simulationType = 0, cpuCount = 0, \
+                     skyDivisions = 1, binCount = 146, modifier = "hb_skyPatch", binaryPoints = False):
+        """Calculate the daylight coefficients of the sky patches for the test points of a work unit."""
+        ptsFile = projectName + "_" + str(cpuCount) + ".pts"
+        outputFile = projectName + "_" + str(cpuCount) + ".dc"
+        if simulationType == 2:
+            line0 = "rcontrib -I- "
+        else:
+            line0 = "rcontrib -I+ "
+        
+        if binaryPoints: line0 += "-fdf "
+        else: line0 += "-faf "
+        
+        # there is no ambient cache in rcontrib so -aa, -ar and -as are not used
+        line1_1 = " -h -dp " + str(radParameters["_dp_"]) + \
+                " -ds " + str(radParameters["_ds_"]) + " -dt " + str(radParameters["_dt_"]) + \
+                " -dc " + str(radParameters["_dc_"]) + " -dr " + str(radParameters["_dr_"]) + \
+                " -st " + str(radParameters["_st_"]) + " -lr " + str(radParameters["_lr_"]) + \
+                " -lw " + str(radParameters["_lw_"]) + " -ab " + str(radParameters["_ab_"]) + \
+                " -ad " + str(radParameters["_ad_"])
+        
+        line1_2 = " "
+        if radParameters.has_key("additional"):
+            for par in radParameters["additional"]:
+                line1_2 += "-%s  "%par
+        
+        line1_3 = " -e MF:" + str(skyDivisions) + " -f reinhart.cal -b rbin -bn " + str(binCount) + \
+                  " -m " + modifier + " " + octFileName + ".oct < " + ptsFile + \
+                  " > " + outputFile + " 2>> error.log\n"
+        
+        return line0 + line1_1 + line1_2 + line1_3
         
     def testPtsStr(self, testPoint, ptsNormal):
         return  '%.4f'%testPoint.X + '\t' + \
@@ -3240,6 +4352,1303 @@ class hb_WriteRADAUX(object):
         else:
             return False
 
+class hb_DaylightCoefficients(object):
+    """
+    Daylight coefficient (matrix) mode for grid-based studies.
+    
+    rcontrib calculates the contribution of each sky patch to each test point once for a
+    scene. The matrix is cached on disk by the hash of the scene, the test points and the
+    Radiance parameters so a new sky only needs a sky vector and a matrix-vector product.
+    
+    The sky patches follow reinhart.cal: bin 0 is the ground, the sky bins start at the
+    horizon and go up row by row and the first patch of each row is centered on north (+Y)
+    with the next patches going towards east (+X).
+    
+    Args:
+        skyDivisions: Subdivisions of each Tregenza patch (MF in reinhart.cal). 1 is the 145
+            Tregenza patches and 2 is the 577 Reinhart patches.
+        cacheFolder: Optional folder for the matrices. Default is daylightCoefficients in the
+            Honeybee default folder.
+    """
+    cacheVersion = 1
+    extension = ".dc"
+    modifier = "hb_skyPatch"
+    tregenzaRows = (30, 30, 24, 24, 18, 12, 6)
+    
+    def __init__(self, skyDivisions = 1, cacheFolder = None):
+        if not cacheFolder:
+            cacheFolder = os.path.join(sc.sticky["Honeybee_DefaultFolder"], "daylightCoefficients")
+        self.cacheFolder = cacheFolder
+        self.skyDivisions = max(int(skyDivisions), 1)
+        
+        # [minimum altitude, maximum altitude, number of patches] of each row in radians
+        rowCount = 7 * self.skyDivisions
+        rowAngle = math.radians(90.0 / (rowCount + 0.5))
+        self.rows = [[row * rowAngle, (row + 1) * rowAngle, \
+                      self.skyDivisions * self.tregenzaRows[row // self.skyDivisions]] \
+                     for row in range(rowCount)]
+        self.rows.append([rowCount * rowAngle, math.pi / 2, 1])
+        self.rowAngle = rowAngle
+        
+        self.binCount = 1 + sum(row[2] for row in self.rows)
+    
+    def getBin(self, x, y, z):
+        """Return the bin of a direction the same way as rbin in reinhart.cal."""
+        length = math.sqrt(x * x + y * y + z * z)
+        if z <= 0 or length == 0: return 0
+        
+        rowIndex = min(int(math.asin(min(z / length, 1)) / self.rowAngle), len(self.rows) - 1)
+        binNumber = 1 + sum(row[2] for row in self.rows[:rowIndex])
+        patchCount = self.rows[rowIndex][2]
+        azimuth = math.atan2(x, y) % (2 * math.pi)
+        return binNumber + int(math.floor(azimuth * patchCount / (2 * math.pi) + 0.5)) % patchCount
+    
+    def getPatches(self):
+        """Return [minimum altitude, maximum altitude, azimuth center, azimuth width] of each bin."""
+        patches = [[-math.pi / 2, 0, 0, 2 * math.pi]]
+        for minAlt, maxAlt, patchCount in self.rows:
+            width = 2 * math.pi / patchCount
+            for patch in range(patchCount):
+                patches.append([minAlt, maxAlt, patch * width, width])
+        return patches
+    
+    @staticmethod
+    def getSolidAngle(patch):
+        minAlt, maxAlt, azimuth, width = patch
+        return width * (math.sin(maxAlt) - math.sin(minAlt))
+    
+    @staticmethod
+    def getSampleDirections(patch, samples):
+        """Return samples x samples directions which are evenly spread over the solid angle of a patch."""
+        minAlt, maxAlt, azimuth, width = patch
+        sinMin, sinMax = math.sin(minAlt), math.sin(maxAlt)
+        directions = []
+        for i in range(samples):
+            alt = math.asin(sinMin + (i + 0.5) * (sinMax - sinMin) / samples)
+            for j in range(samples):
+                azi = azimuth + width * ((j + 0.5) / samples - 0.5)
+                directions.append((math.sin(azi) * math.cos(alt), math.cos(azi) * math.cos(alt), math.sin(alt)))
+        return directions
+    
+    def writeSkyPatchFile(self, subWorkingDir, radFileName):
+        """Write the sky and the ground of the scene as a single glow with a radiance of 1."""
+        skyPatchFileName = os.path.join(subWorkingDir, radFileName + '_skyPatches.rad')
+        with open(skyPatchFileName, "w") as skyPatchFile:
+            skyPatchFile.write("void glow " + self.modifier + "\n0\n0\n4 1 1 1 0\n\n" + \
+                               self.modifier + " source hb_sky\n0\n0\n4 0 0 1 180\n\n" + \
+                               self.modifier + " source hb_ground\n0\n0\n4 0 0 -1 180\n")
+        return skyPatchFileName
+    
+    def getKey(self, filePaths, *parameters):
+        """Return the hash of the content of the scene and point files and the parameters."""
+        md5 = hashlib.md5()
+        md5.update("%d,%d,%d"%(self.cacheVersion, self.skyDivisions, self.binCount))
+        for filePath in filePaths:
+            md5.update("|" + os.path.basename(filePath).split(".")[-1])
+            with open(filePath, "rb") as inf:
+                while True:
+                    chunk = inf.read(1048576)
+                    if not chunk: break
+                    md5.update(chunk)
+        md5.update(repr(parameters))
+        return md5.hexdigest()
+    
+    def getFilePath(self, key):
+        return os.path.join(self.cacheFolder, key + self.extension)
+    
+    def isCached(self, key, pointCount):
+        cacheFile = self.getFilePath(key)
+        return os.path.isfile(cacheFile) and \
+               os.path.getsize(cacheFile) == pointCount * self.binCount * 12
+    
+    def save(self, key, dcFiles, pointCount):
+        """Join the matrices of the work units into the cache. Return True if it succeeds."""
+        cacheFile = self.getFilePath(key)
+        try:
+            if not os.path.isdir(self.cacheFolder): os.makedirs(self.cacheFolder)
+            tempFile = cacheFile + ".tmp"
+            with open(tempFile, "wb") as outf:
+                for dcFile in dcFiles:
+                    with open(dcFile, "rb") as inf:
+                        shutil.copyfileobj(inf, outf, 1048576)
+            if os.path.getsize(tempFile) != pointCount * self.binCount * 12:
+                os.remove(tempFile)
+                print "The daylight coefficient files don't have the expected size. Check error.log."
+                return False
+            if os.path.isfile(cacheFile): os.remove(cacheFile)
+            os.rename(tempFile, cacheFile)
+            return True
+        except Exception, e:
+            print "Failed to write the daylight coefficients to %s:\n%s"%(cacheFile, e)
+            return False
+    
+    def readRows(self, key):
+        """Yield the RGB coefficients of each test point as an array of binCount * 3 floats."""
+        rowSize = self.binCount * 12
+        with open(self.getFilePath(key), "rb") as inf:
+            while True:
+                rowBytes = inf.read(rowSize)
+                if len(rowBytes) < rowSize: break
+                yield array.array('f', rowBytes)
+    
+    @staticmethod
+    def readRADPrimitives(radText):
+        """Return the [modifier, type, name, strings, integers, reals] of each primitive in a text."""
+        tokens = []
+        for line in radText.split("\n"):
+            line = line.strip()
+            if line and not line.startswith("#"): tokens.extend(line.split())
+        
+        primitives = []
+        count = 0
+        while count + 3 < len(tokens):
+            primitive = tokens[count:count + 3]
+            count += 3
+            for argType in range(3):
+                argCount = int(tokens[count])
+                primitive.append(tokens[count + 1: count + 1 + argCount])
+                count += 1 + argCount
+            primitives.append(primitive)
+        return primitives
+    
+    @staticmethod
+    def writeRADPrimitive(primitive):
+        modifier, primType, name, strings, integers, reals = primitive
+        return "%s %s %s\n%d %s\n%d %s\n%d %s\n\n"%(modifier, primType, name, \
+            len(strings), " ".join(strings), len(integers), " ".join(integers), \
+            len(reals), " ".join(reals))
+    
+    def getSkyVector(self, skyFile, subWorkingDir, RADPath, RADLibPath, samples = 4):
+        """
+        Return the average RGB radiance of each sky patch as a flat list of binCount * 3 values.
+        
+        The sky is sampled with rtrace and the suns are added to the patches that they fall in
+        since the samples are not dense enough to find a half-degree sun.
+        """
+        env = hb_RtracePool.getEnvironment(RADPath, RADLibPath)
+        
+        def runCommand(command, inputText = None):
+            p = subprocess.Popen(command, shell = True, cwd = subWorkingDir, env = env, \
+                                 stdin = subprocess.PIPE, stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+            out, err = p.communicate(inputText)
+            if p.returncode != 0:
+                raise Exception("%s failed:\n%s"%(command.split()[0], err))
+            return out
+        
+        # run the generators in the sky file
+        skyLines = []
+        with open(skyFile, "r") as skyIn:
+            for line in skyIn:
+                if line.strip().startswith("!"): skyLines.append(runCommand(line.strip()[1:]))
+                else: skyLines.append(line)
+        primitives = self.readRADPrimitives("\n".join(skyLines))
+        
+        # separate the suns from the sky
+        lights = dict((p[2], p) for p in primitives if p[1] == "light")
+        suns = []
+        skyPrimitives = []
+        for primitive in primitives:
+            if primitive[1] == "source" and primitive[0] in lights and float(primitive[5][3]) < 5:
+                suns.append(([float(v) for v in lights[primitive[0]][5][:3]], \
+                             [float(v) for v in primitive[5][:4]]))
+            else:
+                skyPrimitives.append(primitive)
+        
+        skyVector = [0.0] * (self.binCount * 3)
+        patches = self.getPatches()
+        
+        # sample the sky
+        skyRADFile = os.path.join(subWorkingDir, "skyVector.rad")
+        with open(skyRADFile, "w") as outf:
+            for primitive in skyPrimitives: outf.write(self.writeRADPrimitive(primitive))
+        runCommand("oconv -f skyVector.rad > skyVector.oct")
+        
+        rays = []
+        for patch in patches:
+            for x, y, z in self.getSampleDirections(patch, samples):
+                rays.append("0 0 0 %.6f %.6f %.6f\n"%(x, y, z))
+        values = runCommand("rtrace -h -ab 0 -ov skyVector.oct", "".join(rays)).split()
+        
+        samplesPerPatch = samples * samples
+        for count in range(len(values) // 3):
+            binNumber = count // samplesPerPatch
+            for channel in range(3):
+                skyVector[3 * binNumber + channel] += float(values[3 * count + channel]) / samplesPerPatch
+        
+        # add the suns
+        for (r, g, b), (x, y, z, angle) in suns:
+            binNumber = self.getBin(x, y, z)
+            sunSolidAngle = 2 * math.pi * (1 - math.cos(math.radians(angle) / 2))
+            factor = sunSolidAngle / self.getSolidAngle(patches[binNumber])
+            for channel, value in enumerate((r, g, b)):
+                skyVector[3 * binNumber + channel] += value * factor
+        
+        return skyVector
+    
+    def writeResults(self, key, skyVector, resultFiles, lenOfPts, binaryFiles = False):
+        """Write the product of the matrix and a sky vector to the rtrace result file of each work unit."""
+        skyR, skyG, skyB = skyVector[0::3], skyVector[1::3], skyVector[2::3]
+        mul = operator.mul
+        rows = self.readRows(key)
+        for resultFile, pointCount in zip(resultFiles, lenOfPts):
+            values = []
+            for count in range(pointCount):
+                row = rows.next()
+                values.extend((sum(map(mul, row[0::3], skyR)), sum(map(mul, row[1::3], skyG)), \
+                               sum(map(mul, row[2::3], skyB))))
+            if binaryFiles:
+                hb_RtracePool.writeResultFile(resultFile, values)
+            else:
+                with open(resultFile, "w") as outf:
+                    outf.write("".join(["%e\t%e\t%e\t\n"%tuple(values[3 * i: 3 * i + 3]) for i in range(pointCount)]))
+
+
+class hb_RADResultCache(object):
+    """
+    Content-addressed disk cache of the results of grid-based and image-based studies.
+    
+    The key of a study is the hash of the written scene files, the files that they reference
+    (function files, data files, pictures, fonts, octrees and scene files of inline commands),
+    the sky, the test points, the Radiance parameters and the view lines of the batch files,
+    so an identical study returns the stored .res or .HDR files without running Radiance.
+    There is no key and the study is not cached if a referenced file can't be found. The least
+    recently used studies are removed when the cache grows past maxSize.
+    
+    Args:
+        cacheFolder: Optional folder for the cache. Default is radianceResultCache in the
+            Honeybee default folder.
+        maxSize: Maximum size of the cache in bytes. Default is 2 GB.
+        searchFolders: Folders that Radiance searches for the referenced files, which are
+            the folder that the study runs in and the folders in RAYPATH. Default is the
+            Radiance library folder.
+    """
+    cacheVersion = 2
+    
+    # files that a scene can reference. Scene files are searched for references too.
+    referenceExtensions = ('.cal', '.dat', '.hdr', '.pic', '.unf', '.tif', '.xml', '.oct', \
+                           '.rtm', '.fnt', '.txt', '.rad', '.mat', '.sky')
+    sceneExtensions = ('.rad', '.mat', '.sky')
+    # function files that the output of the sky generators references
+    commandReferences = {'gensky': ['skybright.cal'], 'gendaylit': ['perezlum.cal']}
+    # quick check for the scene files that don't have any references
+    referencePattern = re.compile(r"^\s*!|\.(?:%s)\b"%"|".join(ext[1:] for ext in referenceExtensions), \
+                                  re.M | re.I)
+    
+    def __init__(self, cacheFolder = None, maxSize = 2 * 1024 ** 3, searchFolders = None):
+        if not cacheFolder:
+            cacheFolder = os.path.join(sc.sticky["Honeybee_DefaultFolder"], "radianceResultCache")
+        if searchFolders is None:
+            searchFolders = [sc.sticky["honeybee_folders"]["RADLibPath"]]
+        self.cacheFolder = cacheFolder
+        self.maxSize = maxSize
+        self.searchFolders = searchFolders
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+    
+    @classmethod
+    def getReferences(cls, sceneText):
+        """Return the names of the files that a Radiance scene references.
+        
+        The names are the string arguments of the primitives and the arguments of the inline
+        commands that end with one of referenceExtensions, and the function files that the
+        output of the sky generators needs.
+        """
+        tokens = []
+        references = []
+        for line in sceneText.splitlines():
+            line = line.strip()
+            if line.startswith('#'): continue
+            elif line.startswith('!'):
+                command = line[1:].split()
+                if not command: continue
+                program = os.path.splitext(os.path.basename(command[0]))[0].lower()
+                references.extend(cls.commandReferences.get(program, []))
+                references.extend(command[1:])
+            else: tokens.extend(line.split())
+        
+        # modifier, type and identifier of each primitive are followed by the number of
+        # string arguments, the strings, and the integer and real arguments
+        count = 0
+        try:
+            while count < len(tokens):
+                stringCount = int(tokens[count + 3])
+                references.extend(tokens[count + 4: count + 4 + stringCount])
+                count += 4 + stringCount
+                count += 1 + int(tokens[count])
+                count += 1 + int(tokens[count])
+        except (ValueError, IndexError):
+            # not a valid scene. Check all the words.
+            references.extend(tokens)
+        
+        return [reference for reference in references \
+                if reference.lower().endswith(cls.referenceExtensions)]
+    
+    @staticmethod
+    def findFile(fileName, folders):
+        """Find a file the way that Radiance does with RAYPATH. Returns None if it's not found."""
+        if os.path.isabs(fileName):
+            return fileName if os.path.isfile(fileName) else None
+        for folder in folders:
+            filePath = os.path.join(folder, fileName)
+            if os.path.isfile(filePath): return filePath
+        return None
+    
+    @classmethod
+    def updateHash(cls, md5, filePaths, searchFolders):
+        """Add the content of the files and the files that they reference to a hash.
+        
+        Returns the list of the referenced files that can't be found in searchFolders.
+        """
+        unresolved = []
+        hashedFiles = set()
+        
+        def addFile(filePath):
+            md5.update("|%s|"%os.path.basename(filePath).split(".")[-1])
+            if not filePath.lower().endswith(cls.sceneExtensions):
+                with open(filePath, "rb") as inf:
+                    while True:
+                        chunk = inf.read(1048576)
+                        if not chunk: break
+                        md5.update(chunk)
+                return
+            
+            with open(filePath, "rb") as inf:
+                sceneText = inf.read()
+            md5.update(sceneText)
+            if not cls.referencePattern.search(sceneText): return
+            
+            for reference in cls.getReferences(sceneText):
+                referencePath = cls.findFile(reference, searchFolders)
+                if referencePath is None:
+                    unresolved.append(reference)
+                    continue
+                md5.update("|%s"%reference)
+                referenceKey = os.path.normcase(os.path.abspath(referencePath))
+                if referenceKey in hashedFiles: continue
+                hashedFiles.add(referenceKey)
+                addFile(referencePath)
+        
+        for filePath in filePaths:
+            addFile(filePath)
+        return unresolved
+    
+    def getKey(self, filePaths, texts, *parameters):
+        """Return the hash of the content of the files, a list of texts and the parameters.
+        
+        Returns None if a file that the scene references can't be found.
+        """
+        md5 = hashlib.md5()
+        md5.update(str(self.cacheVersion))
+        unresolved = self.updateHash(md5, filePaths, self.searchFolders)
+        if unresolved:
+            print "The results are not cached. Can't find %s."%", ".join(sorted(set(unresolved)))
+            return None
+        for text in texts:
+            md5.update("|%d|"%len(text))
+            md5.update(text)
+        md5.update(repr(parameters))
+        return md5.hexdigest()
+    
+    def getEntryFolder(self, key):
+        return os.path.join(self.cacheFolder, key)
+    
+    def load(self, key, subWorkingDir, resultFiles, lenOfPts = None):
+        """
+        Copy the cached results of a study to its result files. Return True if they are found.
+        
+        Grid-based results are stored as one file and split again based on the number of
+        points in each work unit so the cache doesn't depend on the number of CPUs.
+        """
+        entryFolder = self.getEntryFolder(key)
+        if not os.path.isdir(entryFolder):
+            self.misses += 1
+            return False
+        
+        try:
+            if lenOfPts:
+                cachedFile = os.path.join(entryFolder, "results.res")
+                values = hb_RtracePool.readResultFile(cachedFile)
+                if values is not None:
+                    stPt = 0
+                    for resultFile, pointCount in zip(resultFiles, lenOfPts):
+                        hb_RtracePool.writeResultFile(resultFile, values[3 * stPt: 3 * (stPt + pointCount)])
+                        stPt += pointCount
+                else:
+                    with open(cachedFile, "r") as inf:
+                        for resultFile, pointCount in zip(resultFiles, lenOfPts):
+                            with open(resultFile, "w") as outf:
+                                outf.write("".join(itertools.islice(inf, pointCount)))
+            else:
+                for count, resultFile in enumerate(resultFiles):
+                    cachedFile = os.path.join(entryFolder, "%d%s"%(count, os.path.splitext(resultFile)[-1]))
+                    shutil.copyfile(cachedFile, resultFile)
+            
+            errorLog = os.path.join(entryFolder, "error.log")
+            if os.path.isfile(errorLog): shutil.copyfile(errorLog, os.path.join(subWorkingDir, "error.log"))
+            else: open(os.path.join(subWorkingDir, "error.log"), "w").close()
+            
+            # the modified time of the folder is used to find the least recently used studies
+            os.utime(entryFolder, None)
+            self.hits += 1
+            return True
+        except Exception, e:
+            print "Failed to read the results from the cache at %s:\n%s"%(entryFolder, e)
+            self.misses += 1
+            return False
+    
+    def save(self, key, subWorkingDir, resultFiles, lenOfPts = None):
+        """Copy the results of a study to the cache. Return True if it succeeds."""
+        if len(resultFiles) == 0: return False
+        for resultFile in resultFiles:
+            if not os.path.isfile(resultFile) or os.path.getsize(resultFile) == 0: return False
+        
+        entryFolder = self.getEntryFolder(key)
+        tempFolder = entryFolder + ".tmp"
+        try:
+            if os.path.isdir(tempFolder): shutil.rmtree(tempFolder)
+            os.makedirs(tempFolder)
+            if lenOfPts:
+                lineCount = 0
+                if hb_RtracePool.readResultFile(resultFiles[0]) is not None:
+                    # binary results
+                    values = array.array('f')
+                    for resultFile in resultFiles:
+                        values.extend(hb_RtracePool.readResultFile(resultFile))
+                    hb_RtracePool.writeResultFile(os.path.join(tempFolder, "results.res"), values)
+                    lineCount = len(values) // 3
+                else:
+                    with open(os.path.join(tempFolder, "results.res"), "w") as outf:
+                        for resultFile in resultFiles:
+                            with open(resultFile, "r") as inf:
+                                for line in inf:
+                                    outf.write(line)
+                                    lineCount += 1
+                if lineCount != sum(lenOfPts):
+                    shutil.rmtree(tempFolder)
+                    return False
+            else:
+                for count, resultFile in enumerate(resultFiles):
+                    shutil.copyfile(resultFile, os.path.join(tempFolder, "%d%s"%(count, os.path.splitext(resultFile)[-1])))
+            
+            errorLog = os.path.join(subWorkingDir, "error.log")
+            if os.path.isfile(errorLog): shutil.copyfile(errorLog, os.path.join(tempFolder, "error.log"))
+            
+            if os.path.isdir(entryFolder): shutil.rmtree(entryFolder)
+            os.rename(tempFolder, entryFolder)
+        except Exception, e:
+            print "Failed to write the results to the cache at %s:\n%s"%(entryFolder, e)
+            return False
+        
+        self.evict()
+        return True
+    
+    def evict(self):
+        """Remove the least recently used studies until the cache is smaller than maxSize."""
+        entries = []
+        totalSize = 0
+        for name in os.listdir(self.cacheFolder):
+            entryFolder = os.path.join(self.cacheFolder, name)
+            if not os.path.isdir(entryFolder) or name.endswith(".tmp"): continue
+            size = sum(os.path.getsize(os.path.join(entryFolder, f)) for f in os.listdir(entryFolder))
+            entries.append((os.path.getmtime(entryFolder), size, entryFolder))
+            totalSize += size
+        
+        entries.sort()
+        # keep the newest study even if it is larger than the cache
+        for lastUsed, size, entryFolder in entries[:-1]:
+            if totalSize <= self.maxSize: break
+            try:
+                shutil.rmtree(entryFolder)
+                totalSize -= size
+                self.evicted += 1
+            except:
+                pass
+    
+    def report(self):
+        """Return a line that reports the cache hits and misses."""
+        report = "%d studies were read from the result cache and %d were calculated."%(self.hits, self.misses)
+        if self.evicted: report += " %d old studies were removed from the cache."%self.evicted
+        return report
+
+
+class hb_RtracePool(object):
+    """
+    Long-lived rtrace processes that keep the octree of a scene loaded between studies.
+    
+    The rays are streamed to the processes as binary floats (-ff). Each process writes its own
+    ambient file (-af name_<process>.amb) since the ambient file is not locked on Windows and
+    processes that share it can corrupt it. The ambient values of the earlier studies are
+    reused by the same process. A ray with a zero
+    direction is sent after each batch which makes rtrace flush its output. The pools are kept
+    in sc.sticky by the key of their scene so a study that only moves the test points doesn't
+    start rtrace or load the octree again.
+    
+    Args:
+        octFile: Path to the octree of the scene.
+        rtraceOptions: List of rtrace options without -h, -f and the octree.
+        processCount: Number of rtrace processes.
+        rtraceCommand: The rtrace executable. Default is rtrace from the PATH of env.
+        env: Optional environment of the processes.
+    
+    Usage:
+        pool = hb_RtracePool.getPool(sceneKey, createOctree, rtraceOptions, processCount, env)
+        values = pool.trace(rays) # 6 floats for each ray in and 3 floats for each ray out
+    """
+    maxPools = 2
+    header = "#?RADIANCE\nhb_RtracePool\nNCOMP=3\nBigEndian=%d\nFORMAT=float\n\n"
+    isBigEndian = struct.pack('=H', 1) == '\x00\x01'
+    
+    def __init__(self, octFile, rtraceOptions, processCount = 1, rtraceCommand = "rtrace", env = None):
+        self.octFile = octFile
+        self.command = [rtraceCommand, "-h", "-ff"] + list(rtraceOptions) + [os.path.basename(octFile)]
+        self.errorLog = os.path.join(os.path.dirname(octFile), "error.log")
+        self.lastUsed = time.time()
+        self.processes = []
+        self.errorFile = open(self.errorLog, "ab")
+        for count in range(max(int(processCount), 1)):
+            self.processes.append(subprocess.Popen(self.getProcessCommand(count), cwd = os.path.dirname(octFile), \
+                env = env, stdin = subprocess.PIPE, stdout = subprocess.PIPE, stderr = self.errorFile))
+    
+    def getProcessCommand(self, count):
+        """Return the command of a process with its own ambient file."""
+        command = list(self.command)
+        if "-af" in command:
+            index = command.index("-af") + 1
+            name, ext = os.path.splitext(command[index])
+            command[index] = "%s_%d%s"%(name, count, ext)
+        return command
+    
+    @classmethod
+    def getPool(cls, sceneKey, createOctree, rtraceOptions, processCount = 1, env = None, rtraceCommand = "rtrace"):
+        """
+        Return the running pool of a scene or start a new one.
+        
+        createOctree is only called when the scene doesn't have a running pool and should
+        return the path to the octree. The least recently used pools are closed so only
+        maxPools scenes keep their processes.
+        """
+        pools = sc.sticky.setdefault("honeybee_RtracePools", {})
+        poolKey = (sceneKey, tuple(rtraceOptions), max(int(processCount), 1))
+        pool = pools.get(poolKey)
+        if pool is not None and not pool.isAlive():
+            pool.close()
+            del pools[poolKey]
+            pool = None
+        
+        if pool is None:
+            for key, oldPool in sorted(pools.items(), key = lambda item: item[1].lastUsed)[:max(len(pools) - cls.maxPools + 1, 0)]:
+                oldPool.close()
+                del pools[key]
+            pool = cls(createOctree(), rtraceOptions, processCount, rtraceCommand, env)
+            pools[poolKey] = pool
+        
+        pool.lastUsed = time.time()
+        return pool
+    
+    @staticmethod
+    def getEnvironment(RADPath, RADLibPath):
+        """Return the environment for the Radiance processes."""
+        env = dict(os.environ)
+        env["PATH"] = RADPath + ";" + env.get("PATH", "")
+        env["RAYPATH"] = ".;" + RADLibPath
+        return env
+    
+    def isAlive(self):
+        if not self.processes: return False
+        for process in self.processes:
+            if process.poll() is not None: return False
+        return True
+    
+    def close(self):
+        for process in self.processes:
+            try:
+                process.stdin.close()
+                process.wait()
+            except:
+                try: process.kill()
+                except: pass
+        self.processes = []
+        try: self.errorFile.close()
+        except: pass
+    
+    def readError(self):
+        try:
+            with open(self.errorLog, "r") as errFile: return errFile.read()
+        except:
+            return ""
+    
+    def trace(self, rays):
+        """Trace a list or an array of 6 floats for each ray and return an array of 3 floats for each ray."""
+        rays = array.array('f', rays)
+        rayCount = len(rays) // 6
+        flushRay = array.array('f', [0] * 6).tostring()
+        
+        # split the rays evenly between the processes
+        processCount = len(self.processes)
+        bounds = [rayCount * count // processCount for count in range(processCount + 1)]
+        
+        def writeRays(process, stRay, endRay):
+            try:
+                process.stdin.write(rays[6 * stRay: 6 * endRay].tostring() + flushRay)
+                process.stdin.flush()
+            except:
+                pass
+        
+        writers = []
+        for count, process in enumerate(self.processes):
+            writer = threading.Thread(target = writeRays, args = (process, bounds[count], bounds[count + 1]))
+            writer.daemon = True
+            writer.start()
+            writers.append(writer)
+        
+        # one extra value for the flush ray
+        values = array.array('f')
+        for count, process in enumerate(self.processes):
+            size = 12 * (bounds[count + 1] - bounds[count] + 1)
+            data = process.stdout.read(size)
+            if len(data) != size:
+                self.close()
+                raise Exception("rtrace stopped before tracing all the rays.\n" + self.readError())
+            values.fromstring(data[:-12])
+        
+        for writer in writers: writer.join()
+        self.lastUsed = time.time()
+        return values
+    
+    @classmethod
+    def writeResultFile(cls, resultFile, values):
+        """Write the values in the binary float format of rtrace with a Radiance header."""
+        with open(resultFile, "wb") as outf:
+            outf.write(cls.header%int(cls.isBigEndian))
+            outf.write(array.array('f', values).tostring())
+    
+    @classmethod
+    def readResultFile(cls, resultFile):
+        """Return the array of values of a binary result file or None if the file is rtrace text output."""
+        with open(resultFile, "rb") as inf:
+            if not inf.readline().startswith("#?RADIANCE"): return None
+            isFloat = False
+            isBigEndian = cls.isBigEndian
+            while True:
+                line = inf.readline()
+                if line.strip() == "": break
+                line = line.strip()
+                if line.startswith("FORMAT="): isFloat = line[7:] == "float"
+                elif line.startswith("BigEndian="): isBigEndian = line[10:] == "1"
+            if not isFloat: return None
+            values = array.array('f', inf.read())
+        if isBigEndian != cls.isBigEndian: values.byteswap()
+        return values
+
+
+class hb_RGBEImage(object):
+    """
+    Read and write Radiance RGBE (.HDR) pictures without running the Radiance image tools.
+
+    The pixels are streamed one scanline at a time from top to bottom as flat lists of
+    r, g, b floats so large renders are never loaded in memory. Flat, old run-length and new
+    run-length encoded scanlines are read and the scanlines are always written with the new
+    run-length encoding. The EXPOSURE lines of the header are multiplied together and the VIEW
+    lines are joined the same way Radiance reads them. Only the standard -Y +X orientation is
+    supported.
+
+    Args:
+        filePath: Path to the HDR file.
+
+    Usage:
+        image = hb_RGBEImage(HDRFilePath)
+        image.setExposure(outputFile, 0.5)
+        image.writeTIFF(TIFFilePath)
+        hb_RGBEImage.writeHDR(outputFile, image.width, image.height, image.iterScanlines(), image.header)
+    """
+
+    # size of the blocks that are read from the file
+    chunkSize = 1 << 16
+
+    # multipliers of the mantissas for each exponent byte
+    expTable = [0.0] + [math.ldexp(1.0, exp - 136) for exp in range(1, 256)]
+
+    # colors of the legend from the lowest to the highest value in display values
+    falseColorRamps = {
+        "default": [(0.16, 0.0, 0.44), (0.0, 0.0, 1.0), (0.0, 0.75, 1.0), (0.0, 0.8, 0.2), \
+                    (0.9, 0.95, 0.0), (1.0, 0.5, 0.0), (1.0, 0.0, 0.0)],
+        "alternate": [(0.0, 0.0, 0.0), (0.5, 0.0, 0.5), (0.0, 0.0, 1.0), (0.0, 1.0, 1.0), \
+                      (0.0, 1.0, 0.0), (1.0, 1.0, 0.0), (1.0, 0.0, 0.0), (1.0, 1.0, 1.0)]
+        }
+
+    def __init__(self, filePath):
+        self.filePath = filePath
+        self.header = []
+        self.exposure = 1.0
+        self.view = ""
+        self.format = None
+
+        with open(filePath, "rb") as inf:
+            magic = inf.readline()
+            if not magic.startswith("#?"):
+                raise ValueError("%s is not a Radiance picture."%filePath)
+
+            while True:
+                line = inf.readline()
+                if line == "": raise ValueError("Unexpected end of header in %s."%filePath)
+                if line.strip() == "": break
+                info = line.strip()
+                if info.startswith("FORMAT="):
+                    self.format = info[7:].strip()
+                    continue
+                elif info.startswith("EXPOSURE="):
+                    self.exposure *= float(info[9:])
+                elif info.startswith("VIEW="):
+                    self.view = (self.view + " " + info[5:].strip()).strip()
+                self.header.append(line.rstrip("\r\n"))
+
+            if self.format not in (None, "32-bit_rle_rgbe"):
+                raise ValueError("Pictures with %s format are not supported."%self.format)
+
+            resolution = inf.readline().split()
+            if len(resolution) != 4 or resolution[0] != "-Y" or resolution[2] != "+X":
+                raise ValueError("Only pictures with -Y +X orientation are supported: %s"%" ".join(resolution))
+
+            self.height = int(resolution[1])
+            self.width = int(resolution[3])
+            self.dataOffset = inf.tell()
+
+    def iterColrs(self):
+        """Yield the scanlines as bytearrays of r, g, b, e bytes from top to bottom."""
+        width = self.width
+        # worst case size of a run-length encoded scanline
+        scanlineSize = 5 * width + 8
+
+        with open(self.filePath, "rb") as inf:
+            inf.seek(self.dataOffset)
+            data = bytearray()
+            pos = 0
+            eof = False
+            for y in xrange(self.height):
+                while not eof and len(data) - pos < scanlineSize:
+                    chunk = inf.read(self.chunkSize)
+                    if not chunk:
+                        eof = True
+                        break
+                    del data[:pos]
+                    pos = 0
+                    data.extend(chunk)
+
+                try:
+                    colrs, pos = self.decodeScanline(data, pos, width)
+                except IndexError:
+                    raise ValueError("Unexpected end of data at scanline %d of %s."%(y, self.filePath))
+                yield colrs
+
+    def iterScanlines(self):
+        """Yield the scanlines as lists of r, g, b floats from top to bottom."""
+        for colrs in self.iterColrs():
+            yield self.colrsToColors(colrs)
+
+    @staticmethod
+    def decodeScanline(data, pos, width):
+        """Decode one scanline from data starting at pos and return the RGBE bytes and the new position."""
+        if 8 <= width <= 0x7fff and data[pos] == 2 and data[pos + 1] == 2 and not data[pos + 2] & 128:
+            # new run-length encoding with the components in separate runs
+            if (data[pos + 2] << 8 | data[pos + 3]) != width:
+                raise ValueError("Length of the scanline doesn't match the width of the picture.")
+            pos += 4
+            colrs = bytearray(4 * width)
+            for component in range(4):
+                values = bytearray()
+                while len(values) < width:
+                    count = data[pos]
+                    if count > 128:
+                        values.extend(data[pos + 1:pos + 2] * (count - 128))
+                        pos += 2
+                    elif count:
+                        values.extend(data[pos + 1:pos + 1 + count])
+                        pos += 1 + count
+                    else:
+                        raise ValueError("Run with zero length in the scanline.")
+                if len(values) != width:
+                    raise ValueError("Runs overrun the length of the scanline.")
+                colrs[component::4] = values
+            return colrs, pos
+
+        # flat pixels with the old run-length encoding
+        colrs = bytearray(4 * width)
+        end = 4 * width
+        i = 0
+        shift = 0
+        while i < end:
+            pixel = data[pos:pos + 4]
+            if len(pixel) < 4: raise IndexError
+            pos += 4
+            if pixel[0] == 1 and pixel[1] == 1 and pixel[2] == 1:
+                # repeat the previous pixel
+                count = pixel[3] << shift
+                if i == 0 or i + 4 * count > end:
+                    raise ValueError("Bad run in the scanline.")
+                colrs[i:i + 4 * count] = colrs[i - 4:i] * count
+                i += 4 * count
+                shift += 8
+            else:
+                colrs[i:i + 4] = pixel
+                i += 4
+                shift = 0
+        return colrs, pos
+
+    @staticmethod
+    def encodeScanline(colrs, width):
+        """Return one scanline of RGBE bytes with the new run-length encoding."""
+        if not 8 <= width <= 0x7fff:
+            return colrs
+
+        encoded = bytearray((2, 2, width >> 8, width & 255))
+        for component in range(4):
+            values = colrs[component::4]
+            i = 0
+            while i < width:
+                # look for the next run of at least 4 equal values
+                start = i
+                count = 0
+                while start < width:
+                    count = 1
+                    while count < 127 and start + count < width and values[start + count] == values[start]:
+                        count += 1
+                    if count >= 4: break
+                    start += count
+
+                # values before the run are written as they are
+                while i < start:
+                    length = min(128, start - i)
+                    encoded.append(length)
+                    encoded.extend(values[i:i + length])
+                    i += length
+
+                if start < width:
+                    encoded.append(128 + count)
+                    encoded.append(values[start])
+                    i = start + count
+        return encoded
+
+    @classmethod
+    def colrsToColors(cls, colrs):
+        """Convert a scanline of RGBE bytes to a list of r, g, b floats."""
+        multipliers = [cls.expTable[exp] for exp in colrs[3::4]]
+        colors = [0.0] * (3 * len(multipliers))
+        for component in range(3):
+            colors[component::3] = [(value + 0.5) * multiplier if multiplier else 0.0 \
+                                    for value, multiplier in zip(colrs[component::4], multipliers)]
+        return colors
+
+    @staticmethod
+    def colorsToColrs(colors):
+        """Convert a list of r, g, b floats to a scanline of RGBE bytes. Negative values are set to 0."""
+        width = len(colors) // 3
+        colrs = bytearray(4 * width)
+        frexp = math.frexp
+        for i in xrange(width):
+            r, g, b = colors[3 * i], colors[3 * i + 1], colors[3 * i + 2]
+            if r < 0: r = 0
+            if g < 0: g = 0
+            if b < 0: b = 0
+            d = max(r, g, b)
+            if d <= 1e-32: continue
+            mantissa, exp = frexp(d)
+            d = mantissa * 256.0 / d
+            j = 4 * i
+            colrs[j] = int(r * d)
+            colrs[j + 1] = int(g * d)
+            colrs[j + 2] = int(b * d)
+            colrs[j + 3] = exp + 128
+        return colrs
+
+    @classmethod
+    def writeHDR(cls, filePath, width, height, scanlines, header = None):
+        """Write the scanlines of r, g, b floats to an HDR file.
+
+        Args:
+            filePath: Path to the output file.
+            width: Width of the picture in pixels.
+            height: Height of the picture in pixels.
+            scanlines: An iterable of scanlines from top to bottom.
+            header: Optional list of header lines (e.g. the header of the input picture
+                followed by new EXPOSURE= or VIEW= lines).
+        """
+        with open(filePath, "wb") as outf:
+            outf.write("#?RADIANCE\n")
+            for line in header or []:
+                outf.write(line + "\n")
+            outf.write("FORMAT=32-bit_rle_rgbe\n\n")
+            outf.write("-Y %d +X %d\n"%(height, width))
+
+            count = 0
+            for colors in scanlines:
+                if len(colors) != 3 * width:
+                    raise ValueError("Scanline %d has %d values instead of %d."%(count, len(colors), 3 * width))
+                outf.write(str(cls.encodeScanline(cls.colorsToColrs(colors), width)))
+                count += 1
+
+        if count != height:
+            raise ValueError("%d scanlines were written to %s instead of %d."%(count, filePath, height))
+
+    def setExposure(self, outputFile, exposure):
+        """Multiply the pixels by exposure and add it to the header the same way pfilt -e does."""
+        scanlines = ([value * exposure for value in colors] for colors in self.iterScanlines())
+        self.writeHDR(outputFile, self.width, self.height, scanlines, \
+                      self.header + ["EXPOSURE=%e"%exposure])
+
+    def flipHorizontal(self, outputFile):
+        """Mirror the picture from left to right like pflip -h."""
+        def flip(colors):
+            flipped = [0.0] * len(colors)
+            for component in range(3):
+                flipped[component::3] = colors[component::3][::-1]
+            return flipped
+
+        self.writeHDR(outputFile, self.width, self.height, \
+                      (flip(colors) for colors in self.iterScanlines()), self.header)
+
+    # export to 8-bit pictures
+
+    @staticmethod
+    def toneMap(colors, exposure = 1.0, gamma = 2.2):
+        """Convert a scanline of r, g, b floats to display bytes like ra_tiff and ra_gif do."""
+        invGamma = 1.0 / gamma
+        return bytearray([255 if value >= 1 else (int(255.0 * value ** invGamma + 0.5) if value > 0 else 0) \
+                          for value in (color * exposure for color in colors)])
+
+    def iterDisplayScanlines(self, exposure = 1.0, gamma = 2.2):
+        for colors in self.iterScanlines():
+            yield self.toneMap(colors, exposure, gamma)
+
+    @staticmethod
+    def PNGChunk(chunkType, data):
+        return struct.pack(">I", len(data)) + chunkType + data + \
+               struct.pack(">I", zlib.crc32(chunkType + data) & 0xffffffff)
+
+    def writePNG(self, filePath, exposure = 1.0, gamma = 2.2):
+        """Write the picture to an 8-bit RGB PNG file."""
+        compressor = zlib.compressobj(6)
+        with open(filePath, "wb") as outf:
+            outf.write("\x89PNG\r\n\x1a\n")
+            outf.write(self.PNGChunk("IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)))
+            for row in self.iterDisplayScanlines(exposure, gamma):
+                # each row starts with filter type 0
+                data = compressor.compress("\x00" + str(row))
+                if data: outf.write(self.PNGChunk("IDAT", data))
+            outf.write(self.PNGChunk("IDAT", compressor.flush()))
+            outf.write(self.PNGChunk("IEND", ""))
+
+    def writeTIFF(self, filePath, exposure = 1.0, gamma = 2.2):
+        """Write the picture to an uncompressed 8-bit RGB TIFF file."""
+        width, height = self.width, self.height
+        imageSize = 3 * width * height
+
+        with open(filePath, "wb") as outf:
+            # the pixels are written right after the file header and the directory after them
+            outf.write("II*\x00" + struct.pack("<I", 8 + imageSize + 6 + imageSize % 2))
+            for row in self.iterDisplayScanlines(exposure, gamma):
+                outf.write(str(row))
+
+            bitsPerSampleOffset = 8 + imageSize
+            outf.write(struct.pack("<HHH", 8, 8, 8))
+            if imageSize % 2: outf.write("\x00")
+
+            # tag, type (3: SHORT, 4: LONG), count, value
+            entries = [(256, 4, 1, width), (257, 4, 1, height), (258, 3, 3, bitsPerSampleOffset), \
+                       (259, 3, 1, 1), (262, 3, 1, 2), (273, 4, 1, 8), (277, 3, 1, 3), \
+                       (278, 4, 1, height), (279, 4, 1, imageSize), (284, 3, 1, 1)]
+            outf.write(struct.pack("<H", len(entries)))
+            for entry in entries:
+                outf.write(struct.pack("<HHII", *entry))
+            outf.write(struct.pack("<I", 0))
+
+    def writeGIF(self, filePath, exposure = 1.0, gamma = 2.2):
+        """Write the picture to a GIF file with a uniform palette of 6 x 7 x 6 colors."""
+        if self.width > 0xffff or self.height > 0xffff:
+            raise ValueError("The picture is too large for a GIF file.")
+
+        palette = bytearray(768)
+        for index in range(252):
+            palette[3 * index] = int((index // 42 + 0.5) * 256 / 6)
+            palette[3 * index + 1] = int((index // 6 % 7 + 0.5) * 256 / 7)
+            palette[3 * index + 2] = int((index % 6 + 0.5) * 256 / 6)
+
+        def iterIndices():
+            for row in self.iterDisplayScanlines(exposure, gamma):
+                yield bytearray([(r * 6 >> 8) * 42 + (g * 7 >> 8) * 6 + (b * 6 >> 8) \
+                                 for r, g, b in zip(row[0::3], row[1::3], row[2::3])])
+
+        with open(filePath, "wb") as outf:
+            outf.write("GIF89a" + struct.pack("<HHBBB", self.width, self.height, 0xf7, 0, 0))
+            outf.write(str(palette))
+            outf.write("," + struct.pack("<HHHHB", 0, 0, self.width, self.height, 0))
+            outf.write("\x08")
+            for block in self.LZWEncode(iterIndices()):
+                outf.write(block)
+            outf.write("\x00;")
+
+    @staticmethod
+    def LZWEncode(rows):
+        """Yield the GIF sub-blocks of the LZW codes of the rows of 8-bit indices."""
+        clearCode, endCode = 256, 257
+        table = {}
+        nextCode = endCode + 1
+        codeSize = 9
+        prefix = None
+        buffer, bitCount = 0, 0
+        data = bytearray()
+
+        codes = [(clearCode, codeSize)]
+        for row in rows:
+            for index in row:
+                if prefix is None:
+                    prefix = index
+                    continue
+                key = prefix << 8 | index
+                code = table.get(key)
+                if code is not None:
+                    prefix = code
+                    continue
+
+                codes.append((prefix, codeSize))
+                table[key] = nextCode
+                nextCode += 1
+                if nextCode == 4096:
+                    # the table is full. start a new one
+                    codes.append((clearCode, codeSize))
+                    table = {}
+                    nextCode = endCode + 1
+                    codeSize = 9
+                elif nextCode > 1 << codeSize:
+                    codeSize += 1
+                prefix = index
+
+
+            # pack the codes from the least significant bit
+            for code, size in codes:
+                buffer |= code << bitCount
+                bitCount += size
+                while bitCount >= 8:
+                    data.append(buffer & 255)
+                    buffer >>= 8
+                    bitCount -= 8
+            codes = []
+
+            while len(data) >= 255:
+                yield "\xff" + str(data[:255])
+                del data[:255]
+
+        if prefix is not None: codes.append((prefix, codeSize))
+        codes.append((endCode, codeSize))
+        for code, size in codes:
+            buffer |= code << bitCount
+            bitCount += size
+            while bitCount >= 8:
+                data.append(buffer & 255)
+                buffer >>= 8
+                bitCount -= 8
+        if bitCount: data.append(buffer & 255)
+
+        while data:
+            yield chr(min(255, len(data))) + str(data[:255])
+            del data[:255]
+
+    @classmethod
+    def convertTIFFToHDR(cls, TIFFFilePath, HDRFilePath, gamma = 2.2):
+        """Convert an uncompressed 8-bit RGB TIFF file to an HDR file like ra_tiff -r does.
+
+        A ValueError is raised for the TIFF files that are compressed or have a different
+        layout so the caller can fall back to ra_tiff.
+        """
+        with open(TIFFFilePath, "rb") as inf:
+            data = inf.read()
+
+        if data[:4] == "II*\x00": endian = "<"
+        elif data[:4] == "MM\x00*": endian = ">"
+        else: raise ValueError("%s is not a TIFF file."%TIFFFilePath)
+
+        typeFormats = {3: "H", 4: "I"}
+        tags = {}
+        IFDOffset = struct.unpack(endian + "I", data[4:8])[0]
+        entryCount = struct.unpack(endian + "H", data[IFDOffset:IFDOffset + 2])[0]
+        for count in range(entryCount):
+            entry = data[IFDOffset + 2 + 12 * count:IFDOffset + 14 + 12 * count]
+            tag, tagType, valueCount = struct.unpack(endian + "HHI", entry[:8])
+            if tagType not in typeFormats: continue
+            valueFormat = endian + typeFormats[tagType] * valueCount
+            size = struct.calcsize(valueFormat)
+            if size <= 4:
+                values = struct.unpack(valueFormat, entry[8:8 + size])
+            else:
+                valueOffset = struct.unpack(endian + "I", entry[8:12])[0]
+                values = struct.unpack(valueFormat, data[valueOffset:valueOffset + size])
+            tags[tag] = values
+
+        width, height = tags[256][0], tags[257][0]
+        samples = tags.get(277, (1,))[0]
+        if tags.get(259, (1,))[0] != 1 or tags.get(262, (0,))[0] != 2 or samples not in (3, 4) or \
+           tags.get(284, (1,))[0] != 1 or set(tags.get(258, (1,))) != set([8]):
+            raise ValueError("Only uncompressed 8-bit RGB TIFF files are supported.")
+
+        pixels = bytearray()
+        for offset, size in zip(tags[273], tags[279]):
+            pixels.extend(data[offset:offset + size])
+        if len(pixels) < width * height * samples:
+            raise ValueError("%s has less pixels than its size."%TIFFFilePath)
+
+        values = [((value + 0.5) / 256.0) ** gamma for value in range(256)]
+        def iterScanlines():
+            rowSize = width * samples
+            for y in xrange(height):
+                row = pixels[y * rowSize:(y + 1) * rowSize]
+                colors = [0.0] * (3 * width)
+                for component in range(3):
+                    colors[component::3] = [values[value] for value in row[component::samples]]
+                yield colors
+
+        cls.writeHDR(HDRFilePath, width, height, iterScanlines())
+
+    # false color and compositing
+
+    def getMaximum(self, conversionF = 179):
+        """Return the maximum luminance of the picture in the unit of conversionF."""
+        maximum = 0
+        factor = conversionF / self.exposure
+        for colors in self.iterScanlines():
+            for i in xrange(0, len(colors), 3):
+                value = 0.265 * colors[i] + 0.670 * colors[i + 1] + 0.065 * colors[i + 2]
+                if value > maximum: maximum = value
+        return maximum * factor
+
+    def falseColor(self, outputFile, conversionF = 179, legendMax = None, numOfSegments = 10, \
+                   maskThreshold = 0, contourBands = False, contourLines = False, useAlterColors = False):
+        """Write a false color picture of the luminance of the picture.
+
+        The values are in the unit of conversionF (e.g. 179 for lux or cd/m2) and the exposure of
+        the picture is removed first. Pixels below maskThreshold are black. Unlike falsecolor
+        the legend is not drawn on the picture.
+
+        Args:
+            outputFile: Path to the output HDR file.
+            conversionF: Multiplier to convert the pixel values. Default is 179.
+            legendMax: Maximum of the legend. Default is the maximum of the picture.
+            numOfSegments: Number of segments of the legend for contourBands and contourLines.
+            maskThreshold: Optional masking threshold.
+            contourBands: Set to True to color the pixels by the segment of their value.
+            contourLines: Set to True to only draw the borders of the segments.
+            useAlterColors: Set to True to use the alternate colors.
+
+        Returns:
+            The maximum of the legend.
+        """
+        if not legendMax or legendMax <= 0:
+            legendMax = self.getMaximum(conversionF) or 1
+        numOfSegments = max(1, int(numOfSegments))
+        factor = conversionF / self.exposure
+
+        ramp = self.falseColorRamps["alternate" if useAlterColors else "default"]
+        # colors of the ramp in radiance values
+        ramp = [tuple(c ** 2.2 for c in color) for color in ramp]
+        def getColor(t):
+            t = min(max(t, 0), 1) * (len(ramp) - 1)
+            i = min(int(t), len(ramp) - 2)
+            t -= i
+            return [c0 + (c1 - c0) * t for c0, c1 in zip(ramp[i], ramp[i + 1])]
+
+        bandColors = [getColor((band + 0.5) / numOfSegments) for band in range(numOfSegments)]
+        black = [0.0, 0.0, 0.0]
+
+        def iterScanlines():
+            previousBands = None
+            for colors in self.iterScanlines():
+                width = len(colors) // 3
+                values = [factor * (0.265 * colors[3 * i] + 0.670 * colors[3 * i + 1] + 0.065 * colors[3 * i + 2]) \
+                          for i in xrange(width)]
+
+                if not (contourBands or contourLines):
+                    falseColors = []
+                    for value in values:
+                        falseColors.extend(black if value < maskThreshold else getColor(value / legendMax))
+                    yield falseColors
+                    continue
+
+                bands = [min(int(value / legendMax * numOfSegments), numOfSegments - 1) if value >= maskThreshold else -1 \
+                         for value in values]
+                falseColors = []
+                for i, band in enumerate(bands):
+                    if band < 0:
+                        falseColors.extend(black)
+                    elif contourLines and not ((i and bands[i - 1] != band) or \
+                                               (previousBands and previousBands[i] != band)):
+                        falseColors.extend(black)
+                    else:
+                        falseColors.extend(bandColors[band])
+                previousBands = bands
+                yield falseColors
+
+        header = [line for line in self.header if not line.strip().startswith("EXPOSURE=")]
+        self.writeHDR(outputFile, self.width, self.height, iterScanlines(), header)
+        return legendMax
+
+    @classmethod
+    def composeTiles(cls, tileFiles, columns, outputFile, view = None, reduction = 2):
+        """Put the pieces of a render together and reduce the size of the result.
+
+        The tiles are placed the same way pcompos -a does: columns from left to right and rows
+        from bottom to top. The result is then reduced by averaging blocks of reduction x
+        reduction pixels which replaces pfilt -x /2 -y /2.
+
+        Args:
+            tileFiles: List of paths to the HDR tiles.
+            columns: Number of tiles in each row.
+            outputFile: Path to the output HDR file.
+            view: Optional view which is added to the header of the result.
+            reduction: Integer reduction of the size. Default is 2.
+        """
+        tiles = [cls(tileFile) for tileFile in tileFiles]
+        rows = [tiles[i:i + columns] for i in range(0, len(tiles), columns)]
+        # the first row is the bottom of the picture
+        rows.reverse()
+
+        fullWidth = max(sum(tile.width for tile in row) for row in rows)
+        fullHeight = sum(max(tile.height for tile in row) for row in rows)
+        width, height = fullWidth // reduction, fullHeight // reduction
+
+        def iterFullScanlines():
+            for row in rows:
+                rowHeight = max(tile.height for tile in row)
+                iterators = [tile.iterScanlines() for tile in row]
+                for y in xrange(rowHeight):
+                    colors = []
+                    for tile, iterator in zip(row, iterators):
+                        # shorter tiles are aligned to the bottom of the row
+                        if y < rowHeight - tile.height: colors.extend([0.0] * (3 * tile.width))
+                        else: colors.extend(iterator.next())
+                    colors.extend([0.0] * (3 * fullWidth - len(colors)))
+                    yield colors
+
+        def iterScanlines():
+            blockSize = float(reduction * reduction)
+            rowsInBlock = []
+            for colors in iterFullScanlines():
+                rowsInBlock.append(colors)
+                if len(rowsInBlock) < reduction: continue
+
+                sums = [sum(values) for values in zip(*rowsInBlock)]
+                reduced = [0.0] * (3 * width)
+                for x in xrange(width):
+                    for component in range(3):
+                        start = 3 * reduction * x + component
+                        reduced[3 * x + component] = sum(sums[start:start + 3 * reduction:3]) / blockSize
+                rowsInBlock = []
+                yield reduced
+
+        header = list(tiles[0].header)
+        if view: header.append("VIEW= " + view)
+
+        cls.writeHDR(outputFile, width, height, itertools.islice(iterScanlines(), height), header)
+
+
 class hb_WriteDS(object):
     
     def isSensor(self, testPt, sensors):
@@ -3516,6 +5925,423 @@ class hb_WriteDS(object):
                 'direct_sunlight_file ' + projectName  + '_' + `cpuCount` + '.dir\n' + \
                 'thermal_simulation ' + projectName  + '_' + `cpuCount` + '_intgain.csv\n'
 
+class hb_DSIllMatrix(object):
+    """
+    Binary hour-major matrix of the values in Daysim .ill files.
+    
+    The .ill files for one shading state (one file per CPU) are converted once into a
+    single float32 matrix of hours x points with a small json header. The matrix file is
+    written next to the first .ill file and is reused as long as the .ill files don't change.
+    The name of the matrix has a hash of the paths of all the .ill files, so readers that
+    convert different sets of files never write to the same matrix.
+    The matrix is memory-mapped when mmap is available so reading one hour, one point or a
+    block of sensors only reads that part of the file.
+    
+    File layout:
+        json header (one line padded with spaces to a multiple of 16 bytes)
+        values: hours x points float32
+        dates: hours x 3 float32 (month, day, hour)
+    
+    Usage:
+        illMatrix = hb_DSIllMatrix.fromIllFiles(["c:/ladybug/study/annualSimulation/study_0.ill"])
+        illMatrix.getHour(12)      # values for all the points for the 13th hour of the year
+        illMatrix.getPoint(10)     # annual values for the 11th point
+        illMatrix.getHour(12, 0, 100) # values of the first 100 points
+    """
+    version = 1
+    extension = ".illb"
+    
+    def __init__(self, matrixFile):
+        if not os.path.isfile(matrixFile):
+            raise ValueError("Can't find %s."%matrixFile)
+        
+        self.matrixFile = matrixFile
+        self.header = self.readHeader(matrixFile)
+        self.numOfPts = self.header["points"]
+        self.numOfHours = self.header["hours"]
+        self.shadingGroup = self.header["shadingGroup"]
+        self.state = self.header["state"]
+        self.dataOffset = self.header["dataOffset"]
+        self.datesOffset = self.dataOffset + 4 * self.numOfPts * self.numOfHours
+        self.swapBytes = self.header["byteOrder"] != sys.byteorder
+        
+        self.file = open(matrixFile, "rb")
+        self.mmap = None
+        if mmap is not None:
+            try:
+                self.mmap = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+            except:
+                self.mmap = None
+    
+    @staticmethod
+    def readHeader(matrixFile):
+        with open(matrixFile, "rb") as inf:
+            header = json.loads(inf.readline())
+        if header.get("version") != hb_DSIllMatrix.version:
+            raise ValueError("%s is not a supported .ill matrix file."%matrixFile)
+        return header
+    
+    @staticmethod
+    def getSourceSignatures(illFiles):
+        return [[os.path.normcase(os.path.abspath(illFile)), os.path.getsize(illFile), \
+                 os.path.getmtime(illFile)] for illFile in illFiles]
+    
+    @classmethod
+    def getMatrixFilePath(cls, illFiles):
+        sources = "\n".join(os.path.normcase(os.path.abspath(illFile)) for illFile in illFiles)
+        return "%s_%s%s"%(os.path.splitext(illFiles[0])[0], hashlib.md5(sources).hexdigest()[:8], cls.extension)
+    
+    @classmethod
+    def isUpToDate(cls, matrixFile, illFiles):
+        if not os.path.isfile(matrixFile): return False
+        try:
+            header = cls.readHeader(matrixFile)
+        except:
+            return False
+        return header["sources"] == cls.getSourceSignatures(illFiles)
+    
+    @classmethod
+    def fromIllFiles(cls, illFiles, shadingGroup = 0, state = 0, matrixFile = None):
+        """
+        Convert the .ill files of one shading state to a matrix if it is not converted already.
+        
+        Args:
+            illFiles: List of .ill files for a single shading state sorted by CPU.
+                Points of the files will be joined in the same order.
+            shadingGroup: Shading group number (0 is no dynamic shading).
+            state: Shading state number.
+            matrixFile: Optional path for the matrix. Default is next to the first .ill file.
+        """
+        illFiles = list(illFiles)
+        if not matrixFile: matrixFile = cls.getMatrixFilePath(illFiles)
+        
+        if not cls.isUpToDate(matrixFile, illFiles):
+            cls.convertIllFiles(illFiles, matrixFile, shadingGroup, state)
+        
+        return cls(matrixFile)
+    
+    @classmethod
+    def convertIllFiles(cls, illFiles, matrixFile, shadingGroup = 0, state = 0):
+        """Parse .ill files once and write them as a single binary matrix."""
+        for illFile in illFiles:
+            if not os.path.isfile(illFile):
+                raise ValueError("Can't find %s."%illFile)
+        
+        tempValuesFile = matrixFile + ".values"
+        dates = array.array('f')
+        numOfHours = 0
+        numOfPts = None
+        
+        sources = [open(illFile, "r") for illFile in illFiles]
+        try:
+            with open(tempValuesFile, "wb") as valuesFile:
+                # read the files line by line together and join the points for each hour
+                lines = [cls.iterValueLines(source) for source in sources]
+                for hourLines in itertools.izip(*lines):
+                    hourValues = array.array('f')
+                    for lineCount, line in enumerate(hourLines):
+                        values = line.split()
+                        if lineCount == 0: dates.extend(map(float, values[:3]))
+                        hourValues.extend(map(float, values[3:]))
+                    
+                    if numOfPts is None: numOfPts = len(hourValues)
+                    elif len(hourValues) != numOfPts:
+                        raise ValueError("Number of points in hour %d of %s doesn't match the first hour."%(numOfHours + 1, illFiles[0]))
+                    
+                    hourValues.tofile(valuesFile)
+                    numOfHours += 1
+        finally:
+            for source in sources: source.close()
+        
+        header = {"version": cls.version,
+                  "points": numOfPts or 0,
+                  "hours": numOfHours,
+                  "shadingGroup": shadingGroup,
+                  "state": state,
+                  "byteOrder": sys.byteorder,
+                  "sources": cls.getSourceSignatures(illFiles),
+                  "dataOffset": 0}
+        
+        # the header is padded so the values start at a multiple of 16 bytes
+        headerLength = len(json.dumps(header)) + 16
+        header["dataOffset"] = headerLength + 16 - headerLength%16
+        headerString = json.dumps(header)
+        headerString += " " * (header["dataOffset"] - len(headerString) - 1) + "\n"
+        
+        with open(matrixFile, "wb") as outf:
+            outf.write(headerString)
+            with open(tempValuesFile, "rb") as valuesFile:
+                shutil.copyfileobj(valuesFile, outf)
+            dates.tofile(outf)
+        
+        os.remove(tempValuesFile)
+        return matrixFile
+    
+    @staticmethod
+    def iterValueLines(illFile):
+        for line in illFile:
+            if line.startswith("#") or not line.strip(): continue
+            yield line
+    
+    def readFloats(self, offset, count):
+        values = array.array('f')
+        if count <= 0: return values
+        
+        if self.mmap is not None:
+            values.fromstring(self.mmap[offset:offset + 4 * count])
+        else:
+            self.file.seek(offset)
+            values.fromstring(self.file.read(4 * count))
+        
+        if self.swapBytes: values.byteswap()
+        return values
+    
+    def getHour(self, hour, start = 0, end = None):
+        """
+        Return values for an hour as an array('f').
+        
+        Args:
+            hour: Index of the hour (0 for the first hour in the file).
+            start: Index of the first point. Default is 0.
+            end: Index after the last point. Default is the number of points.
+        """
+        if end is None or end > self.numOfPts: end = self.numOfPts
+        offset = self.dataOffset + 4 * (hour * self.numOfPts + start)
+        return self.readFloats(offset, end - start)
+    
+    def iterHours(self, start = 0, end = None, hours = None):
+        """Yield values for a block of sensors for every hour (or input hours)."""
+        if hours is None: hours = xrange(self.numOfHours)
+        for hour in hours:
+            yield self.getHour(hour, start, end)
+    
+    def getPoint(self, ptIndex, hours = None):
+        """Return annual values of a single point as a list."""
+        if not 0 <= ptIndex < self.numOfPts:
+            raise ValueError("Point index %d is out of range."%ptIndex)
+        if hours is None: hours = xrange(self.numOfHours)
+        rowLength = 4 * self.numOfPts
+        offset = self.dataOffset + 4 * ptIndex
+        return [self.readFloats(offset + hour * rowLength, 1)[0] for hour in hours]
+    
+    def getDates(self):
+        """Return (month, day, hour) for each hour in the original .ill files."""
+        dates = self.readFloats(self.datesOffset, 3 * self.numOfHours)
+        return [(int(dates[3 * i]), int(dates[3 * i + 1]), dates[3 * i + 2]) \
+                for i in range(self.numOfHours)]
+    
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        self.file.close()
+
+class hb_DSAnnualMetrics(object):
+    """
+    Calculate annual daylight metrics from .ill matrices in a single pass.
+
+    Daylight autonomy, continuous daylight autonomy, useful daylight illuminance and
+    occupied hours are calculated in process from hb_DSIllMatrix instead of running
+    ds_el_lighting and reading the result files back. Sensors are processed in blocks
+    and only a few counters are kept for each sensor of the block so memory use doesn't
+    grow with the size of the grid. For dynamic shadings the values are read from the
+    matrix of the state that is in effect for each hour (same as Daysim annual profiles).
+
+    Args:
+        illMatrices: A dictionary of shading group number to a list of hb_DSIllMatrix for
+            each state. Group 0 is the base case with no dynamic shading.
+        occupancy: A list of 0 and 1 values for each hour. Default is all hours occupied.
+        shadingProfiles: Optional list of hourly blind values for each dynamic shading group
+            in the same order as the groups. Use readShadingProfiles to read them from
+            a Daysim annual profile or getConceptualBlindsProfile to calculate them for
+            conceptual dynamic blinds.
+        blockSize: Number of sensors in each block.
+
+    Usage:
+        occupancy = hb_DSAnnualMetrics.readOccupancyFile("c:/ladybug/DaysimCSVOCC/userDefinedOcc_9to17.csv")
+        metrics = hb_DSAnnualMetrics({0: [illMatrix]}, occupancy)
+        results = metrics.calculate(threshold = 300)
+        sDA = hb_DSAnnualMetrics.spatialDaylightAutonomy(results["DA"])
+    """
+    blockSize = 2048
+    # Daysim lowers conceptual blinds when more than 50 W/m2 of direct sunlight hits a sensor.
+    # Radiance converts irradiance to illuminance with 179 lm/W.
+    directSunlightThreshold = 50 * 179
+
+    def __init__(self, illMatrices, occupancy = None, shadingProfiles = None, blockSize = None):
+        self.illMatrices = illMatrices
+        self.baseMatrix = illMatrices[0][0]
+        self.numOfHours = self.baseMatrix.numOfHours
+        self.numOfPts = self.baseMatrix.numOfPts
+
+        if occupancy is None: occupancy = [1] * self.numOfHours
+        if len(occupancy) != self.numOfHours:
+            raise ValueError("Length of occupancy (%d) doesn't match the number of hours in ill files (%d)." \
+                             %(len(occupancy), self.numOfHours))
+        self.occupancy = occupancy
+        self.shadingProfiles = shadingProfiles or []
+        if blockSize: self.blockSize = int(blockSize)
+
+        # hours are grouped by the matrix that is in effect so each matrix is read in order
+        self.hoursByMatrix = self.getOccupiedHoursByMatrix()
+
+    @staticmethod
+    def readOccupancyFile(occFile):
+        """Return a list of 0 and 1 values for each hour from a Daysim occupancy file."""
+        occupancy = []
+        with open(occFile, "r") as inf:
+            for line in inf:
+                if line.startswith("#") or not line.strip(): continue
+                try:
+                    occ = float(line.split(",")[-1])
+                except ValueError:
+                    # heading line
+                    continue
+                occupancy.append(int(occ > 0))
+        return occupancy
+
+    @staticmethod
+    def readShadingProfiles(annualProfile):
+        """Return the hourly blind values for each shading group from a Daysim annual profile."""
+        headings = []
+        columns = []
+        with open(annualProfile, "r") as inf:
+            for lineCount, line in enumerate(inf):
+                if lineCount == 3:
+                    headings = line.strip().split(",")[3:]
+                    columns = [[] for heading in headings]
+                elif lineCount > 3:
+                    for resCount, result in enumerate(line.strip().split(",")[3:]):
+                        columns[resCount].append(float(result))
+
+        return [columns[headingCount] for headingCount, heading in enumerate(headings) \
+                if heading.strip().startswith("blind")]
+
+    @classmethod
+    def getConceptualBlindsProfile(cls, upMatrix, downMatrix, sensors, occupancy):
+        """
+        Calculate the hourly blind values (0 for up and 1 for down) of conceptual dynamic blinds.
+
+        This follows the active user of Daysim. The blinds are opened when the occupants arrive
+        and are lowered for the rest of the day once direct sunlight hits any of the sensors.
+        Lowered blinds block all direct sunlight and transmit 25% of diffuse daylight so the
+        direct illuminance at a sensor is the illuminance with the blinds up minus four times
+        the illuminance with the blinds down.
+
+        Args:
+            upMatrix: hb_DSIllMatrix for the blinds up.
+            downMatrix: hb_DSIllMatrix for the blinds down.
+            sensors: Indices of the blind sensors in the matrices.
+            occupancy: A list of 0 and 1 values for each hour.
+        """
+        profile = [0] * upMatrix.numOfHours
+        if not sensors: return profile
+        start, end = min(sensors), max(sensors) + 1
+        sensors = [sensor - start for sensor in sensors]
+
+        isDown = False
+        hasArrived = False
+        for HOY in xrange(upMatrix.numOfHours):
+            if HOY % 24 == 0: hasArrived = False
+            if occupancy[HOY]:
+                if not hasArrived:
+                    hasArrived = True
+                    isDown = False
+                if not isDown:
+                    upValues = upMatrix.getHour(HOY, start, end)
+                    downValues = downMatrix.getHour(HOY, start, end)
+                    for sensor in sensors:
+                        if upValues[sensor] - 4 * downValues[sensor] > cls.directSunlightThreshold:
+                            isDown = True
+                            break
+            if isDown: profile[HOY] = 1
+        return profile
+
+    def getMatrixForHour(self, HOY):
+        """Return the shading group and the state of the matrix that is in effect for an hour."""
+        group, state = 0, 0
+        for groupCount, profile in enumerate(self.shadingProfiles):
+            shadingGroup = groupCount + 1
+            if shadingGroup not in self.illMatrices or profile[HOY] <= 0: continue
+            numberOfStates = len(self.illMatrices[shadingGroup])
+            stateInEffect = int(round(numberOfStates * profile[HOY]))
+            group, state = shadingGroup, max(stateInEffect - 1, 0)
+        return group, state
+
+    def getOccupiedHoursByMatrix(self):
+        hoursByMatrix = {}
+        for HOY, occ in enumerate(self.occupancy):
+            if not occ: continue
+            hoursByMatrix.setdefault(self.getMatrixForHour(HOY), []).append(HOY)
+        return hoursByMatrix
+
+    @property
+    def occupiedHours(self):
+        return sum(len(hours) for hours in self.hoursByMatrix.values())
+
+    def calculate(self, start = 0, end = None, threshold = 300, UDIRange = (100, 2000)):
+        """
+        Calculate the metrics for the points from start to end.
+
+        Args:
+            start: Index of the first point. Default is 0.
+            end: Index after the last point. Default is the number of points.
+            threshold: Illuminance threshold for daylight autonomy in lux. Default is 300.
+            UDIRange: Lower and upper limits of useful daylight illuminance. Default is (100, 2000).
+        Returns:
+            A dictionary with lists of percentages for "DA", "cDA", "UDILess", "UDIIn" and
+            "UDIMore" for each point and "occupiedHours" for the number of occupied hours.
+        """
+        if end is None or end > self.numOfPts: end = self.numOfPts
+        threshold = float(threshold)
+        UDILow, UDIHigh = map(float, UDIRange)
+        occupiedHours = self.occupiedHours
+
+        results = {"DA": [], "cDA": [], "UDILess": [], "UDIIn": [], "UDIMore": [],
+                   "occupiedHours": occupiedHours}
+
+        for blockStart in xrange(start, end, self.blockSize):
+            blockEnd = min(blockStart + self.blockSize, end)
+            blockLength = blockEnd - blockStart
+
+            DACount = [0] * blockLength
+            # sum of the illuminance values under the threshold for continuous DA
+            underThreshold = [0.0] * blockLength
+            UDILessCount = [0] * blockLength
+            UDIMoreCount = [0] * blockLength
+
+            for (group, state), hours in sorted(self.hoursByMatrix.items()):
+                illMatrix = self.illMatrices[group][state]
+                for hourValues in illMatrix.iterHours(blockStart, blockEnd, hours):
+                    for ptCount, value in enumerate(hourValues):
+                        if value >= threshold: DACount[ptCount] += 1
+                        else: underThreshold[ptCount] += value
+                        if value < UDILow: UDILessCount[ptCount] += 1
+                        elif value > UDIHigh: UDIMoreCount[ptCount] += 1
+
+            if occupiedHours == 0:
+                for key in ("DA", "cDA", "UDILess", "UDIIn", "UDIMore"):
+                    results[key].extend([0] * blockLength)
+                continue
+
+            toPercent = 100.0 / occupiedHours
+            for ptCount in xrange(blockLength):
+                results["DA"].append(DACount[ptCount] * toPercent)
+                results["cDA"].append((DACount[ptCount] + underThreshold[ptCount] / threshold) * toPercent)
+                results["UDILess"].append(UDILessCount[ptCount] * toPercent)
+                results["UDIMore"].append(UDIMoreCount[ptCount] * toPercent)
+                results["UDIIn"].append((occupiedHours - UDILessCount[ptCount] - UDIMoreCount[ptCount]) * toPercent)
+
+        return results
+
+    @staticmethod
+    def spatialDaylightAutonomy(DAValues, threshold = 50):
+        """Percentage of the points with daylight autonomy equal or more than threshold."""
+        if len(DAValues) == 0: return 0
+        moreThan = len([DA for DA in DAValues if DA >= threshold])
+        return 100.0 * moreThan / len(DAValues)
+
+
 class hb_ReadAnnualResultsAux(object):
     
     def sortIllFiles(self, illFilesTemp):
@@ -4118,6 +6944,901 @@ class EPScheduleAux(object):
         
         return values, comments
 
+class hb_EPResultCache(object):
+    """
+    Columnar cache of an EnergyPlus result csv file.
+    
+    The csv file is parsed once and each column is saved as contiguous doubles in a
+    sidecar file (<csv file>.hbcol) next to the csv. The sidecar keeps the modified time
+    and the size of the csv and it is rebuilt when the csv changes. Readers only load the
+    columns that they need. Empty cells are saved as NaN and getValues returns None for
+    them so float() fails the same way that it does for an empty cell in the csv.
+    
+    Use hb_EPResultCache.open to share the same cache between the components.
+    
+    Usage:
+        epResults = hb_EPResultCache.open(csvFilePath)
+        for index in epResults.findColumns(variable = 'Zone Mean Air Temperature'):
+            print epResults.catalog[index], epResults.getValues(index)[:24]
+    """
+    MAGIC = 'HBCC'
+    VERSION = 1
+    # magic, version, csv modified time, csv size, columns, rows, rows in each block
+    HEADER = '<4sHdQIII'
+    # number of values that are kept in memory while the csv is parsed
+    BLOCKSIZE = 2 ** 22
+    
+    # caches which are already open. Keys are the csv file paths. Only the last
+    # maxOpenFiles files that are opened are kept so the loaded columns of the old
+    # results don't stay in memory for the whole Rhino session.
+    openFiles = {}
+    openOrder = []
+    maxOpenFiles = 4
+    
+    def __init__(self, csvFilePath, cacheFilePath = None):
+        self.csvFilePath = csvFilePath
+        self.cacheFilePath = cacheFilePath or csvFilePath + '.hbcol'
+        stat = os.stat(csvFilePath)
+        self.csvMTime = stat.st_mtime
+        self.csvSize = stat.st_size
+        self.columns = {}
+        
+        if self.loadIndex(): return
+        try:
+            self.ingest()
+        except (IOError, OSError):
+            # the result folder is read-only. Use Honeybee's default folder instead.
+            cacheFolder = os.path.join(sc.sticky["Honeybee_DefaultFolder"], "resultCache")
+            if not os.path.isdir(cacheFolder): os.makedirs(cacheFolder)
+            self.cacheFilePath = os.path.join(cacheFolder, \
+                hashlib.md5(os.path.abspath(csvFilePath)).hexdigest() + '.hbcol')
+            if not self.loadIndex(): self.ingest()
+    
+    @classmethod
+    def open(cls, csvFilePath):
+        """Return the cache for a csv file. The cache is built if it's not up to date.
+        
+        The results are read directly from the database for a sql file (see hb_EPSqlResults)
+        and from the eso file for eso and mtr files (see hb_EPEsoResults).
+        """
+        key = os.path.normcase(os.path.abspath(csvFilePath))
+        cache = cls.openFiles.get(key)
+        if cache is None or not cache.isValid():
+            if csvFilePath.lower().endswith('.sql'):
+                cache = hb_EPSqlResults(csvFilePath)
+            elif csvFilePath.lower().endswith(('.eso', '.mtr')):
+                cache = hb_EPEsoResults(csvFilePath)
+            else:
+                cache = cls(csvFilePath)
+            cls.openFiles[key] = cache
+        
+        # the most recently used file is the last one
+        if key in cls.openOrder: cls.openOrder.remove(key)
+        cls.openOrder.append(key)
+        while len(cls.openOrder) > cls.maxOpenFiles:
+            del cls.openFiles[cls.openOrder.pop(0)]
+        return cache
+    
+    def isValid(self):
+        """Check if the csv file is not changed since the cache is created."""
+        try:
+            stat = os.stat(self.csvFilePath)
+        except OSError:
+            return False
+        return stat.st_mtime == self.csvMTime and stat.st_size == self.csvSize
+    
+    @property
+    def columnCount(self):
+        return len(self.headers)
+    
+    @staticmethod
+    def parseHeader(header):
+        """Split a csv header to (variable, key, unit, timestep).
+        
+        e.g. 'ZONE_1:Zone Mean Air Temperature [C](Hourly)' is parsed to
+        ('Zone Mean Air Temperature', 'ZONE_1', 'C', 'Hourly')
+        """
+        name, unit, timestep = header.strip(), '', ''
+        if name.endswith(')') and '(' in name:
+            name, timestep = name[:-1].rsplit('(', 1)
+        if name.endswith(']') and '[' in name:
+            name, unit = name[:-1].rsplit('[', 1)
+        name = name.strip()
+        if ':' in name:
+            key, variable = name.rsplit(':', 1)
+        else:
+            key, variable = '', name
+        return variable, key, unit, timestep
+    
+    def loadIndex(self):
+        """Load the header of the cache file. Returns False if the cache is not valid."""
+        if not os.path.isfile(self.cacheFilePath): return False
+        try:
+            with open(self.cacheFilePath, 'rb') as inf:
+                magic, version, mTime, size, columnCount, rowCount, rowsPerBlock = \
+                    struct.unpack(self.HEADER, inf.read(struct.calcsize(self.HEADER)))
+                if magic != self.MAGIC or version != self.VERSION or \
+                    mTime != self.csvMTime or size != self.csvSize:
+                    return False
+                length, = struct.unpack('<I', inf.read(4))
+                headers = json.loads(inf.read(length).decode('utf-8'))
+                self.dataOffset = inf.tell()
+        except Exception:
+            return False
+        
+        self.setIndex(headers, rowCount, rowsPerBlock)
+        return True
+    
+    def setIndex(self, headers, rowCount, rowsPerBlock):
+        self.headers = headers
+        self.rowCount = rowCount
+        self.rowsPerBlock = rowsPerBlock
+        self.catalog = [self.parseHeader(header) for header in headers]
+        self.columns = {}
+    
+    def ingest(self):
+        """Parse the csv file and write the cache file."""
+        nan = float('nan')
+        tempFilePath = self.cacheFilePath + '.tmp'
+        with open(self.csvFilePath, 'r') as inf:
+            headers = inf.readline().split(',')
+            columnCount = len(headers)
+            rowsPerBlock = max(1, self.BLOCKSIZE // columnCount)
+            headerData = json.dumps(headers).encode('utf-8')
+            
+            with open(tempFilePath, 'wb') as outf:
+                outf.write(struct.pack(self.HEADER, self.MAGIC, self.VERSION, \
+                    self.csvMTime, self.csvSize, columnCount, 0, rowsPerBlock))
+                outf.write(struct.pack('<I', len(headerData)) + headerData)
+                dataOffset = outf.tell()
+                
+                def writeBlock(block):
+                    # values are collected row by row. write each column in one piece
+                    for c in xrange(columnCount):
+                        outf.write(block[c::columnCount].tostring())
+                
+                hasDates = headers[0].strip() == 'Date/Time'
+                block = array.array('d')
+                rowCount = 0
+                for line in inf:
+                    line = line.rstrip('\r\n')
+                    if ',,' in line:
+                        # empty cells for outputs with longer timesteps
+                        line = line.replace(',,', ',nan,').replace(',,', ',nan,')
+                    if line.endswith(','): line += 'nan'
+                    values = line.split(',')[:columnCount]
+                    if hasDates: values[0] = 'nan'
+                    if len(values) < columnCount:
+                        values.extend([''] * (columnCount - len(values)))
+                    try:
+                        block.extend(map(float, values))
+                    except ValueError:
+                        for value in values:
+                            try: block.append(float(value))
+                            except ValueError: block.append(nan)
+                    rowCount += 1
+                    
+                    if rowCount % rowsPerBlock == 0:
+                        writeBlock(block)
+                        block = array.array('d')
+                
+                writeBlock(block)
+                
+                outf.seek(0)
+                outf.write(struct.pack(self.HEADER, self.MAGIC, self.VERSION, \
+                    self.csvMTime, self.csvSize, columnCount, rowCount, rowsPerBlock))
+        
+        if os.path.isfile(self.cacheFilePath):
+            os.remove(self.cacheFilePath)
+        os.rename(tempFilePath, self.cacheFilePath)
+        self.dataOffset = dataOffset
+        self.setIndex(headers, rowCount, rowsPerBlock)
+    
+    def findColumns(self, variable = None, key = None, timestep = None):
+        """Return the index of the columns for a variable, key and/or timestep.
+        
+        The names are not case sensitive. None matches all the values.
+        """
+        indexes = []
+        for index, (v, k, unit, t) in enumerate(self.catalog):
+            if variable is not None and v.upper() != variable.upper(): continue
+            if key is not None and k.upper() != key.upper(): continue
+            if timestep is not None and t.upper() != timestep.upper(): continue
+            indexes.append(index)
+        return indexes
+    
+    def getColumns(self, indexes):
+        """Return a dictionary of the values of the columns as array('d')."""
+        toRead = sorted(set(index for index in indexes if index not in self.columns))
+        if toRead:
+            blockCount = int(math.ceil(self.rowCount / float(self.rowsPerBlock)))
+            blockLength = 8 * self.rowsPerBlock * self.columnCount
+            with open(self.cacheFilePath, 'rb') as inf:
+                for index in toRead:
+                    values = array.array('d')
+                    for block in xrange(blockCount):
+                        rows = min(self.rowsPerBlock, self.rowCount - block * self.rowsPerBlock)
+                        inf.seek(self.dataOffset + block * blockLength + 8 * index * rows)
+                        values.fromstring(inf.read(8 * rows))
+                    self.columns[index] = values
+        
+        return dict((index, self.columns[index]) for index in indexes)
+    
+    def getColumn(self, index):
+        return self.getColumns([index])[index]
+    
+    def getValues(self, indexes):
+        """Return a dictionary of the values of the columns as lists.
+        
+        Empty cells are None.
+        """
+        return dict((index, [None if v != v else v for v in values]) \
+            for index, values in self.getColumns(indexes).iteritems())
+
+class hb_EPSqlResults(hb_EPResultCache):
+    """
+    Read EnergyPlus results from the SQLite output (eplusout.sql).
+    
+    The reader has the same interface as hb_EPResultCache (headers, catalog, rowCount,
+    findColumns, getValues) so the result components can read the sql file with the
+    same code that reads the csv file. Headers are formatted the same way as
+    ReadVarsESO does in the csv file, columns are in the order of the data dictionary
+    and the rows are the reported time steps after the warmup days. EnergyPlus writes a
+    time step for each reporting frequency so the time steps that end at the same time are
+    merged into one row and the run period values are in the last row of their environment,
+    the same as the csv file. Outputs with longer reporting frequencies are None in the rows
+    that they are not reported, like the empty cells in the csv file.
+    
+    Unlike the csv file there is no limit on the number of columns and the values
+    keep full precision. hb_EPResultCache.open returns this reader for .sql files.
+    
+    The file is opened read-only and it is only open while the data dictionary, the
+    columns or the tables are read, so EnergyPlus can overwrite it in the next run.
+    
+    Usage:
+        sqlResults = hb_EPResultCache.open(sqlFilePath)
+        index = sqlResults.findColumns('Zone Mean Air Temperature', 'ZONE_1')[0]
+        temperatures = sqlResults.getValues([index])[index]
+        endUses = sqlResults.getEndUses()
+    """
+    # ReportDataDictionary reporting frequencies to csv timesteps
+    FREQUENCIES = {'Zone Timestep': 'TimeStep', 'HVAC System Timestep': 'TimeStep', \
+        'Run Period': 'RunPeriod', 'Annual': 'Annual', 'Hourly': 'Hourly', \
+        'Daily': 'Daily', 'Monthly': 'Monthly', 'Environment': 'RunPeriod'}
+    
+    # maximum number of variables in a single query
+    QUERYSIZE = 500
+    
+    def __init__(self, sqlFilePath):
+        if sqlite3 is None:
+            raise ImportError("sqlite3 is not available in this version of IronPython. " + \
+                "Use the csv result file instead.")
+        if not os.path.isfile(sqlFilePath):
+            raise ValueError("Can't find %s"%sqlFilePath)
+        
+        self.sqlFilePath = sqlFilePath
+        self.sqlMTime = os.stat(sqlFilePath).st_mtime
+        self.columns = {}
+        self.connection = None
+        self.loadIndex()
+    
+    def isValid(self):
+        """Check if the sql file is not changed since the reader is created."""
+        try:
+            return os.stat(self.sqlFilePath).st_mtime == self.sqlMTime
+        except OSError:
+            return False
+    
+    def connect(self):
+        """Open the sql file read-only."""
+        filePath = os.path.abspath(self.sqlFilePath).replace('\\', '/')
+        if not filePath.startswith('/'): filePath = '/' + filePath
+        try:
+            return sqlite3.connect('file://' + urllib.quote(filePath, safe = '/:') + '?mode=ro', uri = True)
+        except TypeError:
+            # this version of sqlite3 doesn't support uris. Only SELECT statements
+            # are executed so the file is not changed.
+            return sqlite3.connect(self.sqlFilePath)
+    
+    def openConnection(self):
+        """Keep the file open for a number of queries until close is called."""
+        if self.connection is None: self.connection = self.connect()
+    
+    def query(self, sql, parameters = ()):
+        connection = self.connection or self.connect()
+        try:
+            return connection.execute(sql, parameters).fetchall()
+        finally:
+            if connection is not self.connection: connection.close()
+    
+    def loadIndex(self):
+        """Load the data dictionary and the time steps."""
+        self.openConnection()
+        try:
+            self.readDataDictionary()
+        finally:
+            self.close()
+    
+    def readDataDictionary(self):
+        tables = set(row[0] for row in \
+            self.query("SELECT name FROM sqlite_master WHERE type='table'"))
+        if 'ReportDataDictionary' not in tables:
+            raise ValueError("%s doesn't have ReportDataDictionary table. "%self.sqlFilePath + \
+                "It is probably generated by an older version of EnergyPlus.")
+        
+        # the first column is Date/Time to match the columns of the csv file
+        self.headers = ['Date/Time']
+        self.catalog = [('Date/Time', '', '', '')]
+        self.dictionaryIndexes = [None]
+        for index, key, name, frequency, units in self.query( \
+            "SELECT ReportDataDictionaryIndex, KeyValue, Name, ReportingFrequency, Units " + \
+            "FROM ReportDataDictionary ORDER BY ReportDataDictionaryIndex"):
+            timestep = self.FREQUENCIES.get(frequency, frequency)
+            if key:
+                header = '%s:%s [%s](%s)'%(key, name, units, timestep)
+            else:
+                header = '%s [%s](%s)'%(name, units, timestep)
+            self.headers.append(header)
+            # parsed from the header so meters are split the same way as in the csv file
+            self.catalog.append(self.parseHeader(header))
+            self.dictionaryIndexes.append(index)
+        
+        # rows for the end of each time step. Run period values don't have a date.
+        self.rows = {}
+        self.rowCount = 0
+        rowKeys = {}
+        lastRows = {}
+        runPeriods = []
+        for timeIndex, environment, month, day, hour, minute in self.query( \
+            "SELECT TimeIndex, EnvironmentPeriodIndex, Month, Day, Hour, Minute FROM Time " + \
+            "WHERE (WarmupFlag IS NULL OR WarmupFlag = 0) " + \
+            "AND TimeIndex IN (SELECT DISTINCT TimeIndex FROM ReportData) ORDER BY TimeIndex"):
+            if month is None:
+                runPeriods.append((timeIndex, environment))
+                continue
+            key = (environment, month, day, hour, minute)
+            if key not in rowKeys:
+                rowKeys[key] = self.rowCount
+                self.rowCount += 1
+            self.rows[timeIndex] = rowKeys[key]
+            lastRows[environment] = max(lastRows.get(environment, 0), rowKeys[key])
+        
+        for timeIndex, environment in runPeriods:
+            if environment not in lastRows:
+                lastRows[environment] = self.rowCount
+                self.rowCount += 1
+            self.rows[timeIndex] = lastRows[environment]
+    
+    def getColumns(self, indexes):
+        """Return a dictionary of the values of the columns as array('d').
+        
+        Values are NaN for the rows that the output is not reported.
+        """
+        toRead = set(index for index in indexes if index not in self.columns)
+        emptyColumn = array.array('d', [float('nan')]) * self.rowCount
+        columnIndexes = {}
+        for index in toRead:
+            self.columns[index] = array.array('d', emptyColumn)
+            if self.dictionaryIndexes[index] is not None:
+                columnIndexes[self.dictionaryIndexes[index]] = index
+        
+        dictionaryIndexes = sorted(columnIndexes)
+        if dictionaryIndexes: self.openConnection()
+        try:
+            for i in xrange(0, len(dictionaryIndexes), self.QUERYSIZE):
+                queryIndexes = dictionaryIndexes[i: i + self.QUERYSIZE]
+                sql = "SELECT ReportDataDictionaryIndex, TimeIndex, Value FROM ReportData " + \
+                    "WHERE ReportDataDictionaryIndex IN (%s)"%','.join('?' * len(queryIndexes))
+                for dictionaryIndex, timeIndex, value in self.query(sql, queryIndexes):
+                    row = self.rows.get(timeIndex)
+                    if row is not None and value is not None:
+                        self.columns[columnIndexes[dictionaryIndex]][row] = value
+        except:
+            # don't keep the columns that are partly read
+            for index in toRead: self.columns.pop(index, None)
+            raise
+        finally:
+            self.close()
+        
+        return dict((index, self.columns[index]) for index in indexes)
+    
+    def getTabularData(self, reportName, tableName, reportFor = 'Entire Facility'):
+        """Read a table from the tabular reports.
+        
+        Args:
+            reportName: Name of the report (e.g. AnnualBuildingUtilityPerformanceSummary).
+            tableName: Name of the table (e.g. End Uses).
+            reportFor: Report for string. Default is Entire Facility.
+        
+        Returns:
+            rowNames: List of row names in the order of the report.
+            columns: List of (column name, units) in the order of the report.
+            values: A dictionary of values as {rowName: {columnName: value}}. Values
+                are converted to float when it's possible.
+        """
+        rowNames, columns, values = [], [], {}
+        for rowName, columnName, units, value in self.query( \
+            "SELECT RowName, ColumnName, Units, Value FROM TabularDataWithStrings " + \
+            "WHERE ReportName = ? AND TableName = ? AND ReportForString = ? " + \
+            "ORDER BY TabularDataIndex", (reportName, tableName, reportFor)):
+            if rowName not in values:
+                rowNames.append(rowName)
+                values[rowName] = {}
+            if (columnName, units) not in columns:
+                columns.append((columnName, units))
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                value = value.strip() if value else value
+            values[rowName][columnName] = value
+        return rowNames, columns, values
+    
+    def getEndUses(self):
+        """End uses table from the annual building utility performance summary."""
+        return self.getTabularData('AnnualBuildingUtilityPerformanceSummary', 'End Uses')
+    
+    def getZoneSizing(self, load = 'Cooling'):
+        """Zone sensible cooling or heating table from the HVAC sizing summary."""
+        return self.getTabularData('HVACSizingSummary', 'Zone Sensible %s'%load)
+    
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+class hb_EPEsoResults(hb_EPResultCache):
+    """
+    Streaming reader of the EnergyPlus output files (.eso and .mtr).
+    
+    The results are read directly from the eso file without ReadVarsESO so there is no
+    limit on the number of columns and sub-hourly results don't need to be converted to
+    csv first. The data dictionary is read when the reader is created and the values are
+    read in a single pass over the file only for the columns that are requested.
+    
+    The reader has the same interface as hb_EPResultCache. Each time stamp in the file
+    is a row and the values are None for the rows that an output is not reported. Time
+    stamps for the same time are merged into one row like ReadVarsESO does in the csv
+    file (e.g. the end of an hour for timestep and hourly outputs or the last hour of a
+    day for daily outputs). hb_EPResultCache.open returns this reader for .eso and .mtr
+    files. Use readColumns to get the values of an output only for the time steps that
+    it is reported.
+    
+    Usage:
+        esoResults = hb_EPResultCache.open(esoFilePath)
+        indexes = esoResults.findColumns('Zone Mean Air Temperature', timestep = 'TimeStep')
+        for index, (rows, values) in esoResults.readColumns(indexes).iteritems():
+            print esoResults.headers[index], values[:24]
+    """
+    # report ids of the time stamps. 1 is the environment.
+    STAMPS = ('1', '2', '3', '4', '5', '6')
+    
+    # size of the chunks that are read from the file
+    CHUNKSIZE = 2 ** 24
+    # up to this number of outputs each output is searched in the chunks instead of
+    # parsing every line. Searching is faster for a few outputs.
+    SCANLIMIT = 8
+    
+    # reporting frequencies in the data dictionary to csv timesteps
+    FREQUENCIES = {'Each Call': 'TimeStep', 'TimeStep': 'TimeStep', 'Hourly': 'Hourly', \
+        'Daily': 'Daily', 'Monthly': 'Monthly', 'RunPeriod': 'RunPeriod', \
+        'Run Period': 'RunPeriod', 'Environment': 'RunPeriod', 'Annual': 'Annual'}
+    
+    def __init__(self, esoFilePath):
+        self.esoFilePath = esoFilePath
+        stat = os.stat(esoFilePath)
+        self.esoMTime = stat.st_mtime
+        self.esoSize = stat.st_size
+        self.columns = {}
+        self.environments = []
+        self._rowCount = None
+        self.loadIndex()
+    
+    def isValid(self):
+        """Check if the eso file is not changed since the reader is created."""
+        try:
+            stat = os.stat(self.esoFilePath)
+        except OSError:
+            return False
+        return stat.st_mtime == self.esoMTime and stat.st_size == self.esoSize
+    
+    @property
+    def rowCount(self):
+        """Number of time stamps in the file. The file is read once to count them."""
+        if self._rowCount is None: self.readColumns([])
+        return self._rowCount
+    
+    def loadIndex(self):
+        """Read the data dictionary from the header of the file."""
+        self.headers = ['Date/Time']
+        self.catalog = [('Date/Time', '', '', '')]
+        # column index for each report id in the file
+        self.reportIds = {}
+        with open(self.esoFilePath, 'rb') as inf:
+            inf.readline() # Program Version
+            while True:
+                line = inf.readline()
+                if not line:
+                    raise ValueError("Can't find the end of the data dictionary in %s."%self.esoFilePath)
+                if line.startswith('End of Data Dictionary'): break
+                reportId, count, name = line.split(',', 2)
+                if reportId in self.STAMPS: continue
+                name, frequency = name.split('!', 1)
+                timestep = frequency.split('[')[0].strip()
+                timestep = self.FREQUENCIES.get(timestep, timestep)
+                if ',' in name:
+                    key, name = name.rsplit(',', 1)
+                else:
+                    # meters don't have a key
+                    key = ''
+                name, unit = name.strip(), ''
+                if name.endswith(']') and '[' in name:
+                    name, unit = name[:-1].rsplit('[', 1)
+                    name = name.strip()
+                if key:
+                    self.headers.append('%s:%s [%s](%s)'%(key, name, unit, timestep))
+                else:
+                    self.headers.append('%s [%s](%s)'%(name, unit, timestep))
+                self.catalog.append((name, key, unit, timestep))
+                self.reportIds[reportId] = len(self.headers) - 1
+            # position of the first time stamp
+            self.dataOffset = inf.tell()
+    
+    def readColumns(self, indexes):
+        """Read the values of the columns in a single pass over the file.
+        
+        Only the values of the requested columns are kept in memory.
+        
+        Returns:
+            A dictionary of {index: (rows, values)}. rows is an array('i') of the rows that
+            the output is reported and values is an array('d') of the values in the same
+            rows. Both start from 0 for the first time stamp.
+        """
+        columns = dict((index, (array.array('i'), array.array('d'))) for index in indexes)
+        # the values are looked up by the report id string to avoid parsing the other lines
+        toRead = {}
+        for reportId, index in self.reportIds.iteritems():
+            if index in columns: toRead[reportId] = columns[index]
+        environments = []
+        rowCount = 0
+        
+        with open(self.esoFilePath, 'rb') as inf:
+            inf.seek(self.dataOffset)
+            if len(toRead) > self.SCANLIMIT:
+                rowCount = self.readLines(inf, toRead, environments)
+            else:
+                rest = ''
+                lastKey = None
+                while True:
+                    data = inf.read(self.CHUNKSIZE)
+                    chunk = rest + data
+                    if data:
+                        # only pass full lines. The rest is added to the next chunk.
+                        cut = chunk.rfind('\n') + 1
+                        chunk, rest = chunk[:cut], chunk[cut:]
+                    rowCount, lastKey = self.scanChunk(chunk, toRead, rowCount, environments, lastKey)
+                    if not data: break
+        
+        self._rowCount = rowCount
+        self.environments = environments
+        return columns
+    
+    @staticmethod
+    def getStampKey(reportId, fields, lastKey):
+        """Return (day of simulation, minute of the day) at the end of a time stamp.
+        
+        Annual time stamps don't have a day and are at the same time as the stamp
+        before them.
+        """
+        try:
+            fields = fields.split(',')
+            if reportId == '2':
+                return int(fields[0]), (int(fields[4]) - 1) * 60 + float(fields[6])
+            elif reportId == '6':
+                if lastKey is not None: return lastKey
+            else:
+                return int(fields[0]), 1440.0
+        except (ValueError, IndexError):
+            pass
+        # unknown time. Start a new row.
+        return reportId, tuple(fields)
+    
+    def readLines(self, lines, toRead, environments):
+        """Parse the data lines one by one. Returns the number of rows."""
+        stamps = self.STAMPS
+        row = -1
+        lastKey = None
+        for line in lines:
+            reportId, sep, values = line.partition(',')
+            column = toRead.get(reportId)
+            if column is not None:
+                # daily and longer outputs have min and max values after the value
+                column[0].append(row)
+                column[1].append(float(values.split(',', 1)[0]))
+            elif reportId in stamps:
+                if reportId == '1':
+                    environments.append((row + 1, values.split(',', 1)[0].strip()))
+                    lastKey = None
+                else:
+                    key = self.getStampKey(reportId, values, lastKey)
+                    if key != lastKey:
+                        row += 1
+                        lastKey = key
+        return row + 1
+    
+    def scanChunk(self, chunk, toRead, rowCount, environments, lastKey = None):
+        """Search a chunk for the lines of the outputs and the time stamps.
+        
+        lastKey is the time of the last time stamp in the previous chunk.
+        
+        Returns the number of rows and the time of the last time stamp after the chunk.
+        """
+        def findLines(reportId):
+            marker = '\n%s,'%reportId
+            positions = []
+            position = chunk.find(marker)
+            while position != -1:
+                positions.append(position)
+                position = chunk.find(marker, position + 1)
+            return positions
+        
+        # every line starts after a line break
+        chunk = '\n' + chunk
+        stamps = []
+        for reportId in self.STAMPS:
+            stamps.extend(findLines(reportId))
+        stamps.sort()
+        
+        # a row starts at each time stamp which is not at the same time as the one before
+        rowStarts = []
+        for position in stamps:
+            end = chunk.find('\n', position + 1)
+            if end == -1: end = len(chunk)
+            reportId, sep, fields = chunk[position + 1:end].partition(',')
+            if reportId == '1':
+                environments.append((rowCount + len(rowStarts), fields.split(',', 1)[0].strip()))
+                lastKey = None
+            else:
+                key = self.getStampKey(reportId, fields, lastKey)
+                if key != lastKey:
+                    rowStarts.append(position)
+                    lastKey = key
+        
+        for reportId, (rows, values) in toRead.iteritems():
+            start = len(reportId) + 2
+            for position in findLines(reportId):
+                end = chunk.find('\n', position + start)
+                if end == -1: end = len(chunk)
+                rows.append(rowCount + bisect.bisect(rowStarts, position) - 1)
+                values.append(float(chunk[position + start:end].split(',', 1)[0]))
+        
+        return rowCount + len(rowStarts), lastKey
+    
+    def getColumns(self, indexes):
+        """Return a dictionary of the values of the columns as array('d').
+        
+        Values are NaN for the rows that the output is not reported.
+        """
+        toRead = sorted(set(index for index in indexes if index not in self.columns))
+        if toRead:
+            readColumns = self.readColumns([index for index in toRead if index != 0])
+            emptyColumn = array.array('d', [float('nan')]) * self.rowCount
+            for index in toRead:
+                values = array.array('d', emptyColumn)
+                if index in readColumns:
+                    for row, value in itertools.izip(*readColumns[index]):
+                        values[row] = value
+                self.columns[index] = values
+        
+        return dict((index, self.columns[index]) for index in indexes)
+
+class hb_ComfortMatrixFile(object):
+    """
+    Binary file of a comfort matrix from the Microclimate Map Analysis or the Thermal
+    Autonomy Analysis components.
+    
+    The file can be used in place of the matrix. matrix[0] is the header of the matrix,
+    matrix[hour] is the list of the values of the points for an hour of the analysis and
+    for the occupied matrices of the Thermal Autonomy Analysis matrix[-1] is the number
+    of occupied hours for each point. Only the rows that are requested are read from the
+    file and getPeriodValues calculates the total or the average of an analysis period
+    one row at a time without loading the whole matrix.
+    
+    File layout:
+        header: magic, version, number of hours, number of points, occupied flag,
+            start and end of the analysis period as (month, day, hour) and the length
+            of the header of the matrix. The header of the matrix follows.
+        body: float32 values of the points for each hour.
+        footer: float32 number of occupied hours for each point (only occupied matrices).
+    
+    In occupied matrices the unoccupied hours are saved as NaN and they are read as 0.0
+    while the occupied hours are read as integers, the same as the matrix that is
+    created by the Thermal Autonomy Analysis component.
+    
+    Usage:
+        hb_ComfortMatrixFile.write(filePath, comfResultsMtx)
+        comfMtx = hb_ComfortMatrixFile(filePath)
+        noonValues = comfMtx[12]
+        averages = comfMtx.getPeriodValues(range(1, 169))
+    """
+    MAGIC = 'HBCM'
+    VERSION = 1
+    # magic, version, hours, points, occupied, analysis period, length of the matrix header
+    HEADER = '<4sHIIB6HI'
+    EXTENSION = '.hbcm'
+    
+    def __init__(self, filePath):
+        self.filePath = filePath
+        self.file = None
+        self.data = None
+        with open(filePath, 'rb') as inf:
+            header = inf.read(struct.calcsize(self.HEADER))
+            magic, version, self.hourCount, self.pointCount, occupied, \
+                startMonth, startDay, startHour, endMonth, endDay, endHour, \
+                headerLength = struct.unpack(self.HEADER, header)
+            if magic != self.MAGIC or version != self.VERSION:
+                raise ValueError("%s is not a valid comfort matrix file."%filePath)
+            self.header = inf.read(headerLength)
+        self.occupied = bool(occupied)
+        self.analysisPeriod = [(startMonth, startDay, startHour), (endMonth, endDay, endHour)]
+        self.dataOffset = struct.calcsize(self.HEADER) + headerLength
+        self.rowLength = 4 * self.pointCount
+    
+    @classmethod
+    def isMatrixFile(cls, filePath):
+        """Check if a file path is a binary comfort matrix."""
+        if not isinstance(filePath, basestring) or not os.path.isfile(filePath): return False
+        with open(filePath, 'rb') as inf:
+            return inf.read(len(cls.MAGIC)) == cls.MAGIC
+    
+    @classmethod
+    def write(cls, filePath, comfMtx, occupied = False):
+        """Write a comfort matrix to a binary file.
+        
+        Args:
+            filePath: Path to the file.
+            comfMtx: A comfort matrix. The first item is the header and the rest are lists
+                of the values of the points for each hour.
+            occupied: Set to True for matrices that have the number of occupied hours as
+                the last item (e.g. the matrices of the Thermal Autonomy Analysis).
+        """
+        rows = comfMtx[1:]
+        occupiedHours = None
+        if occupied: rows, occupiedHours = rows[:-1], rows[-1]
+        pointCount = len(rows[0]) if rows else 0
+        
+        writer = hb_ComfortMatrixWriter(filePath, comfMtx[0], pointCount, occupied)
+        for row in rows: writer.writeRow(row)
+        writer.close(occupiedHours)
+        return filePath
+    
+    def __len__(self):
+        return self.hourCount + 1 + int(self.occupied)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in xrange(*index.indices(len(self)))]
+        if index < 0: index += len(self)
+        if index == 0: return self.header
+        elif 0 < index <= self.hourCount: return self.toValues(self.readRow(index))
+        elif self.occupied and index == self.hourCount + 1:
+            return [int(value) for value in self.readRow(index)]
+        raise IndexError("comfort matrix index out of range")
+    
+    def __iter__(self):
+        for index in xrange(len(self)):
+            yield self[index]
+    
+    def readRow(self, index):
+        """Return the raw values of a row of the matrix as array('f')."""
+        if self.file is None:
+            self.file = open(self.filePath, 'rb')
+            if mmap is not None:
+                try: self.data = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+                except Exception: self.data = None
+        offset = self.dataOffset + (index - 1) * self.rowLength
+        if self.data is not None:
+            rowData = self.data[offset: offset + self.rowLength]
+        else:
+            self.file.seek(offset)
+            rowData = self.file.read(self.rowLength)
+        values = array.array('f')
+        values.fromstring(rowData)
+        return values
+    
+    def toValues(self, values):
+        if not self.occupied: return values.tolist()
+        return [int(value) if value == value else 0.0 for value in values]
+    
+    def getPeriodValues(self, rows, total = False):
+        """Calculate the total or the average of the points for a list of rows.
+        
+        Rows are the indexes of the matrix which start from 1 for the first hour. For the
+        occupied matrices the average is calculated over the occupied hours of the period.
+        """
+        sums = [0.0] * self.pointCount
+        counts = [0] * self.pointCount
+        add = operator.add
+        for row in rows:
+            values = self.readRow(row)
+            if self.occupied:
+                counts = map(add, counts, [value == value for value in values])
+                values = [value if value == value else 0.0 for value in values]
+            sums = map(add, sums, values)
+        
+        if total: return sums
+        if not self.occupied: return [value / len(rows) for value in sums]
+        return [value / count if count else 0.0 for value, count in zip(sums, counts)]
+    
+    def close(self):
+        if self.data is not None: self.data.close()
+        if self.file is not None: self.file.close()
+        self.data = self.file = None
+
+class hb_ComfortMatrixWriter(object):
+    """
+    Write a binary comfort matrix file one hour at a time.
+    
+    Rows are written to the file as soon as they are added so only one hour of the matrix
+    has to be kept in memory. The number of hours in the header is updated when the
+    writer is closed.
+    
+    Usage:
+        writer = hb_ComfortMatrixWriter(filePath, header, pointCount, occupied = True)
+        for values in hourlyValues: writer.writeRow(values)
+        writer.close(occupiedHours)
+    """
+    
+    def __init__(self, filePath, header, pointCount, occupied = False):
+        self.filePath = filePath
+        self.header = str(header)
+        self.pointCount = pointCount
+        self.occupied = occupied
+        self.hourCount = 0
+        self.nan = float('nan')
+        
+        # the analysis period is the last two items of the header. e.g. ;(1, 1, 1);(12, 31, 24)
+        period = [int(number) for number in re.findall(r'\d+', ''.join(self.header.split(';')[-2:]))]
+        self.period = period if len(period) == 6 else [0] * 6
+        
+        self.file = open(filePath, 'wb')
+        self.writeHeader()
+        self.file.write(self.header)
+    
+    def writeHeader(self):
+        hbCM = hb_ComfortMatrixFile
+        self.file.write(struct.pack(hbCM.HEADER, hbCM.MAGIC, hbCM.VERSION, self.hourCount, \
+            self.pointCount, int(self.occupied), *(self.period + [len(self.header)])))
+    
+    def writeRow(self, row):
+        """Write the values of the points for the next hour."""
+        if self.occupied:
+            # unoccupied hours are floats and occupied hours are integers
+            nan = self.nan
+            row = [nan if isinstance(value, float) else value for value in row]
+        self.writeValues(row)
+    
+    def writeValues(self, row):
+        """Write the values of the points for the next hour as they are.
+        
+        Unlike writeRow the unoccupied hours of occupied matrices should already be NaN.
+        """
+        values = array.array('f', row)
+        if len(values) < self.pointCount: values.extend([self.nan] * (self.pointCount - len(values)))
+        self.file.write(values[:self.pointCount].tostring())
+        self.hourCount += 1
+    
+    def close(self, occupiedHours = None):
+        """Write the number of occupied hours of the points and close the file."""
+        if self.file is None: return self.filePath
+        if self.occupied:
+            if occupiedHours is None: occupiedHours = [0] * self.pointCount
+            self.file.write(array.array('f', occupiedHours).tostring())
+        self.file.seek(0)
+        self.writeHeader()
+        self.file.close()
+        self.file = None
+        return self.filePath
+
 class EPObjectsAux(object):
     
     def isEPMaterial(self, matName):
@@ -4476,7 +8197,7 @@ class ReadEPSchedules(object):
         
         if numericType.strip().lower() == "district":
             hourlyValues = map(int, hourlyValues)
-        return scheduleConstant
+        return hourlyValues
     
     
     def getCompactEPScheduleValues(self, schName):
@@ -4488,80 +8209,10 @@ class ReadEPSchedules(object):
         lowerLimit, upperLimit, numericType, unitType = \
                 self.getScheduleTypeLimitsData(typeLimitName)
         
-        #Separate out the different periods.
-        totalValues = []
-        periodValues = []
-        headerDone = False
-        for val in values:
-            newPeriod = False
-            for word in self.comapctKeywords:
-                if word in val: newPeriod = True
-            if newPeriod == True:
-                if headerDone == True:
-                    totalValues.append(periodValues)
-                periodValues = [val]
-                headerDone = True
-            elif headerDone == True:
-                periodValues.append(val)
-        totalValues.append(periodValues)
-        
-        #For each day period, construct a day schedule.
-        dayType = []
-        dayValues = []
-        for dayVals in totalValues:
-            dayType.append(dayVals[0].title().split('For: ')[-1])
-            numberOfDaySch = int((len(dayVals) - 1) /2)
-            
-            hourlyValues = range(24)
-            startHour = 0
-            for i in range(numberOfDaySch):
-                value = float(dayVals[2 * i + 2])
-                untilTime = map(int, dayVals[2 * i + 1].split(":")[1:])
-                endHour = int(untilTime[0] +  untilTime[1]/60)
-                for hour in range(startHour, endHour):
-                    hourlyValues[hour] = value
-                
-                startHour = endHour
-            dayValues.append(hourlyValues)
-        
-        #Construct a week schedule from the day schedules.
-        #Map the dayTypes to the days of the week.
-        ['Weekdays', 'Weekends', 'Alldays', 'AllOtherDays', 'Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-        weekVals = [-1, -1, -1, -1, -1, -1, -1]
-        for typeCount, type in enumerate(dayType):
-            if type == 'Alldays':
-                for count, val in enumerate(weekVals):
-                    weekVals[count] = typeCount
-            elif type == 'Weekdays':
-                for count, val in enumerate(weekVals):
-                    if count < 6 and count != 0: weekVals[count] = typeCount
-            elif type == 'Weekends':
-                weekVals[0] = typeCount
-                weekVals[-1] = typeCount
-            elif type == 'Sunday': weekVals[0] = typeCount
-            elif type == 'Monday': weekVals[1] = typeCount
-            elif type == 'Tuesday': weekVals[2] = typeCount
-            elif type == 'Wednesday': weekVals[3] = typeCount
-            elif type == 'Thursday': weekVals[4] = typeCount
-            elif type == 'Friday': weekVals[5] = typeCount
-            elif type == 'Saturday': weekVals[6] = typeCount
-            elif type == 'Allotherdays':
-                for count, val in enumerate(weekVals):
-                    if val == -1: weekVals[count] = typeCount
-        
-        #Turn the week schedule into a year schedule.
-        hourlyValues = []
-        dayVals = []
-        dayofWeek = -1
-        for day in range(365):
-            if dayofWeek == 6: dayofWeek = 0
-            else: dayofWeek += 1
-            dayVals.append(weekVals[dayofWeek])
-        for day in dayVals:
-            hourlyValues.extend(dayValues[day])
-        
-        print hourlyValues
-        return hourlyValues
+        # update last day of schedule
+        self.endHOY = 8760
+        
+        return list(hb_ScheduleCompiler().getAnnualValues(schName, self.startDayOfTheWeek))
     
     
     def getYearlyEPScheduleValues(self, schName = None):
@@ -4624,6 +8275,38 @@ class ReadEPSchedules(object):
             
             return hourlyValues
     
+    def getAnnualScheduleValues(self, schName = None, holidays = None, timestep = 1):
+        """
+        Return 8760 * timestep values for any supported schedule using hb_ScheduleCompiler.
+        
+        The result is a new array('d') that can be changed.
+        
+        Args:
+            schName: Optional schedule name. Default is the schedule of this object.
+            holidays: Optional list of holidays as day of the year starting from 0.
+            timestep: Number of values per hour.
+        """
+        if schName == None:
+            schName = self.schName
+        
+        compiler = hb_ScheduleCompiler(timestep = timestep)
+        hourlyValues = compiler.getAnnualValues(schName, self.startDayOfTheWeek, holidays)
+        
+        values, comments = self.hb_EPScheduleAUX.getScheduleDataByName(schName.upper(), ghenv.Component)
+        self.schType = values[0].lower()
+        self.startHOY = 1
+        self.endHOY = 8760
+        
+        # find the schedule type limits to set the unit
+        try:
+            if self.schType == "schedule:week:daily":
+                values, comments = self.hb_EPScheduleAUX.getScheduleDataByName(values[1].upper(), ghenv.Component)
+            self.getScheduleTypeLimitsData(values[1])
+        except:
+            pass
+        
+        return hourlyValues
+    
     def getHolidaySchedValues(self, schName = None):
         hourlyValues = []
         if schName == None:
@@ -4642,7 +8325,226 @@ class ReadEPSchedules(object):
                     holidaySchedule = self.getScheduleValues(weekValues[8])
                     hourlyValues.append([startDay,endDay,holidaySchedule])
         
-        return hourlyValues
+        return hourlyValues
+
+class hb_ScheduleCompiler(object):
+    """
+    Compile EnergyPlus schedules into annual arrays of values.
+    
+    Supported schedules are Schedule:Year, Schedule:Week:Daily, Schedule:Day:Interval,
+    Schedule:Constant and Schedule:Compact. The result is an array('d') with 8760 * timestep
+    values which starts from Jan 1st. Compiled schedules are cached and shared between all
+    the components and each call returns a copy of the cached array.
+    
+    The cache is keyed by schedule name, start day of the week, timestep and holidays and
+    a cached schedule is only reused if all the library objects that it was compiled from
+    are still the same objects in the schedule library.
+    
+    Args:
+        scheduleLib: Optional schedule library. Default is Honeybee schedule library.
+        timestep: Number of values per hour. Default is 1.
+    
+    Usage:
+        compiler = hb_ScheduleCompiler()
+        values = compiler.getAnnualValues("Medium Office Occupancy", startDayOfWeek = 0)
+    """
+    # (NAME, startDayOfWeek, timestep, holidays) > (values, dependencies)
+    cache = {}
+    daysInMonth = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+    weekDays = ('sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday')
+    # day types are 0-6 for days of the week (0 is Sunday) and then the special days
+    compactDayTypes = {'sunday': (0,), 'monday': (1,), 'tuesday': (2,), 'wednesday': (3,),
+                       'thursday': (4,), 'friday': (5,), 'saturday': (6,),
+                       'weekdays': (1, 2, 3, 4, 5), 'weekends': (0, 6),
+                       'holiday': (7,), 'holidays': (7,),
+                       'summerdesignday': (8,), 'winterdesignday': (9,),
+                       'customday1': (10,), 'customday2': (11,),
+                       'alldays': tuple(range(12))}
+    
+    def __init__(self, scheduleLib = None, timestep = 1):
+        if scheduleLib is None: scheduleLib = sc.sticky["honeybee_ScheduleLib"]
+        self.scheduleLib = scheduleLib
+        self.timestep = int(timestep)
+        self.stepsPerDay = 24 * self.timestep
+        self.dependencies = {}
+        self.dayProfiles = {}
+    
+    @classmethod
+    def clearCache(cls):
+        cls.cache.clear()
+    
+    def getDOY(self, month, day):
+        return sum(self.daysInMonth[:int(month) - 1]) + int(day)
+    
+    def getScheduleFields(self, schName):
+        """Return schedule type (lower case) and the list of field values for a schedule."""
+        schName = schName.upper()
+        try:
+            record = self.scheduleLib[schName]
+        except KeyError:
+            raise ValueError("Failed to find %s in the Honeybee schedule library."%schName)
+        
+        self.dependencies[schName] = record
+        fields = [record[key][0] for key in sorted(record.keys()) if key != 0]
+        return record[0].lower(), fields
+    
+    def isUpToDate(self, dependencies):
+        for schName, record in dependencies.items():
+            if self.scheduleLib.get(schName) is not record: return False
+        return True
+    
+    def getAnnualValues(self, schName, startDayOfWeek = 0, holidays = None):
+        """
+        Return annual values of a schedule as a new array('d') of 8760 * timestep values.
+        
+        Args:
+            schName: Name of a schedule in the Honeybee schedule library.
+            startDayOfWeek: Day of the week for Jan 1st. 0 is Sunday and 6 is Saturday.
+            holidays: Optional list of holidays as day of the year starting from 0.
+        """
+        startDayOfWeek = int(startDayOfWeek)%7
+        if holidays: holidays = tuple(sorted(set(int(day) for day in holidays)))
+        else: holidays = ()
+        
+        key = (schName.upper(), startDayOfWeek, self.timestep, holidays)
+        if key in self.cache:
+            values, dependencies = self.cache[key]
+            if self.isUpToDate(dependencies):
+                # callers can change the values without changing the cache
+                return values[:]
+        
+        self.dependencies = {}
+        self.dayProfiles = {}
+        values = self.compileSchedule(schName, startDayOfWeek, frozenset(holidays))
+        self.cache[key] = values, self.dependencies
+        return values[:]
+    
+    def compileSchedule(self, schName, startDayOfWeek, holidays):
+        scheduleType, fields = self.getScheduleFields(schName)
+        
+        if scheduleType == "schedule:year":
+            dailyProfiles = self.compileYearSchedule(fields, startDayOfWeek, holidays)
+        elif scheduleType == "schedule:week:daily":
+            weekProfiles = self.compileWeekSchedule(schName)
+            dailyProfiles = [self.getWeekDayProfile(weekProfiles, day, startDayOfWeek, holidays) \
+                             for day in range(365)]
+        elif scheduleType == "schedule:day:interval":
+            dailyProfiles = [self.compileDaySchedule(schName)] * 365
+        elif scheduleType == "schedule:constant":
+            dailyProfiles = [array.array('d', [float(fields[1])] * self.stepsPerDay)] * 365
+        elif scheduleType == "schedule:compact":
+            dailyProfiles = self.compileCompactSchedule(fields, startDayOfWeek, holidays)
+        else:
+            raise ValueError("Honeybee doesn't support %s currently."%scheduleType)
+        
+        values = array.array('d')
+        for profile in dailyProfiles:
+            values.extend(profile)
+        return values
+    
+    def getUntilStep(self, untilTime):
+        """Convert an until time such as 'Until: 08:30' or '08:30' to the index of the end step."""
+        hour, minute = untilTime.split(":")[-2:]
+        return min((int(hour) * 60 + int(minute)) * self.timestep // 60, self.stepsPerDay)
+    
+    def fillDayProfile(self, untilValuePairs):
+        profile = array.array('d', [0.0] * self.stepsPerDay)
+        startStep = 0
+        for untilTime, value in untilValuePairs:
+            endStep = self.getUntilStep(untilTime)
+            value = float(value)
+            for step in range(startStep, endStep):
+                profile[step] = value
+            startStep = max(startStep, endStep)
+        return profile
+    
+    def compileDaySchedule(self, schName):
+        schName = schName.upper()
+        if schName not in self.dayProfiles:
+            scheduleType, fields = self.getScheduleFields(schName)
+            if scheduleType == "schedule:day:interval":
+                # typeLimits, interpolate, (until, value) * n
+                pairs = [(fields[2 * i + 2], fields[2 * i + 3]) \
+                         for i in range(int((len(fields) - 2) / 2))]
+                self.dayProfiles[schName] = self.fillDayProfile(pairs)
+            elif scheduleType == "schedule:constant":
+                self.dayProfiles[schName] = array.array('d', [float(fields[1])] * self.stepsPerDay)
+            else:
+                raise ValueError("%s is a %s and not a day schedule."%(schName, scheduleType))
+        return self.dayProfiles[schName]
+    
+    def compileWeekSchedule(self, schName):
+        """Return day profiles for Sunday to Saturday and holiday."""
+        scheduleType, fields = self.getScheduleFields(schName)
+        if scheduleType != "schedule:week:daily":
+            raise ValueError("%s is a %s and not a week schedule."%(schName, scheduleType))
+        return [self.compileDaySchedule(daySchName) for daySchName in fields[:8]]
+    
+    @staticmethod
+    def getWeekDayProfile(weekProfiles, day, startDayOfWeek, holidays):
+        if day in holidays: return weekProfiles[7]
+        return weekProfiles[(day + startDayOfWeek)%7]
+    
+    def compileYearSchedule(self, fields, startDayOfWeek, holidays):
+        dailyProfiles = [array.array('d', [0.0] * self.stepsPerDay)] * 365
+        
+        # typeLimits, (week, startMonth, startDay, endMonth, endDay) * n
+        for i in range(int((len(fields) - 1) / 5)):
+            weekProfiles = self.compileWeekSchedule(fields[5 * i + 1])
+            startDay = self.getDOY(fields[5 * i + 2], fields[5 * i + 3])
+            endDay = self.getDOY(fields[5 * i + 4], fields[5 * i + 5])
+            for day in range(startDay - 1, endDay):
+                dailyProfiles[day] = self.getWeekDayProfile(weekProfiles, day, startDayOfWeek, holidays)
+        
+        return dailyProfiles
+    
+    def compileCompactSchedule(self, fields, startDayOfWeek, holidays):
+        # periods is a list of [endDay, {dayType: [(until, value), ...]}]
+        periods = []
+        currentDayTypes = []
+        untilTime = None
+        for field in fields[1:]:
+            field = field.strip()
+            keyword = field.split(":")[0].strip().lower()
+            if keyword == "through":
+                month, day = field.split(":")[-1].strip().split("/")
+                periods.append([self.getDOY(month, day), {}])
+                currentDayTypes = []
+            elif keyword == "for":
+                if not periods: periods.append([365, {}])
+                dayTypes = periods[-1][1]
+                currentDayTypes = []
+                for word in field.split(":", 1)[-1].lower().split():
+                    if word == "allotherdays":
+                        newDayTypes = [d for d in range(12) if d not in dayTypes]
+                    else:
+                        newDayTypes = self.compactDayTypes.get(word, ())
+                    for dayType in newDayTypes:
+                        dayTypes[dayType] = []
+                        currentDayTypes.append(dayType)
+            elif keyword == "interpolate":
+                continue
+            elif keyword == "until":
+                untilTime = field
+            elif untilTime is not None:
+                for dayType in currentDayTypes:
+                    periods[-1][1][dayType].append((untilTime, field))
+                untilTime = None
+        
+        emptyProfile = array.array('d', [0.0] * self.stepsPerDay)
+        dailyProfiles = []
+        startDay = 0
+        for endDay, dayTypes in periods:
+            profiles = dict((dayType, self.fillDayProfile(pairs)) for dayType, pairs in dayTypes.items())
+            for day in range(startDay, min(endDay, 365)):
+                if day in holidays and 7 in profiles: dayType = 7
+                else: dayType = (day + startDayOfWeek)%7
+                dailyProfiles.append(profiles.get(dayType, emptyProfile))
+            startDay = max(startDay, endDay)
+        
+        dailyProfiles.extend([emptyProfile] * (365 - len(dailyProfiles)))
+        return dailyProfiles
+
 
 class EPTypes(object):
     def __init__(self):
@@ -6011,6 +9913,151 @@ class hb_reEvaluateHBZones(object):
                     
             return newSurfaces
 
+class hb_AdjacencyIndex(object):
+    """
+    Broad phase to find candidate adjacent surfaces between zones.
+
+    Surfaces are put in buckets based on their plane (normal direction and distance from
+    origin) and a uniform grid over their bounding boxes. A query only looks at the
+    buckets of the opposite plane which are close to the bounding box of the surface,
+    so only coplanar, opposite-facing surfaces with overlapping bounding boxes from other
+    zones are returned. The class only works with coordinates and doesn't need Rhino.
+
+    Args:
+        tol: Distance tolerance.
+        angleTol: Angle tolerance in radians for opposite normals. Default is 1 degree.
+        cellSize: Size of the grid cells. Default is calculated from the surfaces.
+
+    Usage:
+        index = hb_AdjacencyIndex(0.01)
+        index.addPolygon("zone_0_srf_1", "zone_0", [(0, 0, 0), (5, 0, 0), (5, 0, 3), (0, 0, 3)])
+        index.addPolygon("zone_1_srf_3", "zone_1", [(0, 0, 0), (0, 0, 3), (5, 0, 3), (5, 0, 0)])
+        index.getCandidates("zone_0_srf_1") # ["zone_1_srf_3"]
+    """
+
+    def __init__(self, tol = 0.01, angleTol = math.radians(1), cellSize = None):
+        self.tol = tol
+        self.angleTol = angleTol
+        self.cosAngleTol = math.cos(angleTol)
+        # bucket size for the components of normal vectors. Normals of adjacent surfaces
+        # are at most a quarter of a bucket apart so each query checks one or two buckets
+        self.normalStep = max(4 * angleTol, 1e-6)
+        self.planeStep = None
+        self.cellSize = cellSize
+        self.surfaces = {}
+        self.buckets = None
+
+    def addSurface(self, key, group, minPt, maxPt, normal, origin):
+        """
+        Add a surface to the index.
+
+        Args:
+            key: A unique key for the surface.
+            group: Key of the zone. Surfaces of the same group are never returned as candidates.
+            minPt, maxPt: Corners of the bounding box as (x, y, z).
+            normal: Normal vector of the surface as (x, y, z).
+            origin: A point on the surface as (x, y, z).
+        """
+        length = math.sqrt(sum(c * c for c in normal))
+        if length == 0: raise ValueError("Normal vector of %s has zero length."%str(key))
+        normal = tuple(c / length for c in normal)
+        distance = sum(n * p for n, p in zip(normal, origin))
+        self.surfaces[key] = (group, tuple(minPt), tuple(maxPt), normal, distance, tuple(origin))
+        # the buckets will be rebuilt before the next query
+        self.buckets = None
+
+    def addPolygon(self, key, group, vertices):
+        """Add a planar polygon from a list of (x, y, z) vertices in counter-clockwise order."""
+        minPt = tuple(min(v[i] for v in vertices) for i in range(3))
+        maxPt = tuple(max(v[i] for v in vertices) for i in range(3))
+        self.addSurface(key, group, minPt, maxPt, self.getNewellNormal(vertices), vertices[0])
+
+    @staticmethod
+    def getNewellNormal(vertices):
+        nx = ny = nz = 0
+        for count, (x1, y1, z1) in enumerate(vertices):
+            x2, y2, z2 = vertices[(count + 1) % len(vertices)]
+            nx += (y1 - y2) * (z1 + z2)
+            ny += (z1 - z2) * (x1 + x2)
+            nz += (x1 - x2) * (y1 + y2)
+        return nx, ny, nz
+
+    def getPlaneKey(self, normal, distance):
+        return tuple(int(round(c / self.normalStep)) for c in normal) + \
+               (int(round(distance / self.planeStep)),)
+
+    @staticmethod
+    def getBins(value, step):
+        """Buckets that can include values which are less than a quarter of step away."""
+        scaled = value / step
+        center = int(round(scaled))
+        if scaled - center > 0.25: return (center, center + 1)
+        if scaled - center < -0.25: return (center - 1, center)
+        return (center,)
+
+    def getCells(self, minPt, maxPt):
+        cellSize = self.cellSize
+        ranges = [range(int(math.floor((minPt[i] - self.tol) / cellSize)), \
+                        int(math.floor((maxPt[i] + self.tol) / cellSize)) + 1) for i in range(3)]
+        return [(x, y, z) for x in ranges[0] for y in ranges[1] for z in ranges[2]]
+
+    def buildBuckets(self):
+        if self.cellSize is None:
+            # twice the median size of the bounding boxes keeps each surface in a few cells
+            sizes = sorted(max(maxPt[i] - minPt[i] for i in range(3)) \
+                           for group, minPt, maxPt, normal, distance, origin in self.surfaces.values())
+            self.cellSize = max(2 * sizes[len(sizes) // 2], 10 * self.tol) if sizes else 1
+
+        # distance of the planes from origin changes with the angle between normals too
+        maxCoordinate = max([0] + [max(map(abs, minPt + maxPt)) \
+                            for group, minPt, maxPt, normal, distance, origin in self.surfaces.values()])
+        self.planeStep = max(4 * (self.tol + 2 * maxCoordinate * math.sin(self.angleTol / 2)), 1e-6)
+
+        self.buckets = {}
+        for key, (group, minPt, maxPt, normal, distance, origin) in self.surfaces.items():
+            planeKey = self.getPlaneKey(normal, distance)
+            for cell in self.getCells(minPt, maxPt):
+                self.buckets.setdefault(planeKey + cell, []).append(key)
+
+    def getCandidates(self, key):
+        """Return keys of the surfaces from other groups that can be adjacent to the surface."""
+        if self.buckets is None: self.buildBuckets()
+        group, minPt, maxPt, normal, distance, origin = self.surfaces[key]
+
+        # an adjacent surface faces the opposite direction so its plane is (-normal, -distance)
+        bins = [self.getBins(-c, self.normalStep) for c in normal] + \
+               [self.getBins(-distance, self.planeStep)]
+        planeKeys = list(itertools.product(*bins))
+        cells = self.getCells(minPt, maxPt)
+
+        candidates = set()
+        for planeKey in planeKeys:
+            for cell in cells:
+                candidates.update(self.buckets.get(planeKey + cell, ()))
+
+        return [testKey for testKey in candidates if self.isCandidate(key, testKey)]
+
+    def isCandidate(self, key, testKey):
+        group, minPt, maxPt, normal, distance, origin = self.surfaces[key]
+        testGroup, testMinPt, testMaxPt, testNormal, testDistance, testOrigin = self.surfaces[testKey]
+        if group == testGroup: return False
+
+        # opposite normals
+        if sum(n * t for n, t in zip(normal, testNormal)) > -self.cosAngleTol: return False
+
+        # coplanar
+        if abs(sum(n * p for n, p in zip(normal, testOrigin)) - distance) > self.tol: return False
+
+        # overlapping bounding boxes
+        for i in range(3):
+            overlap = min(maxPt[i], testMaxPt[i]) - max(minPt[i], testMinPt[i])
+            if maxPt[i] - minPt[i] > self.tol and testMaxPt[i] - testMinPt[i] > self.tol:
+                # surfaces that only touch at an edge are not adjacent
+                if overlap <= self.tol: return False
+            elif overlap < -self.tol:
+                return False
+        return True
+
 class hb_EPSurface(object):
     
     def __init__(self, surface, srfNumber, srfID, *arg):
@@ -8248,10 +12295,802 @@ class viewFactorInfo(object):
         return 'View Factor Info' + '\nNumber of Points: ' + str(self.NumPts)
 
 
+class hb_ViewFactorCache(object):
+    """
+    Content-addressed disk cache of the view factor results of each zone.
+    
+    The key of a zone is the hash of everything that its results depend on: the meshes of
+    the zone, its test points (which follow the grid size and the distance from the floor)
+    and the view vectors (which follow the view resolution and the sky patches). Changing
+    one zone only changes the keys of that zone so the other zones are read from the cache.
+    
+    Args:
+        cacheFolder: Optional folder for the cache files. Default is viewFactorCache in the
+            Honeybee default folder.
+    
+    Usage:
+        vfCache = hb_ViewFactorCache()
+        key = vfCache.getKey("viewFactor", zoneSrfsMesh, viewVectors, testPts)
+        viewFactors = vfCache.load(key)
+        if viewFactors is None:
+            viewFactors = calculateViewFactors()
+            vfCache.save(key, viewFactors)
+    """
+    cacheVersion = 1
+    extension = ".vfcache"
+    
+    def __init__(self, cacheFolder = None):
+        if not cacheFolder:
+            cacheFolder = os.path.join(sc.sticky["Honeybee_DefaultFolder"], "viewFactorCache")
+        self.cacheFolder = cacheFolder
+        self.hits = 0
+        self.misses = 0
+    
+    @classmethod
+    def updateHash(cls, md5, item):
+        """Add a geometry, a number, a string or a list of them to a hash."""
+        if isinstance(item, (list, tuple)):
+            md5.update("[%d"%len(item))
+            for subItem in item: cls.updateHash(md5, subItem)
+            md5.update("]")
+        elif isinstance(item, rc.Geometry.Mesh):
+            md5.update("M%d,%d"%(item.Vertices.Count, item.Faces.Count))
+            md5.update(array.array('f', item.Vertices.ToFloatArray()).tostring())
+            md5.update(array.array('i', item.Faces.ToIntArray(False)).tostring())
+        elif isinstance(item, (rc.Geometry.Point3d, rc.Geometry.Vector3d)):
+            md5.update(struct.pack('<3d', item.X, item.Y, item.Z))
+        else:
+            md5.update("%s%r"%(type(item).__name__, item))
+    
+    def getKey(self, *items):
+        """Return the hash of the inputs of a zone calculation."""
+        md5 = hashlib.md5()
+        md5.update(str(self.cacheVersion))
+        self.updateHash(md5, items)
+        return md5.hexdigest()
+    
+    def getFilePath(self, key):
+        return os.path.join(self.cacheFolder, key + self.extension)
+    
+    def load(self, key):
+        """Return the cached results for a key or None if they are not in the cache."""
+        cacheFile = self.getFilePath(key)
+        if os.path.isfile(cacheFile):
+            try:
+                with open(cacheFile, "rb") as inf:
+                    results = pickle.load(inf)
+                self.hits += 1
+                return results
+            except Exception, e:
+                print "Failed to read the view factor cache at %s:\n%s"%(cacheFile, e)
+        self.misses += 1
+        return None
+    
+    def save(self, key, results):
+        """Write the results of a key to the cache. Return True if it succeeds."""
+        cacheFile = self.getFilePath(key)
+        try:
+            if not os.path.isdir(self.cacheFolder): os.makedirs(self.cacheFolder)
+            tempFile = cacheFile + ".tmp"
+            with open(tempFile, "wb") as outf:
+                pickle.dump(results, outf, pickle.HIGHEST_PROTOCOL)
+            if os.path.isfile(cacheFile): os.remove(cacheFile)
+            os.rename(tempFile, cacheFile)
+            return True
+        except Exception, e:
+            print "Failed to write the view factor cache to %s:\n%s"%(cacheFile, e)
+            return False
+    
+    def report(self):
+        """Return a line that reports the cache hits and misses."""
+        return "%d zone calculations were read from the view factor cache and %d were calculated."%(self.hits, self.misses)
+
+
+class hb_RayTracer(object):
+    """
+    Ray caster for a triangle soup of surfaces with a bounding volume hierarchy.
+    
+    Each triangle carries the ID of the surface that it belongs to and the queries return
+    these IDs. The BVH is built once with binned surface area heuristic splits and can then
+    be shared between threads as it is not changed by the queries.
+    
+    Rays are passed as packets of directions that are prepared once with preparePacket and
+    cast from each test point. Ray parameters are in units of the direction vectors, the
+    same as Intersection.MeshRay.
+    
+    Usage:
+        tracer = hb_RayTracer()
+        for srfCount, srfMesh in enumerate(zoneSrfsMesh): tracer.addMesh(srfMesh, srfCount)
+        tracer.build()
+        packet = tracer.preparePacket(viewVectors)
+        srfIds = tracer.closestHits(testPt, packet)  # -1 for the rays that hit nothing
+    """
+    LEAFSIZE = 4
+    BINCOUNT = 12
+    EPSILON = 1e-12
+    BIG = 1e30
+    
+    def __init__(self):
+        # ax, ay, az, e1x, e1y, e1z, e2x, e2y, e2z, surfaceId for each triangle
+        self.triangles = []
+        self.built = False
+    
+    def __len__(self):
+        return len(self.triangles)
+    
+    @staticmethod
+    def getCoordinates(point):
+        try: return point.X, point.Y, point.Z
+        except AttributeError: return tuple(point)
+    
+    def addTriangle(self, a, b, c, surfaceId):
+        """Add a triangle from three points or (x, y, z) tuples."""
+        ax, ay, az = self.getCoordinates(a)
+        bx, by, bz = self.getCoordinates(b)
+        cx, cy, cz = self.getCoordinates(c)
+        self.triangles.append((ax, ay, az, bx - ax, by - ay, bz - az, \
+            cx - ax, cy - ay, cz - az, surfaceId))
+        self.built = False
+    
+    def addMesh(self, mesh, surfaceId = None):
+        """Add the faces of a Rhino mesh.
+        
+        Args:
+            mesh: A Rhino mesh. Quad faces are split into two triangles.
+            surfaceId: ID of the surface for all of the faces. Default is the index of
+                each face in the mesh.
+        """
+        vertices = [(vertex.X, vertex.Y, vertex.Z) for vertex in mesh.Vertices]
+        for faceIndex in xrange(mesh.Faces.Count):
+            face = mesh.Faces[faceIndex]
+            srfId = faceIndex if surfaceId is None else surfaceId
+            self.addTriangle(vertices[face.A], vertices[face.B], vertices[face.C], srfId)
+            if face.IsQuad:
+                self.addTriangle(vertices[face.A], vertices[face.C], vertices[face.D], srfId)
+    
+    def build(self):
+        """Build the bounding volume hierarchy. It has to be called after adding triangles."""
+        triangles = self.triangles
+        lows, highs, centers = [], [], []
+        for ax, ay, az, e1x, e1y, e1z, e2x, e2y, e2z, srfId in triangles:
+            low = (ax + min(0, e1x, e2x), ay + min(0, e1y, e2y), az + min(0, e1z, e2z))
+            high = (ax + max(0, e1x, e2x), ay + max(0, e1y, e2y), az + max(0, e1z, e2z))
+            lows.append(low)
+            highs.append(high)
+            centers.append(((low[0] + high[0]) / 2.0, (low[1] + high[1]) / 2.0, (low[2] + high[2]) / 2.0))
+        
+        # flat node lists. leaves have a negative child and a range of leafTriangles.
+        self.bounds = []
+        self.axes = []
+        self.children = []
+        self.starts = []
+        self.counts = []
+        self.leafTriangles = []
+        
+        if not triangles:
+            self.built = True
+            return
+        
+        self.addNode()
+        stack = [(0, range(len(triangles)))]
+        while stack:
+            node, items = stack.pop()
+            low = [min(lows[i][axis] for i in items) for axis in xrange(3)]
+            high = [max(highs[i][axis] for i in items) for axis in xrange(3)]
+            self.bounds[6 * node: 6 * node + 6] = low + high
+            
+            split = None
+            if len(items) > self.LEAFSIZE: split = self.findSplit(items, centers, lows, highs)
+            if split is None:
+                self.starts[node] = len(self.leafTriangles)
+                self.counts[node] = len(items)
+                self.leafTriangles.extend(triangles[i] for i in items)
+                continue
+            
+            axis, leftItems, rightItems = split
+            left = self.addNode()
+            right = self.addNode()
+            self.axes[node] = axis
+            self.children[node] = left
+            stack.append((left, leftItems))
+            stack.append((right, rightItems))
+        
+        self.built = True
+    
+    def addNode(self):
+        self.bounds.extend([0.0] * 6)
+        self.axes.append(0)
+        self.children.append(-1)
+        self.starts.append(0)
+        self.counts.append(0)
+        return len(self.children) - 1
+    
+    def findSplit(self, items, centers, lows, highs):
+        """Find the split of the items with the lowest surface area heuristic cost."""
+        cLow = [min(centers[i][axis] for i in items) for axis in xrange(3)]
+        cHigh = [max(centers[i][axis] for i in items) for axis in xrange(3)]
+        extents = [h - l for l, h in zip(cLow, cHigh)]
+        axis = extents.index(max(extents))
+        if extents[axis] <= 0: return None
+        
+        # put the items in bins along the axis and keep the bounds of each bin
+        binCount = self.BINCOUNT
+        scale = binCount / extents[axis] * (1 - 1e-9)
+        itemBins = []
+        binLows = [[self.BIG] * 3 for b in xrange(binCount)]
+        binHighs = [[-self.BIG] * 3 for b in xrange(binCount)]
+        binSizes = [0] * binCount
+        for i in items:
+            binIndex = int((centers[i][axis] - cLow[axis]) * scale)
+            itemBins.append(binIndex)
+            binSizes[binIndex] += 1
+            binLow, binHigh, low, high = binLows[binIndex], binHighs[binIndex], lows[i], highs[i]
+            for ax in xrange(3):
+                if low[ax] < binLow[ax]: binLow[ax] = low[ax]
+                if high[ax] > binHigh[ax]: binHigh[ax] = high[ax]
+        
+        def sweep(binIndexes):
+            # area and number of items on one side of each split
+            low, high, size, result = [self.BIG] * 3, [-self.BIG] * 3, 0, []
+            for b in binIndexes:
+                size += binSizes[b]
+                low = map(min, low, binLows[b])
+                high = map(max, high, binHighs[b])
+                dx, dy, dz = [max(h - l, 0) for l, h in zip(low, high)]
+                result.append((dx * dy + dy * dz + dz * dx, size))
+            return result
+        
+        leftCosts = sweep(xrange(binCount - 1))
+        rightCosts = sweep(xrange(binCount - 1, 0, -1))[::-1]
+        bestCost, bestBin = None, None
+        for b in xrange(1, binCount):
+            (leftArea, leftSize), (rightArea, rightSize) = leftCosts[b - 1], rightCosts[b - 1]
+            if not leftSize or not rightSize: continue
+            cost = leftArea * leftSize + rightArea * rightSize
+            if bestCost is None or cost < bestCost: bestCost, bestBin = cost, b
+        
+        if bestBin is None:
+            # all of the centers are in one bin. split at the median.
+            items = sorted(items, key = lambda i: centers[i][axis])
+            half = len(items) // 2
+            return axis, items[:half], items[half:]
+        leftItems = [i for i, binIndex in zip(items, itemBins) if binIndex < bestBin]
+        rightItems = [i for i, binIndex in zip(items, itemBins) if binIndex >= bestBin]
+        return axis, leftItems, rightItems
+    
+    def preparePacket(self, directions):
+        """Prepare a list of directions (vectors or tuples) to be cast from many points."""
+        packet = []
+        big = self.BIG
+        for direction in directions:
+            dx, dy, dz = self.getCoordinates(direction)
+            packet.append((dx, dy, dz, \
+                1.0 / dx if dx else big, 1.0 / dy if dy else big, 1.0 / dz if dz else big, \
+                0 if dx >= 0 else 3, 1 if dy >= 0 else 4, 2 if dz >= 0 else 5))
+        return packet
+    
+    def cast(self, origin, ray, tMax, mode):
+        """Cast a prepared ray from an origin.
+        
+        mode 0 returns (t, surfaceId) of the closest hit or (-1, -1).
+        mode 1 returns True if the ray hits any triangle.
+        mode 2 returns the sorted IDs of all of the surfaces that the ray hits.
+        """
+        if not self.built: self.build()
+        ox, oy, oz = origin
+        dx, dy, dz, idx, idy, idz, nx, ny, nz = ray
+        fx, fy, fz = 3 - nx, 5 - ny, 7 - nz
+        signs = (dx < 0, dy < 0, dz < 0)
+        bounds, children, axes = self.bounds, self.children, self.axes
+        starts, counts, triangles = self.starts, self.counts, self.leafTriangles
+        eps = self.EPSILON
+        
+        bestT, bestId = tMax, -1
+        hitIds = set()
+        stack = [0] if children else []
+        while stack:
+            node = stack.pop()
+            b = 6 * node
+            tNear = max((bounds[b + nx] - ox) * idx, (bounds[b + ny] - oy) * idy, (bounds[b + nz] - oz) * idz, 0.0)
+            tFar = min((bounds[b + fx] - ox) * idx, (bounds[b + fy] - oy) * idy, (bounds[b + fz] - oz) * idz, bestT)
+            if tNear > tFar: continue
+            
+            child = children[node]
+            if child >= 0:
+                # visit the near child first
+                if signs[axes[node]]: stack.extend((child, child + 1))
+                else: stack.extend((child + 1, child))
+                continue
+            
+            start = starts[node]
+            for ax, ay, az, e1x, e1y, e1z, e2x, e2y, e2z, srfId in triangles[start: start + counts[node]]:
+                px = dy * e2z - dz * e2y
+                py = dz * e2x - dx * e2z
+                pz = dx * e2y - dy * e2x
+                det = e1x * px + e1y * py + e1z * pz
+                if -eps < det < eps: continue
+                inv = 1.0 / det
+                sx, sy, sz = ox - ax, oy - ay, oz - az
+                u = (sx * px + sy * py + sz * pz) * inv
+                if u < 0.0 or u > 1.0: continue
+                qx = sy * e1z - sz * e1y
+                qy = sz * e1x - sx * e1z
+                qz = sx * e1y - sy * e1x
+                v = (dx * qx + dy * qy + dz * qz) * inv
+                if v < 0.0 or u + v > 1.0: continue
+                t = (e2x * qx + e2y * qy + e2z * qz) * inv
+                if t < 0.0 or t > bestT: continue
+                if mode == 0:
+                    # ties go to the lowest surface ID like taking the minimum of the surfaces
+                    if t < bestT or bestId < 0 or srfId < bestId: bestT, bestId = t, srfId
+                elif mode == 1:
+                    return True
+                else:
+                    hitIds.add(srfId)
+        
+        if mode == 0: return (bestT, bestId) if bestId >= 0 else (-1.0, -1)
+        elif mode == 1: return False
+        return sorted(hitIds)
+    
+    def intersect(self, origin, direction, tMax = None):
+        """Return (t, surfaceId) of the closest hit of a ray or (-1, -1) if it hits nothing."""
+        if tMax is None: tMax = float('inf')
+        return self.cast(self.getCoordinates(origin), self.preparePacket([direction])[0], tMax, 0)
+    
+    def closestHits(self, origin, packet, tMax = None):
+        """Return the ID of the closest surface for each ray of a packet or -1 for misses."""
+        if tMax is None: tMax = float('inf')
+        origin = self.getCoordinates(origin)
+        return [self.cast(origin, ray, tMax, 0)[1] for ray in packet]
+    
+    def anyHits(self, origin, packet, tMax = None):
+        """Return True for each ray of a packet that hits any surface."""
+        if tMax is None: tMax = float('inf')
+        origin = self.getCoordinates(origin)
+        return [self.cast(origin, ray, tMax, 1) for ray in packet]
+    
+    def allHits(self, origin, packet, tMax = None):
+        """Return the sorted IDs of all of the surfaces that each ray of a packet hits."""
+        if tMax is None: tMax = float('inf')
+        origin = self.getCoordinates(origin)
+        return [self.cast(origin, ray, tMax, 2) for ray in packet]
+
+
+class hb_HiveCopyState(object):
+    """
+    Shared state of all the copy-on-write proxies of a single object in the hive.
+    
+    The object is copied with hb_Hive.copyHBObject the first time that one of the
+    proxies is changed. Until then all the proxies read from the stored object.
+    """
+    __slots__ = ('source', 'copy', 'stats', 'module', 'children')
+    
+    def __init__(self, source, stats):
+        self.source = source
+        self.copy = None
+        self.stats = stats
+        self.module = type(source).__module__
+        # proxies that are already created for each path
+        self.children = {}
+    
+    @property
+    def isCopied(self):
+        return self.copy is not None
+    
+    def materialize(self):
+        """Copy the stored object if it's not copied yet and return the copy."""
+        if self.copy is None:
+            t0 = time.time()
+            self.copy = hb_Hive.copyHBObject(self.source)
+            self.stats['copyTime'] += time.time() - t0
+            self.stats['copies'] += 1
+            # lists and dictionaries that are handed out keep the items of the stored
+            # object for Rhino methods. Point them to the copy
+            for proxy in self.children.itervalues():
+                if type(proxy) is not hb_HiveProxy:
+                    try: proxy._hbRefresh()
+                    except (AttributeError, KeyError, IndexError): pass
+            self.children = {}
+        return self.copy
+    
+    def resolve(self, path, obj = None):
+        """Find the value for path starting from the copy or the stored object."""
+        if obj is None:
+            obj = self.copy if self.copy is not None else self.source
+        for isItem, key in path:
+            if isItem:
+                obj = obj[key]
+            else:
+                obj = getattr(obj, key)
+        return obj
+    
+    def wrap(self, path, value):
+        """Wrap lists, dictionaries and Honeybee objects into proxies."""
+        if self.copy is not None:
+            return value
+        
+        if path in self.children:
+            return self.children[path]
+        
+        if isinstance(value, list):
+            proxy = hb_HiveListProxy(self, path, value)
+        elif isinstance(value, dict):
+            proxy = hb_HiveDictProxy(self, path, value)
+        elif type(value).__module__ == self.module and hasattr(value, '__dict__'):
+            proxy = hb_HiveProxy(self, path)
+        else:
+            return value
+        
+        self.children[path] = proxy
+        return proxy
+    
+    @staticmethod
+    def unwrap(value):
+        """Return the object behind a proxy. Other values are returned as they are."""
+        if type(value) in (hb_HiveProxy, hb_HiveListProxy, hb_HiveDictProxy):
+            return value._hbTarget()
+        return value
+
+
+class hb_HiveProxy(object):
+    """
+    Copy-on-write view of a Honeybee object which is stored in the hive.
+    
+    Attributes are read from the stored object and nested Honeybee objects, lists
+    and dictionaries are returned as proxies. Setting or deleting an attribute, or
+    calling a method that doesn't start with get, is or has, copies the stored object
+    first so the change never leaks to the upstream components. In-place changes to
+    Rhino geometries are not tracked.
+    """
+    __slots__ = ('_hbState', '_hbPath')
+    
+    readOnlyMethods = ('get', 'is', 'has')
+    
+    def __init__(self, state, path = ()):
+        object.__setattr__(self, '_hbState', state)
+        object.__setattr__(self, '_hbPath', path)
+    
+    def _hbTarget(self):
+        return self._hbState.resolve(self._hbPath)
+    
+    def _hbMaterialize(self):
+        return self._hbState.resolve(self._hbPath, self._hbState.materialize())
+    
+    @property
+    def __class__(self):
+        return type(self._hbTarget())
+    
+    def __getattr__(self, name):
+        state = self._hbState
+        if state.isCopied:
+            return getattr(self._hbTarget(), name)
+        
+        target = self._hbTarget()
+        if name == '__dict__':
+            # the caller can change anything in the dictionary
+            return self._hbMaterialize().__dict__
+        
+        if name not in getattr(target, '__dict__', {}):
+            for klass in type(target).__mro__:
+                if name not in klass.__dict__: continue
+                attr = klass.__dict__[name]
+                if isinstance(attr, property):
+                    return attr.__get__(self, type(target))
+                elif hasattr(attr, '__get__') and callable(attr) and \
+                    not isinstance(attr, (staticmethod, classmethod)):
+                    if name.startswith(self.readOnlyMethods):
+                        # run the method against the proxy
+                        return attr.__get__(self, type(target))
+                    return getattr(self._hbMaterialize(), name)
+                break
+        
+        return state.wrap(self._hbPath + ((False, name),), getattr(target, name))
+    
+    def __setattr__(self, name, value):
+        setattr(self._hbMaterialize(), name, hb_HiveCopyState.unwrap(value))
+    
+    def __delattr__(self, name):
+        delattr(self._hbMaterialize(), name)
+    
+    def __repr__(self):
+        return repr(self._hbTarget())
+    
+    def __str__(self):
+        return str(self._hbTarget())
+    
+    def __eq__(self, other):
+        return self._hbTarget() == hb_HiveCopyState.unwrap(other)
+    
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    
+    def __hash__(self):
+        return hash(self._hbTarget())
+    
+    def __nonzero__(self):
+        return bool(self._hbTarget())
+    
+    def __copy__(self):
+        return copy.copy(self._hbTarget())
+    
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self._hbTarget(), memo)
+    
+    def __reduce_ex__(self, protocol):
+        return self._hbTarget().__reduce_ex__(protocol)
+
+
+class hb_HiveListProxy(list):
+    """
+    Copy-on-write view of a list inside a Honeybee object in the hive.
+    
+    Items are wrapped the same way as hb_HiveProxy attributes when they are read. The
+    list can be passed to Rhino methods as a normal list. Changing the list copies the
+    stored object first. Once the object is copied the items are read from the copy.
+    """
+    __slots__ = ('_hbState', '_hbPath')
+    
+    def __init__(self, state, path, values):
+        list.__init__(self, values)
+        self._hbState = state
+        self._hbPath = path
+    
+    def _hbTarget(self):
+        return self._hbState.resolve(self._hbPath)
+    
+    def _hbRefresh(self):
+        """Copy the items of the target into the list that Rhino methods read."""
+        list.__setitem__(self, slice(None), self._hbTarget())
+    
+    def _hbGetItem(self, index):
+        state = self._hbState
+        path = self._hbPath + ((True, index),)
+        if state.isCopied:
+            # the stored items in this list can belong to the hive. Use the copy
+            return state.resolve(path)
+        return state.wrap(path, list.__getitem__(self, index))
+    
+    def _hbChange(self, methodName, *args):
+        target = self._hbState.resolve(self._hbPath, self._hbState.materialize())
+        args = [hb_HiveCopyState.unwrap(arg) for arg in args]
+        result = getattr(target, methodName)(*args)
+        # the list is now a copy. Follow the changes
+        list.__setitem__(self, slice(None), target)
+        return result
+    
+    def __len__(self):
+        return len(self._hbTarget())
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in xrange(*index.indices(len(self)))]
+        if index < 0: index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('list index out of range')
+        return self._hbGetItem(index)
+    
+    def __getslice__(self, i, j):
+        return self.__getitem__(slice(i, j))
+    
+    def __iter__(self):
+        index = 0
+        while index < len(self):
+            yield self._hbGetItem(index)
+            index += 1
+    
+    def __reversed__(self):
+        for index in xrange(len(self) - 1, -1, -1):
+            yield self[index]
+    
+    def __contains__(self, item):
+        return hb_HiveCopyState.unwrap(item) in self._hbTarget()
+    
+    def index(self, item, *args):
+        return self._hbTarget().index(hb_HiveCopyState.unwrap(item), *args)
+    
+    def count(self, item):
+        return self._hbTarget().count(hb_HiveCopyState.unwrap(item))
+    
+    def append(self, item): self._hbChange('append', item)
+    
+    def extend(self, items): self._hbChange('extend', map(hb_HiveCopyState.unwrap, items))
+    
+    def insert(self, index, item): self._hbChange('insert', index, item)
+    
+    def remove(self, item): self._hbChange('remove', item)
+    
+    def pop(self, *args): return self._hbChange('pop', *args)
+    
+    def sort(self, *args, **kwargs):
+        target = self._hbState.resolve(self._hbPath, self._hbState.materialize())
+        target.sort(*args, **kwargs)
+        list.__setitem__(self, slice(None), target)
+    
+    def reverse(self): self._hbChange('reverse')
+    
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = map(hb_HiveCopyState.unwrap, value)
+        self._hbChange('__setitem__', index, value)
+    
+    def __delitem__(self, index): self._hbChange('__delitem__', index)
+    
+    def __setslice__(self, i, j, values):
+        self.__setitem__(slice(i, j), values)
+    
+    def __delslice__(self, i, j):
+        self.__delitem__(slice(i, j))
+    
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+    
+    def __imul__(self, n):
+        target = self._hbState.resolve(self._hbPath, self._hbState.materialize())
+        target *= n
+        list.__setitem__(self, slice(None), target)
+        return self
+    
+    def __repr__(self):
+        return repr(self._hbTarget())
+    
+    def __copy__(self):
+        return list(self._hbTarget())
+    
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self._hbTarget(), memo)
+    
+    def __reduce_ex__(self, protocol):
+        return (list, (list(self._hbTarget()),))
+
+
+class hb_HiveDictProxy(dict):
+    """
+    Copy-on-write view of a dictionary inside a Honeybee object in the hive.
+    
+    Values are wrapped the same way as hb_HiveProxy attributes when they are read.
+    Changing the dictionary copies the stored object first. Once the object is copied
+    the values are read from the copy.
+    """
+    __slots__ = ('_hbState', '_hbPath')
+    
+    def __init__(self, state, path, values):
+        dict.__init__(self, values)
+        self._hbState = state
+        self._hbPath = path
+    
+    def _hbTarget(self):
+        return self._hbState.resolve(self._hbPath)
+    
+    def _hbRefresh(self):
+        """Copy the items of the target into the dictionary that Rhino methods read."""
+        dict.clear(self)
+        dict.update(self, self._hbTarget())
+    
+    def _hbGetItem(self, key):
+        state = self._hbState
+        path = self._hbPath + ((True, key),)
+        if state.isCopied:
+            return state.resolve(path)
+        return state.wrap(path, self._hbTarget()[key])
+    
+    def _hbChange(self, methodName, *args):
+        target = self._hbState.resolve(self._hbPath, self._hbState.materialize())
+        args = [hb_HiveCopyState.unwrap(arg) for arg in args]
+        result = getattr(target, methodName)(*args)
+        dict.clear(self)
+        dict.update(self, target)
+        return result
+    
+    def __len__(self):
+        return len(self._hbTarget())
+    
+    def __contains__(self, key):
+        return key in self._hbTarget()
+    
+    def has_key(self, key):
+        return key in self._hbTarget()
+    
+    def __iter__(self):
+        return iter(self.keys())
+    
+    def keys(self):
+        return self._hbTarget().keys()
+    
+    def iterkeys(self):
+        return iter(self.keys())
+    
+    def __getitem__(self, key):
+        return self._hbGetItem(key)
+    
+    def get(self, key, default = None):
+        if key in self: return self[key]
+        return default
+    
+    def values(self):
+        return [self._hbGetItem(k) for k in self.keys()]
+    
+    def items(self):
+        return [(k, self._hbGetItem(k)) for k in self.keys()]
+    
+    def itervalues(self):
+        for k in self.keys():
+            yield self._hbGetItem(k)
+    
+    def iteritems(self):
+        for k in self.keys():
+            yield k, self._hbGetItem(k)
+    
+    def __setitem__(self, key, value): self._hbChange('__setitem__', key, value)
+    
+    def __delitem__(self, key): self._hbChange('__delitem__', key)
+    
+    def pop(self, *args): return self._hbChange('pop', *args)
+    
+    def popitem(self): return self._hbChange('popitem')
+    
+    def setdefault(self, key, default = None):
+        if key in self: return self[key]
+        return self._hbChange('setdefault', key, default)
+    
+    def update(self, *args, **kwargs):
+        values = dict(*args, **kwargs)
+        self._hbChange('update', dict((k, hb_HiveCopyState.unwrap(v)) \
+            for k, v in values.iteritems()))
+    
+    def clear(self): self._hbChange('clear')
+    
+    def __repr__(self):
+        return repr(self._hbTarget())
+    
+    def __copy__(self):
+        return dict(self._hbTarget())
+    
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self._hbTarget(), memo)
+    
+    def __reduce_ex__(self, protocol):
+        return (dict, (dict(self._hbTarget()),))
+
+
 class hb_Hive(object):
     
     class CopyClass(object):
         pass
+    
+    def __init__(self, copyOnWrite = False):
+        """Honeybee hive.
+        
+        copyOnWrite: Set to True to get copy-on-write proxies from callFromHoneybeeHive
+            instead of deep copies. Useful for components that only read the objects.
+        """
+        self.copyOnWrite = copyOnWrite
+        self.resetCopyStats()
+    
+    def resetCopyStats(self):
+        self.copyStats = {'proxies': 0, 'copies': 0, 'copyTime': 0.0}
+        self.proxyStates = []
+    
+    def getCopyStats(self):
+        """Return copy counters for the objects that are called from this hive.
+        
+        copiesAvoided is the number of proxies that are never changed. timeSaved
+        is estimated from the average time of the copies that are made.
+        """
+        stats = dict(self.copyStats)
+        stats['copiesAvoided'] = sum(1 for state in self.proxyStates if not state.isCopied)
+        if stats['copies']:
+            stats['timeSaved'] = stats['copiesAvoided'] * stats['copyTime'] / stats['copies']
+        else:
+            stats['timeSaved'] = 0.0
+        return stats
+    
+    def reportCopyStats(self):
+        """Return a short report of the copies that are made and avoided by this hive."""
+        stats = self.getCopyStats()
+        return "Honeybee hive: %d proxies, %d copies (%.3f s), %d copies avoided (~%.3f s saved)."%( \
+               stats['proxies'], stats['copies'], stats['copyTime'], stats['copiesAvoided'], stats['timeSaved'])
+    
     def checkifTransformed(self, brep, HBO):
         """
         This method ensures that Honeybee objects are not rotated or moved
@@ -8273,6 +13112,70 @@ class hb_Hive(object):
         elif bb1.Max.DistanceTo(bb2.Max) > 5 * sc.doc.ModelAbsoluteTolerance:
             raise Exception(msg)
     
+    @staticmethod
+    def copyHBObject(HBObject):
+        """Return a deep copy of a Honeybee zone or surface.
+        
+        Boundary condition objects are not deep copied. Both the original and the
+        new object will reference a copy of the original boundary condition objects.
+        """
+        # after the first round meshedFace makes copy.deepcopy crash
+        # so I need to regenerate meshFaces
+        bc = []
+        if HBObject.objectType == "HBZone":
+            for surface in HBObject.surfaces:
+                newMesh = rc.Geometry.Mesh()
+                newMesh.Append(surface.meshedFace)
+                surface.meshedFace = newMesh
+                
+                # keep track of boundary conditions
+                # and then set them to None not to create
+                # memory issues for large models.
+                bc.append(copy.copy(surface.BCObject))
+                surface.BCObject = None
+                for csrf in surface.childSrfs:
+                    bc.append(copy.copy(csrf.BCObject))
+                    csrf.BCObject = None
+                    
+        elif HBObject.objectType == "HBSurface": 
+            newMesh = rc.Geometry.Mesh()
+            newMesh.Append(HBObject.meshedFace)
+            HBObject.meshedFace = newMesh
+            # keep track of boundary conditions
+            # and then set them to None not to create
+            # memory issues for large models.
+            bc.append(copy.copy(HBObject.BCObject))
+            HBObject.BCObject = None
+            for csrf in HBObject.childSrfs:
+                bc.append(copy.copy(csrf.BCObject))
+                csrf.BCObject = None                    
+        
+        newObject = copy.deepcopy(HBObject)
+        
+        # put the boundary condition objects back
+        count = 0
+        if HBObject.objectType == "HBZone":
+            for c, surface in enumerate(newObject.surfaces):
+                surface.BCObject = bc[count]
+                HBObject.surfaces[c].BCObject = bc[count]
+                count += 1
+                for cc, csrf in enumerate(surface.childSrfs):
+                    csrf.BCObject = bc[count]
+                    HBObject.surfaces[c].childSrfs[cc].BCObject = bc[count]
+                    count += 1
+                    
+        elif HBObject.objectType == "HBSurface": 
+            newObject.BCObject = bc[count]
+            HBObject.BCObject = bc[count]
+            count += 1
+            for cc, csrf in enumerate(newObject.childSrfs):
+                csrf.BCObject = bc[count]
+                HBObject.childSrfs[cc].BCObject = bc[count]
+                count += 1
+        
+        del(bc)
+        return newObject
+    
     @staticmethod
     def addToHoneybeeHive(HBObjects, Component, removeCurrent=True):
         """Add honeybee objects to memory so they can be passed between the components.
@@ -8305,6 +13208,10 @@ class hb_Hive(object):
         outGeometry = []
         for HBObject in HBObjects:
             
+            # copy-on-write proxies are copied before they are added to the hive
+            if type(HBObject) is hb_HiveProxy:
+                HBObject = HBObject._hbMaterialize()
+            
             HBObject.resetID()
             
             key = '{}'.format(HBObject.ID)
@@ -8360,7 +13267,15 @@ class hb_Hive(object):
         HBID = '{}#{}'.format(baseKey, key)
         return 'Honeybee View Factor Info - ' + HBID
     
-    def callFromHoneybeeHive(self, geometryList):
+    def callFromHoneybeeHive(self, geometryList, copyOnWrite = None):
+        """Return copies of Honeybee objects for a list of geometries or keys.
+        
+        copyOnWrite: Set to True to get hb_HiveProxy objects instead of copies. Proxies
+            share the objects in the hive and only copy them when they are changed.
+            Default is the value that is set for this hive.
+        """
+        if copyOnWrite is None: copyOnWrite = self.copyOnWrite
+        
         HBObjects = []
         for geometry in geometryList:
             try:
@@ -8383,62 +13298,16 @@ class hb_Hive(object):
                     pass
                 
                 try:
-                    # after the first round meshedFace makes copy.deepcopy crash
-                    # so I need to regenerate meshFaces
-                    bc = []
-                    if HBObject.objectType == "HBZone":
-                        for surface in HBObject.surfaces:
-                            newMesh = rc.Geometry.Mesh()
-                            newMesh.Append(surface.meshedFace)
-                            surface.meshedFace = newMesh
-                            
-                            # keep track of boundary conditions
-                            # and then set them to None not to create
-                            # memory issues for large models.
-                            bc.append(copy.copy(surface.BCObject))
-                            surface.BCObject = None
-                            for csrf in surface.childSrfs:
-                                bc.append(copy.copy(csrf.BCObject))
-                                csrf.BCObject = None
-                                
-                    elif HBObject.objectType == "HBSurface": 
-                        newMesh = rc.Geometry.Mesh()
-                        newMesh.Append(HBObject.meshedFace)
-                        HBObject.meshedFace = newMesh
-                        # keep track of boundary conditions
-                        # and then set them to None not to create
-                        # memory issues for large models.
-                        bc.append(copy.copy(HBObject.BCObject))
-                        HBObject.BCObject = None
-                        for csrf in HBObject.childSrfs:
-                            bc.append(copy.copy(csrf.BCObject))
-                            csrf.BCObject = None                    
-                    
-                    newObject = copy.deepcopy(HBObject)
-                    
-                    # put the boundary condition objects back
-                    count = 0
-                    if HBObject.objectType == "HBZone":
-                        for c, surface in enumerate(newObject.surfaces):
-                            surface.BCObject = bc[count]
-                            HBObject.surfaces[c].BCObject = bc[count]
-                            count += 1
-                            for cc, csrf in enumerate(surface.childSrfs):
-                                csrf.BCObject = bc[count]
-                                HBObject.surfaces[c].childSrfs[cc].BCObject = bc[count]
-                                count += 1
-                                
-                    elif HBObject.objectType == "HBSurface": 
-                        newObject.BCObject = bc[count]
-                        HBObject.BCObject = bc[count]
-                        count += 1
-                        for cc, csrf in enumerate(newObject.childSrfs):
-                            csrf.BCObject = bc[count]
-                            HBObject.childSrfs[cc].BCObject = bc[count]
-                            count += 1
-                    
-                    HBObjects.append(newObject)
-                    del(bc)
+                    if copyOnWrite:
+                        state = hb_HiveCopyState(HBObject, self.copyStats)
+                        self.proxyStates.append(state)
+                        self.copyStats['proxies'] += 1
+                        HBObjects.append(hb_HiveProxy(state))
+                    else:
+                        t0 = time.time()
+                        HBObjects.append(self.copyHBObject(HBObject))
+                        self.copyStats['copyTime'] += time.time() - t0
+                        self.copyStats['copies'] += 1
                 except Exception, e:
                     print `e`
                     print "Failed to copy the object. Returning the original objects...\n" +\
@@ -8469,6 +13338,369 @@ class hb_Hive(object):
         
         return HBObjects
 
+class hb_ObjectsFile(object):
+    """
+    Read and write dumped Honeybee objects in a compact binary format (*.HBB).
+    
+    The file starts with a fixed size header which points to an index at the end of
+    the file. The index has a table of interned strings (names of constructions,
+    schedules, materials, etc.) and an object table with the position of each record,
+    so a subset of the objects can be loaded without reading the whole file.
+    
+    Records are the attribute dictionaries that Dump Honeybee Objects collects.
+    Meshes and planar polysurfaces are written as flat vertex and face arrays. Any
+    other value that is not a basic Python type is pickled.
+    
+    Usage:
+        hb_ObjectsFile().write(filePath, {'ids': ids, 'objs': objs})
+        HBData = hb_ObjectsFile().read(filePath, names = ['ZONE_1'])
+    """
+    MAGIC = 'HBBF'
+    VERSION = 1
+    # magic, version, flags, index offset
+    HEADER = '<4sHHQ'
+    
+    # attributes that keep the ID of another object. Referenced objects are loaded
+    # together with the object. BCObject is not followed so a zone can be loaded
+    # without the adjacent zones.
+    REFERENCES = ('surfaces', 'childSrfs', 'parent', 'HVACSystem', 'airDetails', \
+        'heatingDetails', 'coolingDetails')
+    
+    # library objects are always loaded
+    LIBRARYTYPES = ('HBConstr', 'HBMat', 'HBsched', 'HBShdCntrl', 'HBRadMat')
+    
+    def __init__(self, tolerance = None):
+        if tolerance is None:
+            tolerance = sc.doc.ModelAbsoluteTolerance
+        self.tolerance = tolerance
+        self.strings = []
+        self.stringIndex = {}
+    
+    @classmethod
+    def isObjectsFile(cls, filePath):
+        """Check if a file is written in this format."""
+        with open(filePath, "rb") as inf:
+            return inf.read(len(cls.MAGIC)) == cls.MAGIC
+    
+    # ------------------------------ writing ------------------------------
+    def internString(self, value):
+        try:
+            return self.stringIndex[value]
+        except KeyError:
+            index = len(self.strings)
+            self.strings.append(value)
+            self.stringIndex[value] = index
+            return index
+    
+    def encodeValue(self, value, out):
+        """Append the binary presentation of value to out."""
+        if value is None:
+            out.append('N')
+        elif value is True:
+            out.append('T')
+        elif value is False:
+            out.append('F')
+        elif isinstance(value, unicode):
+            out.append('u' + struct.pack('<I', self.internString(value.encode('utf-8'))))
+        elif isinstance(value, str):
+            out.append('s' + struct.pack('<I', self.internString(value)))
+        elif isinstance(value, float):
+            out.append('d' + struct.pack('<d', value))
+        elif isinstance(value, (int, long)) and -2**63 <= value < 2**63:
+            out.append('i' + struct.pack('<q', value))
+        elif isinstance(value, (list, tuple)):
+            out.append(('L' if isinstance(value, list) else 't') + struct.pack('<I', len(value)))
+            for item in value:
+                self.encodeValue(item, out)
+        elif isinstance(value, dict):
+            out.append('D' + struct.pack('<I', len(value)))
+            for key, item in value.iteritems():
+                self.encodeValue(key, out)
+                self.encodeValue(item, out)
+        elif isinstance(value, rc.Geometry.Point3d):
+            out.append('P' + struct.pack('<3d', value.X, value.Y, value.Z))
+        elif isinstance(value, rc.Geometry.Vector3d):
+            out.append('V' + struct.pack('<3d', value.X, value.Y, value.Z))
+        elif isinstance(value, rc.Geometry.Plane):
+            out.append('A' + struct.pack('<9d', value.Origin.X, value.Origin.Y, value.Origin.Z, \
+                value.XAxis.X, value.XAxis.Y, value.XAxis.Z, \
+                value.YAxis.X, value.YAxis.Y, value.YAxis.Z))
+        elif isinstance(value, rc.Geometry.Mesh):
+            self.encodeMesh(value, out)
+        elif isinstance(value, rc.Geometry.Brep) and self.encodeBrep(value, out):
+            pass
+        else:
+            data = pickle.dumps(value, 2)
+            out.append('O' + struct.pack('<I', len(data)) + data)
+    
+    @staticmethod
+    def encodePoints(points, out):
+        coordinates = array.array('d')
+        for pt in points:
+            coordinates.extend((pt.X, pt.Y, pt.Z))
+        out.append(struct.pack('<I', len(points)) + coordinates.tostring())
+    
+    def encodeMesh(self, mesh, out):
+        out.append('M')
+        self.encodePoints(mesh.Vertices.ToPoint3dArray(), out)
+        # triangles are saved with C == D
+        faces = array.array('i')
+        for face in mesh.Faces:
+            faces.extend((face.A, face.B, face.C, face.D))
+        out.append(struct.pack('<I', mesh.Faces.Count) + faces.tostring())
+    
+    def encodeBrep(self, brep, out):
+        """Add a polysurface with planar polygon faces to out.
+        
+        Returns False without changing out if the brep has curved faces or edges.
+        """
+        faces = []
+        for face in brep.Faces:
+            if not face.IsPlanar(self.tolerance): return False
+            outerLoop = face.OuterLoop
+            loops = [outerLoop] + [loop for loop in face.Loops \
+                if loop.LoopIndex != outerLoop.LoopIndex]
+            polylines = []
+            for loop in loops:
+                success, polyline = loop.To3dCurve().TryGetPolyline()
+                if not success: return False
+                polylines.append(polyline)
+            normal = face.NormalAt(face.Domain(0).Mid, face.Domain(1).Mid)
+            faces.append((normal, polylines))
+        
+        out.append('B' + struct.pack('<IB', len(faces), brep.IsSolid))
+        for normal, polylines in faces:
+            out.append(struct.pack('<3dI', normal.X, normal.Y, normal.Z, len(polylines)))
+            for polyline in polylines:
+                self.encodePoints(polyline, out)
+        return True
+    
+    @classmethod
+    def getReferences(cls, objData, objs):
+        """Find IDs of the other objects that an object needs."""
+        refs = []
+        for key in cls.REFERENCES:
+            value = objData.get(key)
+            if isinstance(value, (str, unicode)):
+                value = [value]
+            elif not isinstance(value, list):
+                continue
+            refs.extend(v for v in value if isinstance(v, (str, unicode)) and v in objs)
+        return refs
+    
+    def write(self, filePath, HBData):
+        """Write the dictionary of dumped objects ({'ids': [], 'objs': {}}) to a file."""
+        self.strings = []
+        self.stringIndex = {}
+        objs = HBData['objs']
+        table = []
+        with open(filePath, "wb") as outf:
+            outf.write(struct.pack(self.HEADER, self.MAGIC, self.VERSION, 0, 0))
+            for id, objData in objs.iteritems():
+                out = []
+                self.encodeValue(objData, out)
+                record = ''.join(out)
+                table.append([id, objData.get('objectType'), objData.get('name'), \
+                    outf.tell(), len(record), self.getReferences(objData, objs)])
+                outf.write(record)
+            
+            # the index is encoded first to collect all the strings
+            out = []
+            self.encodeValue({'ids': HBData['ids'], 'objects': table}, out)
+            indexOffset = outf.tell()
+            strings = [struct.pack('<I', len(self.strings))]
+            for string in self.strings:
+                strings.append(struct.pack('<I', len(string)) + string)
+            outf.write(''.join(strings))
+            outf.write(''.join(out))
+            
+            outf.seek(0)
+            outf.write(struct.pack(self.HEADER, self.MAGIC, self.VERSION, 0, indexOffset))
+        return filePath
+    
+    # ------------------------------ reading ------------------------------
+    def decodePoints(self, data, offset):
+        count, = struct.unpack_from('<I', data, offset)
+        offset += 4
+        coordinates = array.array('d')
+        coordinates.fromstring(data[offset: offset + 24 * count])
+        points = [rc.Geometry.Point3d(coordinates[3 * i], coordinates[3 * i + 1], \
+            coordinates[3 * i + 2]) for i in xrange(count)]
+        return points, offset + 24 * count
+    
+    def decodeMesh(self, data, offset):
+        mesh = rc.Geometry.Mesh()
+        points, offset = self.decodePoints(data, offset)
+        for pt in points:
+            mesh.Vertices.Add(pt)
+        count, = struct.unpack_from('<I', data, offset)
+        offset += 4
+        faces = array.array('i')
+        faces.fromstring(data[offset: offset + 16 * count])
+        for i in xrange(0, 4 * count, 4):
+            mesh.Faces.AddFace(faces[i], faces[i + 1], faces[i + 2], faces[i + 3])
+        mesh.Normals.ComputeNormals()
+        mesh.Compact()
+        return mesh, offset + 16 * count
+    
+    def decodeBrep(self, data, offset):
+        faceCount, isSolid = struct.unpack_from('<IB', data, offset)
+        offset += 5
+        faces = []
+        for f in xrange(faceCount):
+            x, y, z, loopCount = struct.unpack_from('<3dI', data, offset)
+            offset += 28
+            curves = []
+            for l in xrange(loopCount):
+                points, offset = self.decodePoints(data, offset)
+                curves.append(rc.Geometry.Polyline(points).ToNurbsCurve())
+            face = rc.Geometry.Brep.CreatePlanarBreps(curves)[0]
+            brepFace = face.Faces[0]
+            normal = brepFace.NormalAt(brepFace.Domain(0).Mid, brepFace.Domain(1).Mid)
+            if normal.X * x + normal.Y * y + normal.Z * z < 0:
+                face.Flip()
+            faces.append(face)
+        
+        if len(faces) == 1:
+            return faces[0], offset
+        
+        joined = rc.Geometry.Brep.JoinBreps(faces, self.tolerance)
+        brep = joined[0]
+        for piece in joined[1:]:
+            brep.Append(piece)
+        if isSolid and brep.IsSolid and \
+            brep.SolidOrientation == rc.Geometry.BrepSolidOrientation.Inward:
+            brep.Flip()
+        return brep, offset
+    
+    def decodeValue(self, data, offset = 0):
+        """Decode the value that starts at offset. Returns the value and the next offset."""
+        tag = data[offset]
+        offset += 1
+        if tag == 'N': return None, offset
+        elif tag == 'T': return True, offset
+        elif tag == 'F': return False, offset
+        elif tag == 's' or tag == 'u':
+            index, = struct.unpack_from('<I', data, offset)
+            value = self.strings[index]
+            if tag == 'u': value = value.decode('utf-8')
+            return value, offset + 4
+        elif tag == 'd':
+            return struct.unpack_from('<d', data, offset)[0], offset + 8
+        elif tag == 'i':
+            return struct.unpack_from('<q', data, offset)[0], offset + 8
+        elif tag == 'L' or tag == 't':
+            count, = struct.unpack_from('<I', data, offset)
+            offset += 4
+            value = []
+            for i in xrange(count):
+                item, offset = self.decodeValue(data, offset)
+                value.append(item)
+            if tag == 't': value = tuple(value)
+            return value, offset
+        elif tag == 'D':
+            count, = struct.unpack_from('<I', data, offset)
+            offset += 4
+            value = {}
+            for i in xrange(count):
+                key, offset = self.decodeValue(data, offset)
+                value[key], offset = self.decodeValue(data, offset)
+            return value, offset
+        elif tag == 'P':
+            return rc.Geometry.Point3d(*struct.unpack_from('<3d', data, offset)), offset + 24
+        elif tag == 'V':
+            return rc.Geometry.Vector3d(*struct.unpack_from('<3d', data, offset)), offset + 24
+        elif tag == 'A':
+            v = struct.unpack_from('<9d', data, offset)
+            plane = rc.Geometry.Plane(rc.Geometry.Point3d(v[0], v[1], v[2]), \
+                rc.Geometry.Vector3d(v[3], v[4], v[5]), rc.Geometry.Vector3d(v[6], v[7], v[8]))
+            return plane, offset + 72
+        elif tag == 'M':
+            return self.decodeMesh(data, offset)
+        elif tag == 'B':
+            return self.decodeBrep(data, offset)
+        elif tag == 'O':
+            length, = struct.unpack_from('<I', data, offset)
+            offset += 4
+            return pickle.loads(data[offset: offset + length]), offset + length
+        else:
+            raise ValueError("Invalid value in Honeybee objects file at %d: %s"%(offset - 1, `tag`))
+    
+    def readIndex(self, inf):
+        """Read the header, string table and object table from an open file."""
+        magic, version, flags, indexOffset = struct.unpack(self.HEADER, \
+            inf.read(struct.calcsize(self.HEADER)))
+        if magic != self.MAGIC:
+            raise ValueError("%s is not a binary Honeybee objects file."%inf.name)
+        if version > self.VERSION:
+            raise ValueError("%s is written by a newer version of Honeybee (format %d)."%(inf.name, version) + \
+                "\nUpdate Honeybee to load this file.")
+        
+        inf.seek(indexOffset)
+        data = inf.read()
+        count, = struct.unpack_from('<I', data, 0)
+        offset = 4
+        self.strings = []
+        for i in xrange(count):
+            length, = struct.unpack_from('<I', data, offset)
+            self.strings.append(data[offset + 4: offset + 4 + length])
+            offset += 4 + length
+        index, offset = self.decodeValue(data, offset)
+        return index
+    
+    def selectObjects(self, index, names = None, ids = None):
+        """Select the IDs to load for a list of names and IDs and the objects they need."""
+        table = dict((row[0], row) for row in index['objects'])
+        if names is None and ids is None:
+            return index['ids'], table.keys()
+        
+        names = set(name.upper() for name in names or [])
+        ids = set(ids or [])
+        selected = [id for id in index['ids'] \
+            if id in ids or (table[id][2] or '').upper() in names]
+        selected.extend(id for id in ids if id in table and id not in selected)
+        
+        toLoad = set(row[0] for row in index['objects'] if row[1] in self.LIBRARYTYPES)
+        stack = list(selected)
+        while stack:
+            id = stack.pop()
+            if id in toLoad: continue
+            toLoad.add(id)
+            stack.extend(table[id][5])
+        return selected, list(toLoad)
+    
+    def read(self, filePath, names = None, ids = None):
+        """Read objects from a file.
+        
+        Args:
+            filePath: Path to a *.HBB file.
+            names: Optional list of object names to load.
+            ids: Optional list of object IDs to load.
+        
+        Returns:
+            A dictionary with 'ids' and 'objs' keys in the same structure as the pickled
+            data in *.HB files. If names or ids are provided only the selected objects and
+            the objects that they reference are in the dictionary and 'names' maps the
+            ID of every object in the file to its name. Surfaces which are adjacent to
+            the objects that are not loaded keep the ID as the BCObject.
+        """
+        with open(filePath, "rb") as inf:
+            index = self.readIndex(inf)
+            selected, toLoad = self.selectObjects(index, names, ids)
+            table = dict((row[0], row) for row in index['objects'])
+            
+            objs = {}
+            # read the records in the order that they are written in the file
+            for id in sorted(toLoad, key = lambda id: table[id][3]):
+                offset, length = table[id][3:5]
+                inf.seek(offset)
+                objs[id], end = self.decodeValue(inf.read(length))
+        
+        HBData = {'ids': selected, 'objs': objs}
+        if names is not None or ids is not None:
+            HBData['names'] = dict((row[0], row[2]) for row in index['objects'])
+        return HBData
+
 class hb_RADParameters(object):
     def __init__(self):
         self.radParDict = {
@@ -8568,7 +13800,17 @@ class CalculateGridBasedDLAnalysisResults(object):
         
         return resultValues
     
+    def readBinaryResult(self, resultFile):
+        """Return the R, G and B arrays of the points if the file has binary float values."""
+        values = sc.sticky["honeybee_RtracePool"].readResultFile(resultFile)
+        if values is None: return None
+        return values[0::3], values[1::3], values[2::3]
+    
     def readRadiationResult(self, resultFile):
+        binaryValues = self.readBinaryResult(resultFile)
+        if binaryValues is not None:
+            return binaryValues[0].tolist()
+        
         result = []
         resultFile = open(resultFile,"r")
         for line in resultFile:
@@ -8576,6 +13818,10 @@ class CalculateGridBasedDLAnalysisResults(object):
         return result
     
     def readDLResult(self, resultFile):
+        binaryValues = self.readBinaryResult(resultFile)
+        if binaryValues is not None:
+            return map(lambda R, G, B: 179*(.265 * R + .67 * G + .065 * B), *binaryValues)
+        
         result = []
         resultFile = open(resultFile,"r")
         for line in resultFile:
@@ -8584,6 +13830,10 @@ class CalculateGridBasedDLAnalysisResults(object):
         return result
     
     def readDFResult(self, resultFile):
+        binaryValues = self.readBinaryResult(resultFile)
+        if binaryValues is not None:
+            return map(lambda R, G, B: min(17900*(.265 * R + .67 * G + .065 * B)/1000, 100), *binaryValues)
+        
         result = []
         resultFile = open(resultFile,"r")
         for line in resultFile:
@@ -9715,18 +14965,30 @@ if checkIn.letItFly:
                   "\nhttps://github.com/mostaphaRoudsari/Honeybee/tree/master/resources\n"
         if libFilePaths != -1:
             EPLibs = HB_GetEPLibraries()
+            EPLibCache = hb_EPLibraryCache(libFilePaths)
             
             try:
-                for pathCount, path in enumerate(libFilePaths):
-                    if "honeybee_Hive" not in sc.sticky:
-                        # This is first time loading so clean the library
-                        cleanLibs = True if pathCount == 0 else False
-                    else:
-                        cleanLibs = False
-                    if path.endswith('.csv'): isMatFile = True
-                    else: isMatFile = False
+                cachedLibraries = EPLibCache.load()
+                if cachedLibraries is not None:
+                    print "Loading EP and THERM libraries from %s"%EPLibCache.cacheFile
+                    EPLibs.libraries = cachedLibraries
+                    # the cache only has the libraries. The indices that getEPObject uses
+                    # are built again from the idf files when they are needed.
+                    for path in libFilePaths:
+                        if not path.endswith('.csv'): EPLibs.addEPFile(path)
+                else:
+                    for pathCount, path in enumerate(libFilePaths):
+                        if "honeybee_Hive" not in sc.sticky:
+                            # This is first time loading so clean the library
+                            cleanLibs = True if pathCount == 0 else False
+                        else:
+                            cleanLibs = False
+                        if path.endswith('.csv'): isMatFile = True
+                        else: isMatFile = False
+                        
+                        EPLibs.importEPLibrariesFromFile(path, isMatFile, cleanLibs, False)
                     
-                    EPLibs.importEPLibrariesFromFile(path, isMatFile, cleanLibs, False)                
+                    EPLibCache.save(EPLibs.libraries)
                 
                 EPLibs.report()
                 sc.sticky["honeybee_materialLib"].update(EPLibs.getEPMaterials())
@@ -9737,6 +14999,8 @@ if checkIn.letItFly:
                 sc.sticky["honeybee_thermMaterialLib"].update(EPLibs.getTHERMMaterials())
                 sc.sticky["honeybee_WindowPropLib"].update(EPLibs.getEPWindowProp())
                 sc.sticky["honeybee_SpectralDataLib"].update(EPLibs.getEPSpectralData())
+                # keep the loaded libraries for getEPObject
+                sc.sticky["honeybee_EPLibraries"] = EPLibs
             except:
                 print msg
                 ghenv.Component.AddRuntimeMessage(w, msg)
@@ -9746,14 +15010,24 @@ if checkIn.letItFly:
         
         
         sc.sticky["honeybee_Hive"] = hb_Hive
+        sc.sticky["honeybee_ObjectsFile"] = hb_ObjectsFile
         sc.sticky["honeybee_generationHive"] = generationhb_hive
         sc.sticky["honeybee_GetEPLibs"] = HB_GetEPLibraries
+        sc.sticky["honeybee_EPObjectIndex"] = hb_EPObjectIndex
+        sc.sticky["honeybee_EPLibrary"] = hb_EPLibrary
+        sc.sticky["honeybee_EPLibraryCache"] = hb_EPLibraryCache
         sc.sticky["honeybee_DefaultMaterialLib"] = materialLibrary
         sc.sticky["honeybee_DefaultSurfaceLib"] = EPSurfaceLib
         sc.sticky["honeybee_EPMaterialAUX"] = EPMaterialAux
         sc.sticky["honeybee_EPScheduleAUX"] = EPScheduleAux
         sc.sticky["honeybee_EPObjectsAUX"] = EPObjectsAux
+        sc.sticky["honeybee_EPResultCache"] = hb_EPResultCache
+        sc.sticky["honeybee_EPSqlResults"] = hb_EPSqlResults
+        sc.sticky["honeybee_EPEsoResults"] = hb_EPEsoResults
+        sc.sticky["honeybee_ComfortMatrixFile"] = hb_ComfortMatrixFile
+        sc.sticky["honeybee_ComfortMatrixWriter"] = hb_ComfortMatrixWriter
         sc.sticky["honeybee_ReadSchedules"] = ReadEPSchedules
+        sc.sticky["honeybee_ScheduleCompiler"] = hb_ScheduleCompiler
         sc.sticky["honeybee_BuildingProgramsLib"] = BuildingProgramsLib
         sc.sticky["honeybee_EPTypes"] = EPTypes()
         sc.sticky["honeybee_EPZone"] = EPZone
@@ -9764,6 +15038,8 @@ if checkIn.letItFly:
         sc.sticky["honeybee_ThermBC"] = thermBC
         sc.sticky["honeybee_ThermDefault"] = thermDefaults
         sc.sticky["honeybee_ViewFactors"] = viewFactorInfo
+        sc.sticky["honeybee_ViewFactorCache"] = hb_ViewFactorCache
+        sc.sticky["honeybee_RayTracer"] = hb_RayTracer
         sc.sticky["PVgen"] = PV_gen
         sc.sticky["PVinverter"] = PVinverter
         sc.sticky["HB_generatorsystem"] = HB_generatorsystem
@@ -9777,6 +15053,7 @@ if checkIn.letItFly:
         sc.sticky["honeybee_hvacHeatingDetails"] = hb_heatingDetail
         sc.sticky["honeybee_hvacCoolingDetails"] = hb_coolingDetail
         sc.sticky["honeybee_EPSurface"] = hb_EPSurface
+        sc.sticky["honeybee_AdjacencyIndex"] = hb_AdjacencyIndex
         sc.sticky["honeybee_EPShdSurface"] = hb_EPShdSurface
         sc.sticky["honeybee_EPZoneSurface"] = hb_EPZoneSurface
         sc.sticky["honeybee_EPFenSurface"] = hb_EPFenSurface
@@ -9784,11 +15061,19 @@ if checkIn.letItFly:
         sc.sticky["honeybee_DLAnalysisRecipe"] = DLAnalysisRecipe
         sc.sticky["honeybee_MeshToRAD"] = hb_MSHToRAD
         sc.sticky["honeybee_WriteRAD"] = hb_WriteRAD
+        sc.sticky["honeybee_BatchJob"] = hb_BatchJob
+        sc.sticky["honeybee_JobScheduler"] = hb_JobScheduler
         sc.sticky["honeybee_WriteRADAUX"] = hb_WriteRADAUX
         sc.sticky["honeybee_WriteDS"] = hb_WriteDS
+        sc.sticky["honeybee_DaylightCoefficients"] = hb_DaylightCoefficients
+        sc.sticky["honeybee_RADResultCache"] = hb_RADResultCache
+        sc.sticky["honeybee_RtracePool"] = hb_RtracePool
+        sc.sticky["honeybee_RGBEImage"] = hb_RGBEImage
         sc.sticky["honeybee_RADParameters"] = hb_RADParameters
         sc.sticky["honeybee_DSParameters"] = hb_DSParameters
         sc.sticky["honeybee_ReadAnnualResultsAux"] = hb_ReadAnnualResultsAux
+        sc.sticky["honeybee_DSIllMatrix"] = hb_DSIllMatrix
+        sc.sticky["honeybee_DSAnnualMetrics"] = hb_DSAnnualMetrics
         sc.sticky["honeybee_EPParameters"] = hb_EnergySimulatioParameters
         sc.sticky["honeybee_SerializeObjects"] = SerializeObjects
         sc.sticky["honeybee_GridBasedDLResults"] = CalculateGridBasedDLAnalysisResults
@@ -27,7 +27,8 @@ Import Radiance Test Grid
 Provided by Honeybee 0.0.63
 
     Args:
-        input1: ...
+        _ptsFileAddress: List of test point files (.pts). Both the text files and the binary
+            files of grid-based studies are supported.
     Returns:
         readMe!: ...
 """
@@ -46,6 +47,7 @@ except: pass
 
 import os
 import Rhino as rc
+import scriptcontext as sc
 from System import Object
 from clr import AddReference
 AddReference('Grasshopper')
@@ -58,15 +60,14 @@ vectorsF = []
 
 def main(ptsFileAddress):
     
+    hb_writeRAD = sc.sticky["honeybee_WriteRAD"]
+    
     for fileAddress in ptsFileAddress:
-        with open(fileAddress, 'r') as pts:
-            for lineCount, line in enumerate(pts):
-                line = ' '.join(line.split())
-                lineSeg = line.Split(' ')
-                if len(lineSeg)!=6: lineSeg = line.Split('\t')
-                if len(lineSeg)==6:
-                    pointsF.append(rc.Geometry.Point3d(float(lineSeg[0]), float(lineSeg[1]), float(lineSeg[2])))
-                    vectorsF.append(rc.Geometry.Vector3d(float(lineSeg[3]), float(lineSeg[4]), float(lineSeg[5])))
+        # binary files of grid-based studies are packed doubles
+        values = hb_writeRAD.readTestPtFile(fileAddress)
+        for count in xrange(0, len(values), 6):
+            pointsF.append(rc.Geometry.Point3d(values[count], values[count + 1], values[count + 2]))
+            vectorsF.append(rc.Geometry.Vector3d(values[count + 3], values[count + 4], values[count + 5]))
                 
     # check if there is a pattern file in thr folder
     workingDir = os.path.dirname(ptsFileAddress[0])
@@ -99,5 +100,8 @@ def main(ptsFileAddress):
 
     return points, vectors
 
-if len(_ptsFileAddress)!=0 and _ptsFileAddress[0]!=None:
+if not sc.sticky.has_key('honeybee_release'):
+    msg = "You should first let Honeybee to fly..."
+    ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+elif len(_ptsFileAddress)!=0 and _ptsFileAddress[0]!=None:
     points, vectors = main(_ptsFileAddress)
\ No newline at end of file
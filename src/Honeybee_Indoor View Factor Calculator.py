@@ -41,7 +41,7 @@ Provided by Honeybee 0.0.63
         ============: ...
         parallel_: Set to "True" to run the calculation with multiple cores and "False" to run it with a single core.  Multiple cores can increase the speed of the calculation substantially and is recommended if you are not running other big or important processes.  The default is set to "True."
         _buildMesh: Set boolean to "True" to generate a mesh based on your zones and the input distFromFloorOrSrf_ and gridSize_.  This is a necessary step before calculating view factors from each test point to the surrounding zone surfaces.
-        _runIt: Set boolean to "True" to run the component and calculate viewFactors from each test point to surrounding surfaces.
+        _runIt: Set boolean to "True" to run the component and calculate viewFactors from each test point to surrounding surfaces.  The results of each zone are saved to a cache in the Honeybee default folder and are reused as long as the zone geometry, its test points and the view resolution do not change, so editing one zone only recalculates the points of that zone.
     Returns:
         readMe!: ...
         ==========: ...
@@ -76,7 +76,6 @@ from Grasshopper.Kernel.Data import GH_Path
 import Rhino as rc
 import rhinoscriptsyntax as rs
 import scriptcontext as sc
-import operator
 import System.Threading.Tasks as tasks
 import time
 
@@ -1257,45 +1256,63 @@ def checkViewResolution(viewResolution, lb_preparation):
     
     return newVecs, skyViewVecs, newVecsAreas, skyViewVecsAreas
 
-def allSame(items):
-    return all(x == items[0] for x in items)
+def zoneRayTracer(meshes):
+    #Put the meshes of a zone in a ray tracer with the index of each mesh as the ID of its faces.
+    tracer = sc.sticky["honeybee_RayTracer"]()
+    for srfCount, srfMesh in enumerate(meshes): tracer.addMesh(srfMesh, srfCount)
+    tracer.build()
+    return tracer
+
+def pointViewFactors(tracer, packet, point, srfCount, divisor):
+    #Find the surface that is the closest for each ray and count the hits of each surface.
+    srfHits = [0] * srfCount
+    for srfId in tracer.closestHits(point, packet):
+        if srfId >= 0: srfHits[srfId] += 1
+    
+    #Divide by the total rays to get the view factor.
+    return [hits/divisor for hits in srfHits]
+
+def pointSkyView(opaqueTracer, windowTracer, packet, point, zoneHasWindows, zoneWindowTransmiss, zoneWindowNames):
+    #See if the rays pass all of the context meshes.
+    blockedRays = opaqueTracer.anyHits(point, packet)
+    
+    finalViewCount = []
+    finalWindowNameCount = []
+    for rayCount, ray in enumerate(packet):
+        if not blockedRays[rayCount]:
+            if zoneHasWindows == 2:
+                finalViewCount.append(1) #This is the code to indicate that the point is outside and there is no need to calculate a window transmissivity.
+                finalWindowNameCount.append(0)
+            else:
+                #The ray is not blocked but it is hitting a window and so we need to factor in the window transmissivity.
+                transmiss = 1
+                winNameList = []
+                for winCount in windowTracer.allHits(point, [ray])[0]:
+                    transmiss = transmiss * zoneWindowTransmiss[winCount]
+                    winNameList.append(zoneWindowNames[winCount].upper())
+                finalViewCount.append(transmiss)
+                finalWindowNameCount.append(winNameList)
+        else:
+            #The ray has been blocked by an opaque surface.
+            finalViewCount.append(0)
+            finalWindowNameCount.append(0)
+    
+    return finalViewCount, finalWindowNameCount
 
 def parallel_projection(zoneSrfsMesh, viewVectors, pointList):
     #Placeholder for the outcome of the parallel projection.
     pointIntList = []
     for point in pointList: pointIntList.append([])
     
+    #Put the surfaces of the zone in a ray tracer and prepare the rays that are projected from each point.
+    tracer = zoneRayTracer(zoneSrfsMesh)
+    packet = tracer.preparePacket(viewVectors)
+    
     #Keep track of the divisor.
     divisor = len(viewVectors)
     
     def intersect(i):
-        point = pointList[i]
-        #Create the rays to be projected from each point.
-        pointRays = []
-        for vec in viewVectors: pointRays.append(rc.Geometry.Ray3d(point, vec))
-        
-        #Create a list that will hold the intersection hits of each surface
-        srfHits = []
-        for srf in zoneSrfsMesh: srfHits.append([])
-        
-        #Perform the intersection of the rays with the mesh.
-        pointIntersectList = []
-        for rayCount, ray in enumerate(pointRays):
-            pointIntersectList.append([])
-            for srf in zoneSrfsMesh:
-                intersect = rc.Geometry.Intersect.Intersection.MeshRay(srf, ray)
-                if intersect == -1: intersect = "N"
-                pointIntersectList[rayCount].append(intersect)
-        
-        #Find the intersection that was the closest for each ray.
-        for list in pointIntersectList:
-            if allSame(list) == False:
-                minIndex, minValue = min(enumerate(list), key=operator.itemgetter(1))
-                srfHits[minIndex].append(1)
-        
-        #Sum up the lists and divide by the total rays to get the view factor.
-        for hitList in srfHits:
-            pointIntList[i].append(sum(hitList)/divisor)
+        pointIntList[i] = pointViewFactors(tracer, packet, pointList[i], len(zoneSrfsMesh), divisor)
     
     tasks.Parallel.ForEach(range(len(pointList)), intersect)
     
@@ -1312,53 +1329,16 @@ def parallel_skyProjection(zoneOpaqueMesh, skyViewVecs, skyViewVecsAreas, pointL
         skyBlockedList.append([])
         skyBlockWindowNameCount.append([])
     
+    #Put the opaque and window meshes in ray tracers and prepare the rays that are projected from each point.
+    opaqueTracer = zoneRayTracer(zoneOpaqueMesh)
+    windowTracer = zoneRayTracer(zoneWindowMesh)
+    packet = opaqueTracer.preparePacket(skyViewVecs)
+    
     #Keep track of the divisor.
     divisor = len(skyViewVecs)
     
     def intersect(i):
-        point = pointList[i]
-        #Create the rays to be projected from each point.
-        pointRays = []
-        for vec in skyViewVecs: pointRays.append(rc.Geometry.Ray3d(point, vec))
-        
-        #Perform the intersection of the rays with the opaque mesh.
-        pointIntersectList = []
-        for rayCount, ray in enumerate(pointRays):
-            pointIntersectList.append([])
-            for srf in zoneOpaqueMesh:
-                intersect = rc.Geometry.Intersect.Intersection.MeshRay(srf, ray)
-                if intersect == -1: pass
-                else: pointIntersectList[rayCount].append(1)
-        
-        #See if the ray passed all of the context meshes.
-        finalIntersectList = []
-        for ray in pointRays:
-            finalIntersectList.append([])
-        for listCt, rayList in enumerate(pointIntersectList):
-            for intersect in rayList:
-                finalIntersectList[listCt].append(intersect)
-        
-        finalViewCount = []
-        finalWindowNameCount = []
-        for rayListCount, rayList in enumerate(finalIntersectList):
-            if sum(rayList) == 0:
-                if zoneHasWindows == 2:
-                    finalViewCount.append(1)
-                    finalWindowNameCount.append(0)
-                else:
-                    transmiss = 1
-                    winNameList = []
-                    for winCount, winMesh in enumerate(zoneWindowMesh):
-                        intersect = rc.Geometry.Intersect.Intersection.MeshRay(winMesh, pointRays[rayListCount])
-                        if intersect == -1: pass
-                        else:
-                            transmiss = transmiss * zoneWindowTransmiss[winCount]
-                            winNameList.append(zoneWindowNames[winCount].upper())
-                    finalViewCount.append(transmiss)
-                    finalWindowNameCount.append(winNameList)
-            else:
-                finalViewCount.append(0)
-                finalWindowNameCount.append(0)
+        finalViewCount, finalWindowNameCount = pointSkyView(opaqueTracer, windowTracer, packet, pointList[i], zoneHasWindows, zoneWindowTransmiss, zoneWindowNames)
         
         #Sum up the lists and divide by the total rays to get the view factor.
         skyBlockedList[i] = finalViewCount
@@ -1383,6 +1363,13 @@ def skyViewCalc(testPts, zoneOpaqueMesh, skyViewVecs, skyViewVecsAreas, zoneHasW
     
     for zoneCount, pointList in enumerate(testPts):
         if zoneHasWindows[zoneCount] > 0:
+            #Read the results of the zone from the cache if none of its inputs have changed.
+            cacheKey = vfCache.getKey("skyView", zoneOpaqueMesh[zoneCount], skyViewVecs, pointList, zoneHasWindows[zoneCount], zoneWindowMesh[zoneCount], zoneWindowTransmiss[zoneCount], zoneWindowNames[zoneCount])
+            cachedResults = vfCache.load(cacheKey)
+            if cachedResults != None:
+                for resultList, result in zip([testPtSkyView, testPtSkyBlockedList, testPtBlockName], cachedResults): resultList.append(result)
+                continue
+            
             if parallel_ == True or parallel_ == None:
                 skyViewFactors, skyBlockedList, finalWindowNameCount = parallel_skyProjection(zoneOpaqueMesh[zoneCount], skyViewVecs, skyViewVecsAreas, testPts[zoneCount], zoneWindowMesh[zoneCount], zoneWindowTransmiss[zoneCount], zoneHasWindows[zoneCount], zoneWindowNames[zoneCount])
                 testPtSkyView.append(skyViewFactors)
@@ -1392,59 +1379,19 @@ def skyViewCalc(testPts, zoneOpaqueMesh, skyViewVecs, skyViewVecsAreas, zoneHasW
                 testPtSkyView.append([])
                 testPtSkyBlockedList.append([])
                 testPtBlockName.append([])
+                opaqueTracer = zoneRayTracer(zoneOpaqueMesh[zoneCount])
+                windowTracer = zoneRayTracer(zoneWindowMesh[zoneCount])
+                packet = opaqueTracer.preparePacket(skyViewVecs)
+                divisor = len(skyViewVecs)
                 for pointCount, point in enumerate(pointList):
-                    #Make the list that will eventually hold the view factors of each surface.
-                    divisor = len(skyViewVecs)
-                    
-                    #Create the rays to be projected from each point.
-                    pointRays = []
-                    for vec in skyViewVecs: pointRays.append(rc.Geometry.Ray3d(point, vec))
-                    
-                    #Perform the intersection of the rays with the opaque mesh.
-                    pointIntersectList = []
-                    for rayCount, ray in enumerate(pointRays):
-                        pointIntersectList.append([])
-                        for srf in zoneOpaqueMesh[zoneCount]:
-                            intersect = rc.Geometry.Intersect.Intersection.MeshRay(srf, ray)
-                            if intersect == -1: pointIntersectList[rayCount].append(0)
-                            else: pointIntersectList[rayCount].append(1)
-                    
-                    #See if the ray passed all of the context meshes.
-                    finalIntersectList = []
-                    for ray in pointRays:
-                        finalIntersectList.append([])
-                    for listCt, rayList in enumerate(pointIntersectList):
-                        for intersect in rayList:
-                            finalIntersectList[listCt].append(intersect)
-                    
-                    finalViewCount = []
-                    finalWindowNameCount = []
-                    for rayListCount, rayList in enumerate(finalIntersectList):
-                        if sum(rayList) == 0:
-                            if zoneHasWindows[zoneCount] == 2:
-                                finalViewCount.append(1) #This is the code to indicate that the point is outside and there is no need to calculate a window transmissivity.
-                                finalWindowNameCount.append(0)
-                            else:
-                                #The ray is not blocked but it is hitting a window and so we need to factor in the window transmissivity.
-                                transmiss = 1
-                                winNameList = []
-                                for winCount, winMesh in enumerate(zoneWindowMesh[zoneCount]):
-                                    intersect = rc.Geometry.Intersect.Intersection.MeshRay(winMesh, pointRays[rayListCount])
-                                    if intersect == -1: pass
-                                    else:
-                                        transmiss = transmiss * zoneWindowTransmiss[zoneCount][winCount]
-                                        winNameList.append(zoneWindowNames[zoneCount][winCount].upper())
-                                finalViewCount.append(transmiss)
-                                finalWindowNameCount.append(winNameList)
-                        else:
-                            #The ray has been blocked by an opaque surface.
-                            finalViewCount.append(0)
-                            finalWindowNameCount.append(0)
+                    finalViewCount, finalWindowNameCount = pointSkyView(opaqueTracer, windowTracer, packet, point, zoneHasWindows[zoneCount], zoneWindowTransmiss[zoneCount], zoneWindowNames[zoneCount])
                     
                     #Sum up the lists and divide by the total rays to get the view factor.
                     testPtSkyBlockedList[zoneCount].append(finalViewCount)
                     testPtSkyView[zoneCount].append(sum(finalViewCount)/divisor)
                     testPtBlockName[zoneCount].append(finalWindowNameCount)
+            
+            vfCache.save(cacheKey, [testPtSkyView[zoneCount], testPtSkyBlockedList[zoneCount], testPtBlockName[zoneCount]])
         else:
             testPtSkyView.append(0)
             testPtSkyBlockedList.append([range(len(skyViewVecs))])
@@ -1457,44 +1404,24 @@ def main(testPts, zoneSrfsMesh, viewVectors, includeOutdoor):
     testPtViewFactor = []
     
     for zoneCount, pointList in enumerate(testPts):
+        #Read the view factors of the zone from the cache if none of its inputs have changed.
+        cacheKey = vfCache.getKey("viewFactor", zoneSrfsMesh[zoneCount], viewVectors, pointList)
+        cachedViewFactors = vfCache.load(cacheKey)
+        if cachedViewFactors != None:
+            testPtViewFactor.append(cachedViewFactors)
+            continue
+        
         if parallel_ == True  or parallel_ == None:
             viewFactors = parallel_projection(zoneSrfsMesh[zoneCount], viewVectors, testPts[zoneCount])
             testPtViewFactor.append(viewFactors)
         else:
+            tracer = zoneRayTracer(zoneSrfsMesh[zoneCount])
+            packet = tracer.preparePacket(viewVectors)
             testPtViewFactor.append([])
             for pointCount, point in enumerate(pointList):
-                #Make the list that will eventually hold the view factors of each surface.
-                testPtViewFactor[zoneCount].append([])
-                divisor = len(viewVectors)
-                
-                #Create the rays to be projected from each point.
-                pointRays = []
-                for vec in viewVectors: pointRays.append(rc.Geometry.Ray3d(point, vec))
-                
-                #Create a list that will hold the intersection hits of each surface
-                srfHits = []
-                for srf in zoneSrfsMesh[zoneCount]: srfHits.append([])
-                
-                #Perform the intersection of the rays with the mesh.
-                pointIntersectList = []
-                for rayCount, ray in enumerate(pointRays):
-                    pointIntersectList.append([])
-                    for srf in zoneSrfsMesh[zoneCount]:
-                        intersect = rc.Geometry.Intersect.Intersection.MeshRay(srf, ray)
-                        if intersect == -1: intersect = "N"
-                        pointIntersectList[rayCount].append(intersect)
-                
-                #Find the intersection that was the closest for each ray.
-                for list in pointIntersectList:
-                    try:
-                        if allSame(list) == False:
-                            minIndex, minValue = min(enumerate(list), key=operator.itemgetter(1))
-                            srfHits[minIndex].append(1)
-                    except: pass
-                
-                #Sum up the lists and divide by the total rays to get the view factor.
-                for hitList in srfHits:
-                    testPtViewFactor[zoneCount][pointCount].append(sum(hitList)/divisor)
+                testPtViewFactor[zoneCount].append(pointViewFactors(tracer, packet, point, len(zoneSrfsMesh[zoneCount]), len(viewVectors)))
+        
+        vfCache.save(cacheKey, testPtViewFactor[zoneCount])
     
     
     return testPtViewFactor
@@ -1638,6 +1565,7 @@ if checkData == True and buildMesh == True:
 if checkData == True and _runIt == True and geoCheck == True and buildMesh == True:
     start = time.clock()
     viewVectors, skyViewVecs, newVecsAreas, skyViewVecsAreas = checkViewResolution(viewResolution, lb_preparation)
+    vfCache = sc.sticky["honeybee_ViewFactorCache"]()
     testPtViewFactor = main(testPtsInit, zoneSrfsMesh, viewVectors, includeOutdoor)
     testPtSkyView, testPtBlockedVec, testPtBlockName = skyViewCalc(testPtsInit, zoneOpaqueMesh, skyViewVecs, skyViewVecsAreas, zoneHasWindows, zoneWindowMesh, zoneWindowTransmiss, zoneWindowNames)
     
@@ -1662,6 +1590,7 @@ if checkData == True and _runIt == True and geoCheck == True and buildMesh == Tr
 print "_"
 if total_ms != None: print str(round(total_ms, 3)) + " seconds were spent creating the view factor mesh."
 if total_fs != None: print str(round(total_fs, 3)) + " seconds were spent calculating view factors."
+if total_fs != None: print vfCache.report()
 
 #Hide the outputs that are not highly important.
 ghenv.Component.Params.Output[5].Hidden = True
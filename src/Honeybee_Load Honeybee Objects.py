@@ -26,11 +26,19 @@ Load Honeybee Objects
 Use this component to load Honeybee objects from a file on your system.
 The valid files are created by dump Honeybee objects component.
 -
+To load only some of the zones, zoom in on the component and add an input named
+zoneNames_ with list access. Connect the names of the zones to it. The surfaces, HVAC
+systems and the libraries that the zones need are loaded with them. Only the selected
+zones are read from .HBB files while .HB files are fully read first. Surfaces which
+are adjacent to zones that are not loaded keep the name of the adjacent surface as
+their boundary condition object.
+-
 Provided by Honeybee 0.0.63
 
     Args:
         _HBObjects: A list of Honeybee objects
         _filePath: A valid path to a file on your drive (e.g. c:\ladybug\20ZonesExample.HB)
+            Both .HB and binary .HBB files are supported.
         _load: Set to True to load the objects from the file
     Returns:
         readMe!: ...
@@ -63,7 +71,7 @@ class outdoorBCObject(object):
         self.name = name
 
 
-def loadHBObjects(HBData):
+def loadHBObjects(HBData, calculatePunched = True):
     
     hb_EPZone = sc.sticky["honeybee_EPZone"]
     hb_EPSrf = sc.sticky["honeybee_EPSurface"]
@@ -180,7 +188,8 @@ def loadHBObjects(HBData):
                 
             if not HBObject.isChild and HBObject.hasChild:
                 HBObject.childSrfs = [HBObjects[id] for id in HBObject.childSrfs]
-                HBObject.calculatePunchedSurface()
+                if calculatePunched or HBObject.punchedGeometry == None:
+                    HBObject.calculatePunchedSurface()
             
             if HBObject.type==6:
                 HBObject.childSrfs = [HBObjects[id] for id in HBObject.childSrfs]
@@ -190,7 +199,12 @@ def loadHBObjects(HBData):
                 
             if HBObject.type!=6 and HBObject.BC.lower() == "surface":
                 # replace parent object with ID
-                HBObject.BCObject = HBObjects[HBObject.BCObject]
+                if HBObject.BCObject in HBObjects:
+                    HBObject.BCObject = HBObjects[HBObject.BCObject]
+                else:
+                    # the adjacent zone is not loaded
+                    names = HBData.get("names", {})
+                    HBObject.BCObject = outdoorBCObject(names.get(HBObject.BCObject, HBObject.BCObject))
     
     for id, HBO in objs.iteritems():
         if HBO['objectType'] == 'HBSurface' and HBO['type'] == 5: continue
@@ -242,12 +256,33 @@ def loadHBObjects(HBData):
         return hb_hive.addNonGeoObjToHive([HBObjects[id] for id in HBData["ids"]][0], ghenv.Component)
 
 
-def main(filePath):
+def main(filePath, zoneNames):
     if not os.path.isfile(filePath):
         raise ValueError("Can't find %s"%filePath)
     
-    with open(filePath, "rb") as inf:
-        return loadHBObjects(pickle.load(inf))
+    names = [name for name in zoneNames if name] or None
+    
+    hb_ObjectsFile = sc.sticky["honeybee_ObjectsFile"]
+    if hb_ObjectsFile.isObjectsFile(filePath):
+        # binary files keep the punched geometries and only the selected zones are read
+        tol = sc.doc.ModelAbsoluteTolerance * sc.sticky["honeybee_ConversionFactor"]
+        HBData = hb_ObjectsFile(tol).read(filePath, names)
+        calculatePunched = False
+    else:
+        with open(filePath, "rb") as inf:
+            HBData = pickle.load(inf)
+        calculatePunched = True
+        if names:
+            names = set(name.upper() for name in names)
+            HBData["ids"] = [id for id in HBData["ids"] \
+                             if HBData["objs"][id].get("name", "").upper() in names]
+    
+    if not HBData["ids"]:
+        msg = "Can't find any of the zones in %s."%filePath
+        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+        return -1
+    
+    return loadHBObjects(HBData, calculatePunched)
 
 
 
@@ -270,5 +305,6 @@ else:
         ghenv.Component.AddRuntimeMessage(w, warning)
 
 if initCheck == True and _filePath != None and _load == True:
-    results = main(_filePath)
+    # zoneNames_ is an optional input that isn't in the user object
+    results = main(_filePath, globals().get('zoneNames_') or [])
     HBObjects = results if results!= -1 else None
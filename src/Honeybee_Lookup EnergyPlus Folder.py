@@ -39,7 +39,7 @@ Provided by Honeybee 0.0.63
         rddFiles: The file path of the Report Data Dictionary (rdd) file that has been generated on your machine.
         errFiles: The file path of the Error (err) file that has been generated on your machine.
         eioFiles: The file path of the EnergyPlus Invariant Output (eio) file that has been generated on your machine.
-        esoFiles: The file path of the EnergyPlus Simulation Output (eso) result file that has been generated on your machine.
+        esoFiles: The file path of the EnergyPlus Simulation Output (eso) result file that has been generated on your machine.  This can be connected to the _resultFileAddress of the Read EP Result components to read the results without ReadVarsESO.
         sqlFiles: The file path of the Structured Query Language (sql) result file that has been generated on your machine.
 """
 ghenv.Component.Name = "Honeybee_Lookup EnergyPlus Folder"
@@ -35,7 +35,7 @@ Provided by Honeybee 0.0.63
         =============: ...
         analysisPeriodOrHOY_: An analysis period from the 'Ladybug Analysis Period' component or an hour of the analysis between 1 and 8760 for which you want to conduct the analysis. If no value is connected here, the component will run for only noon on the winter solstice.  A single HOY is used by default as longer analysis periods can take a very long time.
         =============: ...
-        writeResultFile_: Set to 1 or 'True' to have the component write all results into CSV result files and set to 0 or 'False' to not have the component write these files.  The default is set to 'True' as these simulations can be long and you usually want a copy of your results.  You may want to set it to 'False' if you are just scrolling through key hours and want the fastest run possible.  Set to 2 if you want the component to only write the results of the last two matrices (comfort results and degFromTarget).
+        writeResultFile_: Set to 1 or 'True' to have the component write all results into CSV result files and set to 0 or 'False' to not have the component write these files.  The default is set to 'True' as these simulations can be long and you usually want a copy of your results.  You may want to set it to 'False' if you are just scrolling through key hours and want the fastest run possible.  Set to 2 if you want the component to only write the results of the last two matrices (comfort results and degFromTarget).  Set to 3 to write all results into binary comfort matrix files (.hbcm) instead of CSV files.  These files are smaller, faster to read and can be connected directly to the 'Honeybee_Visualize Microclimate Map' and the 'Honeybee_Thermal Autonomy Analysis' components.
         parallel_: Set to "True" to run the component using multiple CPUs.  This can dramatically decrease calculation time but can interfere with other intense computational processes that might be running on your machine.  For this reason, the default is set to 'False.'
         _runIt: Set boolean to "True" to run the component and generate files for an annual indoor comfort assessment.
     Returns:
@@ -77,7 +77,11 @@ import Rhino as rc
 import scriptcontext as sc
 import math
 import os
+import operator
+import threading
 import System.Threading.Tasks as tasks
+try: import numpy
+except ImportError: numpy = None
 
 
 w = gh.GH_RuntimeMessageLevel.Warning
@@ -282,36 +286,123 @@ def processPrevailOutdoorTemp(prevailingOutdoorTemp, avgMonthOrRunMean):
     return prevailTemp, coldTimes
 
 
-def calculatePointMRT(srfTempDict, testPtsViewFactor, hour, originalHour, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, prevailingOutdoorTemp):
-    #Calculate the MRT for each point.
-    pointMRTValues = []
-    for zoneCount, pointList in enumerate(testPtsViewFactor):
-        if outdoorClac == False or zoneCount != len(testPtsViewFactor)-1:
-            pointMRTValues.append([])
-            for pointViewFactor in pointList:
-                pointMRT = 0
-                for srfCount, srfView in enumerate(pointViewFactor):
-                    path  = str([zoneCount,srfCount])
-                    weightedSrfTemp = srfView*(math.pow((srfTempDict[path]["srfTemp"][hour] + 273.15),4))
-                    pointMRT = pointMRT+weightedSrfTemp
-                pointMRT = math.pow(pointMRT,0.25) - 273.15
-                pointMRTValues[zoneCount].append(round(pointMRT, 3))
+class PointMRTKernel(object):
+    """Calculate the MRT of all the points for blocks of hours.
+    
+    The view factors of each zone are kept as a dense points x surfaces matrix and
+    the surface temperatures are raised to the power of 4 once for each block of hours.
+    The MRT of every point for every hour of the block is the product of the two matrices,
+    which is calculated with numpy when it's available and with zip and map otherwise.
+    Blocks are calculated when their first hour is requested and they are removed when
+    all of their hours are used.
+    """
+    
+    BLOCKSIZE = 168
+    
+    def __init__(self, srfTempDict, testPtsViewFactor, HOYs, originalHOYs, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, prevailingOutdoorTemp):
+        self.srfTempDict = srfTempDict
+        self.testPtsViewFactor = testPtsViewFactor
+        self.hours = [hour-1 for hour in HOYs]
+        self.originalHours = [hour-1 for hour in originalHOYs]
+        self.outdoorClac = outdoorClac
+        self.outSrfTempDict = outSrfTempDict
+        self.outdoorNonSrfViewFac = outdoorNonSrfViewFac
+        self.prevailingOutdoorTemp = prevailingOutdoorTemp
+        self.zones = None
+        self.blocks = {}
+        self.lock = threading.Lock()
+    
+    def prepareZones(self):
+        #Collect the view factors and the surface temperatures of each zone.
+        zones = []
+        for zoneCount, pointList in enumerate(self.testPtsViewFactor):
+            isOutdoor = self.outdoorClac == True and zoneCount == len(self.testPtsViewFactor)-1
+            if isOutdoor: tempDict = self.outSrfTempDict
+            else: tempDict = self.srfTempDict
+            srfCount = max([len(pointViewFactor) for pointViewFactor in pointList] + [0])
+            srfTemps = [tempDict[str([zoneCount,srfIndex])]["srfTemp"] for srfIndex in range(srfCount)]
+            viewFactors = [list(pointViewFactor) + [0]*(srfCount-len(pointViewFactor)) for pointViewFactor in pointList]
+            if numpy is not None:
+                viewFactors = numpy.array(viewFactors, dtype=float).reshape(len(pointList), srfCount)
+                if srfCount != 0: srfTemps = numpy.array(srfTemps, dtype=float)
+                else: srfTemps = numpy.zeros((0, 8760))
+            zones.append((viewFactors, srfTemps, isOutdoor))
+        return zones
+    
+    def getPointMRT(self, count):
+        #Return the MRT of every point of each zone for an hour of the analysis.
+        blockCount = count // self.BLOCKSIZE
+        start = blockCount * self.BLOCKSIZE
+        end = min(start + self.BLOCKSIZE, len(self.hours))
+        with self.lock:
+            if self.zones is None: self.zones = self.prepareZones()
+            if blockCount not in self.blocks:
+                self.blocks[blockCount] = [threading.Lock(), None, end - start]
+            block = self.blocks[blockCount]
+        
+        #Each block has its own lock so different blocks can be calculated at the same time.
+        with block[0]:
+            if block[1] is None: block[1] = self.calculateBlock(start, end)
+        
+        with self.lock:
+            block[2] -= 1
+            if block[2] == 0: del self.blocks[blockCount]
+        return [zoneMRT[count - start] for zoneMRT in block[1]]
+    
+    def calculateBlock(self, start, end):
+        #Calculate the MRT of every point for a block of hours as [zone][hour][point].
+        hours = self.hours[start:end]
+        outdoorTemps = [self.prevailingOutdoorTemp[hour] for hour in self.originalHours[start:end]]
+        blockMRT = []
+        for viewFactors, srfTemps, isOutdoor in self.zones:
+            if numpy is not None: blockMRT.append(self.calculateZoneNumpy(viewFactors, srfTemps, isOutdoor, hours, outdoorTemps))
+            else: blockMRT.append(self.calculateZone(viewFactors, srfTemps, isOutdoor, hours, outdoorTemps))
+        return blockMRT
+    
+    def calculateZone(self, viewFactors, srfTemps, isOutdoor, hours, outdoorTemps):
+        hourT4 = zip(*[[(srfTemp[hour] + 273.15)**4 for hour in hours] for srfTemp in srfTemps])
+        if hourT4 == []: hourT4 = [()] * len(hours)
+        mul = operator.mul
+        if not isOutdoor:
+            return [[round(sum(map(mul, pointViewFactor, srfT4))**0.25 - 273.15, 3) for pointViewFactor in viewFactors] for srfT4 in hourT4]
         else:
-            pointMRTValues.append([])
-            for ptCount, pointViewFactor in enumerate(pointList):
-                pointMRT = 0
-                for srfCount, srfView in enumerate(pointViewFactor):
-                    path  = str([zoneCount,srfCount])
-                    weightedSrfTemp = srfView*(math.pow((outSrfTempDict[path]["srfTemp"][hour]+273.15),4))
-                    pointMRT = pointMRT+weightedSrfTemp
-                
-                weightedSrfTemp = outdoorNonSrfViewFac[ptCount]*(math.pow((prevailingOutdoorTemp[originalHour]+273.15),4))
-                pointMRT = pointMRT+weightedSrfTemp
-                pointMRT = pointMRT / (sum(pointViewFactor) + outdoorNonSrfViewFac[ptCount])
-                pointMRT = math.pow(pointMRT,0.25) - 273.15
-                pointMRTValues[zoneCount].append(round(pointMRT, 3))
-    
-    return pointMRTValues
+            zoneMRT = []
+            for srfT4, outdoorTemp in zip(hourT4, outdoorTemps):
+                outdoorT4 = (outdoorTemp + 273.15)**4
+                hourMRT = []
+                for pointViewFactor, nonSrfViewFac in zip(viewFactors, self.outdoorNonSrfViewFac):
+                    pointMRT = (sum(map(mul, pointViewFactor, srfT4)) + nonSrfViewFac*outdoorT4) / (sum(pointViewFactor) + nonSrfViewFac)
+                    hourMRT.append(round(pointMRT**0.25 - 273.15, 3))
+                zoneMRT.append(hourMRT)
+            return zoneMRT
+    
+    def calculateZoneNumpy(self, viewFactors, srfTemps, isOutdoor, hours, outdoorTemps):
+        srfT4 = (srfTemps[:, hours] + 273.15)**4
+        radiation = numpy.dot(viewFactors, srfT4)
+        if isOutdoor:
+            nonSrfViewFac = numpy.array(self.outdoorNonSrfViewFac[:len(viewFactors)], dtype=float)
+            outdoorT4 = (numpy.array(outdoorTemps, dtype=float) + 273.15)**4
+            radiation += numpy.outer(nonSrfViewFac, outdoorT4)
+            radiation /= (viewFactors.sum(axis=1) + nonSrfViewFac)[:, numpy.newaxis]
+        return numpy.round(radiation**0.25 - 273.15, 3).T.tolist()
+
+def runHourChunks(hourFunction, hourCount):
+    #Run the hours of the analysis in chunks of consecutive hours.
+    #Each hour fills its own row of the matrices so the rows are in the order of the hours no matter which chunk finishes first.
+    #In parallel mode each chunk is a separate task and the tasks are spread over all of the CPUs.
+    workerCount = System.Environment.ProcessorCount if parallel_ == True else 1
+    chunkSize = max(1, min(PointMRTKernel.BLOCKSIZE, int(math.ceil(hourCount / float(workerCount)))))
+    chunks = [range(start, min(start + chunkSize, hourCount)) for start in range(0, hourCount, chunkSize)]
+    
+    def runChunk(chunk):
+        for count in chunk: hourFunction(count)
+    
+    if parallel_ == True and len(chunks) > 1:
+        options = tasks.ParallelOptions()
+        options.MaxDegreeOfParallelism = workerCount
+        tasks.Parallel.ForEach(chunks, options, runChunk)
+    else:
+        for chunk in chunks: runChunk(chunk)
 
 def computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac):
     #Build a new testPtBlockedVec that checks with the window transmissivity status.
@@ -818,6 +909,9 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
             outSrfTempDict = createSrfDict(zoneSrfNames, "srfName", "srfTemp", outSrfTempHeaders, outSrfTempNumbers)
         else: outSrfTempDict = {}
         
+        #Prepare the MRT calculation for all of the hours.
+        mrtKernel = PointMRTKernel(srfTempDict, testPtsViewFactor, HOYs, originalHOYs, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, prevailingOutdoorTemp)
+        
         #If there are different hourly window transmissivities for different windows, make a dictionary for the shades and make a neutral winTrans list to cancel out the usual way window transmissivity is factored in.
         neutralWinTransList = []
         winShdDict = {}
@@ -885,7 +979,7 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, prevailingOutdoorTemp)
+                pointMRTValues = mrtKernel.getPointMRT(count)
                 if sum(zoneHasWindows) != 0:
                     if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels)
                     else:
@@ -943,13 +1037,7 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
                 degFromTargetMtx[count+1] = degFromTargetPointValues
             
             #Run through every hour of the analysis to fill up the matrices.
-            if parallel_ == True and len(HOYs) != 1:
-                tasks.Parallel.ForEach(range(len(HOYs)), climateMap)
-            else:
-                for hour in range(len(HOYs)):
-                    #Ability to cancel with Esc
-                    #if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    climateMap(hour)
+            runHourChunks(climateMap, len(HOYs))
         except:
             print "The calculation has been terminated by the user!"
             e = gh.GH_RuntimeMessageLevel.Warning
@@ -1013,6 +1101,9 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
             outSrfTempDict = createSrfDict(zoneSrfNames, "srfName", "srfTemp", outSrfTempHeaders, outSrfTempNumbers)
         else: outSrfTempDict = {}
         
+        #Prepare the MRT calculation for all of the hours.
+        mrtKernel = PointMRTKernel(srfTempDict, testPtsViewFactor, HOYs, originalHOYs, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+        
         #If there are different shade statuses for the different windows, make a neutral winTrans list for this case.
         neutralWinTransList = []
         winShdDict = {}
@@ -1081,7 +1172,7 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+                pointMRTValues = mrtKernel.getPointMRT(count)
                 if sum(zoneHasWindows) != 0:
                     if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                     else:
@@ -1150,13 +1241,7 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 PMV_Mtx[count+1] = pmvPointValues
             
             #Run through every hour of the analysis to fill up the matrices.
-            if parallel_ == True and len(HOYs) != 1:
-                tasks.Parallel.ForEach(range(len(HOYs)), climateMapPMV)
-            else:
-                for hour in range(len(HOYs)):
-                    #Ability to cancel with Esc
-                    if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    climateMapPMV(hour)
+            runHourChunks(climateMapPMV, len(HOYs))
         except:
             print "The calculation has been terminated by the user!"
             e = gh.GH_RuntimeMessageLevel.Warning
@@ -1220,6 +1305,9 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
         if outdoorClac == True: outSrfTempDict = createSrfDict(zoneSrfNames, "srfName", "srfTemp", outSrfTempHeaders, outSrfTempNumbers)
         else: outSrfTempDict = {}
         
+        #Prepare the MRT calculation for all of the hours.
+        mrtKernel = PointMRTKernel(srfTempDict, testPtsViewFactor, HOYs, originalHOYs, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+        
         #If there are different shade statuses for the different windows, make a neutral winTrans list for this case.
         neutralWinTransList = []
         winShdDict = {}
@@ -1290,7 +1378,7 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+                pointMRTValues = mrtKernel.getPointMRT(count)
                 if sum(zoneHasWindows) != 0:
                     if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                     else:
@@ -1355,13 +1443,7 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
                 DegFromNeutralMtx[count+1] = degNeutralPointValues
             
             #Run through every hour of the analysis to fill up the matrices.
-            if parallel_ == True and len(HOYs) != 1:
-                tasks.Parallel.ForEach(range(len(HOYs)), climateMapUTCI)
-            else:
-                for hour in range(len(HOYs)):
-                    #Ability to cancel with Esc
-                    if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    climateMapUTCI(hour)
+            runHourChunks(climateMapUTCI, len(HOYs))
         except:
             print "The calculation has been terminated by the user!"
             e = gh.GH_RuntimeMessageLevel.Warning
@@ -1425,6 +1507,9 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
         if outdoorClac == True: outSrfTempDict = createSrfDict(zoneSrfNames, "srfName", "srfTemp", outSrfTempHeaders, outSrfTempNumbers)
         else: outSrfTempDict = {}
         
+        #Prepare the MRT calculation for all of the hours.
+        mrtKernel = PointMRTKernel(srfTempDict, testPtsViewFactor, HOYs, originalHOYs, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+        
         #If there are different shade statuses for the different windows, make a neutral winTrans list for this case.
         neutralWinTransList = []
         winShdDict = {}
@@ -1495,7 +1580,7 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+                pointMRTValues = mrtKernel.getPointMRT(count)
                 if sum(zoneHasWindows) != 0:
                     if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                     else:
@@ -1559,13 +1644,7 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 PET_CategoryMtx[count+1] = petCategoryValues
             
             #Run through every hour of the analysis to fill up the matrices.
-            if parallel_ == True and len(HOYs) != 1:
-                tasks.Parallel.ForEach(range(len(HOYs)), climateMapPET)
-            else:
-                for hour in range(len(HOYs)):
-                    #Ability to cancel with Esc
-                    if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    climateMapPET(hour)
+            runHourChunks(climateMapPET, len(HOYs))
         except:
             print "The calculation has been terminated by the user!"
             e = gh.GH_RuntimeMessageLevel.Warning
@@ -1579,93 +1658,74 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
             return -1
 
 
+def resultFileExtension():
+    #Binary comfort matrices are written when writeResultFile_ is set to 3.
+    if writeResultFile_ != 3: return ".csv"
+    if sc.sticky.has_key('honeybee_ComfortMatrixFile'): return sc.sticky["honeybee_ComfortMatrixFile"].EXTENSION
+    warning = "You should let Honeybee fly to write binary result files. The results are written to csv files instead."
+    print warning
+    ghenv.Component.AddRuntimeMessage(w, warning)
+    return ".csv"
+
+def writeResultMatrix(resultFile, resultMtx, valLen):
+    #Write a result matrix to a csv file or to a binary comfort matrix file that can be memory-mapped.
+    if not resultFile.endswith(".csv"):
+        sc.sticky["honeybee_ComfortMatrixFile"].write(resultFile, resultMtx)
+        return
+    resultCSVfile = open(resultFile, 'wb')
+    for lineCount, line in enumerate(resultMtx):
+        lineStr = ''
+        if lineCount != 0:
+            for valCt, val in enumerate(line):
+                if valCt != valLen: lineStr = lineStr + str(val) + ','
+                else: lineStr = lineStr + str(val) + "\n"
+            resultCSVfile.write(lineStr)
+        else: resultCSVfile.write(line + "\n")
+    resultCSVfile.close()
+
 def writeCSVAdapt(lb_preparation, directory, fileName, radTempMtx, airTempMtx, operativeTempMtx, adaptComfMtx, degFromTargetMtx):
     #Find out the number of values in each hour.
     valLen = len(radTempMtx[-1])-1
     
     #Set up a working directory.
     workingDir = lb_preparation.makeWorkingDir(os.path.join(directory)) 
+    extension = resultFileExtension()
     
     #Create a csv Files.
-    radTempFile = fileName + "RadiantTemp.csv"
-    airTempFile = fileName + "AirTemp.csv"
-    opTempFile = fileName + "OperativeTemp.csv"
-    adaptComfFile = fileName + "AdaptComf.csv"
-    degFromTargetFile = fileName + "DegFromTarget.csv"
+    radTempFile = fileName + "RadiantTemp" + extension
+    airTempFile = fileName + "AirTemp" + extension
+    opTempFile = fileName + "OperativeTemp" + extension
+    adaptComfFile = fileName + "AdaptComf" + extension
+    degFromTargetFile = fileName + "DegFromTarget" + extension
     
     #Write the radiant temperature result file.
     if writeResultFile_ != 2:
         radTempResult = os.path.join(workingDir, radTempFile)
-        radCSVfile = open(radTempResult, 'wb')
-        for lineCount, line in enumerate(radTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                radCSVfile.write(lineStr)
-            else: radCSVfile.write(line + "\n")
-        radCSVfile.close()
+        writeResultMatrix(radTempResult, radTempMtx, valLen)
     else:
         radTempResult = None
     
     #Write the air temperature result file.
     if writeResultFile_ != 2:
         airTempResult = os.path.join(workingDir, airTempFile)
-        airCSVfile = open(airTempResult, 'wb')
-        for lineCount, line in enumerate(airTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                airCSVfile.write(lineStr)
-            else: airCSVfile.write(line + "\n")
-        airCSVfile.close()
+        writeResultMatrix(airTempResult, airTempMtx, valLen)
     else:
         airTempResult = None
     
     #Write the operative temperature result file.
     if writeResultFile_ != 2:
         operativeTempResult = os.path.join(workingDir, opTempFile)
-        opCSVfile = open(operativeTempResult, 'wb')
-        for lineCount, line in enumerate(operativeTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                opCSVfile.write(lineStr)
-            else: opCSVfile.write(line + "\n")
-        opCSVfile.close()
+        writeResultMatrix(operativeTempResult, operativeTempMtx, valLen)
     else:
         operativeTempResult = None
     
     #Write the adaptive comfort result file.
     adaptComfResult = os.path.join(workingDir, adaptComfFile)
-    comfCSVfile = open(adaptComfResult, 'wb')
-    for lineCount, line in enumerate(adaptComfMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            comfCSVfile.write(lineStr)
-        else: comfCSVfile.write(line + "\n")
-    comfCSVfile.close()
+    writeResultMatrix(adaptComfResult, adaptComfMtx, valLen)
     
     #Write the deg from target result file.
     degFromTargetResult = os.path.join(workingDir, degFromTargetFile)
-    degCSVfile = open(degFromTargetResult, 'wb')
-    for lineCount, line in enumerate(degFromTargetMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            degCSVfile.write(lineStr)
-        else: degCSVfile.write(line + "\n")
-    degCSVfile.close()
+    writeResultMatrix(degFromTargetResult, degFromTargetMtx, valLen)
     
     
     return radTempResult, airTempResult, operativeTempResult, adaptComfResult, degFromTargetResult
@@ -1677,87 +1737,43 @@ def writeCSVPMV(lb_preparation, directory, fileName, radTempMtx, airTempMtx, SET
     
     #Set up a working directory.
     workingDir = lb_preparation.makeWorkingDir(os.path.join(directory)) 
+    extension = resultFileExtension()
     
     #Create a csv Files.
-    radTempFile = fileName + "RadiantTemp.csv"
-    airTempFile = fileName + "AirTemp.csv"
-    SETFile = fileName + "SET.csv"
-    PPDFile = fileName + "PPD.csv"
-    PMVFile = fileName + "PMV.csv"
+    radTempFile = fileName + "RadiantTemp" + extension
+    airTempFile = fileName + "AirTemp" + extension
+    SETFile = fileName + "SET" + extension
+    PPDFile = fileName + "PPD" + extension
+    PMVFile = fileName + "PMV" + extension
     
     #Write the radiant temperature result file.
     if writeResultFile_ != 2:
         radTempResult = os.path.join(workingDir, radTempFile)
-        radCSVfile = open(radTempResult, 'wb')
-        for lineCount, line in enumerate(radTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                radCSVfile.write(lineStr)
-            else: radCSVfile.write(line + "\n")
-        radCSVfile.close()
+        writeResultMatrix(radTempResult, radTempMtx, valLen)
     else:
         radTempResult = None
     
     #Write the air temperature result file.
     if writeResultFile_ != 2:
         airTempResult = os.path.join(workingDir, airTempFile)
-        airCSVfile = open(airTempResult, 'wb')
-        for lineCount, line in enumerate(airTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                airCSVfile.write(lineStr)
-            else: airCSVfile.write(line + "\n")
-        airCSVfile.close()
+        writeResultMatrix(airTempResult, airTempMtx, valLen)
     else:
         airTempResult = None
     
     #Write the operative temperature result file.
     if writeResultFile_ != 2:
         SET_Result = os.path.join(workingDir, SETFile)
-        opCSVfile = open(SET_Result, 'wb')
-        for lineCount, line in enumerate(SET_Mtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                opCSVfile.write(lineStr)
-            else: opCSVfile.write(line + "\n")
-        opCSVfile.close()
+        writeResultMatrix(SET_Result, SET_Mtx, valLen)
     else:
         SET_Result = None
     
     #Write the adaptive comfort result file.
     PPD_Result = os.path.join(workingDir, PPDFile)
-    comfCSVfile = open(PPD_Result, 'wb')
-    for lineCount, line in enumerate(PMVComfMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            comfCSVfile.write(lineStr)
-        else: comfCSVfile.write(line + "\n")
-    comfCSVfile.close()
+    writeResultMatrix(PPD_Result, PMVComfMtx, valLen)
     
     #Write the deg from target result file.
     PMV_Result = os.path.join(workingDir, PMVFile)
-    degCSVfile = open(PMV_Result, 'wb')
-    for lineCount, line in enumerate(PMV_Mtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            degCSVfile.write(lineStr)
-        else: degCSVfile.write(line + "\n")
-    degCSVfile.close()
+    writeResultMatrix(PMV_Result, PMV_Mtx, valLen)
     
     
     return radTempResult, airTempResult, SET_Result, PPD_Result, PMV_Result
@@ -1768,87 +1784,43 @@ def writeCSVUTCI(lb_preparation, directory, fileName, radTempMtx, airTempMtx, UT
     
     #Set up a working directory.
     workingDir = lb_preparation.makeWorkingDir(os.path.join(directory)) 
+    extension = resultFileExtension()
     
     #Create a csv Files.
-    radTempFile = fileName + "RadiantTemp.csv"
-    airTempFile = fileName + "AirTemp.csv"
-    UTCIFile = fileName + "UTCI.csv"
-    OutdoorComfFile = fileName + "OutdoorComf.csv"
-    DegFromNeutralFile = fileName + "DegFromTarget.csv"
+    radTempFile = fileName + "RadiantTemp" + extension
+    airTempFile = fileName + "AirTemp" + extension
+    UTCIFile = fileName + "UTCI" + extension
+    OutdoorComfFile = fileName + "OutdoorComf" + extension
+    DegFromNeutralFile = fileName + "DegFromTarget" + extension
     
     #Write the radiant temperature result file.
     if writeResultFile_ != 2:
         radTempResult = os.path.join(workingDir, radTempFile)
-        radCSVfile = open(radTempResult, 'wb')
-        for lineCount, line in enumerate(radTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                radCSVfile.write(lineStr)
-            else: radCSVfile.write(line + "\n")
-        radCSVfile.close()
+        writeResultMatrix(radTempResult, radTempMtx, valLen)
     else:
         radTempResult = None
     
     #Write the air temperature result file.
     if writeResultFile_ != 2:
         airTempResult = os.path.join(workingDir, airTempFile)
-        airCSVfile = open(airTempResult, 'wb')
-        for lineCount, line in enumerate(airTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                airCSVfile.write(lineStr)
-            else: airCSVfile.write(line + "\n")
-        airCSVfile.close()
+        writeResultMatrix(airTempResult, airTempMtx, valLen)
     else:
         airTempResult = None
     
     #Write the operative temperature result file.
     if writeResultFile_ != 2:
         UTCI_Result = os.path.join(workingDir, UTCIFile)
-        opCSVfile = open(UTCI_Result, 'wb')
-        for lineCount, line in enumerate(UTCI_Mtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                opCSVfile.write(lineStr)
-            else: opCSVfile.write(line + "\n")
-        opCSVfile.close()
+        writeResultMatrix(UTCI_Result, UTCI_Mtx, valLen)
     else:
         UTCI_Result = None
     
     #Write the adaptive comfort result file.
     OutdoorComfResult = os.path.join(workingDir, OutdoorComfFile)
-    comfCSVfile = open(OutdoorComfResult, 'wb')
-    for lineCount, line in enumerate(OutdoorComfMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            comfCSVfile.write(lineStr)
-        else: comfCSVfile.write(line + "\n")
-    comfCSVfile.close()
+    writeResultMatrix(OutdoorComfResult, OutdoorComfMtx, valLen)
     
     #Write the deg from target result file.
     DegFromNeutralResult = os.path.join(workingDir, DegFromNeutralFile)
-    degCSVfile = open(DegFromNeutralResult, 'wb')
-    for lineCount, line in enumerate(DegFromNeutralMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            degCSVfile.write(lineStr)
-        else: degCSVfile.write(line + "\n")
-    degCSVfile.close()
+    writeResultMatrix(DegFromNeutralResult, DegFromNeutralMtx, valLen)
     
     
     return radTempResult, airTempResult, UTCI_Result, OutdoorComfResult, DegFromNeutralResult
@@ -1859,87 +1831,43 @@ def writeCSVPET(lb_preparation, directory, fileName, radTempMtx, airTempMtx, PET
     
     #Set up a working directory.
     workingDir = lb_preparation.makeWorkingDir(os.path.join(directory)) 
+    extension = resultFileExtension()
     
     #Create a csv Files.
-    radTempFile = fileName + "RadiantTemp.csv"
-    airTempFile = fileName + "AirTemp.csv"
-    PETFile = fileName + "PET.csv"
-    PETComfFile = fileName + "PETComf.csv"
-    PETCategoryFile = fileName + "PETCategory.csv"
+    radTempFile = fileName + "RadiantTemp" + extension
+    airTempFile = fileName + "AirTemp" + extension
+    PETFile = fileName + "PET" + extension
+    PETComfFile = fileName + "PETComf" + extension
+    PETCategoryFile = fileName + "PETCategory" + extension
     
     #Write the radiant temperature result file.
     if writeResultFile_ != 2:
         radTempResult = os.path.join(workingDir, radTempFile)
-        radCSVfile = open(radTempResult, 'wb')
-        for lineCount, line in enumerate(radTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                radCSVfile.write(lineStr)
-            else: radCSVfile.write(line + "\n")
-        radCSVfile.close()
+        writeResultMatrix(radTempResult, radTempMtx, valLen)
     else:
         radTempResult = None
     
     #Write the air temperature result file.
     if writeResultFile_ != 2:
         airTempResult = os.path.join(workingDir, airTempFile)
-        airCSVfile = open(airTempResult, 'wb')
-        for lineCount, line in enumerate(airTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                airCSVfile.write(lineStr)
-            else: airCSVfile.write(line + "\n")
-        airCSVfile.close()
+        writeResultMatrix(airTempResult, airTempMtx, valLen)
     else:
         airTempResult = None
     
     #Write the operative temperature result file.
     if writeResultFile_ != 2:
         PET_Result = os.path.join(workingDir, PETFile)
-        opCSVfile = open(PET_Result, 'wb')
-        for lineCount, line in enumerate(PET_Mtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                opCSVfile.write(lineStr)
-            else: opCSVfile.write(line + "\n")
-        opCSVfile.close()
+        writeResultMatrix(PET_Result, PET_Mtx, valLen)
     else:
         PET_Result = None
     
     #Write the adaptive comfort result file.
     PET_ComfResult = os.path.join(workingDir, PETComfFile)
-    comfCSVfile = open(PET_ComfResult, 'wb')
-    for lineCount, line in enumerate(PETComfMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            comfCSVfile.write(lineStr)
-        else: comfCSVfile.write(line + "\n")
-    comfCSVfile.close()
+    writeResultMatrix(PET_ComfResult, PETComfMtx, valLen)
     
     #Write the deg from target result file.
     PET_CategoryResult = os.path.join(workingDir, PETCategoryFile)
-    degCSVfile = open(PET_CategoryResult, 'wb')
-    for lineCount, line in enumerate(PETCategoryMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            degCSVfile.write(lineStr)
-        else: degCSVfile.write(line + "\n")
-    degCSVfile.close()
+    writeResultMatrix(PET_CategoryResult, PETCategoryMtx, valLen)
     
     
     return radTempResult, airTempResult, PET_Result, PET_ComfResult, PET_CategoryResult
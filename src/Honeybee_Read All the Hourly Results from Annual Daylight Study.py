@@ -51,6 +51,7 @@ except: pass
 
 
 import os
+import scriptcontext as sc
 from System import Object
 import Grasshopper.Kernel as gh
 from Grasshopper import DataTree
@@ -170,35 +171,18 @@ def main(illFilesAddress, testPoints, annualProfiles):
     
     # 3 place holderd for the potential 3 outputs
     # no blinds, shading group I and shading group II
+    # each shading state is a binary hour x point matrix which is only read for the needed hours
     illuminanceValues = {0: [],
                          1: [],
                          2: [],
                          }
     
-    # create a sublist for every shading state
+    hb_DSIllMatrix = sc.sticky["honeybee_DSIllMatrix"]
     for shadingGroupCount in illFileSets.keys():
-        for HOY in range(8760):
-            # separate list for every hour
-            illuminanceValues[shadingGroupCount].append([])
-            
-            # each file represnts one state of shading
-            for shadingState in illFileSets[shadingGroupCount]:
-                # add an empty list for each state
-                illuminanceValues[shadingGroupCount][HOY].append([])
-    
-    totalPtCount = 0
-    ptsCountSoFar = 0
-    for shadingGroupCount in range(len(illFileSets.keys())):
         for shadingState, resultFiles in enumerate(illFileSets[shadingGroupCount]):
-            for resultFile in resultFiles:
-                result = open(resultFile, 'r')
-                for HOY, line in enumerate(result):
-                   line = line.replace('\n', '', 10)
-                   lineSeg = line.Split(' ')
-                   for hourLuxValue in lineSeg[4:]:
-                      illuminanceValues[shadingGroupCount][HOY][shadingState].append(float(hourLuxValue))
-                result.close()
-
+            illuminanceValues[shadingGroupCount].append(
+                hb_DSIllMatrix.fromIllFiles(resultFiles, shadingGroupCount, shadingState))
+    
     return msg, illuminanceValues, shadingProfiles
 
 
@@ -226,15 +210,17 @@ if _illFilesAddress.DataCount!=0 and _illFilesAddress.Branch(0)[0]!=None and _te
 
         # for each space
         for spaceCount in range(len(numOfPtsInEachSpace)):
+            stPt = sum(numOfPtsInEachSpace[:spaceCount])
+            endPt = sum(numOfPtsInEachSpace[:spaceCount+1])
             for HOY in range(8760):
                 p = GH_Path(spaceCount, HOY)
                 stateInEffect = 0
                 blindsGroupInEffect = 0
                 shadingGroupInEffectForTheHour = "No blind"
-                iIllumLevelsNoDynamicSHD.AddRange(illuminanceValues[0][HOY][0][sum(numOfPtsInEachSpace[:spaceCount]):sum(numOfPtsInEachSpace[:spaceCount+1])], p)
+                iIllumLevelsNoDynamicSHD.AddRange(list(illuminanceValues[0][0].getHour(HOY, stPt, endPt)), p)
                 
-                if illuminanceValues[1]!=[] and len(illuminanceValues[1][HOY])!=0 and shadingProfiles[spaceCount]!=[]:
-                    numberOfStates = len(illuminanceValues[1][HOY])
+                if illuminanceValues[1]!=[] and shadingProfiles[spaceCount]!=[]:
+                    numberOfStates = len(illuminanceValues[1])
                     if shadingProfiles[spaceCount][0][HOY] > 0:
                         stateInEffect = int(round(numberOfStates * shadingProfiles[spaceCount][0][HOY]))
                         blindsGroupInEffect = 1
@@ -243,12 +229,12 @@ if _illFilesAddress.DataCount!=0 and _illFilesAddress.Branch(0)[0]!=None and _te
                     if numberOfStates>1:
                         for state in range(numberOfStates):
                             pp = GH_Path(spaceCount, HOY, state)
-                            iIllumLevelsDynamicSHDGroupI.AddRange(illuminanceValues[1][HOY][stateInEffect-1][sum(numOfPtsInEachSpace[:spaceCount]):sum(numOfPtsInEachSpace[:spaceCount+1])], pp)
+                            iIllumLevelsDynamicSHDGroupI.AddRange(list(illuminanceValues[1][stateInEffect-1].getHour(HOY, stPt, endPt)), pp)
                     else:
-                        iIllumLevelsDynamicSHDGroupI.AddRange(illuminanceValues[1][HOY][stateInEffect-1][sum(numOfPtsInEachSpace[:spaceCount]):sum(numOfPtsInEachSpace[:spaceCount+1])], p)
+                        iIllumLevelsDynamicSHDGroupI.AddRange(list(illuminanceValues[1][stateInEffect-1].getHour(HOY, stPt, endPt)), p)
                
-                if illuminanceValues[2]!=[] and len(illuminanceValues[2][HOY])!=0 and shadingProfiles[spaceCount]!=[]:
-                    numberOfStates = len(illuminanceValues[2][HOY])
+                if illuminanceValues[2]!=[] and shadingProfiles[spaceCount]!=[]:
+                    numberOfStates = len(illuminanceValues[2])
                     
                     if shadingProfiles[spaceCount][1][HOY] > 0:
                         stateInEffect = int(round(numberOfStates * shadingProfiles[spaceCount][1][HOY]))
@@ -258,11 +244,15 @@ if _illFilesAddress.DataCount!=0 and _illFilesAddress.Branch(0)[0]!=None and _te
                     if numberOfStates>1:
                         for state in range(numberOfStates):
                             pp = GH_Path(spaceCount, HOY, state)
-                            iIllumLevelsDynamicSHDGroupII.AddRange(illuminanceValues[2][HOY][stateInEffect-1][sum(numOfPtsInEachSpace[:spaceCount]):sum(numOfPtsInEachSpace[:spaceCount+1])], pp)
+                            iIllumLevelsDynamicSHDGroupII.AddRange(list(illuminanceValues[2][stateInEffect-1].getHour(HOY, stPt, endPt)), pp)
                     else:
-                        iIllumLevelsDynamicSHDGroupII.AddRange(illuminanceValues[2][HOY][stateInEffect-1][sum(numOfPtsInEachSpace[:spaceCount]):sum(numOfPtsInEachSpace[:spaceCount+1])], p)
+                        iIllumLevelsDynamicSHDGroupII.AddRange(list(illuminanceValues[2][stateInEffect-1].getHour(HOY, stPt, endPt)), p)
                 
                 if stateInEffect!=0: stateInEffect-=1
-                iIlluminanceBasedOnOccupancy.AddRange(illuminanceValues[blindsGroupInEffect][HOY][stateInEffect][sum(numOfPtsInEachSpace[:spaceCount]):sum(numOfPtsInEachSpace[:spaceCount+1])], p)
+                iIlluminanceBasedOnOccupancy.AddRange(list(illuminanceValues[blindsGroupInEffect][stateInEffect].getHour(HOY, stPt, endPt)), p)
                 
-                shadingGroupInEffect.Add(shadingGroupInEffectForTheHour, p)
\ No newline at end of file
+                shadingGroupInEffect.Add(shadingGroupInEffectForTheHour, p)
+        
+        # release the matrix files
+        for illMatrices in illuminanceValues.values():
+            for illMatrix in illMatrices: illMatrix.close()
\ No newline at end of file
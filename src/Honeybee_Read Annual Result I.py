@@ -43,6 +43,12 @@ Provided by Honeybee 0.0.63
         CDA: Continuous Daylight Autonomy > Similar to Daylight Autonomy except that the point receives illuminaceLevel/illuminace threshold for hours that illuminance level is less than the threshold.
         sDA: Spatial Daylight Autonomy > sDA is the percent of analysis points across the analysis area that meet or exceed _DLAIllumThresholds value (set to 300 lux for LEED) for at least 50% of the analysis period. Honeybee doesn't consider the effect of dynamic blinds in calculating sDA.
         annualProfiles: A .csv file generated by Daysim that can be used as lighting schedule for annual energy simulation
+    
+    The daylight metrics are calculated in Grasshopper from the .ill files. Daysim's ds_el_lighting only runs
+    when annualProfiles (or htmReport) is connected to another component or when the study has advanced
+    dynamic shadings. Conceptual dynamic blinds are lowered in Grasshopper the same way as the active user of
+    Daysim: once more than 50 W/m2 of direct sunlight hits one of the SHDGroupI_Sensors_ the blinds stay down
+    until the occupants arrive the next day.
 """
 ghenv.Component.Name = "Honeybee_Read Annual Result I"
 ghenv.Component.NickName = 'readAnnualResultsI'
@@ -84,59 +90,6 @@ def getFilelength(fileName):
             pass
     return i + 1
 
-def executeBatchFiles(batchFileNames, maxPRuns = None, shell = False, waitingTime = 0.2):
-
-    """Run a number of batch files in parallel and
-        wait to end of the analysis.
-
-        Args:
-            batchFileNames: List of batch files
-            maxPRuns: max number of files to be ran in parallel (default = 0)
-            shell: set to True if you do NOT want to see the cmd window while the analysis is runnig
-    """
-
-    if not maxPRuns : maxPRuns = 1
-    maxPRuns = int(maxPRuns)
-    total = len(batchFileNames)
-    
-    if maxPRuns < 1: maxPRuns = 1
-    if maxPRuns > total: maxPRuns = total
-    
-    running = 0
-    done = False
-    jobs = []
-    pid = 0
-    
-    try:
-        while not done:
-            if running < maxPRuns and pid < total:
-                # execute the files
-                jobs.append(subprocess.Popen(batchFileNames[pid].replace("\\", "/") , shell = shell))
-                pid+=1
-                time.sleep(waitingTime)
-            
-            # count how many jobs are running and how many are done
-            running = 0
-            finished = 0
-            for job in jobs:
-                if job.poll() is None:
-                    #one job is still running
-                    running += 1
-                else:
-                    finished += 1
-    
-            if running == maxPRuns:
-                # wait for half a second
-                #print "waiting..."
-                time.sleep(waitingTime)
-    
-            if finished ==  total:
-                done = True
-    
-    except Exception, e:
-        print "Something went wrong: %s"%str(e) 
-
-
 def convertIllFileDaraTreeIntoSortedDictionary(illFilesAddress):
     
     # I should move this function into Honeybee_Honeybee #BadPractice!
@@ -190,11 +143,7 @@ def convertEPScheduleToDSSchedule(scheduleName, folder):
           "daylight savings time is based on user input),,\n" + \
           "# month,day,time,occupancy (1=present/0=absent)\n"
 
-    readSchedules = sc.sticky["honeybee_ReadSchedules"](scheduleName, 0)
-    dailyValues  = readSchedules.getScheduleValues()
-        
-    hourlyValues = []
-    for values in dailyValues: hourlyValues.extend(values)
+    hourlyValues = sc.sticky["honeybee_ScheduleCompiler"]().getAnnualValues(scheduleName, 0)
     
     # create a temp folder inside folder will .ill files
     if not os.path.isdir(folder): os.mkdir(folder)
@@ -222,6 +171,72 @@ def convertEPScheduleToDSSchedule(scheduleName, folder):
     
     return fullPath
 
+def isOutputConnected(nickNames):
+    for param in ghenv.Component.Params.Output:
+        if param.NickName in nickNames and param.Recipients.Count > 0: return True
+    return False
+
+def isConceptualBlinds(illFilesSorted):
+    """Check if the only dynamic shading group of the study is conceptual blinds."""
+    if sorted(illFilesSorted.keys()) != [0, 1] or len(illFilesSorted[1]) != 1: return False
+    return all(illFile.endswith("_down.ill") for illFile in illFilesSorted[1][0])
+
+def calculateSpaceMetrics(illFilesSorted, numOfPtsInEachSpace, occFiles, DLAIllumThresholds, EPLSchLists = [], blindSensors = None):
+    """
+    Calculate daylight metrics for each space from the ill matrices.
+    
+    Dynamic shadings follow the annual profiles that Daysim writes for each space (EPLSchLists)
+    or the conceptual blinds are calculated here for the sensors of each space (blindSensors).
+    """
+    hb_DSIllMatrix = sc.sticky["honeybee_DSIllMatrix"]
+    hb_DSAnnualMetrics = sc.sticky["honeybee_DSAnnualMetrics"]
+    illMatrices = {}
+    spaceMetrics = []
+    try:
+        for shdGroupCounter, illFileList in illFilesSorted.items():
+            illMatrices[shdGroupCounter] = [hb_DSIllMatrix.fromIllFiles(shadingStateFiles, shdGroupCounter, shadingStateCount) \
+                                            for shadingStateCount, shadingStateFiles in enumerate(illFileList)]
+        
+        # make sure the number of points inside the ill file matches the number of points
+        # inside the point list
+        numOfPtsInMatrix = illMatrices[0][0].numOfPts
+        if numOfPtsInMatrix != sum(numOfPtsInEachSpace):
+            msg = "Number of points in ill files: " + `numOfPtsInMatrix` + \
+                  " doesn't match the number of points in point files: " + `sum(numOfPtsInEachSpace)`
+            return msg, None
+        
+        for spaceCount in range(len(numOfPtsInEachSpace)):
+            try: occFile = occFiles[spaceCount]
+            except: occFile = occFiles[0]
+            
+            try: illumT = DLAIllumThresholds[spaceCount]
+            except: illumT = DLAIllumThresholds[0]
+            
+            occupancy = hb_DSAnnualMetrics.readOccupancyFile(occFile)
+            if len(occupancy) != illMatrices[0][0].numOfHours:
+                msg = "Length of occupancy (%d) doesn't match the number of hours in ill files (%d)." \
+                      %(len(occupancy), illMatrices[0][0].numOfHours) + "\nCheck the occupancy file: " + occFile
+                return msg, None
+            
+            shadingProfiles = None
+            if len(illMatrices.keys()) > 1:
+                if blindSensors is not None:
+                    shadingProfiles = [hb_DSAnnualMetrics.getConceptualBlindsProfile(illMatrices[0][0], \
+                                       illMatrices[1][0], blindSensors[spaceCount], occupancy)]
+                elif spaceCount < len(EPLSchLists):
+                    # blinds are in effect based on the annual profile that Daysim generates for each space
+                    shadingProfiles = hb_DSAnnualMetrics.readShadingProfiles(EPLSchLists[spaceCount])
+            
+            metrics = hb_DSAnnualMetrics(illMatrices, occupancy, shadingProfiles)
+            stPt = sum(numOfPtsInEachSpace[:spaceCount])
+            endPt = sum(numOfPtsInEachSpace[:spaceCount+1])
+            spaceMetrics.append(metrics.calculate(stPt, endPt, illumT))
+    finally:
+        for illMatrixList in illMatrices.values():
+            for illMatrix in illMatrixList: illMatrix.close()
+    
+    return None, spaceMetrics
+
 def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SHDGroupI_Sensors, SHDGroupII_Sensors, DLAIllumThresholds, runInBackground=False):
     
     if sc.sticky.has_key('honeybee_release'):
@@ -384,29 +399,36 @@ def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SH
     # create a place holder for each shading group
     # sort the ill files based on their names
     originalIllFilesSorted = convertIllFileDaraTreeIntoSortedDictionary(illFilesAddress)
-
-    # number of points should be the same in all the illfile lists
-    # that's why I just try the first list of the ill files
-    numOfPtsInEachFile = []
-    for illFile in originalIllFilesSorted[0][0]:
-        with open(illFile, "r") as illInf:
-            for lineCount, line in enumerate(illInf):
-                if not line.startswith("#"):
-                    numOfPtsInEachFile.append(len(line.strip().split(" ")) - 4)
-                    break
     
+    # Daysim is only needed for the electric lighting results and for advanced dynamic shadings.
+    # Otherwise the metrics and the conceptual blinds are calculated from the ill matrices and
+    # no files are written for each space.
+    runDaysim = isOutputConnected(("annualProfiles", "htmReport"))
+    blindSensors = None
+    if not runDaysim and len(originalIllFilesSorted.keys()) > 1:
+        runDaysim = not isConceptualBlinds(originalIllFilesSorted)
+        if not runDaysim:
+            blindSensors = []
+            for spaceCount in range(numOfSpaces):
+                stPt = sum(numOfPtsInEachSpace[:spaceCount])
+                shdGroupSensor = SHDGroupISensors[spaceCount]
+                if shdGroupSensor != None:
+                    blindSensors.append([stPt + ptCount for ptCount, pt in enumerate(testPoints[spaceCount]) \
+                        if isSensor(pt, shdGroupSensor.intSensors) or isSensor(pt, shdGroupSensor.extSensors)])
+                # Daysim decides how the blinds work for the spaces without blind sensors
+                if shdGroupSensor == None or not blindSensors[-1]: runDaysim = True
+    
+    if not runDaysim:
+        msg, spaceMetrics = calculateSpaceMetrics(originalIllFilesSorted, numOfPtsInEachSpace, occFiles, \
+                                                  DLAIllumThresholds, blindSensors = blindSensors)
+        if msg != None: return msg, None
+        return None, [spaceMetrics, [], []]
+
     # find the current project directory that could be differnt from the old one
     projectDirectory = os.path.dirname(originalIllFilesSorted[0][0][0]) + "\\"
     # print numOfPtsInEachFile
     #print numOfPtsInEachSpace
     
-    # make sure the number of points inside the ill file matches the number of points
-    # inside the point list
-    if sum(numOfPtsInEachFile) != numOfPts:
-        msg = "Number of points in ill files: " + `sum(numOfPtsInEachFile)` + \
-              " doesn't match the number of points in point files: " + `numOfPts`
-        return msg, None
-   
     # find the heading files and creat multiple ill files for the study
     heaFiles = []
     filePath =  os.path.dirname(originalIllFilesSorted[0][0][0])
@@ -535,50 +557,54 @@ def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SH
                 #   break
     
 
+    # convert the ill files of each shading state to a binary matrix
+    # the points of the files for different CPUs are joined in the matrix
+    hb_DSIllMatrix = sc.sticky["honeybee_DSIllMatrix"]
+    illMatrices = {}
+    
     # open all the available ill files and put them in the dictionary
     illFilesDict = {}
     newIllFilesDict = {}
     if firstRun:
-        
-        for shdGroupCounter, illFileList in originalIllFilesSorted.items():
+        try:
+            for shdGroupCounter, illFileList in originalIllFilesSorted.items():
+                illMatrices[shdGroupCounter] = [hb_DSIllMatrix.fromIllFiles(shadingStateFiles, shdGroupCounter, shadingStateCount) \
+                                                for shadingStateCount, shadingStateFiles in enumerate(illFileList)]
             
-            for shadingStateCount, shadingStateFiles in enumerate(illFileList):
-                # create a place holder for new .ill files for each shading group
-                newIllFileNamesDict[shdGroupCounter] = []
-                
-                # open all the files for this shading state into memory
-                for counter, illFile in enumerate(illFileList[shadingStateCount]):
-                    illfile = open(illFile, "r")
-                    illFilesDict[counter] = illfile #put each ill file from each cpu separate/ I don't know why I have done this
+            numOfPtsInMatrix = illMatrices[0][0].numOfPts
+            
+            # make sure the number of points inside the ill file matches the number of points
+            # inside the point list
+            if numOfPtsInMatrix != numOfPts:
+                msg = "Number of points in ill files: " + `numOfPtsInMatrix` + \
+                      " doesn't match the number of points in point files: " + `numOfPts`
+                return msg, None
+            
+            for shdGroupCounter, illFileList in originalIllFilesSorted.items():
+            
+                for shadingStateCount, shadingStateFiles in enumerate(illFileList):
+                    # create a place holder for new .ill files for each shading group
+                    newIllFileNamesDict[shdGroupCounter] = []
+                    illMatrix = illMatrices[shdGroupCounter][shadingStateCount]
+                    dates = illMatrix.getDates()
                 
-                # open new ill files for each space and put them in the same directory
-                for spaceCount in range(numOfSpaces):
-                    newIllFileName  = illFileList[shadingStateCount][0].split(".ill")[0] + "_space_" + str(spaceCount) + ".ill"
-                    newIllFileNamesDict[shdGroupCounter].append(newIllFileName) #collect new ill file names to calculate sDA
+                    # write a new ill file for each space and put them in the same directory
+                    for spaceCount in range(numOfSpaces):
+                        newIllFileName  = illFileList[shadingStateCount][0].split(".ill")[0] + "_space_" + str(spaceCount) + ".ill"
+                        newIllFileNamesDict[shdGroupCounter].append(newIllFileName) #collect new ill file names to calculate sDA
                     
-                    newIllFile = open(newIllFileName, "w")
-                    newIllFilesDict[spaceCount] = newIllFile
-                
-                # all the files will have the same length of 8760 lines for the hours of the year
-                for line in range(8760):
-                    # merge the line from all the source file
-                    mergedLine = []
-                    for illFileKey in illFilesDict.keys():
-                        line = illFilesDict[illFileKey].readline()
-                        
-                        if illFileKey==0:
-                            dateInfo = line.strip().split(" ")[:4]
-                        mergedLine.extend(line.strip().split(" ")[4:])
-                
-                
-                    # write the values to the target files
-                    for illFileKey in newIllFilesDict.keys():
-                        line = " ".join(dateInfo + mergedLine[sum(numOfPtsInEachSpace[:illFileKey]):sum(numOfPtsInEachSpace[:illFileKey+1])])
-                        newIllFilesDict[illFileKey].write(line + "\n")
-                
-                # close all the opened files
-                for illFileKey in illFilesDict.keys(): illFilesDict[illFileKey].close()
-                for illFileKey in newIllFilesDict.keys(): newIllFilesDict[illFileKey].close()
+                        stPt = sum(numOfPtsInEachSpace[:spaceCount])
+                        endPt = sum(numOfPtsInEachSpace[:spaceCount+1])
+                        with open(newIllFileName, "w") as newIllFile:
+                            # only the block of sensors for this space is read from the matrix
+                            for HOY, hourValues in enumerate(illMatrix.iterHours(stPt, endPt)):
+                                month, day, hour = dates[HOY]
+                                dateInfo = [str(month), str(day), "%.3f"%hour, ""]
+                                line = " ".join(dateInfo + ["%.7g"%value for value in hourValues])
+                                newIllFile.write(line + "\n")
+        finally:
+            for illMatrixList in illMatrices.values():
+                for illMatrix in illMatrixList: illMatrix.close()
         
         
         # print numOfPtsInEachSpace
@@ -806,7 +832,12 @@ def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SH
         batchFileName = os.path.join(filePath, fileName)
         fileNames.append(batchFileName)
 
-    executeBatchFiles(fileNames, ncpus - 1, shell=runInBackground)
+    jobs = sc.sticky["honeybee_JobScheduler"](ncpus - 1, shell=runInBackground).run(fileNames)
+    for job in jobs:
+        if not job.succeeded:
+            warning = "%s failed with exit code %s.\n%s"%(job.name, str(job.returnCode), job.stderr.strip())
+            w = gh.GH_RuntimeMessageLevel.Warning
+            ghenv.Component.AddRuntimeMessage(w, warning)
     
     # calculate sDA    
     
@@ -854,42 +885,28 @@ def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SH
     #        sDADict[spaceCount] = "%.2f"%((sDADict[spaceCount]/totalOccupancyHours) * 100)
           
     
-    # read all the results
-    DLALists = []
-    underUDLILists = []
-    inRangeUDLILists = []
-    overUDLILists = []
-    CDALists = []
+    # read the electric lighting results
     EPLSchLists = []
     htmLists = []
     
     resultFiles = os.listdir(projectDirectory)
     for fileName in resultFiles:
-        if fileName.endswith(".DA"): DLALists.append(os.path.join(filePath,fileName))
-        elif fileName.endswith(".CDA"): CDALists.append(os.path.join(filePath,fileName))
-        elif fileName.endswith(".htm"): htmLists.append(os.path.join(filePath,fileName))
+        if fileName.endswith(".htm"): htmLists.append(os.path.join(filePath,fileName))
         elif fileName.endswith("_intgain.csv"): EPLSchLists.append(os.path.join(filePath,fileName))
-        elif fileName.endswith("less_than_100.UDI"): underUDLILists.append(os.path.join(filePath,fileName))
-        elif fileName.endswith("100_2000.UDI"): inRangeUDLILists.append(os.path.join(filePath,fileName))
-        elif fileName.endswith("more_than_2000.UDI"): overUDLILists.append(os.path.join(filePath,fileName))
         
     # sort the lists
-    try: CDALists = sorted(CDALists, key=lambda fileName: int(fileName.split(".")[-2].split("_")[-1]))
-    except: pass
-    try: DLALists = sorted(DLALists, key=lambda fileName: int(fileName.split(".")[-2].split("_")[-2]))
-    except: pass
     try: htmLists = sorted(htmLists, key=lambda fileName: int(fileName.split(".")[-2].split("_")[-2]))
     except: pass
     try: EPLSchLists = sorted(EPLSchLists, key=lambda fileName: int(fileName.split(".")[-2].split("_")[-2]))
     except: pass    
-    try: underUDLILists = sorted(underUDLILists, key=lambda fileName: int(fileName.split(".")[-2].split("_")[-4]))
-    except: pass
-    try: inRangeUDLILists = sorted(inRangeUDLILists, key=lambda fileName: int(fileName.split(".")[-2].split("_")[-3]))
-    except: pass
-    try: overUDLILists = sorted(overUDLILists, key=lambda fileName: int(fileName.split(".")[-2].split("_")[-4]))
-    except: pass
     
-    return None, [DLALists, underUDLILists, inRangeUDLILists, overUDLILists, CDALists, EPLSchLists, htmLists]
+    # calculate daylight metrics for each space from the ill matrices
+    # instead of reading the DA, CDA and UDI files that ds_el_lighting writes
+    msg, spaceMetrics = calculateSpaceMetrics(originalIllFilesSorted, numOfPtsInEachSpace, occFiles, \
+                                              DLAIllumThresholds, EPLSchLists)
+    if msg != None: return msg, None
+    
+    return None, [spaceMetrics, EPLSchLists, htmLists]
 
 def isAllNone(dataList):
     for item in dataList.AllData():
@@ -917,7 +934,7 @@ if _runIt and not isAllNone(_illFilesAddress) and not isAllNone(_testPoints):
             ghenv.Component.AddRuntimeMessage(w, msg)
             
         else:
-            DLALists, underUDLILists, inRangeUDLILists, overUDLILists, CDALists, EPLSchLists, htmLists = results
+            spaceMetrics, EPLSchLists, htmLists = results
             DLA = DataTree[Object]()
             UDLI_Less_100 = DataTree[Object]()    
             UDLI_100_2000 = DataTree[Object]()
@@ -927,31 +944,17 @@ if _runIt and not isAllNone(_illFilesAddress) and not isAllNone(_testPoints):
             sDA = DataTree[Object]()
             htmReport = DataTree[Object]()
             
-            def readDSStandardResults(filePath):
-                results = []
-                with open(filePath, "r") as inf:
-                    for line in inf:
-                        if not line.startswith("#"):
-                            results.append(float(line.split("\t")[-1]))
-                return results
-            
-            def getsDA(DLARes, threshold = 50):
-                moreThan = 0
-                for res in DLARes:
-                    if res >= threshold:
-                        moreThan += 1
-                return "%.2f"%((moreThan/len(DLARes)) * 100)
-            
+            hb_DSAnnualMetrics = sc.sticky["honeybee_DSAnnualMetrics"]
             
             for branchNum in range(_testPoints.BranchCount):
                 p = GH_Path(branchNum)
-                DLARes = readDSStandardResults(DLALists[branchNum])
-                DLA.AddRange(DLARes, p)
-                UDLI_Less_100.AddRange(readDSStandardResults(underUDLILists[branchNum]), p)
-                UDLI_100_2000.AddRange(readDSStandardResults(inRangeUDLILists[branchNum]), p)
-                UDLI_More_2000.AddRange(readDSStandardResults(overUDLILists[branchNum]), p)
-                CDA.AddRange(readDSStandardResults(CDALists[branchNum]), p)
-                annualProfiles.Add(EPLSchLists[branchNum], p)
-                sDA.Add(getsDA(DLARes), p)
-                htmReport.Add(htmLists[branchNum], p)
+                metrics = spaceMetrics[branchNum]
+                DLA.AddRange(metrics["DA"], p)
+                UDLI_Less_100.AddRange(metrics["UDILess"], p)
+                UDLI_100_2000.AddRange(metrics["UDIIn"], p)
+                UDLI_More_2000.AddRange(metrics["UDIMore"], p)
+                CDA.AddRange(metrics["cDA"], p)
+                if branchNum < len(EPLSchLists): annualProfiles.Add(EPLSchLists[branchNum], p)
+                sDA.Add("%.2f"%hb_DSAnnualMetrics.spatialDaylightAutonomy(metrics["DA"]), p)
+                if branchNum < len(htmLists): htmReport.Add(htmLists[branchNum], p)
                     
\ No newline at end of file
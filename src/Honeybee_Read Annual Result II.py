@@ -53,6 +53,7 @@ except: pass
 
 
 
+import scriptcontext as sc
 from System import Object
 from clr import AddReference
 AddReference('Grasshopper')
@@ -66,7 +67,11 @@ def isAllNone(dataList):
         if item!=None: return False
     return True
 
-if _runIt and (testPts.DataCount!=0 or not isAllNone(testPts.AllData())) \
+if not sc.sticky.has_key("honeybee_release"):
+    msg = "You should first let Honeybee fly..."
+    print msg
+    ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+elif _runIt and (testPts.DataCount!=0 or not isAllNone(testPts.AllData())) \
    and resultFilesAddress and resultFilesAddress[0]!=None:
     
     numOfPts = 0
@@ -108,22 +113,19 @@ if _runIt and (testPts.DataCount!=0 or not isAllNone(testPts.AllData())) \
     # number of study hours during a year
     studyHours = ((lunchStHour - stHour) + (endHour - lunchEndHour)) * 365
     
-    totalPtCount = 0
     ptsCountSoFar = 0
     for resultFile in resultFilesAddress:
-        result = open(resultFile, 'r')
-        for hour, line in enumerate(result):
-            line = line.replace('\n', '', 10)
-            lineSeg = line.Split(' ')
-            #if len(lineSeg)!= len(testPts) + 4: print 'ERROR!'
-            for ptCount, hourLuxValue in enumerate(lineSeg[4:]):
-                if hour == 0: totalPtCount += 1
-                if  stHour <= (hour + 1)%24 < lunchStHour or lunchEndHour <= (hour + 1)%24 < endHour:
-                    if float(hourLuxValue) <= minThreshold: underValues[ptsCountSoFar + ptCount] += 1
-                    elif minThreshold <= float(hourLuxValue) <= maxThreshold: values[ptsCountSoFar + ptCount] += 1
-                    elif maxThreshold <= float(hourLuxValue): overValues[ptsCountSoFar + ptCount] += 1
-        result.close()
-        ptsCountSoFar = ptsCountSoFar + (len(lineSeg) - 4)
+        # only read the study hours from the binary matrix of the .ill file
+        illMatrix = sc.sticky["honeybee_DSIllMatrix"].fromIllFiles([resultFile])
+        studyHOYs = [hour for hour in range(illMatrix.numOfHours) \
+                     if stHour <= (hour + 1)%24 < lunchStHour or lunchEndHour <= (hour + 1)%24 < endHour]
+        for hourValues in illMatrix.iterHours(hours = studyHOYs):
+            for ptCount, hourLuxValue in enumerate(hourValues):
+                if hourLuxValue <= minThreshold: underValues[ptsCountSoFar + ptCount] += 1
+                elif minThreshold <= hourLuxValue <= maxThreshold: values[ptsCountSoFar + ptCount] += 1
+                elif maxThreshold <= hourLuxValue: overValues[ptsCountSoFar + ptCount] += 1
+        ptsCountSoFar = ptsCountSoFar + illMatrix.numOfPts
+        illMatrix.close()
         
     
     
@@ -182,35 +182,17 @@ def main(illFilesAddress, testPoints, targetPoint, annualProfiles):
             targetPtIndex+=1
         if pointFound ==True: break
     
-    # check number of points in each of the ill files
-    # number of points should be the same in all the illfile lists
-    # that's why I just try the first list of the ill files
-    numOfPtsInEachFile = []
-    for illFile in illFileSets[0][0]:
-        with open(illFile, "r") as illInf:
-            for lineCount, line in enumerate(illInf):
-                if not line.startswith("#"):
-                    numOfPtsInEachFile.append(len(line.strip().split(" ")) - 4)
-                    break
-    
-    # find the right ill file(s) to look into and read the results
-    # print targetPtIndex
-    targetListNumber = None
-    targetIndexNumber = None
-    for listCount, numOfPts in enumerate(numOfPtsInEachFile):
-        if sum(numOfPtsInEachFile[:listCount]) >= targetPtIndex + 1:
-            targetListNumber = listCount - 1
-            targetIndexNumber = targetPtIndex - sum(numOfPtsInEachFile[:listCount-1])
-            #print "list number is: ", listCount - 1
-            #print "index number is:", targetPtIndex - sum(numOfPtsInEachFile[:listCount-1])
-            break
-    
-    # Probably this is not the best way but I really want to get it done tonight!
-    if targetListNumber == None:
-        targetListNumber = len(numOfPtsInEachFile)-1
-        targetIndexNumber = targetPtIndex - sum(numOfPtsInEachFile[:targetListNumber])
+    # convert the ill files of each shading state to a binary matrix
+    # and only read the column of the target point
+    hb_DSIllMatrix = sc.sticky["honeybee_DSIllMatrix"]
+    illMatrices = {}
+    for shadingGroupCount in illFileSets.keys():
+        illMatrices[shadingGroupCount] = [hb_DSIllMatrix.fromIllFiles(illFiles, shadingGroupCount, stateCount) \
+                                          for stateCount, illFiles in enumerate(illFileSets[shadingGroupCount])]
     
-    if targetIndexNumber < 0:
+    if not pointFound or targetPtIndex >= illMatrices[0][0].numOfPts:
+        for illMatrixList in illMatrices.values():
+            for illMatrix in illMatrixList: illMatrix.close()
         msg = "The target point is not inside the point list"
         return msg, None, None
     
@@ -230,24 +212,11 @@ def main(illFilesAddress, testPoints, targetPoint, annualProfiles):
                          2: [],
                          }
                          
-    # create a sublist for every shading state
-    for shadingGroupCount in range(len(illFileSets.keys())):
-        # each file represnts one state of shading
-        for resultFile in illFileSets[shadingGroupCount]:
-            # add an empty list for each state
-            illuminanceValues[shadingGroupCount].append([])
-    
+    for shadingGroupCount in illMatrices.keys():
+        for illMatrix in illMatrices[shadingGroupCount]:
+            illuminanceValues[shadingGroupCount].append(illMatrix.getPoint(targetPtIndex))
+            illMatrix.close()
     
-    for shadingGroupCount in illFileSets.keys():
-        for stateCount, targetIllFiles in enumerate(illFileSets[shadingGroupCount]):
-            targetIllFile = targetIllFiles[targetListNumber]
-            result = open(targetIllFile, 'r')
-            for lineCount, line in enumerate(result):
-                hourLuxValue = line.strip().split(" ")[targetIndexNumber + 4]
-                illuminanceValues[shadingGroupCount][stateCount].append(float(hourLuxValue))
-            result.close()
-            
-                
     return msg, illuminanceValues, shadingProfiles[branch]
 
 
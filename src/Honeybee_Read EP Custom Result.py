@@ -21,7 +21,7 @@
 
 
 """
-This component reads the results of an EnergyPlus simulation from the "Export to OpenStudio" Component or any EnergyPlus result .csv file address.
+This component reads the results of an EnergyPlus simulation from the "Export to OpenStudio" Component or any EnergyPlus result .csv, .sql or .eso file address.
 _
 The component is built to bring in any result that you desire from the csv using _keywords to search through all of the results in the file.  As such, this is particularly useful when you have requested atypical E+ outputs using the "Honeybee_Read Result Dictionary" component.
 
@@ -29,7 +29,7 @@ The component is built to bring in any result that you desire from the csv using
 Provided by Honeybee 0.0.63
     
     Args:
-        _resultFileAddress: The result file address that comes out of the "Export to OpenStudio" component.
+        _resultFileAddress: The result file address that comes out of the "Export to OpenStudio" component.  This can also be the address of an EnergyPlus .sql or .eso file to read the results directly without converting them to csv.
         _keywords: keywords that will be used to bring in the results that you are interested in.  These words should be the name of the output that you are requesting or should correspond to words in the top row of the csv file.
     Returns:
         results: The result data from the csv file (formatted with a Ladybug header on it).
@@ -153,44 +153,44 @@ if hbCheck and _resultFileAddress and _keywords and _resultFileAddress != None:
             keywords.append(word)
     
     try:
-        result = open(_resultFileAddress, 'r')
+        epResults = sc.sticky["honeybee_EPResultCache"].open(_resultFileAddress)
         
-        for lineCount, line in enumerate(result):
-            if lineCount == 0:
-                # PARSE THE FILE HEADING
-                colHeaders = []
-                for column in line.split(','):
-                    colHeaders.append(column)
-                # SEARCH THROUGH THE FILE HEADING
-                simOutputs = hb_EPMaterialAUX.searchListByKeyword(colHeaders, keywords)
-                simOutLower = []
-                for outp in simOutputs:
-                    simOutLower.append(outp.lower())
-                key = []
-                path = []
-                for outp in colHeaders:
-                    if outp.lower() in simOutLower:
-                        outpName = outp.split(' [')[0]
-                        timestep = outp.split('(')[-1].split(')')[0]
-                        units = outp.split('[')[-1].split(']')[0]
-                        makeHeader(results, resultCount, timestep, outpName, units)
-                        key.append(0)
-                        path.append(resultCount)
-                        resultCount += 1
-                    else:
-                        key.append(-1)
-                        path.append(-1)
+        # PARSE THE FILE HEADING
+        colHeaders = []
+        for column in epResults.headers:
+            colHeaders.append(column)
+        # SEARCH THROUGH THE FILE HEADING
+        simOutputs = hb_EPMaterialAUX.searchListByKeyword(colHeaders, keywords)
+        simOutLower = []
+        for outp in simOutputs:
+            simOutLower.append(outp.lower())
+        key = []
+        path = []
+        for outp in colHeaders:
+            if outp.lower() in simOutLower:
+                outpName = outp.split(' [')[0]
+                timestep = outp.split('(')[-1].split(')')[0]
+                units = outp.split('[')[-1].split(']')[0]
+                makeHeader(results, resultCount, timestep, outpName, units)
+                key.append(0)
+                path.append(resultCount)
+                resultCount += 1
             else:
-                for columnCount, column in enumerate(line.split(',')):
-                    p = GH_Path(int(path[columnCount]))
-                    
-                    if key[columnCount] != -1:
-                        results.Add(float(column), p)
-        result.close()
+                key.append(-1)
+                path.append(-1)
+        
+        # only read the columns that are used
+        usedColumns = [columnCount for columnCount in range(len(key)) if key[columnCount] != -1]
+        columns = epResults.getValues(usedColumns)
+        for lineCount in xrange(1, epResults.rowCount + 1):
+            for columnCount in usedColumns:
+                column = columns[columnCount][lineCount - 1]
+                p = GH_Path(int(path[columnCount]))
+                
+                if key[columnCount] != -1:
+                    results.Add(float(column), p)
         parseSuccess = True
     except:
-        try: result.close()
-        except: pass
         parseSuccess = False
         warn = 'Failed to parse the result file.'
         print warn
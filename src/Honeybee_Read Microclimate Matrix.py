@@ -26,7 +26,7 @@ This component reads the results of an Adaptive Indoor Comfort Analysis.  Note t
 Provided by Honeybee 0.0.63
     
     Args:
-        _comfResultFileAddress: Any one of the result file addresses that comes out of the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Thermal Comfort Autonomy Analysis' component.
+        _comfResultFileAddress: Any one of the result file addresses that comes out of the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Thermal Comfort Autonomy Analysis' component.  This can be a csv file or a binary comfort matrix file (.hbcm).
     Returns:
         comfResultsMtx: A matrix of comfort data that can be plugged into the "Visualize Comfort Results" component.
 """
@@ -41,11 +41,17 @@ ghenv.Component.AdditionalHelpFromDocStrings = "6"
 
 
 import Grasshopper.Kernel as gh
+import scriptcontext as sc
 
 
 comfResultsMtx = []
 
-if _comfResultFileAddress:
+if _comfResultFileAddress and sc.sticky.has_key('honeybee_ComfortMatrixFile') and sc.sticky["honeybee_ComfortMatrixFile"].isMatrixFile(_comfResultFileAddress):
+    #Binary comfort matrix files are read without parsing any text.
+    comfMtxFile = sc.sticky["honeybee_ComfortMatrixFile"](_comfResultFileAddress)
+    try: comfResultsMtx = list(comfMtxFile)
+    finally: comfMtxFile.close()
+elif _comfResultFileAddress:
     try:
         result = open(_comfResultFileAddress, 'r')
         
@@ -21,7 +21,7 @@
 
 
 """
-This component reads the results of an EnergyPlus simulation from the WriteIDF Component or any EnergyPlus result .csv file address.  Note that, if you use this component without the WriteIDF component, you should make sure that a corresponding .eio file is next to your .csv file at the input address that you specify.
+This component reads the results of an EnergyPlus simulation from the WriteIDF Component or any EnergyPlus result .csv, .sql or .eso file address.  Note that, if you use this component without the WriteIDF component, you should make sure that a corresponding .eio file is next to your .csv file at the input address that you specify.
 _
 This component reads only the results related to Honeybee generation systems.  For other results related to zones, you should use the "Honeybee_Read EP Result" for HVAC use the "Honeybee_Read EP HVAC Result" component and, for results related to surfaces, you should use the "Honeybee_Read EP Surface Result" component.
 
@@ -29,7 +29,7 @@ This component reads only the results related to Honeybee generation systems.  F
 Provided by Honeybee 0.0.63
     
     Args:
-        _resultFileAddress: The result file address that comes out of the WriteIDF component.
+        _resultFileAddress: The result file address that comes out of the WriteIDF component.  This can also be the address of an EnergyPlus .sql or .eso file to read the results directly without converting them to csv.
         _idfFileAddress: The IDF file address that comes out of the WriteIDF component.
         gridelect_cost_schedule: The cost of grid connected electricty per Kwh in whatever currency the user wishes - Just make it consistent with other components you are using
         If you want to specify a flat rate just specify one value this will be used across all the hours of the year.
@@ -192,7 +192,7 @@ if checktheinputs(_resultFileAddress,_idfFileAddress) != -1:
 # 1. Read electricity generation outputs and electricity demand from IDF file
 
     try:
-        result = open(_resultFileAddress, 'r')
+        epResults = sc.sticky["honeybee_EPResultCache"].open(_resultFileAddress)
         
         netpurchasedelect = []
         totalelectdemand = []
@@ -203,147 +203,145 @@ if checktheinputs(_resultFileAddress,_idfFileAddress) != -1:
         electricloadcentername = []
         electricloadcenterrunperiod = None
         
-        for lineCount,line in enumerate(result):
+        # Read the headers of the CSVs files and create a dictonary entry in dict based on these headers
+        # Splitting this one line into columns of data
+        for columnCount, column in enumerate(epResults.headers):
             
-            # Read the headers of the CSVs files and create a dictonary entry in dict based on these headers
-            if lineCount == 0:
+            
+            # Extract the Whole Building:Facility Net Purchased Electric Energy output from the CSV,
+            # If there is a Honeybee generation system this will alway be written as a default output
+            if 'Whole Building:Facility Net Purchased Electric Energy' in column:
 
-                # Splitting this one line into columns of data
-                for columnCount, column in enumerate(line.split(',')):
-                    
-                    
-                    # Extract the Whole Building:Facility Net Purchased Electric Energy output from the CSV,
-                    # If there is a Honeybee generation system this will alway be written as a default output
-                    if 'Whole Building:Facility Net Purchased Electric Energy' in column:
+                dict['Whole Building:Facility Net Purchased Electric Energy'] = columnCount
+                
+                # Get the runperiod for the net purchased electric energy
+                facilitynet_purchasedelect_runperiod = column.split('(')[-1].split(')')[0]
+                dataTypeList[0] = True
+            # Extract the 'Whole Building:Facility Total Electric Demand Power' output from the CSV,
+            # If there is a Honeybee generation system this will alway be written as a default output
+            elif 'Whole Building:Facility Total Electric Demand Power' in column:
+
+                dict['Whole Building:Facility Total Electric Demand Power'] = columnCount
+                
+                # Get the runperiod for the facility electric demand power
+                facilityelect_demandpower_runperiod = column.split('(')[-1].split(')')[0]
+                
+                dataTypeList[1] = True
+            # Extract the Electricty energy produced by each Honeybee generation system
+            elif 'DISTRIBUTIONSYSTEM:Electric Load Center Produced Electric Energy' in column:
 
-                        dict['Whole Building:Facility Net Purchased Electric Energy'] = columnCount
-                        
-                        # Get the runperiod for the net purchased electric energy
-                        facilitynet_purchasedelect_runperiod = column.split('(')[-1].split(')')[0]
-                        dataTypeList[0] = True
-                    # Extract the 'Whole Building:Facility Total Electric Demand Power' output from the CSV,
-                    # If there is a Honeybee generation system this will alway be written as a default output
-                    elif 'Whole Building:Facility Total Electric Demand Power' in column:
-
-                        dict['Whole Building:Facility Total Electric Demand Power'] = columnCount
-                        
-                        # Get the runperiod for the facility electric demand power
-                        facilityelect_demandpower_runperiod = column.split('(')[-1].split(')')[0]
-                        
-                        dataTypeList[1] = True
-                    # Extract the Electricty energy produced by each Honeybee generation system
-                    elif 'DISTRIBUTIONSYSTEM:Electric Load Center Produced Electric Energy' in column:
+                data = column.split(':')
+                
+                electricloadcentername.append(data[0])
+                
+                # Get the runperiod for each Honeybee generation system
+                electricloadcenterrunperiod = column.split('(')[-1].split(')')[0]
+                
+                dict[str(data[0])+'- DISTRIBUTIONSYSTEM:Electric Load Center Produced Electric Energy'] = columnCount
+                dataTypeList[2] = True
+            else:
+                pass
+        
+        # Read the data of each header in the CSV file
+        # only read the columns that are used
+        usedColumns = sorted(dict.values())
+        columns = epResults.getValues(usedColumns)
+        for lineCount in xrange(1, epResults.rowCount + 1):
 
-                        data = column.split(':')
+            for rowCount in usedColumns:
+                row = columns[rowCount][lineCount - 1]
+
+                # Whole Building:Facility Net Purchased Electric Energy
+                if rowCount == dict['Whole Building:Facility Total Electric Demand Power']:
+                    
+                    if lineCount == 1:
                         
-                        electricloadcentername.append(data[0])
+                        # Add the header to each output
+                        makeHeader(totalelectdemand, facilityelect_demandpower_runperiod, 'Whole Building:Facility Total Electric Demand Power', 'Kwh')
                         
-                        # Get the runperiod for each Honeybee generation system
-                        electricloadcenterrunperiod = column.split('(')[-1].split(')')[0]
+                        if facilityelect_demandpower_runperiod == "RunPeriod":
+                            # For some reason EnergyPlus puts results here in watts,
+                            # if runperiod need to multiple results by number of seconds in a year
+                            # assume 31536000 then convert to Kwh
+                            
+                            totalelectdemand.append(round(float(row)*31536000/3600000,2))
+                            
+                        if facilityelect_demandpower_runperiod == "Monthly":
+                            
+                            # multiple results by number of seconds in a month 31536000/12
+                            
+                            totalelectdemand.append(round(float(row)*2628000/3600000,2))
                         
-                        dict[str(data[0])+'- DISTRIBUTIONSYSTEM:Electric Load Center Produced Electric Energy'] = columnCount
-                        dataTypeList[2] = True
+                        if facilityelect_demandpower_runperiod == "Daily":
+                            
+                            # multiple results by number of seconds in day 
+                            
+                            totalelectdemand.append(round(float(row)*86400/3600000,2))
+                            
+                        if facilityelect_demandpower_runperiod == "Hourly":
+                            
+                            # multiple results by number of seconds in an hour
+                            
+                            totalelectdemand.append(round(float(row)*3600/3600000,2))
                     else:
-                        pass
-            # Read the data of each header in the CSV file
-            else:
 
-                for rowCount, row in enumerate(line.split(',')):
+                        if facilityelect_demandpower_runperiod == 'RunPeriod':
+                            # For some reason EnergyPlus puts results here in watts,
+                            # if runperiod need to multiple results by number of seconds in a year
+                            # assume 31536000 then convert to Kwh
+                            totalelectdemand.append(round(float(row)*31536000/3600000,2))
 
-                    # Whole Building:Facility Net Purchased Electric Energy
-                    if rowCount == dict['Whole Building:Facility Total Electric Demand Power']:
-                        
-                        if lineCount == 1:
+                        if facilityelect_demandpower_runperiod == 'Monthly':
                             
-                            # Add the header to each output
-                            makeHeader(totalelectdemand, facilityelect_demandpower_runperiod, 'Whole Building:Facility Total Electric Demand Power', 'Kwh')
-                            
-                            if facilityelect_demandpower_runperiod == "RunPeriod":
-                                # For some reason EnergyPlus puts results here in watts,
-                                # if runperiod need to multiple results by number of seconds in a year
-                                # assume 31536000 then convert to Kwh
-                                
-                                totalelectdemand.append(round(float(row)*31536000/3600000,2))
-                                
-                            if facilityelect_demandpower_runperiod == "Monthly":
-                                
-                                # multiple results by number of seconds in a month 31536000/12
-                                
-                                totalelectdemand.append(round(float(row)*2628000/3600000,2))
+                            #multiple results by number of seconds in a month 31536000/12
                             
-                            if facilityelect_demandpower_runperiod == "Daily":
-                                
-                                # multiple results by number of seconds in day 
-                                
-                                totalelectdemand.append(round(float(row)*86400/3600000,2))
-                                
-                            if facilityelect_demandpower_runperiod == "Hourly":
-                                
-                                # multiple results by number of seconds in an hour
-                                
-                                totalelectdemand.append(round(float(row)*3600/3600000,2))
-                        else:
+                            totalelectdemand.append(round(float(row)*2628000/3600000,2))
 
-                            if facilityelect_demandpower_runperiod == 'RunPeriod':
-                                # For some reason EnergyPlus puts results here in watts,
-                                # if runperiod need to multiple results by number of seconds in a year
-                                # assume 31536000 then convert to Kwh
-                                totalelectdemand.append(round(float(row)*31536000/3600000,2))
-
-                            if facilityelect_demandpower_runperiod == 'Monthly':
-                                
-                                #multiple results by number of seconds in a month 31536000/12
-                                
-                                totalelectdemand.append(round(float(row)*2628000/3600000,2))
-
-                                
-                            if facilityelect_demandpower_runperiod == 'Daily':
-                                
-                                # multiple results by number of seconds in day 
-                                
-                                totalelectdemand.append(round(float(row)*86400/3600000,2))
-
-                            if facilityelect_demandpower_runperiod == 'Hourly':
-                                
-                                # multiple results by number of seconds in an hour
-                                
-                                totalelectdemand.append(round(float(row)*3600/3600000,2))
-
-                    # Whole Building:Facility Total Electric Demand Power
-                    if rowCount == dict['Whole Building:Facility Net Purchased Electric Energy']:
-                        
-                        if lineCount == 1:
                             
-                            # Add the header to each output
-                            makeHeader(netpurchasedelect, facilitynet_purchasedelect_runperiod, 'Whole Building:Facility Net Purchased Electric Energy', 'Kwh')
+                        if facilityelect_demandpower_runperiod == 'Daily':
                             
-                            netpurchasedelect.append(round(float(row)/3600000,2))
+                            # multiple results by number of seconds in day 
                             
-                        else:
+                            totalelectdemand.append(round(float(row)*86400/3600000,2))
+
+                        if facilityelect_demandpower_runperiod == 'Hourly':
                             
-                            netpurchasedelect.append(round(float(row)/3600000,2))
-                    
-                    # For each Honeybee generation system
-                    for count,electricloadcenter in enumerate(electricloadcentername): 
-                    
-                        if rowCount == dict[str(electricloadcenter)+'- DISTRIBUTIONSYSTEM:Electric Load Center Produced Electric Energy']:
+                            # multiple results by number of seconds in an hour
                             
-                            if lineCount == 1:
-                                # Add the header to each output
-                                
-                                makeHeaderdatatree(generatorproducedenergy, count, electricloadcenterrunperiod, 'Electric energy produced by the generator system named - '+str(electricloadcenter), 'Kwh')
-        
-                                generatorproducedenergy.Add(round(float(row)/3600000,2),GH_Path(count))
+                            totalelectdemand.append(round(float(row)*3600/3600000,2))
+
+                # Whole Building:Facility Total Electric Demand Power
+                if rowCount == dict['Whole Building:Facility Net Purchased Electric Energy']:
+                    
+                    if lineCount == 1:
+                        
+                        # Add the header to each output
+                        makeHeader(netpurchasedelect, facilitynet_purchasedelect_runperiod, 'Whole Building:Facility Net Purchased Electric Energy', 'Kwh')
+                        
+                        netpurchasedelect.append(round(float(row)/3600000,2))
+                        
+                    else:
+                        
+                        netpurchasedelect.append(round(float(row)/3600000,2))
+                
+                # For each Honeybee generation system
+                for count,electricloadcenter in enumerate(electricloadcentername): 
+                
+                    if rowCount == dict[str(electricloadcenter)+'- DISTRIBUTIONSYSTEM:Electric Load Center Produced Electric Energy']:
+                        
+                        if lineCount == 1:
+                            # Add the header to each output
                             
-                            else:
-                                generatorproducedenergy.Add(round(float(row)/3600000,2),GH_Path(count))
+                            makeHeaderdatatree(generatorproducedenergy, count, electricloadcenterrunperiod, 'Electric energy produced by the generator system named - '+str(electricloadcenter), 'Kwh')
+    
+                            generatorproducedenergy.Add(round(float(row)/3600000,2),GH_Path(count))
+                        
+                        else:
+                            generatorproducedenergy.Add(round(float(row)/3600000,2),GH_Path(count))
         parseSuccess = True
-        result.close()
     
     except:
     
-        try: result.close()
-        except: pass
         warn = 'Failed to parse the result file.  Check the folder of the file address you are plugging into this component and make sure that there is a .csv file in the folder. \n'+ \
                   'If there is no csv file or there is a file with no data in it (it is 0 kB), your simulation probably did not run correctly. \n' + \
                   'In this case, check the report out of the Run Simulation component to see what severe or fatal errors happened in the simulation. \n' + \
@@ -172,21 +172,29 @@ def main(octFile, analysisRecipe, numOfCPUs, thisRunName, runIt):
     # except image-based simulation
     testPtsEachCPU, lenOfPts = hb_writeRAD.writeTestPtFile(subWorkingDir, \
                                     radFileName, numOfCPUs, analysisRecipe)
-            
+    
+    # points are split into work units which are distributed between the CPUs
+    numOfUnits = numOfCPUs
+    if len(testPtsEachCPU)!=0: numOfUnits = len(testPtsEachCPU)
+    
     ######################## WRITE BATCH FILES #######################
     # if analysis type is annual this function will write hea files too
     initBatchFileName, batchFilesName, fileNames, pcompBatchFile, expectedResultFiles = \
                             hb_writeRAD.writeBatchFiles(subWorkingDir, radFileName, \
-                            radSkyFileName, "", "", numOfCPUs, testPtsEachCPU, \
+                            radSkyFileName, "", "", numOfUnits, testPtsEachCPU, \
                             lenOfPts, analysisRecipe, \
                             [], newOctFileName, runOverture = False)
     
     if runIt:
-        hb_writeRAD.runBatchFiles(initBatchFileName, batchFilesName, \
-                                  fileNames, pcompBatchFile, waitingTime)
+        failedJobs = hb_writeRAD.runBatchFiles(initBatchFileName, batchFilesName, \
+                                  fileNames, pcompBatchFile, waitingTime, numOfCPUs = numOfCPUs)
+        
+        for job in failedJobs:
+            msg = "%s failed with exit code %s. See %s"%(job.name, str(job.returnCode), job.logFile)
+            ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
         
         results = hb_writeRAD.collectResults(subWorkingDir, radFileName, \
-                                numOfCPUs, analysisRecipe, expectedResultFiles)
+                                numOfUnits, analysisRecipe, expectedResultFiles)
             
         if analysisRecipe.type == 0:
             HDRFileAddress = results
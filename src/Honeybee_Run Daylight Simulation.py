@@ -23,6 +23,10 @@
 """
 export geometries to rad file, and run daylighting/energy simulation
 
+-
+Grid-based and image-based studies that are identical to an earlier study are read from a result cache in the Honeybee folder instead of running Radiance again. Set overwriteResults_ to False to run Radiance again and replace the cached results of the study. To turn the cache off, zoom in on the component, add an input named useResultCache_ and set it to False.
+-
+Grid-based studies write the test points (.pts) and the results (.res) as binary files that are faster to write and read. To write text files that other tools can read, zoom in on the component, add an input named binaryGridFiles_ and set it to False. Annual studies always write text files.
 -
 Provided by Honeybee 0.0.63
 
@@ -31,7 +35,7 @@ Provided by Honeybee 0.0.63
         _HBObjects: List of Honeybee objects
         _analysisRecipe: An analysis recipe
         _writeRad: Write simulation files
-        runRad_: Run the analysis. _writeRad should be also set to true. Set to 2 if you want the analysis to run in background. This option is useful for parametric runs when you don't want to see command shells.
+        runRad_: Run the analysis. _writeRad should be also set to true. Set to 2 if you want the analysis to run in background. This option is useful for parametric runs when you don't want to see command shells. Set to 3 to run grid-based studies in the background with daylight coefficients for the 145 Tregenza sky patches or to 4 for the 577 Reinhart patches. The daylight coefficients are calculated once for each scene and saved to the disk so the next skies for the same scene only take a matrix multiplication. Set to 5 to trace grid-based studies with rtrace processes that keep running with the octree of the scene loaded, which is faster when only the test points change between runs.
         _numOfCPUs_: Number of CPUs to be used for the studies. This option doesn't work for image-based analysis
         _workingDir_: Working directory on your system. Default is set to C:\Ladybug
         _radFileName_: Input the project name as a string
@@ -80,7 +84,33 @@ ghenv.Component.Params.Output[3].NickName = "results"
 ghenv.Component.Params.Output[3].Name = "results"
 results = []
 
-def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir, radFileName, meshParameters, waitingTime, additionalRadFiles, overwriteResults, exportAirWalls):
+def getResultCacheKey(resultCache, subWorkingDir, radFileName, radSkyFileName, radFileFullName, \
+                      materialFileName, additionalRadFiles, numOfUnits, analysisRecipe, \
+                      batchFilesName, pcompBatchFile, daylightCoefficients):
+    # the results depend on the scene, the sky and the parameters
+    filePaths = [materialFileName, radSkyFileName, radFileFullName]
+    if additionalRadFiles:
+        filePaths.extend([f for f in additionalRadFiles if f != None])
+    
+    texts = []
+    if analysisRecipe.type == 0:
+        # the views are only in the batch files of image-based studies
+        for batchFileName in batchFilesName + [pcompBatchFile]:
+            with open(batchFileName, "r") as batchFile:
+                texts.append(batchFile.read().replace(subWorkingDir, "").replace(radFileName, "*"))
+    else:
+        # test points of the work units are joined so the key doesn't depend on the units
+        for unitCount in range(numOfUnits):
+            filePaths.append(os.path.join(subWorkingDir, radFileName + '_' + `unitCount` + '.pts'))
+    
+    skyDivisions = 0
+    if daylightCoefficients: skyDivisions = daylightCoefficients.skyDivisions
+    
+    return resultCache.getKey(filePaths, texts, analysisRecipe.type, analysisRecipe.simulationType, \
+                              sorted(analysisRecipe.radParameters.items()), skyDivisions)
+
+
+def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir, radFileName, meshParameters, waitingTime, additionalRadFiles, overwriteResults, exportAirWalls, binaryGridFiles = True, useResultCache = True):
     # import the classes
     w = gh.GH_RuntimeMessageLevel.Warning
     
@@ -113,7 +143,7 @@ def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir
         return -1
     
     lb_preparation = sc.sticky["ladybug_Preparation"]()
-    hb_writeRAD = sc.sticky["honeybee_WriteRAD"](ghenv.Component)
+    hb_writeRAD = sc.sticky["honeybee_WriteRAD"](ghenv.Component, binaryGridFiles)
     hb_writeRADAUX = sc.sticky["honeybee_WriteRADAUX"]()
     hb_materilaLib = sc.sticky["honeybee_materialLib"]
     hb_scheduleLib = sc.sticky["honeybee_ScheduleLib"]
@@ -196,23 +226,82 @@ def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir
     # except image-based simulation
     testPtsEachCPU, lenOfPts = hb_writeRAD.writeTestPtFile(subWorkingDir, radFileName, numOfCPUs, analysisRecipe)
     
+    # points are split into work units which are distributed between the CPUs
+    numOfUnits = numOfCPUs
     if len(testPtsEachCPU)!=0: # make sure it is a grid based analysis
-        numOfCPUs = len(testPtsEachCPU) #in case number of CPUs are more than number of test points
+        numOfUnits = len(testPtsEachCPU)
+    
+    # daylight coefficient and rtrace pool modes for grid-based studies
+    daylightCoefficients = None
+    useRtracePool = False
+    if (runRad == 3 or runRad == 4 or runRad == 5) and \
+        (analysisRecipe.type == 0 or analysisRecipe.type == 2):
+        msg = "Daylight coefficients and running rtrace processes are only used for grid-based studies. " + \
+              "The study will run without them."
+        print msg
+        ghenv.Component.AddRuntimeMessage(w, msg)
+    elif runRad == 3 or runRad == 4:
+        daylightCoefficients = sc.sticky["honeybee_DaylightCoefficients"](runRad - 2)
+    elif runRad == 5:
+        useRtracePool = True
     
     ######################## WRITE BATCH FILES #######################
     # if analysis type is annual this function will write hea files too
     initBatchFileName, batchFilesName, fileNames, pcompBatchFile, expectedResultFiles = \
                             hb_writeRAD.writeBatchFiles(subWorkingDir, radFileName, \
                             radSkyFileName, radFileFullName, materialFileName, \
-                            numOfCPUs, testPtsEachCPU, lenOfPts, analysisRecipe, \
-                            additionalRadFiles)
+                            numOfUnits, testPtsEachCPU, lenOfPts, analysisRecipe, \
+                            additionalRadFiles, daylightCoefficients = daylightCoefficients)
     
     if runRad:
-        hb_writeRAD.runBatchFiles(initBatchFileName, batchFilesName, \
-                                  fileNames, pcompBatchFile, waitingTime, runRad > 1)
+        # identical grid-based and image-based studies are read from the result cache
+        resultCache = None
+        if analysisRecipe.type != 2 and not useRtracePool and useResultCache:
+            # Radiance runs in the study folder and searches RAYPATH for the referenced files
+            resultCache = sc.sticky["honeybee_RADResultCache"](searchFolders = \
+                [subWorkingDir, sc.sticky["honeybee_folders"]["RADLibPath"]])
+            cacheKey = getResultCacheKey(resultCache, subWorkingDir, radFileName, radSkyFileName, \
+                                         radFileFullName, materialFileName, additionalRadFiles, \
+                                         numOfUnits, analysisRecipe, batchFilesName, \
+                                         pcompBatchFile, daylightCoefficients)
+            if cacheKey is None: resultCache = None
+        
+        if resultCache and overwriteResults == False:
+            # run the study again and replace the cached results
+            print "The cached results of this study will be replaced."
+            resultCache.misses += 1
+            cachedResults = False
+        elif resultCache:
+            cachedResults = resultCache.load(cacheKey, subWorkingDir, expectedResultFiles, lenOfPts)
+        else:
+            cachedResults = False
+        
+        if cachedResults:
+            # the results of the sky are already in the cache
+            hb_writeRAD.daylightCoefficientsJob = None
+            results = hb_writeRAD.collectResults(subWorkingDir, radFileName, \
+                                    numOfUnits, analysisRecipe, expectedResultFiles)
+        elif useRtracePool:
+            hb_writeRAD.runRtracePool(subWorkingDir, radFileName, radSkyFileName, radFileFullName, \
+                                      materialFileName, additionalRadFiles, analysisRecipe, \
+                                      numOfUnits, lenOfPts, numOfCPUs)
+            results = hb_writeRAD.collectResults(subWorkingDir, radFileName, \
+                                    numOfUnits, analysisRecipe, expectedResultFiles)
+        else:
+            failedJobs = hb_writeRAD.runBatchFiles(initBatchFileName, batchFilesName, \
+                                      fileNames, pcompBatchFile, waitingTime, runRad > 1, numOfCPUs)
+            
+            for job in failedJobs:
+                msg = "%s failed with exit code %s. See %s"%(job.name, str(job.returnCode), job.logFile)
+                ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+            
+            results = hb_writeRAD.collectResults(subWorkingDir, radFileName, \
+                                    numOfUnits, analysisRecipe, expectedResultFiles)
+            
+            if resultCache and not failedJobs:
+                resultCache.save(cacheKey, subWorkingDir, expectedResultFiles, lenOfPts)
         
-        results = hb_writeRAD.collectResults(subWorkingDir, radFileName, \
-                                numOfCPUs, analysisRecipe, expectedResultFiles)
+        if resultCache: print resultCache.report()
         
         if analysisRecipe.type == 2:
             DSResultFilesAddress, annualGlareResults = results
@@ -252,7 +341,8 @@ if _writeRad == True and _analysisRecipe!=None and ((len(_HBObjects)!=0 and _HBO
     
     result = main(north_, _HBObjects, _analysisRecipe, runRad_, numOfCPUs, \
                   _workingDir_, _radFileName_, meshSettings_, waitingTime, \
-                  additionalRadFiles_, overwriteResults_, exportAirWalls_)
+                  additionalRadFiles_, overwriteResults_, exportAirWalls_, globals().get('binaryGridFiles_', True) != False, \
+                  globals().get('useResultCache_', True) != False)
     
     if result!= -1:
         
@@ -49,13 +49,6 @@ except: pass
 import os
 import scriptcontext as sc
 import Grasshopper.Kernel as gh
-import subprocess
-
-def runCmdAndGetTheResults(command, shellKey = True):
-    p = subprocess.Popen(["cmd", command], shell=shellKey, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    out, err = p.communicate()
-    # p.kill()
-    return out, err
 
 def main(HDRFilePath, exposure):
     
@@ -73,9 +66,7 @@ def main(HDRFilePath, exposure):
             ghenv.Component.AddRuntimeMessage(w, warning)
             return
             
-        hb_folders = sc.sticky["honeybee_folders"]
-        hb_RADPath = hb_folders["RADPath"]
-        hb_RADLibPath = hb_folders["RADLibPath"]
+        hb_RGBEImage = sc.sticky["honeybee_RGBEImage"]
         
     else:
         print "You should first let Honeybee to fly..."
@@ -83,13 +74,6 @@ def main(HDRFilePath, exposure):
         ghenv.Component.AddRuntimeMessage(w, "You should first let Honeybee to fly...")
         return
     
-    # check for pfilt.exe
-    if not os.path.isfile(hb_RADPath + "\\pfilt.exe"):
-        msg = "Cannot find pfilt.exe at " + hb_RADPath + \
-              "Make sure that Radiance is fully installed on your system."
-        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
-        return
-        
     validExt = ["HDR", "PIC"]
     if HDRFilePath.split('.')[-1].upper() not in validExt:
         msg = "Input file is not a valid HDR file."
@@ -101,18 +85,13 @@ def main(HDRFilePath, exposure):
         fileName = "".join(inputFilePath.split("/")[-1].split('.')[:-1])
         outputFile = fileAddress + fileName + "@exp_" + "%.3f"%exposure + ".HDR"
         
-    batchStr = "SET RAYPATH=.;" + hb_RADLibPath + "n" + \
-                "PATH=" + hb_RADPath + ";$PATH\n\n" + \
-           "pfilt -e " + "%.3f"%exposure + " " + inputFilePath + " > " + outputFile + \
-           "\nexit"
-    
-    batchFileName = fileAddress + 'SETEXPOSURE.BAT'
-    batchFile = open(batchFileName, 'w')
-    batchFile.write(batchStr)
-    batchFile.close()
-    #os.system("start /min /B /wait " + batchFileName)
-    
-    runCmdAndGetTheResults("/c " + batchFileName)
+    # same as pfilt -e but without running pfilt
+    try:
+        hb_RGBEImage(inputFilePath).setExposure(outputFile, float("%.3f"%exposure))
+    except Exception, e:
+        msg = "Failed to set the exposure of the image:\n" + str(e)
+        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+        return
     
     return outputFile
 
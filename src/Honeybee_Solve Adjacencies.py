@@ -54,15 +54,6 @@ import scriptcontext as sc
 import Grasshopper.Kernel as gh
 import uuid
 
-def shootIt(rayList, geometry, tol = 0.01, bounce =1):
-   # shoot a list of rays from surface to geometry
-   # to find if geometry is adjacent to surface
-   for ray in rayList:
-        intPt = rc.Geometry.Intersect.Intersection.RayShoot(ray, geometry, bounce)
-        if intPt:
-            if ray.Position.DistanceTo(intPt[0]) <= tol:
-                return True #'Bang!'
-
 def updateZoneMixing(surface1, zone1, zone2):
     #Change the air mixing between the zone and other zones to "True"
     zone1.mixAir = True
@@ -233,13 +224,28 @@ def main(HBZones, altConstruction, altWinConstr, altBC, tol, remCurrent):
                     srf.setBC('OUTDOORS')
                     srf.setBCObjectToOutdoors()
     
+    # put all the surfaces in a spatial index so each surface is only tested against
+    # coplanar and opposite-facing surfaces of other zones with overlapping bounding boxes
+    adjacencyIndex = sc.sticky["honeybee_AdjacencyIndex"](tol + sc.doc.ModelAbsoluteTolerance, \
+                                                         sc.doc.ModelAngleToleranceRadians)
+    for zoneCount, zone in enumerate(HBZoneObjects):
+        for srfCount, srf in enumerate(zone.surfaces):
+            bbox = srf.geometry.GetBoundingBox(True)
+            adjacencyIndex.addSurface((zoneCount, srfCount), zoneCount, \
+                                      (bbox.Min.X, bbox.Min.Y, bbox.Min.Z), (bbox.Max.X, bbox.Max.Y, bbox.Max.Z), \
+                                      (srf.normalVector.X, srf.normalVector.Y, srf.normalVector.Z), \
+                                      (srf.cenPt.X, srf.cenPt.Y, srf.cenPt.Z))
+    
     # solve it zone by zone
-    for testZone in HBZoneObjects:
+    for zoneCount, testZone in enumerate(HBZoneObjects):
         # mesh each surface and test if it will be adjacent to any surface
         # from other zones
-        for srf in testZone.surfaces:
+        for srfCount, srf in enumerate(testZone.surfaces):
             #print srf.type, srf.BC 
             if srf.BC.upper() == 'OUTDOORS' or srf.BC.upper() == 'GROUND' or srf.BC.upper() == 'ADIABATIC':
+                candidates = sorted(adjacencyIndex.getCandidates((zoneCount, srfCount)))
+                if len(candidates) == 0: continue
+                
                 #Create a mesh of surface to use center points as test points
                 meshPar = rc.Geometry.MeshingParameters.Default
                 BrepMesh = rc.Geometry.Mesh.CreateFromBrep(srf.geometry, meshPar)[0]
@@ -248,43 +254,36 @@ def main(HBZones, altConstruction, altWinConstr, altBC, tol, remCurrent):
                 BrepMesh.FaceNormals.ComputeFaceNormals()
                 BrepMesh.FaceNormals.UnitizeFaceNormals()
                 
-                # dictionary to collect center points and rays
-                raysDict = {}
+                # collect center points
+                testPts = []
                 for faceIndex in range(BrepMesh.Faces.Count):
                     srfNormal = (BrepMesh.FaceNormals)[faceIndex]
                     meshSrfCen = BrepMesh.Faces.GetFaceCenter(faceIndex)
                     # move testPt backward for half of tolerance
                     meshSrfCen = rc.Geometry.Point3d.Add(meshSrfCen, -rc.Geometry.Vector3d(srfNormal)* tol /2)
-                    
-                    raysDict[meshSrfCen] = rc.Geometry.Ray3d(meshSrfCen, srfNormal)
+                    testPts.append(meshSrfCen)
                 
-                for targetZone in HBZoneObjects:
-                    if notTheSameZone(targetZone, testZone):
-                        # check ray intersection to see if this zone is next to the surface
-                        if shootIt(raysDict.values(), [targetZone.geometry], tol + sc.doc.ModelAbsoluteTolerance):
-                            for surface in targetZone.surfaces:
-                                # check if z value of center points matches
-                                #print abs(surface.cenPt.Z - srf.cenPt.Z)
-                                #if abs(surface.cenPt.Z - srf.cenPt.Z) < tol:
-                                # check distance with the nearest point on each surface
-                                for pt in raysDict.keys():
-                                    if surface.geometry.ClosestPoint(pt).DistanceTo(pt) <= tol:
-                                        # extra check for normal direction
-                                        normalAngle = abs(rc.Geometry.Vector3d.VectorAngle(surface.normalVector, srf.normalVector))
-                                        revNormalAngle = abs(rc.Geometry.Vector3d.VectorAngle(surface.normalVector, -srf.normalVector))
-                                        #print normalAngle
-                                        #print revNormalAngle
-                                        if normalAngle==0  or revNormalAngle <= sc.doc.ModelAngleToleranceRadians:
-                                            print 'Surface ' + srf.name + ' which is a ' + srf.srfType[srf.type] + \
-                                                  '\t-> is adjacent to <-\t' + surface.name + ' which is a ' + \
-                                                  surface.srfType[surface.type] + '.'
-                                            
-                                            updateAdj(srf, surface, altConstruction, altBC, altWinConstr, tol)                                        
-                                            if surface.type == 4:
-                                                flowRate = updateZoneMixing(surface, testZone, targetZone)
-                                                print "Air has been mixed between " + testZone.name + " and " + targetZone.name + " with a flow rate of " + str(flowRate) + " m3/s."
-                                            
-                                            break
+                for targetZoneCount, surfaceCount in candidates:
+                    targetZone = HBZoneObjects[targetZoneCount]
+                    if not notTheSameZone(targetZone, testZone): continue
+                    surface = targetZone.surfaces[surfaceCount]
+                    # check distance with the nearest point on each surface
+                    for pt in testPts:
+                        if surface.geometry.ClosestPoint(pt).DistanceTo(pt) <= tol:
+                            # extra check for normal direction
+                            normalAngle = abs(rc.Geometry.Vector3d.VectorAngle(surface.normalVector, srf.normalVector))
+                            revNormalAngle = abs(rc.Geometry.Vector3d.VectorAngle(surface.normalVector, -srf.normalVector))
+                            if normalAngle==0  or revNormalAngle <= sc.doc.ModelAngleToleranceRadians:
+                                print 'Surface ' + srf.name + ' which is a ' + srf.srfType[srf.type] + \
+                                      '\t-> is adjacent to <-\t' + surface.name + ' which is a ' + \
+                                      surface.srfType[surface.type] + '.'
+                                
+                                updateAdj(srf, surface, altConstruction, altBC, altWinConstr, tol)                                        
+                                if surface.type == 4:
+                                    flowRate = updateZoneMixing(surface, testZone, targetZone)
+                                    print "Air has been mixed between " + testZone.name + " and " + targetZone.name + " with a flow rate of " + str(flowRate) + " m3/s."
+                                
+                                break
     
     # add zones to memory
     ModifiedHBZones  = hb_hive.addToHoneybeeHive(HBZoneObjects, ghenv.Component)
@@ -111,10 +111,11 @@ def getSrfNames(HBZones):
     undergroundWall = []
     undergroundCeiling = []
     
+    # call the objects from the lib
+    # the zones are only read here so they are not copied
+    hb_hive = sc.sticky["honeybee_Hive"](copyOnWrite = True)
+    
     for zone in HBZones:
-        # call the objects from the lib
-        hb_hive = sc.sticky["honeybee_Hive"]()
-        
         zone = hb_hive.callFromHoneybeeHive([zone])[0]
         
         for srf in zone.surfaces:
@@ -160,7 +161,8 @@ def getSrfNames(HBZones):
             elif srf.type == 3: ceiling.append(srf.name)
             elif srf.type == 4: airWall.append(srf.name)
         
-        
+    print hb_hive.reportCopyStats()
+    
     return wall, interiorWall, airWall, window, interiorWindow, skylight, roof, \
            ceiling, floor, exposedFloor, groundFloor, undergroundWall, \
            undergroundCeiling
@@ -35,8 +35,8 @@ Levitt, B.; Ubbelohde, M.; Loisos, G.; Brown, N.  Thermal Autonomy as Metric and
 Provided by Honeybee 0.0.63
     
     Args:
-        _comfResultsMtx: A comfort matrix (adaptive, PMV or Outdoor) output from either the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Read Microclimate Matrix' component.
-        _degOrPMVMtx: The degreeFromTargetMtx, PMV_Mtx, or DegFromNeutralMtx from either the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Read Microclimate Matrix' component.
+        _comfResultsMtx: A comfort matrix (adaptive, PMV or Outdoor) output from either the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Read Microclimate Matrix' component.  The address of a binary comfort matrix file (.hbcm) can also be connected here.
+        _degOrPMVMtx: The degreeFromTargetMtx, PMV_Mtx, or DegFromNeutralMtx from either the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Read Microclimate Matrix' component.  The address of a binary comfort matrix file (.hbcm) can also be connected here.
         _viewFactorMesh: The list of view factor meshes that comes out of the  "Honeybee_Indoor View Factor Calculator".
         _HBZones: The HBZones out of any of the HB components that generate or alter zones.  Note that these should ideally be the zones that are fed into the Run Energy Simulation component as surfaces may not align otherwise.  Zones read back into Grasshopper from the Import idf component will not align correctly with the EP Result data.
         _totalThermalEnergy_: The totalThermalEnergy output from the "Honeybee_Read EP Result" component.  If no data tree is connected here, it will be assumed that all zones are completely passive and only occupancy will be taken into accout for the Thermal Autonomy calculation.
@@ -44,7 +44,7 @@ Provided by Honeybee 0.0.63
         occupancyThreshold_: An optional number between 0 and 1 that sets the minimum occupancy at which a zone is considered occupied.  This is done as the default occupancy is taken from the HBZone's occupancy schedules and, in some cases this value is low enough to ignore for the sake of calculating thermal autonomy.  The default is set to 0 such that any time when the zones are occpied count towards the values calculated by this component.
         workingDir_: An optional working directory on your system. Default is set to C:\Ladybug
         fileName_: An optional file name for the result files as a string.
-        writeResultFile_: Set to 1 or 'True' to have the component write all results into CSV result files and set to 0 or 'False' to not have the component write these files.  The default is set to 'True' as these simulations can be long and you usually want a copy of your results.  You may want to set it to 'False' if you are just scrolling through key hours and want the fastest run possible.  Set to 2 if you want the component to only write the results for the TCPocc and TCA matrices.
+        writeResultFile_: Set to 1 or 'True' to have the component write all results into CSV result files and set to 0 or 'False' to not have the component write these files.  The default is set to 'True' as these simulations can be long and you usually want a copy of your results.  You may want to set it to 'False' if you are just scrolling through key hours and want the fastest run possible.  Set to 2 if you want the component to only write the results for the TCPocc and TCA matrices.  Set to 3 to write all results into binary comfort matrix files (.hbcm) instead of CSV files.  These files keep the occupied hours of each point and can be connected directly to the 'Honeybee_Visualize Microclimate Map' component.  With 3, the results are written to the files one hour at a time and the matrix outputs are the addresses of the files, which keeps the memory use low for large numbers of test points.
         parallel_: Set to 'True' to have the operation run with multiple cores and 'False' to run it with a single core.  Note that, because the calculation performed by this component is fairly simple, setting parallel to 'True' can sometimes increase the calculation time so it should only be used in cases where there are a large number of test points.  Because of the possibility of increaseing calculation time, the default is set to 'False' to run the operation as single-core.
         _runIt: Set boolean to "True" to run the component and calculate comfort autonomy.
     Returns:
@@ -110,8 +110,10 @@ def recallHBZoneProperties(HOYs, occupancyThere):
     checkZones = True
     
     #Calls the zones and the libraries from the hive.
-    hb_hive = sc.sticky["honeybee_Hive"]()
+    #The zones are only read here so they are not copied.
+    hb_hive = sc.sticky["honeybee_Hive"](copyOnWrite = True)
     HBScheduleList = sc.sticky["honeybee_ScheduleLib"].keys()
+    hb_scheduleCompiler = sc.sticky["honeybee_ScheduleCompiler"]()
     
     for zoneCount, HZone in enumerate(_HBZones):
         zone = hb_hive.callFromHoneybeeHive([HZone])[0]
@@ -127,8 +129,13 @@ def recallHBZoneProperties(HOYs, occupancyThere):
                     ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
                     checkZones = False
                 else:
-                    readSchedules = sc.sticky["honeybee_ReadSchedules"](zoneOccSched, 0)
-                    values  = readSchedules.getScheduleValues()
+                    try:
+                        values = hb_scheduleCompiler.getAnnualValues(zoneOccSched, 0)
+                    except ValueError, e:
+                        msg = "Failed to read the occupancy schedule of " + zone.name + ": " + str(e)
+                        print msg
+                        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+                        checkZones = False
             elif zoneOccSched.lower().endswith(".csv"):
                 # check if csv file exists.
                 if not os.path.isfile(zoneOccSched):
@@ -147,11 +154,14 @@ def recallHBZoneProperties(HOYs, occupancyThere):
             try: values = lb_preparation.flattenList(values)
             except: pass
             analysisPValues = []
-            for hour in HOYs:
-                analysisPValues.append(values[hour-1])
+            if values:
+                for hour in HOYs:
+                    analysisPValues.append(values[hour-1])
             occupancySchList.append(analysisPValues)
     
     
+    print hb_hive.reportCopyStats()
+    
     return checkZones, zoneNames, occupancySchList
 
 def manageOutput():
@@ -413,19 +423,118 @@ def checkTheInputs():
     return checkData, fileName, workingDir, _viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbersFinal, zoneNames, occupancySchList, comfortType, occupancyThreshold
 
 
-def main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zoneNames, occupancySchList, comfortType, occupancyThreshold):
-    #Set up matrices to be filled.
-    occTCP_Mtx = [comfortType + ' Occupied Thermal Comfort Percent;' + str(analysisPeriod[0]) + ";" + str(analysisPeriod[1])]
-    TA_Mtx = [comfortType + ' Thermal Autonomy;' + str(analysisPeriod[0]) + ";" + str(analysisPeriod[1])]
-    OverHeatedMtx = [comfortType + ' Over-Heated Percent;' + str(analysisPeriod[0]) + ";" + str(analysisPeriod[1])]
-    UnderHeatedMtx = [comfortType + ' Under-Heated Percent;' + str(analysisPeriod[0]) + ";" + str(analysisPeriod[1])]
-    
-    #Create placeholders for all of the hours.
-    for hour in occupancySchList[0]:
-        occTCP_Mtx.append(0)
-        TA_Mtx.append(0)
-        OverHeatedMtx.append(0)
-        UnderHeatedMtx.append(0)
+class ThermalAutonomyCounter(object):
+    """Count the occupied hours of each point one hour at a time.
+    
+    Only the running totals of the points are kept in memory.  The values of each hour
+    are passed on to the hourly writers (e.g. the append method of a matrix or the
+    writeValues method of a comfort matrix writer) when they are given.  The values of the
+    unoccupied hours are 0.0 by default and can be set to NaN for the comfort matrix files.
+    """
+    
+    def __init__(self, pointZoneList, occupancySchList, totEnergyNumbers, occupancyThreshold, unoccupiedValue = 0.0):
+        self.unoccupiedValue = unoccupiedValue
+        self.pointZoneList = pointZoneList
+        self.occupancySchList = occupancySchList
+        self.totEnergyNumbers = totEnergyNumbers
+        self.occupancyThreshold = occupancyThreshold
+        
+        #Running totals of the occupied, comfortable, passive, over-heated and under-heated hours of each point.
+        pointCount = len(pointZoneList)
+        self.occHrsNum = [0] * pointCount
+        self.comfHrsNum = [0] * pointCount
+        self.passiveHrsNum = [0] * pointCount
+        self.overHeatedHrsNum = [0] * pointCount
+        self.underHeatedHrsNum = [0] * pointCount
+    
+    def addHour(self, count, comfValues, degOrPMVValues):
+        """Add an hour of the analysis and return the occTCP, TA, OverHeated and UnderHeated values of the points."""
+        occTCP = []
+        TA = []
+        OverHeated = []
+        UnderHeated = []
+        
+        #Check which zones are occupied and conditioned once for the hour.
+        occupiedZones = []
+        passiveZones = []
+        for zoneCount, schedule in enumerate(self.occupancySchList):
+            try: occupiedZones.append(schedule[count] > self.occupancyThreshold)
+            except IndexError: occupiedZones.append(None)
+            try: passiveZones.append(not self.totEnergyNumbers[zoneCount][count] > 0)
+            except IndexError: passiveZones.append(None)
+        
+        pointZoneList = self.pointZoneList
+        unoccupied = self.unoccupiedValue
+        for pointCount in xrange(min(len(pointZoneList), len(comfValues))):
+            pointZone = pointZoneList[pointCount]
+            occupied = occupiedZones[pointZone]
+            if occupied == None: continue
+            #Check to see if the point's zone is occupied.  Otheriswe, it does not count for anything.
+            if occupied:
+                self.occHrsNum[pointCount] += 1
+                #Check to see if the point is comfortable.
+                if comfValues[pointCount] > 0:
+                    self.comfHrsNum[pointCount] += 1
+                    occTCP.append(1)
+                    OverHeated.append(0)
+                    UnderHeated.append(0)
+                    #Check to see if the point's zone is being conditioned.
+                    if passiveZones[pointZone]:
+                        self.passiveHrsNum[pointCount] += 1
+                        TA.append(1)
+                    else: TA.append(0)
+                else:
+                    occTCP.append(0)
+                    TA.append(0)
+                    if degOrPMVValues[pointCount] > 0:
+                        self.overHeatedHrsNum[pointCount] += 1
+                        OverHeated.append(1)
+                        UnderHeated.append(0)
+                    else:
+                        self.underHeatedHrsNum[pointCount] += 1
+                        OverHeated.append(0)
+                        UnderHeated.append(1)
+            else:
+                occTCP.append(unoccupied)
+                TA.append(unoccupied)
+                OverHeated.append(unoccupied)
+                UnderHeated.append(unoccupied)
+        
+        return occTCP, TA, OverHeated, UnderHeated
+    
+    def printSummary(self):
+        """Print the average percent of the occupied hours of the points for each result."""
+        occHrs = float(sum(self.occHrsNum))
+        if occHrs == 0: return
+        print "Average occupied thermal comfort percent of the points: " + str(round(100 * sum(self.comfHrsNum) / occHrs, 2))
+        print "Average thermal autonomy of the points: " + str(round(100 * sum(self.passiveHrsNum) / occHrs, 2))
+        print "Average over-heated percent of the points: " + str(round(100 * sum(self.overHeatedHrsNum) / occHrs, 2))
+        print "Average under-heated percent of the points: " + str(round(100 * sum(self.underHeatedHrsNum) / occHrs, 2))
+    
+    def run(self, comfResultsMtx, degOrPMVMtx, hourCount, hourlyWriters = None):
+        """Count all of the hours of the matrices.
+        
+        The rows are requested one at a time so binary comfort matrix files are read from
+        the disk hour by hour.
+        """
+        for count in xrange(hourCount):
+            try:
+                comfValues = comfResultsMtx[count + 1]
+                degOrPMVValues = degOrPMVMtx[count + 1]
+            except IndexError:
+                comfValues, degOrPMVValues = [], []
+            hourValues = self.addHour(count, comfValues, degOrPMVValues)
+            if hourlyWriters:
+                for writer, values in zip(hourlyWriters, hourValues): writer(values)
+        self.printSummary()
+
+
+def main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zoneNames, occupancySchList, comfortType, occupancyThreshold, resultFiles = None):
+    #Set up the headers of the matrices to be filled.
+    headers = [comfortType + ' Occupied Thermal Comfort Percent;' + str(analysisPeriod[0]) + ";" + str(analysisPeriod[1]),
+        comfortType + ' Thermal Autonomy;' + str(analysisPeriod[0]) + ";" + str(analysisPeriod[1]),
+        comfortType + ' Over-Heated Percent;' + str(analysisPeriod[0]) + ";" + str(analysisPeriod[1]),
+        comfortType + ' Under-Heated Percent;' + str(analysisPeriod[0]) + ";" + str(analysisPeriod[1])]
    
     #Match the totalEnergy values to the HBZones.
     totEnergyNumbersMatched = []
@@ -471,86 +580,43 @@ def main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zon
         occupancySchList.append(additionalOccSchList)
         totEnergyNumbersMatched.append(additionalENumList)
     
-    #Make a list that tracks the total occupied hours for each of the points.
-    occHrsNum = []
-    for point in pointZoneList: occHrsNum.append(0)
-    
-    #Finally, compute the matrices for each hour and point.
-    def calcComf(count):
-        occTCP = []
-        TA = []
-        OverHeated = []
-        UnderHeated = []
-        for pointCount, pointZone in enumerate(pointZoneList):
-            try:
-                _comfResultsMtx[count + 1][pointCount]
-                #Check to see if the point's zone is occupied.  Otheriswe, it does not count for anything.
-                if occupancySchList[pointZone][count] > occupancyThreshold:
-                    occHrsNum[pointCount] += 1
-                    #Check to see if the point is comfortable.
-                    if _comfResultsMtx[count + 1][pointCount] > 0:
-                        occTCP.append(1)
-                        OverHeated.append(0)
-                        UnderHeated.append(0)
-                        #Check to see if the point's zone is being conditioned.
-                        if totEnergyNumbersMatched[pointZone][count] > 0: TA.append(0)
-                        else: TA.append(1)
-                    else:
-                        occTCP.append(0)
-                        TA.append(0)
-                        if _degOrPMVMtx[count + 1][pointCount] > 0:
-                            OverHeated.append(1)
-                            UnderHeated.append(0)
-                        else:
-                            OverHeated.append(0)
-                            UnderHeated.append(1)
-                else:
-                    occTCP.append(0.0)
-                    TA.append(0.0)
-                    OverHeated.append(0.0)
-                    UnderHeated.append(0.0)
-            except:
-                pass
-        
-        occTCP_Mtx[count+1] = occTCP
-        TA_Mtx[count+1] = TA
-        OverHeatedMtx[count+1] = OverHeated
-        UnderHeatedMtx[count+1] = UnderHeated
-    
-    #Run through every hour of the analysis to fill up the matrices.
-    #if parallel_ == True and len(occupancySchList[0]) != 1:
-    #    tasks.Parallel.ForEach(range(len(occupancySchList[0])), calcComf)
-    #else:
-    for hour in range(len(occupancySchList[0])):
-        calcComf(hour)
-    
-    # Add the total occupied hours to the matrix (to be used to help calculate comfort autonomy).
-    occTCP_Mtx.append(occHrsNum)
-    TA_Mtx.append(occHrsNum)
-    OverHeatedMtx.append(occHrsNum)
-    UnderHeatedMtx.append(occHrsNum)
-    
-    
-    return occTCP_Mtx, TA_Mtx, OverHeatedMtx, UnderHeatedMtx
+    #Count the hours of the points one hour at a time.  Only the hourly values are kept in memory unless the matrices are requested as outputs.
+    hourCount = len(occupancySchList[0])
+    if resultFiles == None:
+        #Fill up the matrices.
+        counter = ThermalAutonomyCounter(pointZoneList, occupancySchList, totEnergyNumbersMatched, occupancyThreshold)
+        matrices = [[header] for header in headers]
+        counter.run(_comfResultsMtx, _degOrPMVMtx, hourCount, [mtx.append for mtx in matrices])
+        # Add the total occupied hours to the matrix (to be used to help calculate comfort autonomy).
+        for mtx in matrices: mtx.append(counter.occHrsNum)
+        return matrices
+    else:
+        #Write the hours directly into the binary result files.
+        counter = ThermalAutonomyCounter(pointZoneList, occupancySchList, totEnergyNumbersMatched, occupancyThreshold, float('nan'))
+        hbCMWriter = sc.sticky["honeybee_ComfortMatrixWriter"]
+        writers = [hbCMWriter(resultFile, header, len(pointZoneList), occupied = True) for resultFile, header in zip(resultFiles, headers)]
+        try:
+            counter.run(_comfResultsMtx, _degOrPMVMtx, hourCount, [writer.writeValues for writer in writers])
+        finally:
+            for writer in writers: writer.close(counter.occHrsNum)
+        return resultFiles
 
-def writeCSV(comfortType, fileName, directory, occTCP_Mtx, TA_Mtx, OverHeatedMtx, UnderHeatedMtx):
-    #Find out the number of values in each hour.
-    valLen = len(occTCP_Mtx[1])-1
-    
+def resultFilePaths(comfortType, fileName, directory, extension):
     #Set up a working directory.
     workingDir = lb_preparation.makeWorkingDir(os.path.join(directory)) 
     
-    #Create csv files.
-    occTCPFile = fileName + comfortType + "occTCP.csv"
-    TAFile = fileName + comfortType + "TA.csv"
-    OverHeatedFile = fileName + comfortType + "OverHeated.csv"
-    UnderHeatedFile = fileName + comfortType + "UnderHeated.csv"
-    
-    #Write the occTCP result file.
-    occTCP_Result = os.path.join(workingDir, occTCPFile)
-    occTCPCSVfile = open(occTCP_Result, 'wb')
+    #Create the addresses of the result files.
+    occTCP_Result = os.path.join(workingDir, fileName + comfortType + "occTCP" + extension)
+    TA_Result = os.path.join(workingDir, fileName + comfortType + "TA" + extension)
+    OverHeatedResult = os.path.join(workingDir, fileName + comfortType + "OverHeated" + extension)
+    UnderHeatedResult = os.path.join(workingDir, fileName + comfortType + "UnderHeated" + extension)
     
-    for lineCount, line in enumerate(occTCP_Mtx):
+    return [occTCP_Result, TA_Result, OverHeatedResult, UnderHeatedResult]
+
+def writeResultMatrix(resultFile, resultMtx, valLen):
+    #Write a result matrix to a csv file.
+    resultCSVfile = open(resultFile, 'wb')
+    for lineCount, line in enumerate(resultMtx):
         lineStr = ''
         if lineCount != 0:
             for valCt, val in enumerate(line):
@@ -560,64 +626,32 @@ def writeCSV(comfortType, fileName, directory, occTCP_Mtx, TA_Mtx, OverHeatedMtx
                     lineStr = lineStr + str(val) + ','
                 else:
                     pass
-            occTCPCSVfile.write(lineStr)
-        else: occTCPCSVfile.write(line + "\n")
-    occTCPCSVfile.close()
+            resultCSVfile.write(lineStr)
+        else: resultCSVfile.write(line + "\n")
+    resultCSVfile.close()
+
+def writeCSV(comfortType, fileName, directory, occTCP_Mtx, TA_Mtx, OverHeatedMtx, UnderHeatedMtx):
+    #Find out the number of values in each hour.
+    valLen = len(occTCP_Mtx[1])-1
+    
+    #Create csv files.
+    occTCP_Result, TA_Result, OverHeatedResult, UnderHeatedResult = resultFilePaths(comfortType, fileName, directory, ".csv")
+    
+    #Write the occTCP result file.
+    writeResultMatrix(occTCP_Result, occTCP_Mtx, valLen)
     
     #Write the TA result file.
-    TA_Result = os.path.join(workingDir, TAFile)
-    TACSVfile = open(TA_Result, 'wb')
-    for lineCount, line in enumerate(TA_Mtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt == valLen:
-                    lineStr = lineStr + str(val) + "\n"
-                elif valCt < valLen:
-                    lineStr = lineStr + str(val) + ','
-                else:
-                    pass
-            TACSVfile.write(lineStr)
-        else: TACSVfile.write(line + "\n")
-    TACSVfile.close()
+    writeResultMatrix(TA_Result, TA_Mtx, valLen)
     
     #Write the OverHeated result file.
     if writeResultFile_ != 2:
-        OverHeatedResult = os.path.join(workingDir, OverHeatedFile)
-        OverHeatedCSVfile = open(OverHeatedResult, 'wb')
-        for lineCount, line in enumerate(OverHeatedMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt == valLen:
-                        lineStr = lineStr + str(val) + "\n"
-                    elif valCt < valLen:
-                        lineStr = lineStr + str(val) + ','
-                    else:
-                        pass
-                OverHeatedCSVfile.write(lineStr)
-            else: OverHeatedCSVfile.write(line + "\n")
-        OverHeatedCSVfile.close()
+        writeResultMatrix(OverHeatedResult, OverHeatedMtx, valLen)
     else:
         OverHeatedResult = None
     
     #Write the UnderHeated result file.
     if writeResultFile_ != 2:
-        UnderHeatedResult = os.path.join(workingDir, UnderHeatedFile)
-        UnderHeatedCSVfile = open(UnderHeatedResult, 'wb')
-        for lineCount, line in enumerate(UnderHeatedMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt == valLen:
-                        lineStr = lineStr + str(val) + "\n"
-                    elif valCt < valLen:
-                        lineStr = lineStr + str(val) + ','
-                    else:
-                        pass
-                UnderHeatedCSVfile.write(lineStr)
-            else: UnderHeatedCSVfile.write(line + "\n")
-        UnderHeatedCSVfile.close()
+        writeResultMatrix(UnderHeatedResult, UnderHeatedMtx, valLen)
     else:
         UnderHeatedResult = None
     
@@ -641,6 +675,12 @@ else:
 #Manage the input and output.
 manageOutput()
 
+#Binary comfort matrix files can be connected instead of the matrices.
+if checkLB == True and len(_comfResultsMtx) == 1 and sc.sticky["honeybee_ComfortMatrixFile"].isMatrixFile(_comfResultsMtx[0]):
+    _comfResultsMtx = sc.sticky["honeybee_ComfortMatrixFile"](_comfResultsMtx[0])
+if checkLB == True and len(_degOrPMVMtx) == 1 and sc.sticky["honeybee_ComfortMatrixFile"].isMatrixFile(_degOrPMVMtx[0]):
+    _degOrPMVMtx = sc.sticky["honeybee_ComfortMatrixFile"](_degOrPMVMtx[0])
+
 checkData = False
 annualData = True
 simStepPossible = True
@@ -648,7 +688,15 @@ if len(_comfResultsMtx) > 0 and len(_degOrPMVMtx) >0 and len(_viewFactorMesh) >
     if _comfResultsMtx[0] != None and _viewFactorMesh[0] != None:
         checkData, fileName, workingDir, viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zoneNames, occupancySchList, comfortType, occupancyThreshold = checkTheInputs()
     
-    if checkData == True and _runIt == True:
+    if checkData == True and _runIt == True and writeResultFile_ == 3:
+        #Stream the results into binary result files.  The addresses of the files can be connected to the 'Honeybee_Visualize Microclimate Map' component.
+        resultFiles = resultFilePaths(comfortType, fileName, workingDir, sc.sticky["honeybee_ComfortMatrixFile"].EXTENSION)
+        occTCP_Result, TA_Result, OverHeatedResult, UnderHeatedResult = main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zoneNames, occupancySchList, comfortType, occupancyThreshold, resultFiles)
+        occTCP_Mtx, TA_Mtx, OverHeatedMtx, UnderHeatedMtx = occTCP_Result, TA_Result, OverHeatedResult, UnderHeatedResult
+    elif checkData == True and _runIt == True:
         occTCP_Mtx, TA_Mtx, OverHeatedMtx, UnderHeatedMtx = main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zoneNames, occupancySchList, comfortType, occupancyThreshold)
         if writeResultFile_ != 0: 
-            occTCP_Result, TA_Result, OverHeatedResult, UnderHeatedResult = writeCSV(comfortType, fileName, workingDir, occTCP_Mtx, TA_Mtx, OverHeatedMtx, UnderHeatedMtx)
\ No newline at end of file
+            occTCP_Result, TA_Result, OverHeatedResult, UnderHeatedResult = writeCSV(comfortType, fileName, workingDir, occTCP_Mtx, TA_Mtx, OverHeatedMtx, UnderHeatedMtx)
+
+if hasattr(_comfResultsMtx, 'close'): _comfResultsMtx.close()
+if hasattr(_degOrPMVMtx, 'close'): _degOrPMVMtx.close()
\ No newline at end of file
@@ -27,7 +27,7 @@ Use this component to produce a colored mesh from a comfResultsMtx.
 Provided by Honeybee 0.0.63
     
     Args:
-        _comfResultsMtx: Any matrix output from the 'Honeybee_Microclimate Map Analysis' component, the 'Honeybee_Thermal Comfort Autonomy Analysis' component, or the 'Honeybee_Read Microclimate Matrix' component.
+        _comfResultsMtx: Any matrix output from the 'Honeybee_Microclimate Map Analysis' component, the 'Honeybee_Thermal Comfort Autonomy Analysis' component, or the 'Honeybee_Read Microclimate Matrix' component.  The address of a binary comfort matrix file (.hbcm) can also be connected here and only the hours that are needed will be read from the file.
         _viewFactorMesh: The list of view factor meshes that comes out of the  "Honeybee_Indoor View Factor Calculator".  These will be colored with result data.
         ===========: ...
         analysisPeriod_: Note that that connecting a value to 'stepOfSimulation_' will override this input.
@@ -75,7 +75,7 @@ w = gh.GH_RuntimeMessageLevel.Warning
 
 inputsDict = {
     
-0: ["_comfResultsMtx", "Any matrix output from the 'Honeybee_Microclimate Map Analysis' component, the 'Honeybee_Thermal Comfort Autonomy Analysis' component, or the 'Honeybee_Read Microclimate Matrix' component."],
+0: ["_comfResultsMtx", "Any matrix output from the 'Honeybee_Microclimate Map Analysis' component, the 'Honeybee_Thermal Comfort Autonomy Analysis' component, or the 'Honeybee_Read Microclimate Matrix' component.  The address of a binary comfort matrix file (.hbcm) can also be connected here and only the hours that are needed will be read from the file."],
 1: ["_viewFactorMesh", "The list of view factor meshes that comes out of the  'Honeybee_Indoor View Factor Calculator'.  These will be colored with result data."],
 2: ["===========", "..."],
 3: ["analysisPeriod_", "Optional analysisPeriod_ to take a slice out of the data stream.  Note that that connecting a value to 'stepOfSimulation_' will override this input."],
@@ -122,7 +122,7 @@ def checkTheInputs():
         analysisPeriod = []
     if _comfResultsMtx[0].split(";")[-2] == "(1, 1, 1)" and _comfResultsMtx[0].split(";")[-1] == "(12, 31, 24)": annualData = True
     else: annualData = False
-    if len(_comfResultsMtx[1:]) == 1: simStepPossible = False
+    if len(_comfResultsMtx) == 2: simStepPossible = False
     else: simStepPossible = True
     
     #Check the HOY to be sure that it is in the counds of the matrix.
@@ -178,7 +178,40 @@ def restoreInputOutput():
         ghenv.Component.Params.Input[input].Description = inputsDict[input][1]
 
 
+def computeComfFileValues(comfMtxFile, analysisP, comfMtxAnalysisP, stepOfSimulation, annualData, simStepPossible, percentOrTotal, totalAble, lb_preparation):
+    #Compute the values from a binary comfort matrix file by reading only the hours that are needed.
+    total = percentOrTotal == False and totalAble == True
+    
+    if stepOfSimulation != None and simStepPossible == True:
+        return comfMtxFile[stepOfSimulation]
+    elif len(analysisP) > 0 and analysisP != comfMtxAnalysisP and annualData == True:
+        #Get the HOYs of the analysis period
+        HOYS, months, days = lb_preparation.getHOYsBasedOnPeriod(analysisP, 1)
+    elif len(analysisP) > 0 and analysisP != comfMtxAnalysisP and annualData == False and simStepPossible == True:
+        #Check the data anlysis period and subtract the start day from each of the HOYs.
+        HOYS, months, days = lb_preparation.getHOYsBasedOnPeriod(analysisP, 1)
+        FinalHOYs, mon, days = lb_preparation.getHOYsBasedOnPeriod(comfMtxAnalysisP, 1)
+        HOYS = [hour - FinalHOYs[0] + 1 for hour in HOYS]
+        
+        #Check to see if the hours of the requested analysis period are in the comfResultsMtx.
+        if min(HOYS) < 0 or max(HOYS) > comfMtxFile.hourCount:
+            warning = 'The analysis period of the confResultsMtx and that which is plugged into this component do not align.'
+            print warning
+            ghenv.Component.AddRuntimeMessage(w, warning)
+            return []
+    else:
+        HOYS = range(1, comfMtxFile.hourCount + 1)
+    
+    rows = [hour for hour in HOYS if 0 < hour <= comfMtxFile.hourCount]
+    if rows == []: return []
+    return comfMtxFile.getPeriodValues(rows, total)
+
+
 def computeComfValues(comfResultsMtx, analysisP, comfMtxAnalysisP, stepOfSimulation, annualData, simStepPossible, occDataType, percentOrTotal, totalAble, lb_preparation):
+    #A binary comfort matrix file is read one hour at a time instead of transposing the whole matrix.
+    if hasattr(comfResultsMtx, 'getPeriodValues'):
+        return computeComfFileValues(comfResultsMtx, analysisP, comfMtxAnalysisP, stepOfSimulation, annualData, simStepPossible, percentOrTotal, totalAble, lb_preparation)
+    
     #Create a list to be filled with values of comfort.
     comfortFactorVals = []
     
@@ -471,6 +504,11 @@ else:
     w = gh.GH_RuntimeMessageLevel.Warning
     ghenv.Component.AddRuntimeMessage(w, "You should let the Ladybug fly first...")
 
+#A binary comfort matrix file can be connected instead of the matrix.
+if len(_comfResultsMtx) == 1 and sc.sticky.has_key('honeybee_ComfortMatrixFile'):
+    if sc.sticky["honeybee_ComfortMatrixFile"].isMatrixFile(_comfResultsMtx[0]):
+        _comfResultsMtx = sc.sticky["honeybee_ComfortMatrixFile"](_comfResultsMtx[0])
+
 checkData = False
 annualData = True
 simStepPossible = True
@@ -521,3 +559,5 @@ if checkData == True and runIt == True:
             resultMesh.Add(mesh, GH_Path(meshCt))
         
         ghenv.Component.Params.Output[4].Hidden = True
+
+if hasattr(_comfResultsMtx, 'close'): _comfResultsMtx.close()
@@ -127,6 +127,7 @@ def main(skyFilePath, imageSize):
         hb_folders = sc.sticky["honeybee_folders"]
         hb_RADPath = hb_folders["RADPath"]
         hb_RADLibPath = hb_folders["RADLibPath"]
+        hb_RGBEImage = sc.sticky["honeybee_RGBEImage"]
         
     else:
         print "You should first let Honeybee to fly..."
@@ -134,7 +135,7 @@ def main(skyFilePath, imageSize):
         ghenv.Component.AddRuntimeMessage(w, "You should first let Honeybee to fly...")
         return None, None
     
-    fileNames = ["oconv.exe", "rpict.exe", "pcond.exe", "pflip.exe"]
+    fileNames = ["oconv.exe", "rpict.exe", "pcond.exe"]
     # check for files
     for fileName in fileNames:
         if not os.path.isfile(hb_RADPath + "\\" + fileName):
@@ -179,7 +180,6 @@ def main(skyFilePath, imageSize):
               rpictL + "\n" + \
               rtraceL + "\n" + \
               "pcond -h+ " + skyImageFile + " > " + hSkyImageFile + "\n" + \
-              "pflip -h " + hSkyImageFile + " > " + flippedSkyImageFile + "\n" + \
               "exit"
 
     with open(projectName + ".bat", "w") as outf:
@@ -188,6 +188,13 @@ def main(skyFilePath, imageSize):
     #os.system(projectName + ".bat")
     runCmdAndGetTheResults( "/c " + projectName + ".bat")
     
+    # same as pflip -h
+    try:
+        hb_RGBEImage(hSkyImageFile).flipHorizontal(flippedSkyImageFile)
+    except Exception, e:
+        msg = "Failed to flip the sky image:\n" + str(e)
+        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+    
     # read the result of the global horizontal irradiance
     with open(resultFile, "r") as inf:
         try: